@@ -25,7 +25,9 @@ from app.core.config import settings
 from app.core.logging import get_logger
 from app.storage.connection_manager import MongoConnectionManager
 from app.services.llm import LLMService
-from app.services.agent_monitor import agent_monitor
+from app.services.llm_cache import LLMCachePolicy
+from app.services.llm_scheduler import LLMPriority
+from app.services.admin_stream import get_admin_stream_broadcaster
 from app.services.memory import MemoryService
 from app.services.options_cache import get_options_cache
 
@@ -1388,33 +1390,21 @@ async def get_ai_learning_metrics(_auth: bool = Depends(verify_admin_auth)):
     ตัวชี้วัดผลความแม่นยำและการเรียนรู้ AI ต่อผู้ใช้ (RL, Choice History, Memory)
     """
     try:
-        from app.storage.connection_manager import ConnectionManager
-        from app.services.selection_preferences import COLLECTION_CHOICE_HISTORY
-        mongo_manager = ConnectionManager.get_instance()
-        db = mongo_manager.get_mongo_database()
-        if db is None:
+        from app.services.learning_metrics import get_learning_metrics_service
+        # ยอดรวมจาก estimated_document_count (metadata ของ collection), จำนวน user นับบน server ด้วย $group/$count
+        summary = await get_learning_metrics_service().summary()
+        if summary is None:
             return {"error": "Database not available", "rl": {}, "choice_history": {}, "memory": {}, "scores": {}}
-        rl_rewards = db["user_feedback_history"]
-        rl_qtable = db["user_preference_scores"]
-        choice_col = db[COLLECTION_CHOICE_HISTORY]
-        memories_col = db["memories"]
-
-        total_rewards = await rl_rewards.count_documents({})
-        total_q = await rl_qtable.count_documents({})
-        users_with_rewards = len(await rl_rewards.distinct("user_id"))
-        users_with_q = len(await rl_qtable.distinct("user_id"))
-        recent_rewards = await rl_rewards.find({}).sort("created_at", -1).limit(100).to_list(length=100)
-        avg_reward = 0.0
-        if recent_rewards:
-            avg_reward = sum(r.get("reward", 0) for r in recent_rewards) / len(recent_rewards)
-        positive_count = sum(1 for r in recent_rewards if r.get("reward", 0) > 0)
-        reward_positive_ratio = (positive_count / len(recent_rewards) * 100) if recent_rewards else 0
-
-        total_choices = await choice_col.count_documents({})
-        users_with_choices = len(await choice_col.distinct("user_id"))
-
-        total_memories = await memories_col.count_documents({})
-        users_with_memories = len(await memories_col.distinct("user_id"))
+        total_rewards = summary["total_reward_records"]
+        total_q = summary["total_q_entries"]
+        users_with_rewards = summary["users_with_rewards"]
+        users_with_q = summary["users_with_q"]
+        avg_reward = summary["recent_rewards"]["avg_reward"]
+        reward_positive_ratio = summary["recent_rewards"]["positive_ratio_pct"]
+        total_choices = summary["total_choices"]
+        users_with_choices = summary["users_with_choices"]
+        total_memories = summary["total_memories"]
+        users_with_memories = summary["users_with_memories"]
 
         # คะแนนและความมั่นใจจาก RL (normalize reward ~[-0.5,1] → 0-1, ความมั่นใจ = สัดส่วน reward บวก)
         rl_score_normalized = round(max(0.0, min(1.0, (avg_reward + 0.5) / 1.5)), 3)
@@ -1458,6 +1448,30 @@ async def get_ai_learning_metrics(_auth: bool = Depends(verify_admin_auth)):
         return {"error": str(e), "rl": {}, "choice_history": {}, "memory": {}, "scores": {}}
 
 
+@router.get("/ai-learning-metrics/history")
+async def get_ai_learning_metrics_history(
+    days: int = 7,
+    _auth: bool = Depends(verify_admin_auth),
+):
+    """
+    ตัวชี้วัดการเรียนรู้ย้อนหลังรายช่วงเวลา (จาก learning_metrics_rollups) สำหรับกราฟ
+    """
+    try:
+        from app.services.learning_metrics import get_learning_metrics_service
+        days = max(1, min(days, settings.learning_metrics_rollup_retention_days))
+        buckets = await get_learning_metrics_service().history(days)
+        for b in buckets:
+            b.pop("_id", None)
+        return {
+            "days": days,
+            "interval_minutes": settings.learning_metrics_rollup_interval_minutes,
+            "buckets": serialize_datetime(buckets),
+        }
+    except Exception as e:
+        logger.warning(f"AI learning metrics history failed: {e}", exc_info=True)
+        return {"error": str(e), "buckets": []}
+
+
 @router.get("/ai-trip-planning-flow")
 async def get_ai_trip_planning_flow(
     limit: int = 50,
@@ -1787,36 +1801,21 @@ async def get_learning_monitor(
     (User ใหม่ใช้ Ask 1 ครั้ง + Agent 1 ครั้ง → inferred prefs, choice history, stars, RL)
     """
     try:
-        from app.storage.connection_manager import ConnectionManager
-        from app.services.trip_evaluations import COLLECTION_NAME as TRIP_EVAL_COL
-        from app.services.selection_preferences import COLLECTION_CHOICE_HISTORY
+        from app.services.learning_metrics import get_learning_metrics_service
 
-        db = ConnectionManager.get_instance().get_mongo_database()
-        if db is None:
+        metrics = get_learning_metrics_service()
+        if not metrics.is_available():
             return {"error": "Database not available", "users_learning": [], "learning_events": []}
 
         # รวบรวม user_id ที่มีกิจกรรมการเรียนรู้ (จาก sessions, trip_evaluations, choice_history, feedback_history)
-        user_ids = set()
-        for col_name in ["sessions", TRIP_EVAL_COL, COLLECTION_CHOICE_HISTORY, "user_feedback_history"]:
-            col = db[col_name]
-            cursor = col.find({}, {"user_id": 1, "session_id": 1}).limit(limit * 2)
-            async for doc in cursor:
-                uid_val = doc.get("user_id")
-                if not uid_val and col_name == "sessions" and doc.get("session_id"):
-                    sid = str(doc["session_id"])
-                    if "::" in sid:
-                        uid_val = sid.split("::")[0]
-                if uid_val:
-                    user_ids.add(uid_val)
-        user_ids = list(user_ids)[:limit]
+        user_ids = await metrics.candidate_user_ids(limit)
+        # ข้อมูลทุก user ใน batch เดียว ($in + $group) แทน query ต่อ user
+        learning_data = await metrics.load_users(user_ids)
 
         users_learning = []
         for uid in user_ids:
-            user_doc = await db["users"].find_one(
-                {"user_id": uid},
-                {"preferences": 1, "full_name": 1, "first_name": 1, "last_name": 1,
-                 "first_name_th": 1, "last_name_th": 1, "email": 1},
-            )
+            data = learning_data.get(uid) or {}
+            user_doc = data.get("user_doc")
             # บุคคลอ่านชื่อ: ภาษาไทย → ไทย+อังกฤษ → email prefix → uidสั้น
             ud = user_doc or {}
             name_th = f"{ud.get('first_name_th', '')} {ud.get('last_name_th', '')}".strip()
@@ -1855,38 +1854,23 @@ async def get_learning_monitor(
                 if not prefs_summary:
                     prefs_summary.append("มีข้อมูลความชอบ")
 
-            choice_count = await db[COLLECTION_CHOICE_HISTORY].count_documents({"user_id": uid})
-            trip_col = db[TRIP_EVAL_COL]
-            last_trip = await trip_col.find_one(
-                {"user_id": uid},
-                {"user_stars": 1, "satisfaction_pct": 1, "agent_accuracy_score": 1, "updated_at": 1},
-                sort=[("updated_at", -1)],
-            )
+            choice_count = data.get("choice_count", 0)
+            last_trip = data.get("last_trip")
             last_stars = last_trip.get("user_stars") if last_trip else None
             last_sat_pct = None
             if last_trip:
                 last_sat_pct = _trip_user_satisfaction_pct(last_trip)
             last_activity = last_trip.get("updated_at") if last_trip else None
             if last_activity is None:
-                last_session = await db["sessions"].find_one(
-                    {"user_id": uid},
-                    {"last_updated": 1},
-                    sort=[("last_updated", -1)],
-                )
-                if last_session and last_session.get("last_updated"):
-                    last_activity = last_session["last_updated"]
+                last_activity = data.get("last_session")
 
-            reward_count = await db["user_feedback_history"].count_documents({"user_id": uid})
-            q_count = await db["user_preference_scores"].count_documents({"user_id": uid})
+            reward_count = data.get("reward_count", 0)
+            q_count = data.get("q_count", 0)
 
             # ── ถ้ายังไม่มี prefs_summary ให้ดึงจาก Q-table (RL) รายการที่คะแนนสูงสุด ──
             if not prefs_summary and q_count > 0:
                 try:
-                    top_q = await db["user_preference_scores"].find(
-                        {"user_id": uid, "q_value": {"$gt": 0}},
-                        {"slot_name": 1, "option_key": 1, "q_value": 1},
-                    ).sort("q_value", -1).limit(3).to_list(length=3)
-                    for q in top_q:
+                    for q in data.get("top_q") or []:
                         slot = q.get("slot_name") or ""
                         key = q.get("option_key") or ""
                         qval = q.get("q_value", 0)
@@ -1904,8 +1888,7 @@ async def get_learning_monitor(
             fwl_updates = 0
             fwl_summary = ""
             try:
-                from app.engine.feature_learning import get_feature_learner
-                fwl_docs = await get_feature_learner().get_user_weights_doc(uid)
+                fwl_docs = data.get("fwl_docs") or []
                 fwl_slots = len(fwl_docs)
                 fwl_updates = sum(d.get("update_count", 0) for d in fwl_docs)
                 # สรุปสั้นๆ: top positive weight per slot
@@ -1954,8 +1937,7 @@ async def get_learning_monitor(
 
         # Learning events: จาก user_feedback_history — ครอบคลุมทุก action type
         events = []
-        ev_cursor = db["user_feedback_history"].find({}).sort("created_at", -1).limit(50)
-        async for doc in ev_cursor:
+        for doc in await metrics.recent_events(50):
             action = doc.get("action_type", "")
             ctx = doc.get("context") or {}
             slot = doc.get("slot_name") or ""
@@ -2370,14 +2352,29 @@ def _familiarity_methodology_payload(
     }
 
 
+def _familiarity_reply_has_score(text: str) -> bool:
+    """แคชเฉพาะคำตอบที่เป็น JSON และมี score เป็นตัวเลข 0–100"""
+    import re as _re
+    match = _re.search(r'\{.*\}', text or "", _re.DOTALL)
+    if not match:
+        return False
+    try:
+        data = json.loads(match.group(0))
+        return isinstance(data, dict) and 0 <= int(data.get("score")) <= 100
+    except (json.JSONDecodeError, ValueError, TypeError):
+        return False
+
+
 @router.get("/user-familiarity")
 async def get_user_familiarity(
     user_id: Optional[str] = None,
+    refresh: bool = False,
     _auth: bool = Depends(verify_admin_auth),
 ):
     """
     วัดว่า AI รู้จัก user นี้มากน้อยแค่ไหน (0–100%).
     ปกติ: LLM ให้คะแนนและเหตุผลจากข้อความที่ย่อจาก DB; ถ้า LLM ใช้ไม่ได้ใช้คะแนน heuristic (+35/+35/+30).
+    ข้อมูล user ไม่เปลี่ยน → ใช้ผล LLM ที่แคชไว้ (refresh=true เพื่อบังคับให้ LLM ประเมินใหม่).
     คืนค่า methodology (คำอธิบายแหล่งที่มาและวิธีคิด %) ใน JSON.
     """
     if not user_id or not user_id.strip():
@@ -2411,6 +2408,9 @@ async def get_user_familiarity(
             prompt,
             temperature=0.3,
             max_tokens=300,
+            context="familiarity",
+            priority=LLMPriority.BACKGROUND,
+            cache=LLMCachePolicy(schema="user_familiarity:v1", validate=_familiarity_reply_has_score, bypass=refresh),
         )
         text = (raw or "").strip()
         if not text:
@@ -2805,278 +2805,24 @@ async def sim_broadcast(body: dict, _auth: bool = Depends(verify_admin_auth)):
 async def admin_stream(request: Request, _auth: bool = Depends(verify_admin_auth)):
     """
     SSE stream for real-time system monitoring
+    snapshot สร้างโดย producer ตัวเดียว (app.services.admin_stream) แล้วส่งให้ทุก admin ที่เปิด dashboard
     """
+    subscriber = get_admin_stream_broadcaster().subscribe()
+
     async def event_generator():
-        # Cache for expensive service checks
-        last_service_check = 0
-        last_sessions_refresh = 0
-        last_logs_refresh = 0
-        service_cache = {
-            "gemini": {"status": "unknown", "message": "Initializing..."},
-            "amadeus": {"status": "unknown", "message": "Initializing..."},
-            "omise": {"status": "unknown", "message": "Initializing..."},
-        }
-        
-        # Initialize Omise check immediately (don't wait for 10 seconds)
         try:
-            if not settings.omise_secret_key or not settings.omise_public_key:
-                service_cache["omise"] = {"status": "error", "message": "API Keys missing"}
-                logger.debug(f"Omise SSE init: Keys missing - Secret: {bool(settings.omise_secret_key)}, Public: {bool(settings.omise_public_key)}")
-            else:
-                secret_valid = settings.omise_secret_key.startswith("skey_")
-                public_valid = settings.omise_public_key.startswith("pkey_")
-                is_test_mode = settings.omise_secret_key.startswith("skey_test_")
-                
-                logger.debug(f"Omise SSE init: Secret valid: {secret_valid}, Public valid: {public_valid}, Test mode: {is_test_mode}")
-                
-                if secret_valid and public_valid:
-                    try:
-                        import httpx
-                        import asyncio
-                        mode = "TEST" if is_test_mode else "LIVE"
-                        logger.debug(f"Omise SSE init: Attempting API connection ({mode} mode)")
-                        # Use asyncio.wait_for with longer timeout (10s) for better reliability
-                        async with httpx.AsyncClient(timeout=10.0) as client:
-                            resp = await asyncio.wait_for(
-                                client.get(
-                                    "https://api.omise.co/account",
-                                    auth=(settings.omise_secret_key, ""),
-                                    timeout=10.0
-                                ),
-                                timeout=10.0
-                            )
-                            logger.debug(f"Omise SSE init: API response status {resp.status_code}")
-                            if resp.status_code == 200:
-                                account_data = resp.json()
-                                email = account_data.get("email", "N/A")
-                                service_cache["omise"] = {"status": "ok", "message": f"{mode} mode - Connected (Account: {email[:20]}...)"}
-                                logger.info(f"Omise SSE init: Successfully connected ({mode} mode)")
-                            else:
-                                error_text = resp.text[:100] if resp.text else f"HTTP {resp.status_code}"
-                                service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Auth failed (HTTP {resp.status_code}): {error_text}"}
-                                logger.warning(f"Omise SSE init: Auth failed - HTTP {resp.status_code}")
-                    except httpx.TimeoutException:
-                        mode = "TEST" if is_test_mode else "LIVE"
-                        service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Connection timeout (5s)"}
-                        logger.warning(f"Omise SSE init: Connection timeout")
-                    except httpx.RequestError as req_err:
-                        mode = "TEST" if is_test_mode else "LIVE"
-                        service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Network error: {str(req_err)[:50]}"}
-                        logger.warning(f"Omise SSE init: Network error - {str(req_err)}")
-                    except Exception as e:
-                        mode = "TEST" if is_test_mode else "LIVE"
-                        service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Error: {str(e)[:50]}"}
-                        logger.error(f"Omise SSE init: Error - {str(e)}", exc_info=True)
-                else:
-                    service_cache["omise"] = {"status": "error", "message": f"Invalid key format (secret: {'valid' if secret_valid else 'invalid'}, public: {'valid' if public_valid else 'invalid'})"}
-                    logger.warning(f"Omise SSE init: Invalid key format")
-        except Exception as init_err:
-            service_cache["omise"] = {"status": "error", "message": f"Initialization error: {str(init_err)[:50]}"}
-            logger.error(f"Omise SSE init: Exception - {str(init_err)}", exc_info=True)
-        
-        while True:
-            # If client disconnects, stop streaming
-            if await request.is_disconnected():
-                break
-
-            try:
-                # 1. Mongo Status (Always check, it's fast)
-                from app.storage.connection_manager import ConnectionManager
-                mongo_manager = ConnectionManager.get_instance()
-                mongo_ok = await mongo_manager.mongo_ping()
-                if mongo_ok:
-                    try:
-                        db = mongo_manager.get_mongo_database()
-                        collections = await db.list_collection_names()
-                        mongo_details = f"Connected ({len(collections)} collections)"
-                    except Exception as db_err:
-                        mongo_details = f"Connected (ping OK, DB error: {str(db_err)[:50]})"
-                else:
-                    mongo_details = "Disconnected (Ping failed)"
-
-                # 2. Check other services periodically (every 60 seconds / 1 minute)
-                # Note: Services status is expensive (API calls), so we check less frequently
-                # Other data (system resources, sessions, logs) remain realtime
-                current_time = time.time()
-                if current_time - last_service_check > 60:  # Changed from 10 to 60 seconds
-                    last_service_check = current_time
-                    
-                    # Gemini Check
-                    if not settings.gemini_api_key:
-                        service_cache["gemini"] = {"status": "error", "message": "API Key missing"}
-                    else:
-                        try:
-                            # Use a lightweight call to verify key/connectivity
-                            from google import genai
-                            client = genai.Client(api_key=settings.gemini_api_key)
-                            # Just list models to verify key
-                            models = list(client.models.list(config={'page_size': 1}))
-                            service_cache["gemini"] = {"status": "ok", "message": f"Model: {settings.gemini_model_name} (Active)"}
-                        except Exception as e:
-                            service_cache["gemini"] = {"status": "error", "message": f"API Error: {str(e)}"}
-                    
-                    # ✅ Amadeus Check (using search keys for testing)
-                    if not settings.amadeus_search_api_key or not settings.amadeus_search_api_secret:
-                        service_cache["amadeus"] = {"status": "error", "message": "Search API credentials missing"}
-                    else:
-                        try:
-                            # Try a simple auth token request using search keys
-                            import httpx
-                            search_env = settings.amadeus_search_env.lower()
-                            auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token" if search_env == "test" else "https://api.amadeus.com/v1/security/oauth2/token"
-                            async with httpx.AsyncClient() as client:
-                                resp = await client.post(
-                                    auth_url,
-                                    data={
-                                        "grant_type": "client_credentials",
-                                        "client_id": settings.amadeus_search_api_key,
-                                        "client_secret": settings.amadeus_search_api_secret
-                                    },
-                                    timeout=5.0
-                                )
-                                if resp.status_code == 200:
-                                    search_key_status = "✅"
-                                    booking_key_status = "✅" if (settings.amadeus_booking_api_key and settings.amadeus_booking_api_secret) else "❌"
-                                    service_cache["amadeus"] = {"status": "ok", "message": f"Search: {settings.amadeus_search_env} ({search_key_status}) | Booking: {settings.amadeus_booking_env} ({booking_key_status}) (Authenticated)"}
-                                else:
-                                    service_cache["amadeus"] = {"status": "error", "message": f"Auth failed: {resp.status_code}"}
-                        except Exception as e:
-                            service_cache["amadeus"] = {"status": "error", "message": f"Connection error: {str(e)}"}
-                    
-                    # ✅ Omise Check
-                    try:
-                        if not settings.omise_secret_key or not settings.omise_public_key:
-                            service_cache["omise"] = {"status": "error", "message": "API Keys missing"}
-                        else:
-                            secret_valid = settings.omise_secret_key.startswith("skey_")
-                            public_valid = settings.omise_public_key.startswith("pkey_")
-                            is_test_mode = settings.omise_secret_key.startswith("skey_test_")
-                            
-                            if secret_valid and public_valid:
-                                try:
-                                    import httpx
-                                    import asyncio
-                                    async with httpx.AsyncClient(timeout=10.0) as client:
-                                        resp = await asyncio.wait_for(
-                                            client.get(
-                                                "https://api.omise.co/account",
-                                                auth=(settings.omise_secret_key, ""),
-                                                timeout=10.0
-                                            ),
-                                            timeout=10.0
-                                        )
-                                        if resp.status_code == 200:
-                                            account_data = resp.json()
-                                            email = account_data.get("email", "N/A")
-                                            mode = "TEST" if is_test_mode else "LIVE"
-                                            service_cache["omise"] = {"status": "ok", "message": f"{mode} mode - Connected (Account: {email[:20]}...)"}
-                                        else:
-                                            mode = "TEST" if is_test_mode else "LIVE"
-                                            error_text = resp.text[:100] if resp.text else f"HTTP {resp.status_code}"
-                                            service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Auth failed (HTTP {resp.status_code}): {error_text}"}
-                                except (httpx.TimeoutException, asyncio.TimeoutError):
-                                    mode = "TEST" if is_test_mode else "LIVE"
-                                    service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Connection timeout (10s)"}
-                                except httpx.RequestError as req_err:
-                                    mode = "TEST" if is_test_mode else "LIVE"
-                                    service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Network error: {str(req_err)[:50]}"}
-                                except Exception as e:
-                                    mode = "TEST" if is_test_mode else "LIVE"
-                                    service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Error: {str(e)[:50]}"}
-                            else:
-                                service_cache["omise"] = {"status": "error", "message": f"Invalid key format (secret: {'valid' if secret_valid else 'invalid'}, public: {'valid' if public_valid else 'invalid'})"}
-                    except Exception as omise_check_err:
-                        logger.error(f"Omise status check error: {omise_check_err}", exc_info=True)
-                        service_cache["omise"] = {"status": "error", "message": f"Check error: {str(omise_check_err)[:50]}"}
-
-                # 3. System Resources
-                uptime = time.time() - START_TIME
-                process = psutil.Process(os.getpid())
-                
-                # Build status data
-                # Services status (Gemini, Amadeus, Omise) is only updated when last_service_check > 60 seconds
-                # This prevents expensive API calls on every update
-                # MongoDB and Google Maps are fast checks, so they update in realtime
-                # System resources, sessions, logs remain realtime
-                status_data = {
-                    "timestamp": datetime.now().isoformat(),
-                    "services": {
-                        "mongodb": {"status": "ok" if mongo_ok else "error", "message": mongo_details},
-                        # Only send service status if it was recently checked (within 5 seconds of check) or it's time to check
-                        "gemini": service_cache["gemini"],
-                        "amadeus": service_cache["amadeus"],
-                        "google_maps": {"status": "ok" if settings.google_maps_api_key else "error", "message": "Key present" if settings.google_maps_api_key else "Key missing"},
-                        "omise": service_cache.get("omise", {"status": "unknown", "message": "Not checked yet"})
-                    },
-                    "agent_activities": agent_monitor.get_activities(),
-                    "system": {
-                        "uptime_seconds": int(uptime),
-                        "memory_usage_mb": int(process.memory_info().rss / 1024 / 1024),
-                        "cpu_usage_percent": psutil.cpu_percent(), # Global CPU
-                        "process_cpu_percent": process.cpu_percent(), # Process CPU
-                        "active_threads": process.num_threads()
-                    },
-                    "config": {
-                        "amadeus_safety_guard": settings.amadeus_env == "test",
-                        "amadeus_env": settings.amadeus_env,
-                        "amadeus_search_env": settings.amadeus_search_env,
-                        "amadeus_booking_env": settings.amadeus_booking_env,
-                        "gemini_model": settings.gemini_model_name
-                    }
-                }
-                
-                # 4. Refresh sessions periodically (every 10 seconds)
-                if current_time - last_sessions_refresh > 10:
-                    last_sessions_refresh = current_time
-                    try:
-                        if mongo_ok:
-                            db = mongo_manager.get_mongo_database()
-                            cursor = db.sessions.find({}).sort("last_updated", -1).limit(50)
-                            sessions = []
-                            async for doc in cursor:
-                                doc["_id"] = str(doc["_id"])
-                                # Remove full trip_plan to reduce payload
-                                if "trip_plan" in doc:
-                                    trip_plan = doc["trip_plan"]
-                                    doc["trip_plan_summary"] = {
-                                        "has_flights": bool(trip_plan.get("travel", {}).get("flights", {}).get("outbound") or trip_plan.get("travel", {}).get("flights", {}).get("inbound")),
-                                        "has_hotels": bool(trip_plan.get("accommodation", {}).get("segments")),
-                                        "has_transport": bool(trip_plan.get("travel", {}).get("ground_transport"))
-                                    }
-                                    del doc["trip_plan"]
-                                # ✅ Serialize datetime objects to ISO strings
-                                doc = serialize_datetime(doc)
-                                sessions.append(doc)
-                            status_data["sessions"] = sessions
-                    except Exception as sessions_err:
-                        logger.warning(f"Failed to refresh sessions in SSE: {sessions_err}")
-                
-                # 5. Refresh logs periodically (every 5 seconds)
-                if current_time - last_logs_refresh > 5:
-                    last_logs_refresh = current_time
-                    try:
-                        if settings.log_file:
-                            log_path = Path(settings.log_file)
-                            if log_path.exists():
-                                with open(log_path, "r", encoding="utf-8") as f:
-                                    all_lines = f.readlines()
-                                    status_data["logs"] = {
-                                        "content": all_lines[-100:],  # Last 100 lines
-                                        "total_lines": len(all_lines)
-                                    }
-                    except Exception as logs_err:
-                        logger.warning(f"Failed to refresh logs in SSE: {logs_err}")
-
-                # ✅ Serialize all datetime objects before JSON encoding
-                serialized_data = serialize_datetime(status_data)
-                yield f"data: {json.dumps(serialized_data, ensure_ascii=False, default=str)}\n\n"
-                
-                # Update every 2 seconds
-                await asyncio.sleep(2)
-            except Exception as e:
-                logger.error(f"Admin stream error: {e}")
-                # Don't yield error to keep the connection alive if possible, just log it
-                await asyncio.sleep(5)
+            while True:
+                # If client disconnects, stop streaming
+                if await request.is_disconnected():
+                    break
+                frame = await subscriber.next_frame(timeout=15.0)
+                if frame is None:
+                    # producer ยังไม่มี snapshot (เช่น Mongo ช้า) → comment line กัน proxy ตัด connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {frame}\n\n"
+        finally:
+            get_admin_stream_broadcaster().unsubscribe(subscriber)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
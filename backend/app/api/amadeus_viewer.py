@@ -11,6 +11,7 @@ import math
 from app.core.logging import get_logger
 from app.services.travel_service import orchestrator
 from app.services.llm import LLMService
+from app.services.llm_cache import LLMCachePolicy
 
 logger = get_logger(__name__)
 
@@ -40,6 +41,17 @@ class ExtractTravelInfoResponse(BaseModel):
     destination_details: Optional[str] = Field(None, description="Additional destination details (e.g., specific places)")
 
 
+def _parse_extraction_json(llm_response: str) -> Any:
+    """Parse the extraction reply (strip markdown code fences first); raises json.JSONDecodeError."""
+    cleaned_response = llm_response.strip()
+    if cleaned_response.startswith('```'):
+        # Remove markdown code block
+        lines = cleaned_response.split('\n')
+        lines = [line for line in lines if not line.strip().startswith('```')]
+        cleaned_response = '\n'.join(lines)
+    return json.loads(cleaned_response)
+
+
 @router.post("/extract-info")
 async def extract_travel_info(request: Request, extract_request: ExtractTravelInfoRequest):
     """
@@ -82,26 +94,23 @@ Always return valid JSON, no explanations, no markdown formatting, just the JSON
 Return a JSON object with origin, destination, date (YYYY-MM-DD format), and optional destination_details."""
 
         # Call LLM (disable auto model selection to use default model)
+        # query เดิมในวันเดียวกัน → ใช้ผลที่แคชไว้ (schema ผูกวันที่ เพราะ "พรุ่งนี้"/"เสาร์นี้" เปลี่ยนตามวัน)
         llm_response = await llm_service.generate_content(
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.3,  # Lower temperature for more consistent extraction
             max_tokens=200,
-            auto_select_model=False  # Use default model to avoid model selection issues
+            auto_select_model=False,  # Use default model to avoid model selection issues
+            context="travel_extraction",
+            cache=LLMCachePolicy(
+                schema=f"travel_extract:v1:{datetime.now().date().isoformat()}",
+                validate=lambda text: isinstance(_parse_extraction_json(text), dict),
+            ),
         )
         
         # Parse LLM response (should be JSON)
         try:
-            # Clean the response (remove markdown code blocks if present)
-            cleaned_response = llm_response.strip()
-            if cleaned_response.startswith('```'):
-                # Remove markdown code block
-                lines = cleaned_response.split('\n')
-                lines = [line for line in lines if not line.strip().startswith('```')]
-                cleaned_response = '\n'.join(lines)
-            
-            # Extract JSON from response
-            extracted_data = json.loads(cleaned_response)
+            extracted_data = _parse_extraction_json(llm_response)
             
             # Validate and return
             return ExtractTravelInfoResponse(
@@ -184,9 +193,7 @@ async def search_flights_task(origin: str, destination: str, departure_date: str
     """Search flights from Amadeus (matching amadeus_data_viewer.py - max=20)"""
     try:
         # Call Amadeus API directly with max=20 (same as amadeus_data_viewer.py)
-        # Use orchestrator's token and client, but override max parameter
-        token = await orchestrator._get_amadeus_token()
-        
+        # Use orchestrator's shared Amadeus transport (token + rate limit), but override max parameter
         params = {
             "originLocationCode": origin,
             "destinationLocationCode": destination,
@@ -197,10 +204,9 @@ async def search_flights_task(origin: str, destination: str, departure_date: str
         }
         
         # ✅ Search: ใช้ production environment
-        resp = await orchestrator.client.get(
+        resp = await orchestrator.transport.get(
             f"{orchestrator.amadeus_search_base_url}/v2/shopping/flight-offers",
-            params=params,
-            headers={"Authorization": f"Bearer {token}"}
+            params=params
         )
         resp.raise_for_status()
         flights = resp.json().get("data", [])
@@ -218,17 +224,14 @@ async def search_hotels_task(location_name: str, check_in: str, check_out: str,
         city_code = location_name.upper()[:3] if len(location_name) == 3 and location_name.isupper() else await orchestrator.find_city_iata(location_name) or location_name
         
         # Call Amadeus API directly (matching amadeus_data_viewer.py)
-        token = await orchestrator._get_amadeus_token()
-        
         # ✅ Search: ใช้ production environment
         # Step 1: Search for hotels by city (same as amadeus_data_viewer.py)
         search_url = f"{orchestrator.amadeus_search_base_url}/v1/reference-data/locations/hotels/by-city"
         search_params = {"cityCode": city_code}
         
-        search_resp = await orchestrator.client.get(
+        search_resp = await orchestrator.transport.get(
             search_url,
-            params=search_params,
-            headers={"Authorization": f"Bearer {token}"}
+            params=search_params
         )
         search_resp.raise_for_status()
         hotel_data = search_resp.json().get("data", [])
@@ -252,10 +255,10 @@ async def search_hotels_task(location_name: str, check_in: str, check_out: str,
                 "adults": guests
             }
             
-            offers_resp = await orchestrator.client.post(
+            offers_resp = await orchestrator.transport.post(
                 offers_url,
                 json=offers_data,
-                headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"}
             )
             offers_resp.raise_for_status()
         except Exception:
@@ -268,10 +271,9 @@ async def search_hotels_task(location_name: str, check_in: str, check_out: str,
                 "adults": guests
             }
             
-            offers_resp = await orchestrator.client.get(
+            offers_resp = await orchestrator.transport.get(
                 offers_url,
-                params=offers_params,
-                headers={"Authorization": f"Bearer {token}"}
+                params=offers_params
             )
             offers_resp.raise_for_status()
         
@@ -286,8 +288,6 @@ async def search_hotels_task(location_name: str, check_in: str, check_out: str,
 async def search_return_flights_task(origin: str, destination: str, return_date: str, adults: int) -> List[Dict[str, Any]]:
     """Search return flights (ขากลับ) from Amadeus"""
     try:
-        token = await orchestrator._get_amadeus_token()
-        
         params = {
             "originLocationCode": destination,  # Reverse origin/destination for return
             "destinationLocationCode": origin,
@@ -298,10 +298,9 @@ async def search_return_flights_task(origin: str, destination: str, return_date:
         }
         
         # ✅ Search: ใช้ production environment
-        resp = await orchestrator.client.get(
+        resp = await orchestrator.transport.get(
             f"{orchestrator.amadeus_search_base_url}/v2/shopping/flight-offers",
-            params=params,
-            headers={"Authorization": f"Bearer {token}"}
+            params=params
         )
         resp.raise_for_status()
         flights = resp.json().get("data", [])
@@ -315,8 +314,6 @@ async def search_return_flights_task(origin: str, destination: str, return_date:
 async def search_transfers_task(start_lat: float, start_lng: float, end_lat: float, end_lng: float, start_time: str, passengers: int) -> List[Dict[str, Any]]:
     """Search all transfer types (รถ, รถโดยสาร, รถไฟ, เรือ) from Amadeus"""
     try:
-        token = await orchestrator._get_amadeus_token()
-        
         # Use Activities API to find all transportation services
         # ✅ Search: ใช้ production environment
         url = f"{orchestrator.amadeus_search_base_url}/v1/shopping/activities"
@@ -326,10 +323,9 @@ async def search_transfers_task(start_lat: float, start_lng: float, end_lat: flo
             "radius": 50,  # 50km radius
         }
         
-        resp = await orchestrator.client.get(
+        resp = await orchestrator.transport.get(
             url,
-            params=params,
-            headers={"Authorization": f"Bearer {token}"}
+            params=params
         )
         resp.raise_for_status()
         data = resp.json()
@@ -751,6 +751,10 @@ async def update_profile(request: Request, profile: ProfileUpdateRequest):
             )
             if result.matched_count == 0:
                 raise HTTPException(status_code=404, detail="User not found")
+            if "preferences" in update_data:
+                # learnFromMyChoices อาจเปลี่ยน → สรุปความชอบที่ materialize ไว้ต้องคำนวณใหม่
+                from app.services.selection_preferences import schedule_selection_summary_refresh
+                schedule_selection_summary_refresh(user_id, delay=0)
 
         # 2) อัปเดตผู้จองร่วมใน user_family
         if family_data is not None:
@@ -1228,10 +1232,10 @@ async def delete_account(request: Request, response: Response):
         
         # 4. Delete all conversations
         try:
-            conversations_collection = storage.db["conversations"]
-            conversations_result = await conversations_collection.delete_many({"user_id": user_id})
-            deletion_summary["collections_deleted"]["conversations"] = conversations_result.deleted_count
-            logger.info(f"Deleted {conversations_result.deleted_count} conversations for user {user_id}")
+            from app.storage.conversation_store import ConversationStore
+            deleted_conversations = await ConversationStore(storage.db).delete({"user_id": user_id})
+            deletion_summary["collections_deleted"]["conversations"] = deleted_conversations
+            logger.info(f"Deleted {deleted_conversations} conversations for user {user_id}")
         except Exception as e:
             logger.error(f"Error deleting conversations for user {user_id}: {e}", exc_info=True)
             deletion_summary["collections_deleted"]["conversations"] = f"Error: {str(e)}"
@@ -174,6 +174,8 @@ async def _sync_booking_to_amadeus_sandbox(booking_doc: dict, bookings_collectio
     if settings.amadeus_booking_env.lower() == "production":
         raise AmadeusException("Amadeus booking env is production — ไม่อนุญาตให้ sync ใน production")
     from app.services.travel_service import orchestrator
+    from app.services.offer_blob_store import get_offer_blob_store
+    blob_store = get_offer_blob_store()
     plan = booking_doc.get("plan") or {}
     travel_slots = booking_doc.get("travel_slots") or {}
     user_id = booking_doc.get("user_id", "")
@@ -204,7 +206,8 @@ async def _sync_booking_to_amadeus_sandbox(booking_doc: dict, bookings_collectio
     for direction in ("outbound", "inbound"):
         segments = flights_data.get(direction) or []
         for seg in segments:
-            opt = seg.get("selected_option") or {}
+            # raw offer เต็มอยู่ใน offer blob store (segment เก็บแค่ raw_data แบบย่อ + raw_ref)
+            opt = await blob_store.resolve_option(seg.get("selected_option") or {})
             raw = opt.get("raw_data") or opt
             if not raw:
                 continue
@@ -224,6 +227,7 @@ async def _sync_booking_to_amadeus_sandbox(booking_doc: dict, bookings_collectio
         opt = seg.get("selected_option") if isinstance(seg, dict) else None
         if not opt:
             continue
+        opt = await blob_store.resolve_option(opt)
         raw = (opt.get("raw_data") or opt) if isinstance(opt, dict) else {}
         offer_id = raw.get("id") or raw.get("offerId") or (opt.get("id") if isinstance(opt, dict) else None)
         if not offer_id:
@@ -13,15 +13,17 @@ from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Any, Dict, Tuple
 from app.models import UserSession, TripPlan
 from app.models.trip_plan import SegmentStatus
-from app.engine.agent import TravelAgent
+from app.engine.service_container import get_agent_container
 from app.core.constants import FALLBACK_RESPONSE_EMPTY
-from app.services.llm import LLMServiceWithMCP
 from app.services.llm import IntentBasedLLM
+from app.services.llm_scheduler import llm_deadline_scope
 from app.services.title import generate_chat_title
 from app.storage.mongodb_storage import MongoStorage
+from app.storage.conversation_store import ConversationStore
 from app.core.logging import get_logger, set_logging_context, clear_logging_context
 from app.core.exceptions import AgentException, StorageException, LLMException
 from app.core.config import settings
+from app.core.sse_bridge import SSEBridge
 from app.services.options_cache import get_options_cache
 from app.services.tts_service import TTSService
 from app.services.live_audio_service import LiveAudioService
@@ -1413,7 +1415,8 @@ async def chat_stream(
         
         set_logging_context(session_id=session_id, user_id=user_id)
         try:
-            storage = MongoStorage()
+            agent_container = get_agent_container()
+            storage = agent_container.get_storage()
             
             # ✅ SECURITY: Verify session belongs to this user before processing
             # ✅ CRITICAL: Validate session_id format matches user_id
@@ -1469,7 +1472,6 @@ async def chat_stream(
             # #endregion
             
             try:
-                llm_with_mcp = LLMServiceWithMCP()
                 # ✅ User ใหม่: อนุมานความชอบจากข้อความแรก → บันทึกลง travelPreferences เพื่อให้ AI เรียนรู้และรู้จักพฤติกรรม/ความชอบทันที (ใช้ Ask 1 ครั้ง + Agent 1 ครั้ง ก็มีข้อมูลใช้ได้)
                 try:
                     from app.services.infer_user_preferences import infer_and_save_user_preferences_from_message
@@ -1478,9 +1480,9 @@ async def chat_stream(
                     logger.debug(f"Infer user preferences (non-critical): {_inf}")
                 # ✅ Get user preferences for agent (personality, style, language, RL + inferred travelPreferences)
                 _prefs = await _load_user_agent_preferences(storage, user_id)
-                agent = TravelAgent(
+                # ✅ Per-turn agent facade over process-wide services (LLM, memory, orchestrator, MCP)
+                agent = await agent_container.create_agent(
                     storage,
-                    llm_service=llm_with_mcp,
                     agent_personality=_prefs["agentPersonality"],
                     response_style=_prefs["responseStyle"],
                     detail_level=_prefs["detailLevel"],
@@ -1509,16 +1511,30 @@ async def chat_stream(
                 yield f"data: {json.dumps({'status': 'error', 'message': 'Failed to initialize chat service. Please check server logs.'}, ensure_ascii=False)}\n\n"
                 return
             
-            # Queue for bridging status updates from agent to SSE
-            status_queue = asyncio.Queue()
+            # Bridge status updates from agent to SSE (event-driven, bounded + coalescing)
+            bridge = SSEBridge()
             
             async def status_callback(status: str, message: str, step: str):
-                await status_queue.put({
+                await bridge.publish({
                     "status": status,
                     "message": message,
                     "step": step
                 })
 
+            # ✅ STREAMING: token ของ Responder ส่งเป็น event status=token (delta) ระหว่างสร้างคำตอบ
+            # event completed ตอนจบยังมี response เต็ม (ตัวจริงที่บันทึกลง DB ครั้งเดียว) — frontend ใช้แทน draft
+            _turn_started = time.perf_counter()
+            _stream_timing = {"ttft_ms": None, "tokens": 0}
+
+            async def token_callback(delta: str, reset: bool = False):
+                if reset:
+                    await bridge.publish({"status": "token_reset"})
+                    return
+                if _stream_timing["ttft_ms"] is None:
+                    _stream_timing["ttft_ms"] = round((time.perf_counter() - _turn_started) * 1000, 1)
+                _stream_timing["tokens"] += 1
+                await bridge.publish({"status": "token", "delta": delta, "seq": _stream_timing["tokens"]})
+
             # ✅ Get mode from request (default to 'normal')
             mode = request.mode or "normal"
             logger.info(f"Chat mode: {mode} for session {session_id}")
@@ -1553,13 +1569,16 @@ async def chat_stream(
                 # #endregion
                 
                 run_turn_error_hint = None  # ตั้งค่าเริ่มต้น (จะถูกเซ็ตเมื่อ run_turn return tuple หลัง exception)
-                task = asyncio.create_task(agent.run_turn(
-                    session_id=session_id,
-                    user_input=request.message,
-                    status_callback=status_callback,
-                    mode=mode,
-                    travel_preferences=_prefs.get("travelPreferences") or {},
-                ))
+                # deadline ของ turn → LLM scheduler ตัดการเรียกที่ยังรอคิวอยู่เมื่อเลยเวลา (task คัดลอก context ตอนสร้าง)
+                with llm_deadline_scope(float(settings.chat_timeout_agent if mode == "agent" else settings.chat_timeout_normal)):
+                    task = asyncio.create_task(agent.run_turn(
+                        session_id=session_id,
+                        user_input=request.message,
+                        status_callback=status_callback,
+                        mode=mode,
+                        travel_preferences=_prefs.get("travelPreferences") or {},
+                        token_callback=token_callback,
+                    ))
                 logger.info(f"Agent task created successfully for session {session_id}")
                 
                 # #region agent log (Hypothesis: No Response)
@@ -1582,66 +1601,40 @@ async def chat_stream(
             # 1. Send initial status
             yield f"data: {json.dumps({'status': 'processing', 'message': 'กำลังเริ่มประมวลผล...', 'step': 'start'}, ensure_ascii=False)}\n\n"
             
-            # ✅ VISIBLE HEARTBEAT: Send "ping" or "processing" event every 2 seconds
-            last_heartbeat = asyncio.get_event_loop().time()
-            heartbeat_interval = 2.0  # 2 seconds
-            
-            # 2. Bridge status updates from queue to SSE until task is done
+            # 2. Bridge status updates to SSE: wake on event / task done / heartbeat (after silence) / deadline
             _stream_timeout = float(settings.chat_timeout_agent if mode == "agent" else settings.chat_timeout_normal)
-            start_time = asyncio.get_event_loop().time()
-            
-            while not task.done() or not status_queue.empty():
-                try:
-                    # Check timeout
-                    elapsed = asyncio.get_event_loop().time() - start_time
-                    if elapsed > _stream_timeout:
-                        logger.warning(f"Task timeout exceeded ({elapsed:.1f}s > {_stream_timeout}s) for session {session_id}")
-                        task.cancel()
-                        break
-                    
-                    # Try to get from queue with short timeout
-                    try:
-                        status_data = await asyncio.wait_for(status_queue.get(), timeout=0.1)
-                        yield f"data: {json.dumps(status_data, ensure_ascii=False)}\n\n"
-                        # ✅ Agent Mode: เมื่อได้ step agent_show_summary ให้ส่ง summary_ready พร้อม current_plan เพื่อให้ frontend แสดง Trip Summary ก่อนจอง
-                        if status_data.get("step") == "agent_show_summary":
-                            try:
-                                updated_session = await storage.get_session(session_id)
-                                if updated_session:
-                                    metadata = await get_agent_metadata(updated_session, is_admin=False, mode=mode)
-                                    summary_event = {
-                                        "status": "summary_ready",
-                                        "current_plan": metadata.get("current_plan"),
-                                        "travel_slots": metadata.get("travel_slots"),
-                                        "workflow_validation": metadata.get("workflow_validation"),
-                                        "agent_state": metadata.get("agent_state"),
-                                    }
-                                    yield f"data: {json.dumps(summary_event, ensure_ascii=False)}\n\n"
-                            except Exception as summary_err:
-                                logger.warning(f"Agent show summary: failed to build summary_ready event: {summary_err}")
-                    except asyncio.TimeoutError:
-                        # ✅ HEARTBEAT: Send ping every 2 seconds while waiting
-                        current_time = asyncio.get_event_loop().time()
-                        if current_time - last_heartbeat >= heartbeat_interval:
-                            yield f"data: {json.dumps({'status': 'processing', 'message': 'กำลังประมวลผล...', 'step': 'heartbeat'}, ensure_ascii=False)}\n\n"
-                            last_heartbeat = current_time
-                        
-                        # Check for disconnect while waiting
-                        if await fastapi_request.is_disconnected():
-                            logger.info(f"Client disconnected during stream: session={session_id}")
-                            task.cancel()
-                            return
-                        if task.done() and status_queue.empty():
-                            break
-                        continue
-                except Exception as e:
-                    logger.error(f"Queue error in stream: {e}")
-                    # ✅ HEARTBEAT: Even on error, send heartbeat to keep connection alive
-                    current_time = asyncio.get_event_loop().time()
-                    if current_time - last_heartbeat >= heartbeat_interval:
-                        yield f"data: {json.dumps({'status': 'processing', 'message': 'กำลังประมวลผล...', 'step': 'heartbeat'}, ensure_ascii=False)}\n\n"
-                        last_heartbeat = current_time
-                    continue
+            _deadline = asyncio.get_running_loop().time() + _stream_timeout
+            try:
+                async for status_data in bridge.stream(task, deadline=_deadline, is_disconnected=fastapi_request.is_disconnected):
+                    yield f"data: {json.dumps(status_data, ensure_ascii=False)}\n\n"
+                    # ✅ Agent Mode: เมื่อได้ step agent_show_summary ให้ส่ง summary_ready พร้อม current_plan เพื่อให้ frontend แสดง Trip Summary ก่อนจอง
+                    if status_data.get("step") == "agent_show_summary":
+                        try:
+                            updated_session = await storage.get_session(session_id)
+                            if updated_session:
+                                metadata = await get_agent_metadata(updated_session, is_admin=False, mode=mode)
+                                summary_event = {
+                                    "status": "summary_ready",
+                                    "current_plan": metadata.get("current_plan"),
+                                    "travel_slots": metadata.get("travel_slots"),
+                                    "workflow_validation": metadata.get("workflow_validation"),
+                                    "agent_state": metadata.get("agent_state"),
+                                }
+                                yield f"data: {json.dumps(summary_event, ensure_ascii=False)}\n\n"
+                        except Exception as summary_err:
+                            logger.warning(f"Agent show summary: failed to build summary_ready event: {summary_err}")
+            except (asyncio.CancelledError, GeneratorExit):
+                # Starlette ยกเลิก generator เมื่อ client ตัดการเชื่อมต่อ → หยุด agent ด้วย
+                logger.info(f"Client disconnected during stream: session={session_id}")
+                task.cancel()
+                raise
+            if bridge.end_reason == "disconnected":
+                logger.info(f"Client disconnected during stream: session={session_id}")
+                task.cancel()
+                return
+            if bridge.end_reason == "timeout":
+                logger.warning(f"Task timeout exceeded ({_stream_timeout}s) for session {session_id}")
+                task.cancel()
             
             # 3. Get the final response from agent (task is already done)
             response_text = None
@@ -1791,6 +1784,8 @@ async def chat_stream(
                 }
                 await storage.save_message(session_id, _bot_msg_realtime)
                 logger.info(f"[Realtime] Bot message saved to DB after response: session={session_id}, length={len(response_text)}")
+                # สรุปประวัติแชทต่อยอดใน background (turn ถัดไปอ่าน summary ที่เก็บไว้ ไม่ต้องเรียก LLM)
+                (await agent_container.get_services()).memory.schedule_summary_update(session_id)
             except Exception as _save_err:
                 logger.warning(f"[Realtime] Failed to save bot message realtime: {_save_err}")
             
@@ -1811,6 +1806,13 @@ async def chat_stream(
             }
             if run_turn_error_hint:
                 final_data["error_hint"] = run_turn_error_hint
+            # ✅ STREAMING: time-to-first-token แยกจากเวลารวมของ turn
+            final_data["timing"] = {
+                "ttft_ms": _stream_timing["ttft_ms"],
+                "total_ms": round((time.perf_counter() - _turn_started) * 1000, 1),
+                "streamed_chunks": _stream_timing["tokens"],
+            }
+            logger.info(f"[Stream] session={session_id} ttft={_stream_timing['ttft_ms']}ms total={final_data['timing']['total_ms']}ms chunks={_stream_timing['tokens']}")
             if mode == "agent":
                 final_data["auto_booked"] = auto_booked
                 if auto_booked:
@@ -1966,15 +1968,14 @@ async def chat(
         
         logger.info(f"Processing chat request: message_length={len(request.message)}")
         
-        # Instantiate storage and agent (with MCP support)
-        storage = MongoStorage()
-        llm_with_mcp = LLMServiceWithMCP()
+        # Per-turn agent facade over process-wide services (with MCP support)
+        agent_container = get_agent_container()
+        storage = agent_container.get_storage()
         
         # ✅ Get user preferences for agent (personality, style, language, RL)
         _prefs = await _load_user_agent_preferences(storage, user_id)
-        agent = TravelAgent(
+        agent = await agent_container.create_agent(
             storage,
-            llm_service=llm_with_mcp,
             agent_personality=_prefs["agentPersonality"],
             response_style=_prefs["responseStyle"],
             detail_level=_prefs["detailLevel"],
@@ -2025,7 +2026,8 @@ async def chat(
         
         # Run agent turn (this returns the response text)
         # Note: TravelAgent.run_turn should handle internal state updates
-        result = await agent.run_turn(session_id, request.message, mode=mode)
+        with llm_deadline_scope(float(settings.chat_timeout_agent if mode == "agent" else settings.chat_timeout_normal)):
+            result = await agent.run_turn(session_id, request.message, mode=mode)
         # run_turn always returns str; auto_booked flag is stored on the session object
         response_text = result if isinstance(result, str) else (result[0] if isinstance(result, tuple) else str(result))
         # Read auto_booked from session after run_turn completes
@@ -2079,6 +2081,7 @@ async def chat(
             logger.error(f"Failed to save bot message to database for session {session_id}")
         else:
             logger.info(f"[Realtime] Bot message saved to DB after agent run: session={session_id}")
+            agent.memory.schedule_summary_update(session_id)
         
         logger.info("Chat request completed successfully")
         
@@ -2332,7 +2335,8 @@ async def select_choice(request: dict, fastapi_request: Request):
     set_logging_context(session_id=session_id, user_id=user_id)
     
     try:
-        storage = MongoStorage()
+        agent_container = get_agent_container()
+        storage = agent_container.get_storage()
         
         # ✅ SECURITY: Verify session belongs to this user before proceeding
         existing_session = await storage.get_session(session_id)
@@ -2340,13 +2344,10 @@ async def select_choice(request: dict, fastapi_request: Request):
             logger.error(f"🚨 SECURITY ALERT: Unauthorized choose attempt: user {user_id} tried to access session {session_id} owned by {existing_session.user_id}")
             raise HTTPException(status_code=403, detail="You do not have permission to access this session")
         
-        llm_with_mcp = LLMServiceWithMCP()
-        
         # ✅ Get user preferences for agent (personality, style, language, RL)
         _prefs = await _load_user_agent_preferences(storage, user_id)
-        agent = TravelAgent(
+        agent = await agent_container.create_agent(
             storage,
-            llm_service=llm_with_mcp,
             agent_personality=_prefs["agentPersonality"],
             response_style=_prefs["responseStyle"],
             detail_level=_prefs["detailLevel"],
@@ -2862,7 +2863,6 @@ async def delete_chat_session(
         db = conn_mgr.get_database()
 
         sessions_collection = db["sessions"]
-        conversations_collection = db["conversations"]
 
         # ✅ SECURITY: Verify session belongs to this user before deleting
         session_doc = await sessions_collection.find_one({"session_id": session_id})
@@ -2875,13 +2875,13 @@ async def delete_chat_session(
         # Delete session document
         session_result = await sessions_collection.delete_one({"session_id": session_id, "user_id": user_id})
 
-        # Delete conversation/messages document
-        conv_result = await conversations_collection.delete_one({"session_id": session_id, "user_id": user_id})
+        # Delete conversation head + message buckets
+        deleted_conversations = await ConversationStore(db).delete({"session_id": session_id, "user_id": user_id})
 
         # Redis removed — MongoDB is the only storage
 
-        logger.info(f"Deleted session {session_id}: sessions={session_result.deleted_count}, conversations={conv_result.deleted_count}")
-        return {"ok": True, "session_id": session_id, "deleted_sessions": session_result.deleted_count, "deleted_conversations": conv_result.deleted_count}
+        logger.info(f"Deleted session {session_id}: sessions={session_result.deleted_count}, conversations={deleted_conversations}")
+        return {"ok": True, "session_id": session_id, "deleted_sessions": session_result.deleted_count, "deleted_conversations": deleted_conversations}
 
     except HTTPException:
         raise
@@ -2984,7 +2984,6 @@ async def auto_delete_old_conversations(request: AutoDeleteRequest, fastapi_requ
         db = conn_mgr.get_database()
 
         sessions_collection = db["sessions"]
-        conversations_collection = db["conversations"]
 
         cutoff_dt = datetime.utcnow() - timedelta(days=days)
         cutoff_iso = cutoff_dt.isoformat()
@@ -3009,8 +3008,8 @@ async def auto_delete_old_conversations(request: AutoDeleteRequest, fastapi_requ
             "session_id": {"$in": old_session_ids}
         })
 
-        # Delete conversation documents
-        c_result = await conversations_collection.delete_many({
+        # Delete conversation heads + message buckets
+        deleted_conversations = await ConversationStore(db).delete({
             "user_id": user_id,
             "session_id": {"$in": old_session_ids}
         })
@@ -3018,14 +3017,14 @@ async def auto_delete_old_conversations(request: AutoDeleteRequest, fastapi_requ
         # Redis removed — MongoDB is the only storage
 
         logger.info(
-            f"Auto-deleted {s_result.deleted_count} sessions and {c_result.deleted_count} conversations "
+            f"Auto-deleted {s_result.deleted_count} sessions and {deleted_conversations} conversations "
             f"older than {days} days for user: {user_id}"
         )
 
         return {
             "ok": True,
             "deleted_sessions": s_result.deleted_count,
-            "deleted_conversations": c_result.deleted_count,
+            "deleted_conversations": deleted_conversations,
             "message": f"Deleted {s_result.deleted_count} old conversation(s)"
         }
 
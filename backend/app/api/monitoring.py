@@ -146,13 +146,16 @@ async def monitoring_health() -> Dict[str, Any]:
     """Health check for monitoring endpoints"""
     try:
         total_sessions = len(cost_tracker.get_all_sessions())
+        cache_summary = cost_tracker.get_cache_summary()
         
         return {
             "ok": True,
             "service": "monitoring",
             "timestamp": datetime.utcnow().isoformat(),
             "stats": {
-                "tracked_sessions": total_sessions
+                "tracked_sessions": total_sessions,
+                "llm_cache_hit_rate": cache_summary["hit_rate"],
+                "llm_cache_saved_cost_usd": cache_summary["saved_cost_usd"],
             }
         }
     except Exception as e:
@@ -160,6 +163,161 @@ async def monitoring_health() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/llm-scheduler")
+async def get_llm_scheduler_stats() -> Dict[str, Any]:
+    """
+    สถานะ LLM scheduler: งานที่รัน/รอคิวต่อ priority class, เวลารอคิวและเวลารัน (p50/p95), งานที่หมดเวลาในคิว
+    """
+    try:
+        from app.services.llm_scheduler import get_llm_scheduler
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "scheduler": get_llm_scheduler().get_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting LLM scheduler stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search-prefetch")
+async def get_search_prefetch_stats() -> Dict[str, Any]:
+    """
+    Speculative search prefetch: จำนวนที่เริ่มล่วงหน้า / ถูก CALL_SEARCH ใช้ (hit) / ยกเลิกเพราะ requirements ไม่ตรง / ไม่ได้ใช้
+    """
+    try:
+        from app.engine.search_prefetch import get_prefetch_stats
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "prefetch": get_prefetch_stats().get_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting search prefetch stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/offer-blobs")
+async def get_offer_blob_stats() -> Dict[str, Any]:
+    """
+    Raw offer blob store: จำนวน option ที่ย้าย raw ออกจาก session, blob ที่เขียนใหม่ / dedupe, bytes ที่ลดได้ และการ resolve ตอนจอง
+    """
+    try:
+        from app.services.offer_blob_store import get_offer_blob_store
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "offer_blobs": get_offer_blob_store().get_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting offer blob stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/sse")
+async def get_sse_bridge_stats() -> Dict[str, Any]:
+    """
+    SSE bridge ของ chat stream: stream ที่เปิดอยู่, event ที่ส่ง / token ที่รวม / status ที่ตัดเมื่อ client ช้า, heartbeat และ wakeup ต่อ event
+    """
+    try:
+        from app.core.sse_bridge import get_sse_bridge_stats as _stats
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "sse": _stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting SSE bridge stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/notifications")
+async def get_notification_broker_stats() -> Dict[str, Any]:
+    """
+    Notification broker: backend (redis / local), subscriber ในโปรเซสนี้, publish / fallback, event ที่ทิ้งเพราะ client ช้า, reconnect
+    """
+    try:
+        from app.services.notification_broker import get_notification_broker
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "notifications": get_notification_broker().get_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting notification broker stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/admin-stream")
+async def get_admin_stream_stats() -> Dict[str, Any]:
+    """
+    Admin /stream broadcaster: จำนวน viewer, producer ทำงานอยู่หรือไม่, Mongo ops / bytes ของ log ที่อ่าน (ไม่เพิ่มตามจำนวน viewer)
+    """
+    try:
+        from app.services.admin_stream import get_admin_stream_broadcaster
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "admin_stream": get_admin_stream_broadcaster().get_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting admin stream stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/learning-metrics")
+async def get_learning_metrics_stats() -> Dict[str, Any]:
+    """
+    Learning metrics: จำนวน query ที่ใช้ (คงที่ต่อ batch ไม่ขึ้นกับจำนวน user), rollup ล่าสุด / error
+    """
+    try:
+        from app.services.learning_metrics import get_learning_metrics_service
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "learning_metrics": get_learning_metrics_service().get_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting learning metrics stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/amadeus")
+async def get_amadeus_transport_stats() -> Dict[str, Any]:
+    """
+    Amadeus transport กลาง: token ที่ใช้ร่วมกัน / จำนวนรีเฟรช, คิว rate limit ต่อ endpoint family (429, เวลารอ p95)
+    และ latency histogram ต่อ endpoint
+    """
+    try:
+        from app.services.amadeus_transport import get_amadeus_transport
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "amadeus": get_amadeus_transport().get_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting Amadeus transport stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cost/llm-cache")
+async def get_llm_cache_savings() -> Dict[str, Any]:
+    """
+    LLM response cache: hit/miss ต่อ brain type, โทเค็นและต้นทุนที่ประหยัดได้ (ประมาณ) และสถานะ storage
+    """
+    try:
+        from app.services.llm_cache import get_llm_cache
+        return {
+            "ok": True,
+            "timestamp": datetime.utcnow().isoformat(),
+            "savings": cost_tracker.get_cache_summary(),
+            "cache": get_llm_cache().get_stats(),
+        }
+    except Exception as e:
+        logger.error(f"Error getting LLM cache stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/search-relaxed/summary")
 async def get_search_relaxed_summary() -> Dict[str, Any]:
     """
@@ -7,31 +7,23 @@
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import Dict, Any, Optional
 from datetime import datetime
 import asyncio
-import json
 from app.core.logging import get_logger
 from app.core.config import settings
 from app.storage.mongodb_storage import MongoStorage
 from app.core.security import extract_user_id_from_request
+from app.services.notification_broker import get_notification_broker
 
 logger = get_logger(__name__)
 
 router = APIRouter(prefix="/api/notification", tags=["notifications"])
 
-# ── SSE subscriber registry ──────────────────────────────────────────────────
-# { user_id: [asyncio.Queue, ...] }
-_sse_subscribers: Dict[str, List[asyncio.Queue]] = {}
-
-
-def _get_queues(user_id: str) -> List[asyncio.Queue]:
-    return _sse_subscribers.get(user_id, [])
-
 
 async def push_notification_event(user_id: str, notification: dict):
     """
-    Push event ไปยัง SSE subscribers ของเจ้าของการแจ้งเตือนเท่านั้น
+    Push event ไปยัง SSE subscribers ของเจ้าของการแจ้งเตือนเท่านั้น (ทุก worker ผ่าน notification broker)
     ใช้ user_id ใน notification เป็นหลัก เพื่อไม่ให้แจ้งเตือนข้ามไปยัง user อื่น
     """
     target_uid = (notification or {}).get("user_id")
@@ -43,21 +35,7 @@ async def push_notification_event(user_id: str, notification: dict):
         user_id = target_uid
     if not user_id:
         return
-    queues = _get_queues(user_id)
-    if not queues:
-        return
-    payload = json.dumps({"type": "new_notification", "notification": notification}, ensure_ascii=False)
-    dead = []
-    for q in queues:
-        try:
-            q.put_nowait(payload)
-        except asyncio.QueueFull:
-            dead.append(q)
-    for q in dead:
-        try:
-            _sse_subscribers[user_id].remove(q)
-        except ValueError:
-            pass
+    await get_notification_broker().publish(user_id, {"type": "new_notification", "notification": notification})
 
 
 @router.get("/list")
@@ -177,12 +155,8 @@ async def notification_stream(request: Request):
             media_type="text/event-stream"
         )
 
-    queue: asyncio.Queue = asyncio.Queue(maxsize=50)
-
-    if user_id not in _sse_subscribers:
-        _sse_subscribers[user_id] = []
-    _sse_subscribers[user_id].append(queue)
-    logger.info(f"SSE subscriber added for user: {user_id} (total: {len(_sse_subscribers[user_id])})")
+    subscriber = await get_notification_broker().subscribe(user_id)
+    logger.info(f"SSE subscriber added for user: {user_id}")
 
     async def event_generator():
         try:
@@ -192,23 +166,18 @@ async def notification_stream(request: Request):
                 # ตรวจว่า client ยังเชื่อมต่ออยู่
                 if await request.is_disconnected():
                     break
-                try:
-                    # รอ event สูงสุด 25 วินาที แล้วส่ง heartbeat
-                    payload = await asyncio.wait_for(queue.get(), timeout=25.0)
-                    yield f"data: {payload}\n\n"
-                except asyncio.TimeoutError:
+                # รอ event สูงสุด 25 วินาที แล้วส่ง heartbeat — burst ที่ค้างอยู่ส่งรวมใน write เดียว
+                batch = await subscriber.next_batch(timeout=25.0)
+                if batch:
+                    yield "".join(f"data: {payload}\n\n" for payload in batch)
+                else:
                     # heartbeat เพื่อไม่ให้ connection timeout
                     yield "data: {\"type\":\"heartbeat\"}\n\n"
         except asyncio.CancelledError:
             pass
         finally:
             # ยกเลิกการลงทะเบียน
-            try:
-                _sse_subscribers[user_id].remove(queue)
-                if not _sse_subscribers[user_id]:
-                    del _sse_subscribers[user_id]
-            except (ValueError, KeyError):
-                pass
+            await subscriber.close()
             logger.info(f"SSE subscriber removed for user: {user_id}")
 
     return StreamingResponse(
@@ -0,0 +1,285 @@
+"""
+แคชในโปรเซสแบบมีขอบเขต (TTL + LRU) สำหรับ store ที่เคยเป็น dict ระดับโมดูลซึ่งโตไม่จำกัด
+
+- จำกัดจำนวน entry และขนาดโดยประมาณ (bytes)
+- TTL ต่อ entry, LRU แบบ O(1) ด้วย OrderedDict
+- background sweeper ลบ entry ที่หมดอายุ (เริ่มเองเมื่อมี event loop)
+- ตัวนับ hit / miss / eviction / expiration ต่อแคช
+- ปลอดภัยทั้งกับ asyncio (ไม่มี await ระหว่างแก้ไข) และ thread (ใช้ lock)
+"""
+
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import sys
+import threading
+import time
+import weakref
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_MISSING = object()
+
+# ทุกแคชที่สร้าง (weak) — ใช้สำหรับ stats รวมและหยุด sweeper ตอน shutdown
+_registry: "weakref.WeakSet[BoundedCache]" = weakref.WeakSet()
+
+
+# ค่าประมาณขนาดแบบถูก: เดินโครงสร้างไม่เกิน _SIZE_NODE_BUDGET node และสุ่มลูกไม่เกิน _SIZE_SAMPLE ตัวต่อ container
+# (เดิม json.dumps ทั้งก้อนทุก set — pool 100–500KB ถูก serialize บน hot path ทุกครั้งที่เขียน)
+_SIZE_SAMPLE = 16
+_SIZE_NODE_BUDGET = 256
+_SIZE_LEAF = 16
+
+
+def _estimate(value: Any, budget: List[int]) -> int:
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value) + 2
+    if value is None or isinstance(value, (bool, int, float)):
+        return 8
+    if budget[0] <= 0:
+        return _SIZE_LEAF
+    budget[0] -= 1
+    if isinstance(value, dict):
+        n = len(value)
+        if not n:
+            return 2
+        total = 0
+        sampled = 0
+        for k, v in value.items():
+            total += len(str(k)) + 4 + _estimate(v, budget)
+            sampled += 1
+            if sampled >= _SIZE_SAMPLE:
+                break
+        return 2 + total * n // sampled
+    if isinstance(value, (list, tuple, set, frozenset)):
+        n = len(value)
+        if not n:
+            return 2
+        items = value if isinstance(value, (list, tuple)) else list(value)
+        # ตัวอย่างกระจายทั้ง list (หัว/กลาง/ท้าย) เพื่อไม่ให้ประมาณจากเฉพาะตัวแรกๆ
+        step = max(1, n // _SIZE_SAMPLE)
+        sample = items[::step][:_SIZE_SAMPLE]
+        total = sum(_estimate(v, budget) + 1 for v in sample)
+        return 2 + total * n // len(sample)
+    return sys.getsizeof(value)
+
+
+def approx_size(value: Any) -> int:
+    """
+    Cheap approximate payload size in bytes (roughly JSON length), bounded work per call.
+
+    Large containers are extrapolated from a sample of their children, so the cost does not grow
+    with the payload. Callers that already have an exact size (e.g. an encoded blob) should pass size=.
+    """
+    return _estimate(value, [_SIZE_NODE_BUDGET])
+
+
+class BoundedCache:
+    """
+    Bounded TTL/LRU mapping.
+
+    Args:
+        name: ชื่อแคช (ใช้ใน log/stats)
+        max_entries: จำนวน entry สูงสุด (LRU eviction เมื่อเกิน)
+        max_bytes: ขนาดรวมโดยประมาณสูงสุด (0 = ไม่จำกัด)
+        default_ttl: TTL (วินาที) ของ entry ที่ไม่ระบุ ttl (None = ไม่หมดอายุ)
+        sizeof: ฟังก์ชันประมาณขนาด value (ค่าเริ่มต้น approx_size)
+            ขนาดวัดครั้งเดียวตอน set() — แก้ value ในที่ (in-place) ไม่ถูกวัดใหม่
+            ถ้าการแก้ทำให้ขนาดเปลี่ยนมาก ให้เรียก set() ใหม่ หรือ adjust_size()
+        sweep_interval: รอบของ background sweeper (วินาที)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 10_000,
+        max_bytes: int = 0,
+        default_ttl: Optional[float] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        sweep_interval: float = 60.0,
+    ):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(0, int(max_bytes))
+        self.default_ttl = default_ttl
+        self._sizeof = sizeof or approx_size
+        self._sweep_interval = sweep_interval
+        # key -> (value, expires_at monotonic | None, size)
+        self._data: "OrderedDict[Any, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._sweeper: Optional["asyncio.Task[None]"] = None
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        _registry.add(self)
+
+    # ---------- internal ----------
+
+    def _remove(self, key: Any) -> Any:
+        value, _, size = self._data.pop(key)
+        self._bytes -= size
+        return value
+
+    def _evict_over_limit(self) -> None:
+        while self._data and (
+            len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self._stats["evictions"] += 1
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None and not self._sweeper.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # ไม่มี event loop (เช่นเรียกจาก thread) — ใช้ lazy expiry ไปก่อน
+        self._sweeper = loop.create_task(self._sweep_loop())
+
+    async def _sweep_loop(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self._sweep_interval)
+                removed = self.sweep()
+                if removed:
+                    logger.debug(f"BoundedCache[{self.name}] swept {removed} expired entries")
+        except asyncio.CancelledError:
+            pass
+
+    # ---------- mapping API ----------
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self._stats["misses"] += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None, size: Optional[int] = None) -> None:
+        """Insert/replace key. ttl=None uses default_ttl; size=None uses the sizeof estimator."""
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        entry_size = int(size) if size is not None else self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, entry_size)
+            self._bytes += entry_size
+            self._evict_over_limit()
+        self._ensure_sweeper()
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.set(key, value)
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: Any) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[1] is None or entry[1] >= time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def adjust_size(self, key: Any, delta: int) -> bool:
+        """Re-account an entry whose value was mutated in place (size is otherwise measured once at set())."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False
+            new_size = max(0, entry[2] + int(delta))
+            self._bytes += new_size - entry[2]
+            self._data[key] = (entry[0], entry[1], new_size)
+            self._evict_over_limit()
+            return True
+
+    def touch(self, key: Any, ttl: Optional[float] = None) -> bool:
+        """Extend the TTL of an existing entry (e.g. when its value was mutated in place)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False
+            ttl = self.default_ttl if ttl is None else ttl
+            self._data[key] = (entry[0], time.monotonic() + ttl if ttl else None, entry[2])
+            self._data.move_to_end(key)
+            return True
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Snapshot of live (non-expired) items; does not affect LRU order."""
+        now = time.monotonic()
+        with self._lock:
+            return [(k, v) for k, (v, exp, _) in self._data.items() if exp is None or exp >= now]
+
+    def keys(self) -> List[Any]:
+        return [k for k, _ in self.items()]
+
+    def values(self) -> List[Any]:
+        return [v for _, v in self.items()]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.keys())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def sweep(self) -> int:
+        """Remove every expired entry now; returns the number removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, exp, _) in self._data.items() if exp is not None and exp < now]
+            for k in expired:
+                self._remove(k)
+            self._stats["expirations"] += len(expired)
+        return len(expired)
+
+    def stop(self) -> None:
+        if self._sweeper is not None and not self._sweeper.done():
+            self._sweeper.cancel()
+        self._sweeper = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "name": self.name,
+            **self._stats,
+            "entries": len(self._data),
+            "approx_bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+def get_all_cache_stats() -> List[Dict[str, Any]]:
+    """Stats of every live BoundedCache in this process (for admin/monitoring)."""
+    return [c.get_stats() for c in list(_registry)]
+
+
+def stop_all_sweepers() -> None:
+    """Cancel background sweepers (called from the FastAPI lifespan on shutdown)."""
+    for c in list(_registry):
+        c.stop()
@@ -44,7 +44,21 @@ class Settings:
         self.gemini_timeout_seconds: int = int(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
         self.gemini_max_retries: int = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
         self.enable_gemini: bool = os.getenv("ENABLE_GEMINI", "true").lower() == "true"  # Enabled by default
-        
+        # LLM scheduler: thread pool แยกสำหรับเรียก Gemini + จำกัดจำนวนพร้อมกันต่อ priority class
+        self.llm_executor_workers: int = int(os.getenv("LLM_EXECUTOR_WORKERS", "16"))
+        self.llm_interactive_max_concurrency: int = int(os.getenv("LLM_INTERACTIVE_MAX_CONCURRENCY", "14"))
+        self.llm_background_max_concurrency: int = int(os.getenv("LLM_BACKGROUND_MAX_CONCURRENCY", "3"))
+        # รอคิวนานเกินนี้ (ms) ถือว่าคิวแน่น → สลับไปใช้ gemini-2.0-flash-lite ทันที
+        self.llm_queue_pressure_ms: float = float(os.getenv("LLM_QUEUE_PRESSURE_MS", "1500"))
+        self.llm_pressure_fallback_model: str = os.getenv("LLM_PRESSURE_FALLBACK_MODEL", "gemini-2.0-flash-lite")
+        # แคชคำตอบ LLM (opt-in ต่อ call: extraction/title/familiarity/intelligence) — เก็บเฉพาะ JSON ที่ผ่านการตรวจ
+        self.llm_cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.llm_cache_ttl_seconds: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "21600"))
+        self.llm_cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+        # temperature สูงกว่านี้ถือว่าไม่ deterministic → ไม่แคชแม้ผู้เรียกจะขอ
+        self.llm_cache_max_temperature: float = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.5"))
+
+
         # 🤖 Auto Model Switching Configuration (Disabled for now)
         self.enable_auto_model_switching: bool = os.getenv("ENABLE_AUTO_MODEL_SWITCHING", "false").lower() == "true"
         # Model names must be set in .env file
@@ -74,6 +88,44 @@ class Settings:
         # ใช้ Redis อัตโนมัติเมื่อมี REDIS_URL; ถ้าไม่ตั้งค่า → ใช้ in-process memory อย่างเดียว
         self.redis_url: str = os.getenv("REDIS_URL", "").strip()
         self.enable_redis_cache: bool = bool(self.redis_url)
+        # Notification broker (SSE /api/notification/stream): auto = Redis pub/sub เมื่อมี Redis ไม่งั้น in-process, local = in-process เท่านั้น
+        # Redis ทำให้ push ถึง client ที่ต่ออยู่กับ worker อื่นได้ (หลาย worker / หลายเครื่อง)
+        self.notification_broker: str = os.getenv("NOTIFICATION_BROKER", "auto").strip().lower()
+        self.notification_channel_prefix: str = os.getenv("NOTIFICATION_CHANNEL_PREFIX", "notif:user:")
+        # event ค้างสูงสุดต่อ SSE connection — เกินแล้วทิ้งตัวเก่าสุดและส่ง resync ให้ client โหลดรายการใหม่
+        self.notification_subscriber_buffer: int = int(os.getenv("NOTIFICATION_SUBSCRIBER_BUFFER", "50"))
+        # รอรวม burst ก่อนส่ง (ms) — 0 = ส่งทุกอย่างที่ค้างอยู่ใน write เดียวโดยไม่รอเพิ่ม
+        self.notification_coalesce_ms: int = int(os.getenv("NOTIFICATION_COALESCE_MS", "0"))
+        # Shared search cache (ข้ามเซสชัน): ผลค้นหา Amadeus ตาม request ที่ normalize แล้ว, TTL แยกตามประเภท
+        self.search_cache_enabled: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+        self.search_cache_flight_ttl_seconds: int = int(os.getenv("SEARCH_CACHE_FLIGHT_TTL_SECONDS", "600"))
+        self.search_cache_hotel_ttl_seconds: int = int(os.getenv("SEARCH_CACHE_HOTEL_TTL_SECONDS", "1800"))
+        self.search_cache_transfer_ttl_seconds: int = int(os.getenv("SEARCH_CACHE_TRANSFER_TTL_SECONDS", "1800"))
+        self.search_cache_max_entries: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "500"))
+        # Speculative search prefetch: ML intent ชัด + slot ครบ → เริ่มค้นหาตั้งแต่ต้นเทิร์น ขนานกับ Controller LLM
+        self.search_prefetch_enabled: bool = os.getenv("SEARCH_PREFETCH_ENABLED", "true").lower() == "true"
+        # confidence ของ MLP (calibrated) มักต่ำ — ตัวกรองหลักคือ slot ต้องครบ (ปลายทาง+วันที่) ค่านี้แค่ตัดข้อความที่ไม่ใช่เรื่องเดินทาง
+        self.search_prefetch_min_confidence: float = float(os.getenv("SEARCH_PREFETCH_MIN_CONFIDENCE", "0.15"))
+        self.search_prefetch_max_requests: int = int(os.getenv("SEARCH_PREFETCH_MAX_REQUESTS", "3"))
+        # Bounded in-process caches (ใช้เมื่อ Redis ไม่พร้อม/ไม่ได้ตั้งค่า) — กัน RSS โตไม่จำกัดใน worker ที่รันนาน
+        self.options_cache_max_entries: int = int(os.getenv("OPTIONS_CACHE_MAX_ENTRIES", "5000"))
+        self.options_cache_max_mb: int = int(os.getenv("OPTIONS_CACHE_MAX_MB", "256"))
+        self.memory_cache_max_entries: int = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", "10000"))
+        self.memory_cache_max_mb: int = int(os.getenv("MEMORY_CACHE_MAX_MB", "64"))
+        self.rate_limit_max_identifiers: int = int(os.getenv("RATE_LIMIT_MAX_IDENTIFIERS", "50000"))
+        self.cost_tracker_max_sessions: int = int(os.getenv("COST_TRACKER_MAX_SESSIONS", "5000"))
+        self.cost_tracker_session_ttl_hours: int = int(os.getenv("COST_TRACKER_SESSION_TTL_HOURS", "24"))
+        self.cost_tracker_max_calls_per_session: int = int(os.getenv("COST_TRACKER_MAX_CALLS_PER_SESSION", "200"))
+        # Hotel → Google Place enrichment index (Mongo + hot memory): อายุข้อมูลก่อน refresh เบื้องหลัง
+        self.hotel_place_stale_days: int = int(os.getenv("HOTEL_PLACE_STALE_DAYS", "30"))
+        self.hotel_place_negative_ttl_hours: int = int(os.getenv("HOTEL_PLACE_NEGATIVE_TTL_HOURS", "24"))
+        self.hotel_place_hot_max_entries: int = int(os.getenv("HOTEL_PLACE_HOT_MAX_ENTRIES", "20000"))
+        # Raw offer blob store: raw Amadeus ของแต่ละ option เก็บแยกใน Mongo "offer_blobs" (key = sha256, dedupe ข้ามเซสชัน)
+        # segment เก็บแค่ raw_data แบบย่อ + raw_ref; booking ดึง payload เต็มเมื่อจะส่ง Amadeus
+        self.offer_blob_store_enabled: bool = os.getenv("OFFER_BLOB_STORE_ENABLED", "true").lower() == "true"
+        self.offer_blob_ttl_days: int = int(os.getenv("OFFER_BLOB_TTL_DAYS", "14"))
+        self.offer_blob_min_bytes: int = int(os.getenv("OFFER_BLOB_MIN_BYTES", "4096"))  # raw ที่เล็กกว่านี้เก็บ inline ตามเดิม
+        self.offer_blob_hot_max_mb: int = int(os.getenv("OFFER_BLOB_HOT_MAX_MB", "64"))
 
         # Logging Configuration
         self.log_level: str = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -95,13 +147,27 @@ class Settings:
         self.enable_langgraph_full_workflow: bool = os.getenv("ENABLE_LANGGRAPH_FULL_WORKFLOW", "true").lower() == "true"
         self.controller_max_iterations: int = int(os.getenv("CONTROLLER_MAX_ITERATIONS", "3"))
         self.controller_temperature: float = float(os.getenv("CONTROLLER_TEMPERATURE", "0.3"))
+        # Fast path: ข้อความที่ชัดเจน (ปลายทาง/วันที่/จำนวนคน) → วางแผนด้วยกฎโดยไม่เรียก Controller LLM
+        self.fast_planner_enabled: bool = os.getenv("FAST_PLANNER_ENABLED", "true").lower() == "true"
+        self.fast_planner_min_confidence: float = float(os.getenv("FAST_PLANNER_MIN_CONFIDENCE", "0.75"))
         self.responder_temperature: float = float(os.getenv("RESPONDER_TEMPERATURE", "0.7"))
+        # ส่ง token ของ Responder ไปทาง SSE (event status=token) ระหว่างที่ LLM กำลังสร้างคำตอบ
+        self.responder_streaming_enabled: bool = os.getenv("RESPONDER_STREAMING_ENABLED", "true").lower() == "true"
         # Timeout ของ stream chat (ใช้ร่วมกันระหว่าง middleware และ chat.py)
         # Agent mode ใช้เวลานานกว่า (ค้นหา + เลือก + จอง) จึงให้ timeout สูงกว่า
         self.chat_timeout_agent: int = int(os.getenv("CHAT_TIMEOUT_AGENT", "120"))
         self.chat_timeout_normal: int = int(os.getenv("CHAT_TIMEOUT_NORMAL", "90"))
         # Middleware timeout ต้องมากกว่า chat timeout อย่างน้อย 10s (buffer)
         self.chat_middleware_timeout: int = self.chat_timeout_agent + 15
+        # SSE bridge ของ chat stream: heartbeat เมื่อเงียบเกิน N วินาที, จำนวน event ค้างสูงสุดต่อ stream (client ช้า)
+        # เต็มแล้ว → รวม token / ตัด status ที่ถูกแทนที่ / ให้ agent รอได้ไม่เกิน SSE_SLOW_CLIENT_TIMEOUT
+        self.sse_heartbeat_interval: float = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "2.0"))
+        self.sse_max_buffered_events: int = int(os.getenv("SSE_MAX_BUFFERED_EVENTS", "256"))
+        self.sse_slow_client_timeout: float = float(os.getenv("SSE_SLOW_CLIENT_TIMEOUT", "10.0"))
+        # Prefetch ก่อน Controller (memory / user profile / workflow state อ่านพร้อมกัน) — timeout ต่อแหล่งข้อมูล
+        self.turn_prefetch_timeout_seconds: float = float(os.getenv("TURN_PREFETCH_TIMEOUT_SECONDS", "3.0"))
+        # conversation context อาจเรียก LLM compaction (เมื่อปิด ROLLING_SUMMARY_ENABLED) จึงให้เวลามากกว่า
+        self.turn_prefetch_context_timeout_seconds: float = float(os.getenv("TURN_PREFETCH_CONTEXT_TIMEOUT_SECONDS", "10.0"))
         
         # MongoDB Configuration (MONGO_* = ปัจจุบัน, MONGODB_* = fallback)
         self.mongodb_uri: str = (
@@ -110,7 +176,32 @@ class Settings:
         self.mongodb_database: str = (
             os.getenv("MONGO_DB_NAME") or os.getenv("MONGODB_DATABASE", "travel_agent")
         ).strip()
-        
+        # save_session แบบ delta: เขียนเฉพาะ path ที่เปลี่ยน ($set/$unset) แทนการ $set ทั้งเอกสารทุกครั้ง
+        self.session_delta_save_enabled: bool = os.getenv("SESSION_DELTA_SAVE_ENABLED", "true").lower() == "true"
+        # ข้อความแชทเก็บเป็น bucket ละ N ข้อความ (conversation_buckets) — append/อ่าน tail ไม่ช้าลงตามความยาวแชท
+        self.conversation_bucket_size: int = max(1, int(os.getenv("CONVERSATION_BUCKET_SIZE", "50")))
+        # last_accessed ของ memories: บัฟเฟอร์ไว้แล้ว flush เป็น bulk_write ทุก N วินาที / เมื่อค้างครบ N รายการ
+        self.memory_access_flush_seconds: float = float(os.getenv("MEMORY_ACCESS_FLUSH_SECONDS", "30"))
+        self.memory_access_flush_max_pending: int = max(1, int(os.getenv("MEMORY_ACCESS_FLUSH_MAX_PENDING", "500")))
+        # RL / FWL แบบ write-behind: record_reward ใส่คิวแล้วคืนทันที worker เขียนเป็น bulk_write ทุก N วินาที
+        self.rl_pipeline_enabled: bool = os.getenv("RL_PIPELINE_ENABLED", "true").lower() == "true"
+        self.rl_event_queue_size: int = max(1, int(os.getenv("RL_EVENT_QUEUE_SIZE", "10000")))
+        self.rl_flush_interval_seconds: float = float(os.getenv("RL_FLUSH_INTERVAL_SECONDS", "2.0"))
+        self.rl_flush_batch_size: int = max(1, int(os.getenv("RL_FLUSH_BATCH_SIZE", "500")))
+        # อายุของ reward history (TTL index บน created_ts) แทนการตัดเหลือ 500 รายการต่อ user ทุก event
+        self.rl_feedback_ttl_days: int = max(1, int(os.getenv("RL_FEEDBACK_TTL_DAYS", "180")))
+        # Learning metrics rollup: สรุปตัวชี้วัดการเรียนรู้เป็น bucket ตามช่วงเวลา (collection learning_metrics_rollups)
+        # สำหรับกราฟย้อนหลังใน admin — upsert ตาม bucket จึงรันซ้ำหลาย worker ได้
+        self.learning_metrics_rollup_enabled: bool = os.getenv("LEARNING_METRICS_ROLLUP_ENABLED", "true").lower() == "true"
+        self.learning_metrics_rollup_interval_minutes: int = max(5, int(os.getenv("LEARNING_METRICS_ROLLUP_INTERVAL_MINUTES", "60")))
+        self.learning_metrics_rollup_retention_days: int = max(1, int(os.getenv("LEARNING_METRICS_ROLLUP_RETENTION_DAYS", "180")))
+        # Rolling summary ต่อแชท: สรุปข้อความเก่าแบบต่อยอดใน background หลังจบ turn (ไม่เรียก LLM ก่อน Controller)
+        self.rolling_summary_enabled: bool = os.getenv("ROLLING_SUMMARY_ENABLED", "true").lower() == "true"
+        # จำนวนข้อความล่าสุดที่คงไว้เป็นข้อความดิบ (ไม่ถูกสรุป)
+        self.rolling_summary_keep_recent: int = max(2, int(os.getenv("ROLLING_SUMMARY_KEEP_RECENT", "10")))
+        # สรุปเพิ่มเมื่อมีข้อความใหม่ที่ยังไม่ถูกสรุปอย่างน้อย N ข้อความ (1 LLM call ต่อ N ข้อความ)
+        self.rolling_summary_batch: int = max(1, int(os.getenv("ROLLING_SUMMARY_BATCH", "10")))
+
         # Authentication Configuration
         # Try GOOGLE_CLIENT_ID first, fallback to VITE_GOOGLE_CLIENT_ID (for shared .env)
         self.google_client_id: str = (
@@ -150,6 +241,17 @@ class Settings:
         # Booking API Keys: ถ้าไม่ตั้งค่าให้ใช้ legacy keys (backward compatibility)
         self.amadeus_booking_api_key: str = os.getenv("AMADEUS_BOOKING_API_KEY", "").strip() or self.amadeus_api_key
         self.amadeus_booking_api_secret: str = os.getenv("AMADEUS_BOOKING_API_SECRET", "").strip() or self.amadeus_api_secret
+        # Amadeus transport กลาง (app/services/amadeus_transport.py): connection pool, token ร่วม, rate limit ต่อ endpoint family
+        self.amadeus_http_timeout_seconds: float = float(os.getenv("AMADEUS_HTTP_TIMEOUT_SECONDS", "12"))
+        self.amadeus_http_max_connections: int = int(os.getenv("AMADEUS_HTTP_MAX_CONNECTIONS", "50"))
+        self.amadeus_http_max_keepalive: int = int(os.getenv("AMADEUS_HTTP_MAX_KEEPALIVE", "20"))
+        self.amadeus_http_keepalive_seconds: float = float(os.getenv("AMADEUS_HTTP_KEEPALIVE_SECONDS", "60"))
+        # รีเฟรช OAuth token เบื้องหลังเมื่อเหลืออายุน้อยกว่านี้ (token ของ Amadeus อายุ ~30 นาที)
+        self.amadeus_token_refresh_margin_seconds: float = float(os.getenv("AMADEUS_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+        # คำขอ/วินาที ต่อ family (ค่าเริ่มต้นรวม search ได้ 10 TPS ตาม test tier; production key ตั้งได้ถึง 40)
+        self.amadeus_rate_limits: str = os.getenv(
+            "AMADEUS_RATE_LIMITS", "shopping=5,reference=3,schedule=1,other=1,booking=5,auth=2"
+        ).strip()
         
         # 🔒 Admin Dashboard Configuration (Production Security)
         self.admin_email: str = os.getenv("ADMIN_EMAIL", "admin@example.com").strip()
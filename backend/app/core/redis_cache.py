@@ -1,23 +1,29 @@
 """
 In-memory cache (Redis ถูกลบออกแล้ว)
 แคชประสิทธิภาพสำหรับคำตอบ API ผลการค้นหา และข้อมูลอื่น
+fallback ใน memory เป็น BoundedCache (จำกัดจำนวน/ขนาด + TTL)
 """
 
 import json
 import hashlib
 import asyncio
-from typing import Optional, Any, Dict, Callable
-from datetime import datetime, timedelta
+from typing import Optional, Any, Callable
 from app.core.logging import get_logger
 from app.core.redis_client import get_redis, is_redis_available
 from app.core.config import settings
+from app.core.bounded_cache import BoundedCache
 
 logger = get_logger(__name__)
 
 DEFAULT_TTL = 3600  # 1 hour
 
-# In-memory store: key -> (value, expires_at)
-_cache_store: Dict[str, tuple] = {}
+# In-memory store: key -> value (TTL/LRU/ขนาดจัดการโดย BoundedCache)
+_cache_store = BoundedCache(
+    "redis_cache_fallback",
+    max_entries=settings.memory_cache_max_entries,
+    max_bytes=settings.memory_cache_max_mb * 1024 * 1024,
+    default_ttl=DEFAULT_TTL,
+)
 
 
 class RedisCache:
@@ -57,14 +63,7 @@ class RedisCache:
                 logger.debug(f"Redis cache get failed for {cache_key}: {e}")
 
         # In-memory fallback
-        entry = _cache_store.get(cache_key)
-        if entry is None:
-            return None
-        value, expires_at = entry
-        if expires_at and datetime.utcnow() > expires_at:
-            _cache_store.pop(cache_key, None)
-            return None
-        return value
+        return _cache_store.get(cache_key)
 
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
         cache_key = self._make_key(key)
@@ -88,9 +87,9 @@ class RedisCache:
 
         # In-memory fallback (เสมอ)
         try:
-            expires_at = datetime.utcnow() + timedelta(seconds=cache_ttl) if cache_ttl else None
-            _cache_store[cache_key] = (value, expires_at)
-            ok = True or ok
+            # ttl=0 → ไม่หมดอายุ (ยังถูกจำกัดด้วย LRU/ขนาด)
+            _cache_store.set(cache_key, value, ttl=cache_ttl or 0)
+            ok = True
         except Exception as e:
             logger.debug(f"Memory cache set failed for {cache_key}: {e}")
 
@@ -125,14 +124,7 @@ class RedisCache:
             except Exception as e:
                 logger.debug(f"Redis cache exists failed for {cache_key}: {e}")
 
-        entry = _cache_store.get(cache_key)
-        if entry is None:
-            return False
-        _, expires_at = entry
-        if expires_at and datetime.utcnow() > expires_at:
-            _cache_store.pop(cache_key, None)
-            return False
-        return True
+        return cache_key in _cache_store
 
     async def clear_pattern(self, pattern: str) -> int:
         # Simple prefix/suffix matching (pattern uses * as wildcard)
@@ -157,7 +149,7 @@ class RedisCache:
             except Exception as e:
                 logger.debug(f"Redis clear_pattern failed for {pattern}: {e}")
 
-        keys_to_delete = [k for k in _cache_store if prefix in k]
+        keys_to_delete = [k for k in _cache_store.keys() if prefix in k]
         for k in keys_to_delete:
             _cache_store.pop(k, None)
         deleted += len(keys_to_delete)
@@ -5,9 +5,9 @@
 """
 
 import time
-from collections import defaultdict
 from typing import Tuple, Optional
 from app.core.logging import get_logger
+from app.core.bounded_cache import BoundedCache
 from app.core.redis_client import get_redis, is_redis_available
 from app.core.config import settings
 
@@ -29,7 +29,13 @@ class RedisRateLimiter:
     ):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self._memory_requests: dict = defaultdict(list)
+        # identifier -> timestamps ใน window ล่าสุด; หมดอายุเองเมื่อไม่มี request เกิน 1 window
+        self._memory_requests = BoundedCache(
+            f"rate_limiter:{max_requests}/{window_seconds}s",
+            max_entries=settings.rate_limit_max_identifiers,
+            default_ttl=window_seconds,
+            sizeof=lambda stamps: 8 * len(stamps) + 56,
+        )
 
     def _make_key(self, identifier: str) -> str:
         return f"ratelimit:{identifier}"
@@ -61,22 +67,24 @@ class RedisRateLimiter:
     def _is_allowed_memory(self, identifier: str) -> Tuple[bool, int]:
         current_time = time.time()
 
-        self._memory_requests[identifier] = [
+        recent = [
             req_time
-            for req_time in self._memory_requests[identifier]
+            for req_time in self._memory_requests.get(identifier) or []
             if current_time - req_time < self.window_seconds
         ]
 
-        request_count = len(self._memory_requests[identifier])
+        request_count = len(recent)
 
         if request_count >= self.max_requests:
+            self._memory_requests.set(identifier, recent)
             logger.warning(
                 f"Rate limit exceeded for {identifier}: {request_count}/{self.max_requests}"
             )
             return False, 0
 
-        self._memory_requests[identifier].append(current_time)
-        remaining = self.max_requests - len(self._memory_requests[identifier])
+        recent.append(current_time)
+        self._memory_requests.set(identifier, recent)
+        remaining = self.max_requests - len(recent)
         return True, remaining
 
     async def reset(self, identifier: Optional[str] = None) -> bool:
@@ -88,11 +96,9 @@ class RedisRateLimiter:
 
     async def get_remaining(self, identifier: str) -> int:
         current_time = time.time()
-        if identifier in self._memory_requests:
-            self._memory_requests[identifier] = [
-                req_time
-                for req_time in self._memory_requests[identifier]
-                if current_time - req_time < self.window_seconds
-            ]
-        count = len(self._memory_requests.get(identifier, []))
+        count = sum(
+            1
+            for req_time in self._memory_requests.get(identifier) or []
+            if current_time - req_time < self.window_seconds
+        )
         return max(0, self.max_requests - count)
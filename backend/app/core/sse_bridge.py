@@ -0,0 +1,194 @@
+"""
+SSE bridge: ส่ง event จาก agent (status_callback / token_callback) ไปยัง SSE generator แบบ event-driven
+
+เดิม chat_stream วน asyncio.wait_for(queue.get(), 0.1) → ตื่น 10 ครั้ง/วินาทีต่อ stream แม้ไม่มีอะไรส่ง
+และ event รอได้สูงสุด 100ms ก่อนถูกส่ง — bridge นี้รอ "อย่างใดอย่างหนึ่งที่มาก่อน":
+event ใหม่, agent task จบ, ถึงเวลา heartbeat หรือ deadline ของ turn (client disconnect: Starlette ยกเลิก generator
+ให้อยู่แล้ว + ตรวจ is_disconnected() ซ้ำตอน heartbeat)
+
+Backpressure (client อ่านช้า → buffer โต):
+- token ที่ยังไม่ถูกส่งรวมเป็น event เดียว (delta ต่อกัน, seq ล่าสุด)
+- buffer เต็ม → ตัด status ความคืบหน้าเก่าที่ถูก event ใหม่แทนที่แล้ว
+- ยังเต็ม → producer รอที่ว่างได้ไม่เกิน sse_slow_client_timeout แล้วค่อยต่อคิว (event สำคัญไม่หาย)
+"""
+
+from __future__ import annotations
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+HEARTBEAT_EVENT = {"status": "processing", "message": "กำลังประมวลผล...", "step": "heartbeat"}
+
+# event ที่ห้ามตัดทิ้งเมื่อ buffer เต็ม (frontend ใช้ประกอบคำตอบ / แสดง Trip Summary)
+_KEEP_STATUSES = frozenset({"token", "token_reset", "summary", "summary_ready", "completed", "error"})
+_KEEP_STEPS = frozenset({"agent_show_summary"})
+
+# ตัวนับรวมทุก stream ในโปรเซส (GET /api/monitoring/sse)
+_totals: Dict[str, int] = {
+    "streams": 0,
+    "active": 0,
+    "events_delivered": 0,
+    "tokens_coalesced": 0,
+    "progress_dropped": 0,
+    "producer_waits": 0,
+    "overflow": 0,
+    "heartbeats": 0,
+    "wakeups": 0,
+    "disconnects": 0,
+    "timeouts": 0,
+}
+
+
+def _droppable(event: Dict[str, Any]) -> bool:
+    return event.get("status") not in _KEEP_STATUSES and event.get("step") not in _KEEP_STEPS
+
+
+class SSEBridge:
+    """
+    Bounded, coalescing event buffer between one producer (agent callbacks) and one SSE consumer.
+
+    Producer: ``await bridge.publish(event)``. Consumer: ``async for event in bridge.stream(task, deadline=...)``;
+    after the loop ``end_reason`` is "completed", "timeout" or "disconnected".
+    """
+
+    def __init__(
+        self,
+        max_buffer: Optional[int] = None,
+        heartbeat_interval: Optional[float] = None,
+        slow_client_timeout: Optional[float] = None,
+    ):
+        self.max_buffer = max(2, max_buffer or settings.sse_max_buffered_events)
+        self.heartbeat_interval = heartbeat_interval or settings.sse_heartbeat_interval
+        self.slow_client_timeout = slow_client_timeout if slow_client_timeout is not None else settings.sse_slow_client_timeout
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self._space = asyncio.Event()
+        self._space.set()
+        self._closed = False
+        self.end_reason: Optional[str] = None
+        self.max_buffered = 0
+
+    # ---------- producer ----------
+
+    def _notify(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _drop_superseded(self) -> bool:
+        """ตัด status ความคืบหน้าที่เก่าที่สุด (ไม่ใช่ตัวท้าย — ตัวท้ายยังเป็นสถานะล่าสุดที่ผู้ใช้ควรเห็น)"""
+        for i in range(len(self._buffer) - 1):
+            if _droppable(self._buffer[i]):
+                del self._buffer[i]
+                _totals["progress_dropped"] += 1
+                return True
+        return False
+
+    async def publish(self, event: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        tail = self._buffer[-1] if self._buffer else None
+        if event.get("status") == "token" and tail is not None and tail.get("status") == "token":
+            tail["delta"] = f"{tail.get('delta', '')}{event.get('delta', '')}"
+            tail["seq"] = event.get("seq", tail.get("seq"))
+            _totals["tokens_coalesced"] += 1
+            return
+        if len(self._buffer) >= self.max_buffer:
+            self._drop_superseded()
+        if len(self._buffer) >= self.max_buffer:
+            _totals["producer_waits"] += 1
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), timeout=self.slow_client_timeout)
+            except asyncio.TimeoutError:
+                _totals["overflow"] += 1
+                logger.warning(
+                    f"SSEBridge: client not reading for {self.slow_client_timeout}s, "
+                    f"buffer over limit ({len(self._buffer)} events)"
+                )
+            if self._closed:
+                return
+        self._buffer.append(dict(event))
+        self.max_buffered = max(self.max_buffered, len(self._buffer))
+        self._notify()
+
+    def close(self) -> None:
+        """หยุดรับ event และปล่อย producer ที่รอที่ว่างอยู่"""
+        self._closed = True
+        self._space.set()
+        self._notify()
+
+    # ---------- consumer ----------
+
+    async def stream(
+        self,
+        task: "asyncio.Future[Any]",
+        deadline: float,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield buffered events (and heartbeats after ``heartbeat_interval`` of silence) until the task is done
+        and the buffer is drained, the loop-time ``deadline`` passes, or the client disconnects.
+        """
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time() + self.heartbeat_interval
+        _totals["streams"] += 1
+        _totals["active"] += 1
+        try:
+            while True:
+                if self._buffer:
+                    event = self._buffer.popleft()
+                    if len(self._buffer) < self.max_buffer:
+                        self._space.set()
+                    _totals["events_delivered"] += 1
+                    yield event
+                    next_heartbeat = loop.time() + self.heartbeat_interval
+                    continue
+                if task.done():
+                    self.end_reason = "completed"
+                    return
+                now = loop.time()
+                if now >= deadline:
+                    self.end_reason = "timeout"
+                    _totals["timeouts"] += 1
+                    return
+                if now >= next_heartbeat:
+                    if is_disconnected is not None:
+                        try:
+                            if await is_disconnected():
+                                self.end_reason = "disconnected"
+                                _totals["disconnects"] += 1
+                                return
+                        except Exception as e:
+                            logger.debug(f"SSEBridge: disconnect check failed: {e}")
+                    _totals["heartbeats"] += 1
+                    yield dict(HEARTBEAT_EVENT)
+                    next_heartbeat = loop.time() + self.heartbeat_interval
+                    continue
+                waiter = loop.create_future()
+                self._waiter = waiter
+                try:
+                    await asyncio.wait(
+                        (waiter, task),
+                        timeout=min(next_heartbeat, deadline) - now,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                finally:
+                    self._waiter = None
+                    if not waiter.done():
+                        waiter.cancel()
+                _totals["wakeups"] += 1
+        finally:
+            _totals["active"] -= 1
+            self.close()
+
+
+def get_sse_bridge_stats() -> Dict[str, Any]:
+    stats = dict(_totals)
+    stats["wakeups_per_event"] = round(stats["wakeups"] / max(1, stats["events_delivered"] + stats["heartbeats"]), 2)
+    return stats
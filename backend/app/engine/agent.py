@@ -1,7 +1,8 @@
 """เอเจนต์ท่องเที่ยวหลัก: คุยกับผู้ใช้, วางแผน, ค้นหา, เลือกตัวเลือก และประสาน MCP/LLM."""
 
 from __future__ import annotations
-from typing import Any, Dict, Optional, Callable, Awaitable, List, Tuple
+from typing import Any, AsyncIterator, Dict, Optional, Callable, Awaitable, List, Tuple, TYPE_CHECKING
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 import json
 import asyncio
@@ -12,6 +13,7 @@ from app.models import UserSession, TripPlan, Segment, ControllerAction, ActionL
 from app.models.trip_plan import SegmentStatus, TravelMode
 from app.storage.interface import StorageInterface
 from app.services.llm import LLMService, get_production_llm, BrainType, ModelType
+from app.services.llm_cache import LLMCachePolicy
 from app.services.memory import MemoryService
 from app.services.travel_service import TravelOrchestrator, TravelSearchRequest
 from app.services.data_aggregator import aggregator, StandardizedItem, ItemCategory
@@ -21,6 +23,8 @@ from app.core.config import settings
 from app.services.agent_monitor import agent_monitor
 from app.engine.cost_tracker import cost_tracker, CostTracker
 from app.services.options_cache import get_options_cache
+from app.services.offer_blob_store import get_offer_blob_store
+from app.services.search_cache import get_search_cache
 from app.services.workflow_state import get_workflow_state_service, WorkflowStep as WfStep
 from app.services.mcp_server import MCPToolExecutor
 from app.services.model_selector import ModelSelector
@@ -30,6 +34,20 @@ from app.engine.reinforcement_learning import (
     apply_personalized_recommendation_to_options,
 )
 from app.services.ml_keyword_service import get_ml_keyword_service
+from app.engine.turn_context import prefetch_turn_context
+from app.engine.controller_view import controller_state_json
+from app.engine.fast_planner import FastPathTurn, get_fast_planner
+from app.engine.search_prefetch import (
+    SearchPrefetchRegistry,
+    activate_prefetch,
+    current_prefetch,
+    deactivate_prefetch,
+    flight_search_params,
+    get_prefetch_stats,
+    hotel_search_params,
+    predict_search_requests,
+)
+from app.engine.ranking_engine import personalized_final_scores, round4
 from app.engine.gemini_agent import (
     CONTROLLER_SYSTEM_PROMPT,
     get_responder_system_prompt,
@@ -37,10 +55,18 @@ from app.engine.gemini_agent import (
 )
 # Agent Intelligence classes will be defined at the end of this file
 
+if TYPE_CHECKING:
+    from app.engine.service_container import AgentServices
+
 logger = get_logger(__name__)
 
 from app.core.constants import FALLBACK_RESPONSE_EMPTY  # noqa: E402
 
+# Callback รับ token ของ Responder ระหว่าง stream: (delta, reset) — reset=True แปลว่าให้ทิ้งข้อความที่ส่งไปแล้ว
+# ตั้งค่าใน run_turn ต่อ turn (ContextVar ผูกกับ task) เพื่อไม่ต้องส่งผ่าน LangGraph workflow ทุกชั้น
+ResponderTokenCallback = Callable[[str, bool], Awaitable[None]]
+_responder_token_callback: ContextVar[Optional[ResponderTokenCallback]] = ContextVar("responder_token_callback", default=None)
+
 # ✅ Helper function to safely write debug logs
 def _write_debug_log(data: dict):
     """Safely write debug log, creating directory if needed"""
@@ -55,42 +81,6 @@ def _write_debug_log(data: dict):
     except Exception:
         pass  # Silently ignore debug log errors
 
-def _strip_options_pool_for_controller(state: dict) -> dict:
-    """Remove raw options_pool data from trip plan state before sending to Controller LLM.
-
-    options_pool can contain full Amadeus API responses (50-200 KB each).
-    The Controller only needs to know *whether* options exist and how many,
-    not the full content.  This keeps the context window small and fast.
-    """
-    def _strip_segment(seg: dict) -> dict:
-        pool = seg.get("options_pool")
-        if pool:
-            seg = dict(seg)
-            seg["options_pool"] = f"[{len(pool)} options available]"
-        return seg
-
-    def _strip_list(segments: list) -> list:
-        return [_strip_segment(s) if isinstance(s, dict) else s for s in segments]
-
-    import copy
-    s = copy.deepcopy(state)
-    try:
-        travel = s.get("travel", {})
-        flights = travel.get("flights", {})
-        if isinstance(flights.get("outbound"), list):
-            flights["outbound"] = _strip_list(flights["outbound"])
-        if isinstance(flights.get("inbound"), list):
-            flights["inbound"] = _strip_list(flights["inbound"])
-        if isinstance(travel.get("ground_transport"), list):
-            travel["ground_transport"] = _strip_list(travel["ground_transport"])
-        acc = s.get("accommodation", {})
-        if isinstance(acc.get("segments"), list):
-            acc["segments"] = _strip_list(acc["segments"])
-    except Exception:
-        pass  # Never break the main flow for a logging helper
-    return s
-
-
 def _build_resume_context(session) -> str:
     """
     State Resumer: Build a formatted context string summarising the pending booking state.
@@ -154,6 +144,22 @@ def _build_resume_context(session) -> str:
         return f"=== RESUME BOOKING CONTEXT ===\nUser returning mid-booking (state={getattr(session, 'booking_funnel_state', 'unknown')})\n"
 
 
+def _agent_can_plan_from_zero(memory_context: str, user_profile_context: str, travel_prefs: Any) -> bool:
+    """Agent Mode วางแผนตั้งแต่ 0 ได้เฉพาะเมื่อรู้จัก user พอ (memory/profile/preferences) — ใช้ทั้ง controller prompt และ fast path"""
+    return bool(
+        (memory_context and len(memory_context.strip()) > 50)
+        or (user_profile_context and len(user_profile_context.strip()) > 30)
+        or (travel_prefs and len(str(travel_prefs)) > 10)
+    )
+
+
+def _activities_reply_has_list(data: Any) -> bool:
+    """แคชเฉพาะคำตอบที่เป็น list กิจกรรม (หรือ dict ที่มี activities เป็น list ไม่ว่าง) — object เดี่ยวไม่แคช"""
+    if isinstance(data, dict):
+        data = data.get("activities")
+    return isinstance(data, list) and bool(data)
+
+
 def _build_curated_comparison_context(session, travel_prefs: dict) -> str:
     """
     Curated Comparison: deterministically rank options_pool into
@@ -281,6 +287,7 @@ class TravelAgent:
         detail_level: str = "medium",
         chat_language: str = "th",
         reinforcement_learning: bool = True,
+        services: Optional[AgentServices] = None,
     ):
         """
         Initialize Travel Agent
@@ -293,9 +300,11 @@ class TravelAgent:
             detail_level: Recommendation detail level (low, medium, high)
             chat_language: Conversation language (th, en, auto)
             reinforcement_learning: Whether to enable RL learning from user feedback
+            services: Optional process-wide AgentServices (see app.engine.service_container);
+                when given, its LLMs, memory, orchestrator and MCP executor are reused instead of rebuilt
         """
         self.storage = storage
-        self.llm = llm_service or LLMService()
+        self.llm = llm_service or (services.llm if services is not None else LLMService())
         self.agent_personality = agent_personality or "friendly"
         self.response_style = response_style or "balanced"
         self.detail_level = detail_level or "medium"
@@ -308,6 +317,20 @@ class TravelAgent:
             detail_level=self.detail_level,
             chat_language=self.chat_language,
         )
+        self.cost_tracker = cost_tracker
+        from app.engine.workflow_manager import get_slot_manager
+        self.slot_manager = get_slot_manager()
+        # Per-turn memo: user_id -> in-flight/finished users.find_one (see _get_user_doc)
+        self._user_doc_tasks: Dict[str, asyncio.Future] = {}
+        if services is not None:
+            # ✅ Warm path: reuse process-wide collaborators (no new clients / LLM objects per turn)
+            self.intent_llm = services.intent_llm
+            self.production_llm = services.production_llm
+            self.memory = services.memory if llm_service is None else MemoryService(self.llm)
+            self.orchestrator = services.orchestrator
+            self.mcp_executor = services.mcp_executor
+            self.db = services.db
+            return
         # ✅ Intent-Based LLM Service with tool calling (Gemini)
         try:
             from app.services.llm import IntentBasedLLM
@@ -325,9 +348,6 @@ class TravelAgent:
             self.production_llm = None
         self.memory = MemoryService(self.llm)
         self.orchestrator = TravelOrchestrator()
-        self.cost_tracker = cost_tracker
-        from app.engine.workflow_manager import get_slot_manager
-        self.slot_manager = get_slot_manager()
         # ✅ Initialize MCP Tool Executor for Amadeus
         try:
             self.mcp_executor = MCPToolExecutor()
@@ -352,6 +372,7 @@ class TravelAgent:
         status_callback: Optional[Callable[[str, str, str], Awaitable[None]]] = None,
         mode: str = "normal",  # ✅ 'normal' = ผู้ใช้เลือกช้อยส์เอง, 'agent' = AI ดำเนินการเอง
         travel_preferences: Optional[Dict[str, Any]] = None,  # Broker preferences from user profile
+        token_callback: Optional[ResponderTokenCallback] = None,
     ) -> str:
         """
         Run one turn of conversation (main entry point)
@@ -362,6 +383,7 @@ class TravelAgent:
             user_input: User's message
             status_callback: Optional async callback for status updates (status, message, step)
             mode: Chat mode - 'normal' (user selects) or 'agent' (AI auto-selects and books)
+            token_callback: Optional async callback receiving Responder text chunks as they stream
             
         Returns:
             Response message in Thai (ALWAYS returns, never raises)
@@ -369,6 +391,8 @@ class TravelAgent:
         # ✅ GLOBAL TRY-EXCEPT: Catch ALL errors and return fallback response
         last_known_data = None
         session = None
+        _token_cb_reset = _responder_token_callback.set(token_callback)
+        _prefetch_token = None
         try:
             # Load session
             session = await self.storage.get_session(session_id)
@@ -395,25 +419,26 @@ class TravelAgent:
             if _funnel not in ("idle", "completed") and mode == "normal":
                 _resume_context = _build_resume_context(session)
 
-            # Phase 0: Recall (Brain Memory) + Sliding Window + User Profile
+            # ML intent ถอดครั้งเดียวต่อเทิร์น — ใช้ทั้ง speculative prefetch และ controller
+            ml_intent_hint = None
+            try:
+                ml_intent_hint = get_ml_keyword_service().decode_keywords(user_input)
+            except Exception as e:
+                logger.debug(f"ML keyword decode failed: {e}")
+
+            # ⚡ Speculative search: intent ชัด + slot ครบ → เริ่มค้นหา Amadeus ขนานกับ Controller LLM
+            _prefetch_token = activate_prefetch(self._start_search_prefetch(session, user_input, ml_intent_hint))
+
+            # Phase 0: Recall (Brain Memory) + Sliding Window + User Profile + Workflow state
+            # ✅ อ่านทุกแหล่งพร้อมกัน (timeout แยกต่อแหล่ง) แทนการรอทีละ round trip
             if status_callback:
                 await status_callback("thinking", "🤖 Agent กำลังระลึกความจำ...", "recall_start")
             
-            user_memories = await self.memory.recall(session.user_id)
-            memory_context = self.memory.format_memories_for_prompt(user_memories)
-            
-            # Sliding Window: build token-aware conversation context
-            conversation_context = ""
-            try:
-                conversation_context = await self.memory.build_conversation_context(
-                    session_id=session_id,
-                    current_input=user_input,
-                )
-            except Exception as ctx_err:
-                logger.warning(f"Failed to build conversation context: {ctx_err}")
-            
-            # Get user profile for personalized context
-            user_profile_context = await self._get_user_profile_context(user_id)
+            self.reset_turn_cache()
+            turn_context = await prefetch_turn_context(self, session, user_input)
+            memory_context = turn_context.memory_context
+            conversation_context = turn_context.conversation_context
+            user_profile_context = turn_context.user_profile_context
             
             # Phase 1 & 2: Controller Loop + Responder (Think & Act & Speak)
             if status_callback:
@@ -435,10 +460,15 @@ class TravelAgent:
                         memory_context=memory_context,
                         user_profile_context=user_profile_context,
                         conversation_context=conversation_context,
+                        workflow_state=turn_context.workflow_state,
+                        ml_intent_hint=ml_intent_hint,
                     )
                 except Exception as lgf_err:
                     logger.warning(f"LangGraph full workflow failed, falling back to agent loop: {lgf_err}")
-                    action_log = await self.run_controller(session, user_input, status_callback, memory_context, user_profile_context, mode=mode, conversation_context=conversation_context)
+                    if token_callback is not None:
+                        await token_callback("", True)  # ทิ้ง token ที่ graph อาจ stream ไปแล้ว
+                    # graph อาจเปลี่ยน workflow state ไปแล้ว → ให้ run_controller อ่านใหม่
+                    action_log = await self.run_controller(session, user_input, status_callback, memory_context, user_profile_context, mode=mode, conversation_context=conversation_context, resume_context=_resume_context, ml_intent_hint=ml_intent_hint)
                     await self.storage.save_session(session)
                     if status_callback:
                         await status_callback("speaking", "🤖 Agent กำลังสรุปคำตอบ...", "responder_start")
@@ -469,7 +499,7 @@ class TravelAgent:
                             await self._run_agent_mode_auto_complete(session, action_log, status_callback)
                             await self.storage.save_session(session)
             else:
-                action_log = await self.run_controller(session, user_input, status_callback, memory_context, user_profile_context, mode=mode, conversation_context=conversation_context)
+                action_log = await self.run_controller(session, user_input, status_callback, memory_context, user_profile_context, mode=mode, conversation_context=conversation_context, workflow_state=turn_context.workflow_state, resume_context=_resume_context, ml_intent_hint=ml_intent_hint)
                 # Save state after Phase 1
                 await self.storage.save_session(session)
                 # Phase 2: Responder (Speak)
@@ -566,27 +596,45 @@ class TravelAgent:
                     logger.error(f"Failed to save session in error handler: {save_error}")
             
             return fallback_message
+        finally:
+            if _prefetch_token is not None:
+                deactivate_prefetch(_prefetch_token)
+            _responder_token_callback.reset(_token_cb_reset)
     
-    async def _get_user_profile_context(self, user_id: str) -> str:
+    async def _get_user_doc(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
-        Get user profile context for personalized service
+        Fetch the user document once per turn.
+
+        Memoized as a shared task so concurrent callers (prefetch, profile context,
+        main-booker DOB) issue a single users.find_one. reset_turn_cache() clears it.
+        """
+        if self.db is None or not user_id or user_id == "anonymous":
+            return None
+        cache = self._user_doc_tasks
+        task = cache.get(user_id)
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            task = asyncio.ensure_future(self.db["users"].find_one({"user_id": user_id}))
+            cache[user_id] = task
+        return await asyncio.shield(task)
+
+    def reset_turn_cache(self) -> None:
+        """Drop per-turn memoized reads (user document) so the next turn sees fresh data."""
+        self._user_doc_tasks = {}
+
+    def _format_user_profile_context(self, user_doc: Optional[Dict[str, Any]], selection_summary: str = "") -> str:
+        """
+        Format the USER PROFILE block for the controller prompt (pure — no I/O).
         
         Args:
-            user_id: User identifier
+            user_doc: users collection document (None → empty context)
+            selection_summary: Choice History + RL summary text
             
         Returns:
             Formatted user profile context string
         """
-        if self.db is None or not user_id or user_id == "anonymous":
+        if not user_doc:
             return ""
-        
         try:
-            users_collection = self.db["users"]
-            user_doc = await users_collection.find_one({"user_id": user_id})
-            
-            if not user_doc:
-                return ""
-            
             # Extract user information
             name = user_doc.get("full_name") or user_doc.get("name") or user_doc.get("first_name") or ""
             first_name_th = user_doc.get("first_name_th") or ""
@@ -641,13 +689,8 @@ class TravelAgent:
                 if tp_parts:
                     context_parts.append(f"✈️ ความชอบการเดินทาง: {' | '.join(tp_parts)}")
             # 🎯 ความชอบจากการเลือก (Choice History + RL) — ใช้ร่วมกับ RL/ML
-            try:
-                from app.services.selection_preferences import get_selection_preferences_summary
-                selection_summary = await get_selection_preferences_summary(user_id)
-                if selection_summary:
-                    context_parts.append(f"🎯 ความชอบจากการเลือก (RL+ประวัติการเลือก):\n{selection_summary}")
-            except Exception as _e:
-                logger.debug(f"Selection preferences summary (non-critical): {_e}")
+            if selection_summary:
+                context_parts.append(f"🎯 ความชอบจากการเลือก (RL+ประวัติการเลือก):\n{selection_summary}")
             
             # 🛂 Visa section (for flight/transfer search and planning - filter/plan by visa)
             visa_type = user_doc.get("visa_type") or ""
@@ -672,6 +715,35 @@ class TravelAgent:
                 return "\n".join(["=== USER PROFILE ==="] + context_parts)
             
             return ""
+        except Exception as e:
+            logger.warning(f"Failed to format user profile context: {e}")
+            return ""
+
+    async def _get_user_profile_context(self, user_id: str) -> str:
+        """
+        Get user profile context for personalized service
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            Formatted user profile context string
+        """
+        if self.db is None or not user_id or user_id == "anonymous":
+            return ""
+        
+        async def _selection_summary() -> str:
+            try:
+                from app.services.selection_preferences import get_selection_preferences_summary
+                return await get_selection_preferences_summary(user_id) or ""
+            except Exception as _e:
+                logger.debug(f"Selection preferences summary (non-critical): {_e}")
+                return ""
+        
+        try:
+            # user doc และ selection summary ไม่ขึ้นต่อกัน → ดึงพร้อมกัน
+            user_doc, selection_summary = await asyncio.gather(self._get_user_doc(user_id), _selection_summary())
+            return self._format_user_profile_context(user_doc, selection_summary)
         except Exception as e:
             logger.warning(f"Failed to get user profile context for {user_id}: {e}")
             return ""
@@ -681,8 +753,7 @@ class TravelAgent:
         if self.db is None or not user_id or user_id == "anonymous":
             return None
         try:
-            users_collection = self.db["users"]
-            user_doc = await users_collection.find_one({"user_id": user_id})
+            user_doc = await self._get_user_doc(user_id)
             if not user_doc:
                 return None
             return user_doc.get("dob") or user_doc.get("date_of_birth") or None
@@ -699,6 +770,9 @@ class TravelAgent:
         user_profile_context: str = "",
         mode: str = "normal",
         conversation_context: str = "",
+        workflow_state: Optional[Dict[str, Any]] = None,
+        resume_context: str = "",
+        ml_intent_hint: Optional[Dict[str, Any]] = None,
     ) -> ActionLog:
         """
         Phase 1: Controller Loop
@@ -712,6 +786,10 @@ class TravelAgent:
             status_callback: Optional async callback for status updates
             memory_context: Background information about user preferences
             mode: Chat mode - 'normal' (user selects) or 'agent' (AI auto-selects and books)
+            workflow_state: Prefetched workflow state (TurnContext) used for the first iteration;
+                later iterations re-read it because executed actions may have changed it
+            resume_context: State-resumer hint for users returning mid-booking
+            ml_intent_hint: decode_keywords result already computed by run_turn (None → decode here)
             
         Returns:
             ActionLog with all actions taken
@@ -735,11 +813,11 @@ class TravelAgent:
         )
         
         # ✅ ML KEYWORD DECODE: ถอดรหัส intent จากข้อความผู้ใช้แบบรวดเร็ว (~90% แม่นยำ) สำหรับวางแผนใน 1 นาที
-        ml_intent_hint = None
         ml_validation_result = None
         try:
             ml_svc = get_ml_keyword_service()
-            ml_intent_hint = ml_svc.decode_keywords(user_input)
+            if ml_intent_hint is None:
+                ml_intent_hint = ml_svc.decode_keywords(user_input)
             if ml_intent_hint and ml_intent_hint.get("confidence", 0) >= 0.5:
                 model_used = ml_intent_hint.get("model", "ml")
                 logger.info(
@@ -765,6 +843,7 @@ class TravelAgent:
         except Exception as ml_err:
             logger.debug("ML keyword/validation skipped: %s", ml_err)
 
+        fast_turn = FastPathTurn()
         for iteration in range(max_iterations):
             logger.info(f"Controller Loop iteration {iteration + 1}/{max_iterations}", 
                        extra={"session_id": session.session_id, "user_id": session.user_id})
@@ -773,35 +852,44 @@ class TravelAgent:
                 await status_callback("thinking", f"🤖 Agent กำลังวิเคราะห์และวางแผนทริป...", f"controller_iter_{iteration + 1}")
             
             try:
-                # Get current state as JSON — strip options_pool to avoid huge context windows
-                _raw_state = session.trip_plan.model_dump()
-                _raw_state = _strip_options_pool_for_controller(_raw_state)
-                state_json = json.dumps(_raw_state, ensure_ascii=False, indent=2)
-                # ✅ Workflow state สำหรับให้ Controller ตรวจและ validate
-                workflow_state = None
-                try:
-                    wf = get_workflow_state_service()
-                    workflow_state = await wf.get_workflow_state(session.session_id)
-                except Exception as wf_err:
-                    logger.debug(f"Workflow state fetch: {wf_err}")
+                # Get current state as compact JSON — options_pool summarised, unchanged segments served from cache
+                state_json = controller_state_json(session.trip_plan)
+                # ✅ Workflow state สำหรับให้ Controller ตรวจและ validate (รอบแรกใช้ค่าที่ prefetch มาแล้ว)
+                if iteration > 0 or workflow_state is None:
+                    try:
+                        wf = get_workflow_state_service()
+                        workflow_state = await wf.get_workflow_state(session.session_id)
+                    except Exception as wf_err:
+                        workflow_state = None
+                        logger.debug(f"Workflow state fetch: {wf_err}")
+                # ⚡ Fast path: intent/slot ชัดเจน → ได้ action จากกฎโดยไม่ต้องเรียก Controller LLM
+                action = self._fast_path_action(
+                    session, user_input, ml_intent_hint, fast_turn,
+                    mode=mode, iteration=iteration, max_iterations=max_iterations,
+                    ml_validation_result=ml_validation_result,
+                    memory_context=memory_context,
+                    user_profile_context=user_profile_context,
+                    travel_preferences=getattr(session, "travel_preferences", {}) or {},
+                )
                 # Call Controller LLM (with ML intent hint for faster & accurate planning)
                 try:
-                    action = await self._call_controller_llm(
-                        state_json,
-                        user_input,
-                        action_log,
-                        memory_context,
-                        user_profile_context,
-                        mode=mode,
-                        session_id=session.session_id,
-                        user_id=session.user_id,
-                        workflow_validation=workflow_state,
-                        ml_intent_hint=ml_intent_hint,
-                        ml_validation_result=ml_validation_result,
-                        conversation_context=conversation_context,
-                        travel_preferences=getattr(session, "travel_preferences", {}) or {},
-                        resume_context=_resume_context,
-                    )
+                    if action is None:
+                        action = await self._call_controller_llm(
+                            state_json,
+                            user_input,
+                            action_log,
+                            memory_context,
+                            user_profile_context,
+                            mode=mode,
+                            session_id=session.session_id,
+                            user_id=session.user_id,
+                            workflow_validation=workflow_state,
+                            ml_intent_hint=ml_intent_hint,
+                            ml_validation_result=ml_validation_result,
+                            conversation_context=conversation_context,
+                            travel_preferences=getattr(session, "travel_preferences", {}) or {},
+                            resume_context=resume_context,
+                        )
                 except Exception as e:
                     logger.error(f"Failed to call controller LLM: {e}", exc_info=True)
                     action = None
@@ -1219,6 +1307,62 @@ class TravelAgent:
         
         return action_log
 
+    def _fast_path_action(
+        self,
+        session: UserSession,
+        user_input: str,
+        ml_intent_hint: Optional[Dict[str, Any]],
+        turn: FastPathTurn,
+        *,
+        mode: str,
+        iteration: int,
+        max_iterations: int,
+        ml_validation_result: Optional[Dict[str, Any]] = None,
+        memory_context: str = "",
+        user_profile_context: str = "",
+        travel_preferences: Optional[Dict[str, Any]] = None,
+    ) -> Optional[ControllerAction]:
+        """
+        Rule-based controller decision for high-confidence turns (None → call the controller LLM).
+        Shared by run_controller and the LangGraph full-workflow controller node.
+        memory_context / user_profile_context / travel_preferences: the same context the controller LLM gets —
+        Agent Mode CREATE_ITINERARY from an empty plan needs it (see _agent_can_plan_from_zero).
+        """
+        if not settings.fast_planner_enabled:
+            return None
+        try:
+            fast = get_fast_planner().plan(
+                session.trip_plan,
+                user_input,
+                ml_intent_hint,
+                turn=turn,
+                mode=mode,
+                iteration=iteration,
+                max_iterations=max_iterations,
+                ml_validation_result=ml_validation_result,
+                # Agent Mode: สร้างแผนจาก 0 ได้เฉพาะเมื่อรู้จัก user — ไม่งั้นให้ Controller LLM ตัดสิน (จะ ASK_USER ตาม prompt)
+                can_plan_from_zero=(
+                    mode != "agent"
+                    or _agent_can_plan_from_zero(memory_context, user_profile_context, travel_preferences)
+                ),
+            )
+        except Exception as e:
+            logger.warning(f"Fast-path planner failed, using controller LLM: {e}")
+            return None
+        if fast is None:
+            return None
+        logger.info(
+            f"[CONTROLLER] Fast path iteration {iteration + 1}: rule={fast.rule} confidence={fast.confidence} "
+            f"action={fast.action.action.value} (controller LLM skipped)",
+            extra={"session_id": session.session_id, "user_id": session.user_id},
+        )
+        agent_monitor.log_activity(
+            session.session_id, session.user_id, "fast_path",
+            f"Iteration {iteration + 1}: {fast.rule} ({fast.confidence})",
+            {"action": fast.action.action.value, "payload": fast.action.payload},
+        )
+        return fast.action
+
     async def execute_controller_action(
         self,
         session: UserSession,
@@ -1454,11 +1598,7 @@ class TravelAgent:
                 pass
             # ✅ วางแผนตั้งแต่ 0 ใน Agent: ได้เฉพาะเมื่อ AI รู้จัก user (memory/profile/preferences) พอ
             travel_prefs = kwargs.get("travel_preferences") or {}
-            agent_can_plan_from_zero = (
-                (memory_context and len(memory_context.strip()) > 50)
-                or (user_profile_context and len(user_profile_context.strip()) > 30)
-                or (travel_prefs and len(str(travel_prefs)) > 10)
-            )
+            agent_can_plan_from_zero = _agent_can_plan_from_zero(memory_context, user_profile_context, travel_prefs)
             _empty_hint = ""
             if _plan_empty:
                 if mode == "agent":
@@ -2991,10 +3131,12 @@ Cherry blossom Japan → start_date late March, end_date early April, suggested_
 """
         system = "You are a travel expert. Output valid JSON only with keys: start_date, end_date, suggested_destination, description. Use YYYY-MM-DD for dates."
         try:
+            # ฤดู/เทศกาลเดียวกันในปีเดียวกันได้คำตอบเดิม → แคช (เก็บเฉพาะ JSON ที่มีวันที่)
+            cache = LLMCachePolicy(schema="season_event:v1", validate=lambda d: bool(d.get("start_date")))
             if self.production_llm:
-                result = await self.production_llm.intelligence_generate(prompt=prompt, system_prompt=system)
+                result = await self.production_llm.intelligence_generate(prompt=prompt, system_prompt=system, cache=cache)
             else:
-                result = await self.llm.generate_json(prompt=prompt, system_prompt=system, temperature=0.2, context="season_event_resolve")
+                result = await self.llm.generate_json(prompt=prompt, system_prompt=system, temperature=0.2, context="season_event_resolve", cache=cache)
             if not result or not isinstance(result, dict):
                 return {}
             out = {}
@@ -3074,14 +3216,16 @@ Output: JSON array only, no markdown. Example:
 """
         system = "You are a travel expert. Output a valid JSON array of activities. Each object has keys: name, description, category. Use Thai for description when possible."
         try:
+            cache = LLMCachePolicy(schema="activities:v1", validate=_activities_reply_has_list)
             if self.production_llm:
-                result = await self.production_llm.intelligence_generate(prompt=prompt, system_prompt=system)
+                result = await self.production_llm.intelligence_generate(prompt=prompt, system_prompt=system, cache=cache)
             else:
                 result = await self.llm.generate_json(
                     prompt=prompt,
                     system_prompt=system,
                     temperature=0.3,
                     context="activities_resolve",
+                    cache=cache,
                 )
             if not result:
                 return []
@@ -3175,6 +3319,66 @@ Output: JSON array only, no markdown. Example:
         
         return cache_key
     
+    async def _shared_mcp_search(
+        self, tool_name: str, product: str, params: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        เรียก MCP search ผ่าน shared search cache (ข้ามเซสชัน + single-flight).
+        คืน (mcp_result, shared_key); shared_key เป็น None เมื่อผลลัพธ์ไม่ได้ถูกแคช (ไม่พบ/ผิดพลาด)
+        """
+        result_field = "flights" if tool_name == "search_flights" else "hotels"
+        search_cache = get_search_cache()
+        result, key = await search_cache.get_or_fetch(
+            product,
+            params,
+            lambda: self.mcp_executor.execute_tool(tool_name, params),
+            source=f"mcp_{tool_name}",
+            cacheable=lambda r: isinstance(r, dict) and bool(r.get("success")) and bool(r.get(result_field)),
+        )
+        cached = isinstance(result, dict) and bool(result.get("success")) and bool(result.get(result_field))
+        return result, (key if cached else None)
+
+    def _start_search_prefetch(
+        self, session: UserSession, user_input: str, ml_intent_hint: Optional[Dict[str, Any]]
+    ) -> Optional[SearchPrefetchRegistry]:
+        """
+        Start the searches this turn will most likely CALL_SEARCH, before the controller decides.
+        ml_intent_hint: the turn's decode_keywords result (shared with the controller).
+        Returns the per-turn registry (None when disabled / nothing predictable).
+        """
+        if not settings.search_prefetch_enabled or not self.mcp_executor:
+            return None
+        try:
+            requests = predict_search_requests(session.trip_plan, user_input, ml_intent_hint, self._create_cache_key)
+        except Exception as e:
+            logger.debug(f"Search prefetch prediction skipped: {e}")
+            return None
+        get_prefetch_stats().bump("turns")
+        if not requests:
+            return None
+        registry = SearchPrefetchRegistry(session.session_id)
+        for request in requests:
+            registry.start(request, lambda r=request: self._shared_mcp_search(r.tool, r.product, r.params))
+        return registry
+
+    async def _search_with_prefetch(
+        self,
+        slot_name: str,
+        segment_index: int,
+        req: Dict[str, Any],
+        tool_name: str,
+        product: str,
+        params: Dict[str, Any],
+        timeout: float,
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """_shared_mcp_search, joining this turn's speculative search when its key and params match."""
+        registry = current_prefetch()
+        if registry is not None:
+            joined = await registry.join(slot_name, segment_index, self._create_cache_key(req, slot_name), params, timeout)
+            if joined is not None:
+                return joined
+        return await asyncio.wait_for(self._shared_mcp_search(tool_name, product, params), timeout=timeout)
+
     async def _execute_call_search(
         self,
         session: UserSession,
@@ -3269,10 +3473,11 @@ Output: JSON array only, no markdown. Example:
                     for opt_dict in segment.options_pool:
                         try:
                             # Reconstruct StandardizedItem from dict
-                            # Handle category enum conversion
-                            if isinstance(opt_dict.get("category"), str):
-                                opt_dict["category"] = ItemCategory(opt_dict["category"])
-                            item = StandardizedItem(**opt_dict)
+                            # Handle category enum conversion (บนสำเนา — ไม่แก้ dict ใน options_pool ในที่)
+                            item_fields = dict(opt_dict)
+                            if isinstance(item_fields.get("category"), str):
+                                item_fields["category"] = ItemCategory(item_fields["category"])
+                            item = StandardizedItem(**item_fields)
                             cached_items.append(item)
                         except Exception as e:
                             logger.warning(f"Failed to reconstruct StandardizedItem from cache: {e}, opt_dict keys: {list(opt_dict.keys()) if isinstance(opt_dict, dict) else 'not dict'}")
@@ -3335,6 +3540,7 @@ Output: JSON array only, no markdown. Example:
                     # ✅ STEP 4: Use Amadeus MCP Tools based on route planning
                     # Try MCP tools first, fallback to DataAggregator if needed
                     mcp_results = None
+                    shared_search_key: Optional[str] = None
                     
                     if self.mcp_executor:
                         try:
@@ -3353,28 +3559,9 @@ Output: JSON array only, no markdown. Example:
                                         if return_date:
                                             logger.info(f"✅ Passing return_date={return_date} for round-trip (align with Flight search)")
                                             req["return_date"] = return_date
-                                search_params = {
-                                    "origin": req.get("origin"),
-                                    "destination": req.get("destination"),
-                                    "departure_date": req.get("departure_date") or req.get("date"),
-                                    "adults": req.get("adults") or req.get("guests", 1),
-                                    "children": req.get("children", 0),
-                                    "infants": req.get("infants", 0),
-                                    "return_date": return_date,
-                                    "non_stop": non_stop,
-                                }
-                                if req.get("preferred_departure_time"):
-                                    search_params["preferred_departure_time"] = req["preferred_departure_time"]
-                                if req.get("min_price"):
-                                    search_params["min_price"] = req["min_price"]
-                                if req.get("max_price"):
-                                    search_params["max_price"] = req["max_price"]
-                                mcp_result = await asyncio.wait_for(
-                                    self.mcp_executor.execute_tool(
-                                        "search_flights",
-                                        search_params
-                                    ),
-                                    timeout=20.0,
+                                search_params = flight_search_params(req, return_date, non_stop)
+                                mcp_result, shared_search_key = await self._search_with_prefetch(
+                                    slot_name, segment_index, req, "search_flights", "flight", search_params, timeout=20.0,
                                 )
                                 
                                 if mcp_result.get("success") and mcp_result.get("flights"):
@@ -3399,11 +3586,8 @@ Output: JSON array only, no markdown. Example:
                                         retry_params["min_price"] = req["min_price"]
                                     if req.get("max_price"):
                                         retry_params["max_price"] = req["max_price"]
-                                    mcp_result2 = await asyncio.wait_for(
-                                        self.mcp_executor.execute_tool(
-                                            "search_flights",
-                                            retry_params
-                                        ),
+                                    mcp_result2, shared_search_key = await asyncio.wait_for(
+                                        self._shared_mcp_search("search_flights", "flight", retry_params),
                                         timeout=25.0,
                                     )
                                     if mcp_result2.get("success") and mcp_result2.get("flights"):
@@ -3413,18 +3597,8 @@ Output: JSON array only, no markdown. Example:
                             elif "accommodation" in slot_name or "hotel" in slot_name:
                                 # Use Amadeus MCP search_hotels
                                 logger.info(f"🔍 Using Amadeus MCP search_hotels for {slot_name}[{segment_index}]")
-                                location = req.get("location") or req.get("destination")
-                                mcp_result = await asyncio.wait_for(
-                                    self.mcp_executor.execute_tool(
-                                        "search_hotels",
-                                        {
-                                            "location": location,
-                                            "check_in": req.get("check_in"),
-                                            "check_out": req.get("check_out"),
-                                            "guests": req.get("guests") or req.get("adults", 1),
-                                        }
-                                    ),
-                                    timeout=20.0,
+                                mcp_result, shared_search_key = await self._search_with_prefetch(
+                                    slot_name, segment_index, req, "search_hotels", "hotel", hotel_search_params(req), timeout=20.0,
                                 )
                                 
                                 if mcp_result.get("success") and mcp_result.get("hotels"):
@@ -3472,6 +3646,7 @@ Output: JSON array only, no markdown. Example:
                                 slot_name=slot_name,
                                 segment_index=segment_index,
                                 raw_response=mcp_results,
+                                shared_key=shared_search_key,
                             )
                         except Exception as raw_err:
                             logger.warning(f"Failed to save raw Amadeus to Redis: {raw_err}")
@@ -3708,6 +3883,12 @@ Output: JSON array only, no markdown. Example:
                 except Exception as rec_err:
                     logger.debug(f"Personalized recommendation ranking skipped: {rec_err}")
 
+            # ✅ raw Amadeus เต็มย้ายไป offer blob store — segment เก็บ raw_data แบบย่อ + raw_ref (booking resolve ภายหลัง)
+            try:
+                segment.options_pool = await get_offer_blob_store().offload_options(segment.options_pool)
+            except Exception as blob_err:
+                logger.warning(f"Offer blob offload skipped for {slot_name}[{segment_index}]: {blob_err}")
+
             if standardized_results and not segment.requirements.get("_cache_key"):
                 # เก็บ cache key ถ้ายังไม่มี
                 cache_key = self._create_cache_key(segment.requirements, slot_name)
@@ -4023,7 +4204,9 @@ Output: JSON array only, no markdown. Example:
 
                 # 🧠 RL: Get per-user Q-scores and re-rank options before LLM selection
                 rl_context = ""
-                raw_options = [opt.model_dump() if hasattr(opt, 'model_dump') else opt for opt in segment.options_pool]
+                # สำเนาตื้นของแต่ละ option: คีย์จัดอันดับ (_original_index/_final_score) ไม่ถูกเขียนลง options_pool ในที่
+                # (pool คง identity เดิม → delta save มองไม่เห็นการแก้แบบ in-place)
+                raw_options = [opt.model_dump() if hasattr(opt, 'model_dump') else dict(opt) for opt in segment.options_pool]
                 for i, opt in enumerate(raw_options):
                     opt["_original_index"] = i  # เก็บ index เดิมใน options_pool (หลัง sort จะใช้ map กลับ)
                 if getattr(self, 'reinforcement_learning_enabled', True):
@@ -4032,12 +4215,12 @@ Output: JSON array only, no markdown. Example:
                         # 1. Get numeric Q-scores for each option (List[float], index-aligned)
                         rl_scores: list = await rl_svc.get_option_scores(session.user_id, slot_name, raw_options)
                         # 2. Combine: final_score = weighted_score (0–1) + rl_bonus (scaled to 0–0.2)
-                        #    RL bonus: map Q-value range [-1, +1] → [0, 0.2]
-                        for i, opt in enumerate(raw_options):
-                            ws = float(opt.get("weighted_score", 0.0))
-                            q = float(rl_scores[i]) if i < len(rl_scores) else 0.0
-                            rl_bonus = (q + 1.0) / 2.0 * 0.20  # normalize Q [-1,1] → [0, 0.2]
-                            opt["_final_score"] = round(ws + rl_bonus, 4)
+                        #    RL bonus: map Q-value range [-1, +1] → [0, 0.2] (vectorized, ranking_engine)
+                        final_scores = personalized_final_scores(
+                            [float(opt.get("weighted_score", 0.0)) for opt in raw_options], rl_scores
+                        )
+                        for opt, score in zip(raw_options, round4(final_scores)):
+                            opt["_final_score"] = score
                         # 3. Sort by final_score descending so LLM sees best options first
                         raw_options.sort(key=lambda x: -x.get("_final_score", 0.0))
                         # 4. Build text context for LLM reasoning
@@ -4180,7 +4363,10 @@ Output JSON with your analysis and selection:
                         _score = raw_options[best_option_index].get("_final_score")
                         if _score is not None:
                             sel = segment.selected_option
-                            if hasattr(sel, "__setitem__"):
+                            if isinstance(sel, dict):
+                                # selected_option เป็น dict เดียวกับใน options_pool — แทนด้วยสำเนา ไม่แก้ pool ในที่
+                                segment.selected_option = {**sel, "_final_score": _score}
+                            elif hasattr(sel, "__setitem__"):
                                 sel["_final_score"] = _score
                             else:
                                 setattr(sel, "_final_score", _score)
@@ -4698,6 +4884,33 @@ Output JSON with your analysis and selection:
             setattr(session, '_auto_select_in_progress', False)
             setattr(session, '_auto_select_retry_count', 0)
     
+    @staticmethod
+    async def _stream_responder_text(
+        chunks: AsyncIterator[str],
+        token_callback: ResponderTokenCallback,
+    ) -> Optional[str]:
+        """
+        อ่าน chunk จาก responder stream ส่งต่อให้ token_callback แล้วคืนข้อความเต็ม
+        ถ้า stream ล้มกลางทาง ส่ง reset ให้ผู้รับทิ้งข้อความที่ได้ไปแล้วก่อน raise (ผู้เรียก fallback ต่อ)
+        """
+        parts: List[str] = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                try:
+                    await token_callback(chunk, False)
+                except Exception as cb_error:
+                    logger.debug(f"Responder token callback failed: {cb_error}")
+        except BaseException:
+            if parts:
+                try:
+                    await token_callback("", True)
+                except Exception:
+                    pass
+            raise
+        text = "".join(parts).strip()
+        return text or None
+
     async def generate_response(
         self,
         session: UserSession,
@@ -4738,6 +4951,9 @@ Output JSON with your analysis and selection:
                 else self.responder_system_prompt
             )
 
+            # ส่ง token ทาง SSE เฉพาะเมื่อผู้เรียก (chat_stream) ตั้ง callback ไว้ใน run_turn
+            token_callback = _responder_token_callback.get() if settings.responder_streaming_enabled else None
+
             # 🧠 Intelligence Layer: Generate Proactive Suggestions
             suggestions = []
             
@@ -4789,8 +5005,7 @@ Output JSON with your analysis and selection:
             
             # Build enhanced prompt with intelligence context
             # Strip options_pool to keep context window manageable for Responder LLM
-            _resp_state = _strip_options_pool_for_controller(session.trip_plan.model_dump())
-            state_json = json.dumps(_resp_state, ensure_ascii=False, indent=2)
+            state_json = controller_state_json(session.trip_plan)
             action_log_json = json.dumps([a.model_dump() for a in action_log.actions], ensure_ascii=False, indent=2)
             
             intelligence_context = ""
@@ -5058,13 +5273,26 @@ Respond in Thai text only (no JSON, no markdown)."""
                         logger.debug(f"ModelSelector.analyze_complexity failed: {e}, using action-based complexity")
                         complexity = "complex" if agent_mode_actions else "simple"
                     start_time = asyncio.get_running_loop().time()
+                    stream_stats: Dict[str, Any] = {}
                     try:
-                        logger.info(f"Calling production_llm.responder_generate: complexity={complexity}, prompt_length={len(prompt)}")
-                        response_text = await self.production_llm.responder_generate(
-                            prompt=prompt,
-                            system_prompt=_effective_system_prompt,
-                            complexity=complexity
-                        )
+                        if token_callback is not None and hasattr(self.production_llm, "responder_stream"):
+                            logger.info(f"Streaming production_llm.responder_stream: complexity={complexity}, prompt_length={len(prompt)}")
+                            response_text = await self._stream_responder_text(
+                                self.production_llm.responder_stream(
+                                    prompt=prompt,
+                                    system_prompt=_effective_system_prompt,
+                                    complexity=complexity,
+                                    stats=stream_stats,
+                                ),
+                                token_callback,
+                            )
+                        else:
+                            logger.info(f"Calling production_llm.responder_generate: complexity={complexity}, prompt_length={len(prompt)}")
+                            response_text = await self.production_llm.responder_generate(
+                                prompt=prompt,
+                                system_prompt=_effective_system_prompt,
+                                complexity=complexity
+                            )
                         logger.info(f"Production LLM response generated: length={len(response_text) if response_text else 0}, is_none={response_text is None}, is_empty={not response_text.strip() if response_text else True}")
                         # ✅ ถ้า production คืนค่าว่าง ให้ลองใช้ basic LLM แทน (ถือว่าเป็น transient failure)
                         if response_text is not None and isinstance(response_text, str) and not response_text.strip():
@@ -5090,7 +5318,8 @@ Respond in Thai text only (no JSON, no markdown)."""
                                 output_tokens=output_tokens,
                                 mode=mode,
                                 latency_ms=latency_ms,
-                                success=True
+                                success=True,
+                                ttft_ms=stream_stats.get("ttft_ms"),
                             )
                         except Exception as track_error:
                             logger.warning(f"Failed to track responder cost: {track_error}")
@@ -5102,14 +5331,32 @@ Respond in Thai text only (no JSON, no markdown)."""
                 if response_text is None or (isinstance(response_text, str) and not response_text.strip()):
                     logger.info(f"Falling back to basic LLM service: production_llm={self.production_llm is not None}, llm={self.llm is not None}")
                     try:
-                        response_text = await self.llm.generate_content(
-                            prompt=prompt,
-                            system_prompt=_effective_system_prompt,
-                            temperature=settings.responder_temperature,
-                            max_tokens=2500,
-                            auto_select_model=True,
-                            context="responder"
-                        )
+                        if token_callback is not None:
+                            try:
+                                response_text = await self._stream_responder_text(
+                                    self.llm.stream_content(
+                                        prompt=prompt,
+                                        system_prompt=_effective_system_prompt,
+                                        temperature=settings.responder_temperature,
+                                        max_tokens=2500,
+                                        auto_select_model=True,
+                                        context="responder",
+                                    ),
+                                    token_callback,
+                                )
+                            except Exception as stream_error:
+                                # stream ล้ม → ใช้ generate_content (มี retry/quota handling) ด้านล่าง
+                                logger.warning(f"Basic LLM stream failed, retrying without streaming: {stream_error}")
+                                response_text = None
+                        if response_text is None or not response_text.strip():
+                            response_text = await self.llm.generate_content(
+                                prompt=prompt,
+                                system_prompt=_effective_system_prompt,
+                                temperature=settings.responder_temperature,
+                                max_tokens=2500,
+                                auto_select_model=True,
+                                context="responder"
+                            )
                         logger.info(f"Basic LLM response generated: length={len(response_text) if response_text else 0}, is_none={response_text is None}, is_empty={not response_text.strip() if response_text else True}")
                     except LLMException as llm_error:
                         logger.error(f"Basic LLM failed with LLMException: {llm_error}")
@@ -5556,8 +5803,10 @@ class LocationIntelligence:
         return attractions_map.get(city, [])
     
     @staticmethod
-    async def search_nearby_google(location_name: str, place_type: str = "lodging", radius: int = 2000) -> List[Dict[str, Any]]:
-        """Search for places near a location using Google Maps Places API"""
+    async def search_nearby_google(
+        location_name: str, place_type: str = "lodging", radius: int = 2000, raise_errors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Search for places near a location using Google Maps Places API (raise_errors: re-raise API errors instead of [])"""
         gmaps = get_gmaps_client()
         if not gmaps:
             logger.warning("Google Maps API not configured")
@@ -5606,12 +5855,19 @@ class LocationIntelligence:
             return formatted_places
             
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Error searching nearby places: {e}", exc_info=True)
             return []
 
     @staticmethod
-    async def find_hotel_place_google(hotel_name: str, city_code: str = "", lat: float = None, lng: float = None) -> Optional[Dict[str, Any]]:
-        """Find a hotel on Google by name and city/code; returns dict with place_id (and photos if available)."""
+    async def find_hotel_place_google(
+        hotel_name: str, city_code: str = "", lat: float = None, lng: float = None, raise_errors: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a hotel on Google by name and city/code; returns dict with place_id (and photos if available).
+        raise_errors: re-raise API errors (timeout, quota) instead of returning None like "no match".
+        """
         gmaps = get_gmaps_client()
         if not gmaps:
             return None
@@ -5634,12 +5890,16 @@ class LocationIntelligence:
                 return candidates[0]
             return None
         except Exception as e:
+            if raise_errors:
+                raise
             logger.debug(f"find_hotel_place_google failed for '{hotel_name}': {e}")
             return None
 
     @staticmethod
-    async def search_hotel_text_google(hotel_name: str, city_code: str = "", lat: float = None, lng: float = None) -> Optional[Dict[str, Any]]:
-        """Text search for a hotel; returns dict with place_id (fallback when find_place returns nothing)."""
+    async def search_hotel_text_google(
+        hotel_name: str, city_code: str = "", lat: float = None, lng: float = None, raise_errors: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Text search for a hotel; returns dict with place_id (fallback when find_place returns nothing). raise_errors as find_hotel_place_google."""
         gmaps = get_gmaps_client()
         if not gmaps:
             return None
@@ -5658,12 +5918,14 @@ class LocationIntelligence:
                     return {"place_id": place["place_id"], "name": place.get("name"), "photos": place.get("photos", [])}
             return None
         except Exception as e:
+            if raise_errors:
+                raise
             logger.debug(f"search_hotel_text_google failed for '{hotel_name}': {e}")
             return None
 
     @staticmethod
-    async def get_place_details_google(place_id: str) -> Optional[Dict[str, Any]]:
-        """Get detailed information about a place using Google Place ID"""
+    async def get_place_details_google(place_id: str, raise_errors: bool = False) -> Optional[Dict[str, Any]]:
+        """Get detailed information about a place using Google Place ID (raise_errors: re-raise API errors instead of None)"""
         gmaps = get_gmaps_client()
         if not gmaps:
             return None
@@ -5685,6 +5947,8 @@ class LocationIntelligence:
             return result if result else None
             
         except Exception as e:
+            if raise_errors:
+                raise
             logger.error(f"Error getting place details: {e}", exc_info=True)
             return None
     
@@ -0,0 +1,112 @@
+"""
+มุมมอง trip plan สำหรับ Controller/Responder LLM แบบ incremental
+
+แทนการทำ trip_plan.model_dump() → copy.deepcopy → json.dumps(indent=2) ทุก iteration:
+- อ่านค่าจาก Pydantic model โดยตรง ไม่แตะ/ไม่ copy options_pool (แสดงเพียงจำนวนตัวเลือก)
+- แคช JSON ต่อ segment ตาม Segment.version → iteration ถัดไป serialize เฉพาะ segment ที่เปลี่ยน
+- ออก JSON แบบ compact (ไม่มี indent) เพื่อลด prompt tokens
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import weakref
+
+from app.models.trip_plan import Segment, TripPlan
+
+# id(segment) -> (weakref to segment, cache key, serialized heavy part)
+_segment_cache: Dict[int, Tuple["weakref.ReferenceType[Segment]", Tuple[Any, ...], str]] = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _drop_cache_entry(key: int) -> None:
+    _segment_cache.pop(key, None)
+
+
+def _segment_stable_json(seg: Segment) -> str:
+    """
+    Serialized part of a segment that only changes on field assignment:
+    status, options_pool summary, selected_option and extra fields.
+    Cached by (Segment.version, identity of the assigned objects).
+    """
+    extra = seg.__pydantic_extra__ or {}
+    key = (seg.version, seg.status, len(seg.options_pool), id(seg.selected_option), tuple(extra))
+    seg_id = id(seg)
+    cached = _segment_cache.get(seg_id)
+    if cached is not None and cached[0]() is seg and cached[1] == key:
+        _stats["hits"] += 1
+        return cached[2]
+    _stats["misses"] += 1
+    pool_len = len(seg.options_pool)
+    parts = [
+        '"status":' + _dumps(seg.status.value if hasattr(seg.status, "value") else seg.status),
+        '"options_pool":' + (_dumps(f"[{pool_len} options available]") if pool_len else "[]"),
+        '"selected_option":' + _dumps(seg.selected_option),
+    ]
+    for name, value in extra.items():
+        parts.append(_dumps(name) + ":" + _dumps(value))
+    stable = ",".join(parts)
+    if cached is None or cached[0]() is not seg:
+        weakref.finalize(seg, _drop_cache_entry, seg_id)
+    _segment_cache[seg_id] = (weakref.ref(seg), key, stable)
+    return stable
+
+
+def segment_view_json(seg: Segment) -> str:
+    """
+    Controller view of one segment as compact JSON.
+    requirements is re-serialized every call: it is small and mutated in place across the agent
+    (seg.requirements["max_price"] = ...), which the version counter cannot observe.
+    """
+    return '{"requirements":' + _dumps(seg.requirements) + "," + _segment_stable_json(seg) + "}"
+
+
+def _segments_json(segments: List[Segment]) -> str:
+    return "[" + ",".join(segment_view_json(s) for s in segments) + "]"
+
+
+def _extras_json(model: Any) -> str:
+    extra = getattr(model, "__pydantic_extra__", None) or {}
+    return "".join("," + _dumps(k) + ":" + _dumps(v) for k, v in extra.items())
+
+
+def controller_state_json(trip_plan: Optional[TripPlan]) -> str:
+    """
+    Compact JSON of the trip plan for Controller/Responder prompts.
+    Same shape as trip_plan.model_dump() with each non-empty options_pool replaced by
+    "[N options available]", without dumping or deep-copying the raw Amadeus pools.
+    """
+    if trip_plan is None:
+        return "{}"
+    travel = trip_plan.travel
+    flights = travel.flights
+    mode = travel.mode.value if hasattr(travel.mode, "value") else travel.mode
+    flights_json = (
+        '{"outbound":' + _segments_json(flights.outbound)
+        + ',"inbound":' + _segments_json(flights.inbound)
+        + _extras_json(flights) + "}"
+    )
+    travel_json = (
+        '{"mode":' + _dumps(mode)
+        + ',"trip_type":' + _dumps(travel.trip_type)
+        + ',"flights":' + flights_json
+        + ',"ground_transport":' + _segments_json(travel.ground_transport)
+        + _extras_json(travel) + "}"
+    )
+    accommodation = trip_plan.accommodation
+    accommodation_json = '{"segments":' + _segments_json(accommodation.segments) + _extras_json(accommodation) + "}"
+    return (
+        '{"travel":' + travel_json
+        + ',"accommodation":' + accommodation_json
+        + ',"plan_context":' + _dumps(trip_plan.plan_context)
+        + _extras_json(trip_plan) + "}"
+    )
+
+
+def get_controller_view_stats() -> Dict[str, int]:
+    """Segment cache hit/miss counters (for monitoring and benchmarks)."""
+    return {**_stats, "cached_segments": len(_segment_cache)}
@@ -7,6 +7,7 @@ from enum import Enum
 
 from app.core.logging import get_logger
 from app.core.config import settings
+from app.core.bounded_cache import BoundedCache
 
 logger = get_logger(__name__)
 
@@ -43,6 +44,7 @@ class LLMCall:
     latency_ms: Optional[float] = None
     success: bool = True
     error: Optional[str] = None
+    ttft_ms: Optional[float] = None  # time-to-first-token (เฉพาะ call ที่ stream)
 
 
 @dataclass
@@ -82,6 +84,7 @@ class SessionCostSummary:
                     "total_tokens": call.total_tokens,
                     "cost_usd": round(call.estimated_cost_usd, 6),
                     "latency_ms": call.latency_ms,
+                    "ttft_ms": call.ttft_ms,
                     "success": call.success
                 }
                 for call in self.calls
@@ -105,7 +108,15 @@ class CostTracker:
     
     def __init__(self):
         """Initialize cost tracker"""
-        self._session_costs: Dict[str, SessionCostSummary] = {}
+        # session_id -> SessionCostSummary; TTL เลื่อนตามการใช้งานล่าสุด + จำกัดจำนวนเซสชัน (LRU)
+        self._session_costs = BoundedCache(
+            "cost_tracker_sessions",
+            max_entries=settings.cost_tracker_max_sessions,
+            default_ttl=settings.cost_tracker_session_ttl_hours * 3600,
+            sizeof=lambda summary: 1024,
+        )
+        # hit/miss ของ LLM response cache (ทั้งโปรเซส ไม่ผูกเซสชัน) + โทเค็น/ต้นทุนที่ประหยัดได้ แยกตาม brain_type
+        self._cache_stats: Dict[str, Dict[str, float]] = {}
         # Initialize MODEL_PRICING from settings
         global MODEL_PRICING
         MODEL_PRICING = _get_model_pricing()
@@ -122,7 +133,8 @@ class CostTracker:
         mode: str = "normal",
         latency_ms: Optional[float] = None,
         success: bool = True,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        ttft_ms: Optional[float] = None,
     ) -> float:
         """
         Track a single LLM call and return estimated cost
@@ -138,6 +150,7 @@ class CostTracker:
             latency_ms: Optional latency in milliseconds
             success: Whether call succeeded
             error: Optional error message
+            ttft_ms: Optional time-to-first-token in milliseconds (streamed calls)
             
         Returns:
             Estimated cost in USD
@@ -157,18 +170,21 @@ class CostTracker:
             estimated_cost_usd=cost,
             latency_ms=latency_ms,
             success=success,
-            error=error
+            error=error,
+            ttft_ms=ttft_ms,
         )
         
         # Get or create session summary
-        if session_id not in self._session_costs:
-            self._session_costs[session_id] = SessionCostSummary(
+        summary = self._session_costs.get(session_id)
+        if summary is None:
+            summary = SessionCostSummary(
                 session_id=session_id,
                 user_id=user_id,
                 mode=mode
             )
-        
-        summary = self._session_costs[session_id]
+            self._session_costs.set(session_id, summary)
+        else:
+            self._session_costs.touch(session_id)
         
         # Update summary
         summary.total_calls += 1
@@ -177,6 +193,10 @@ class CostTracker:
         summary.total_tokens += total_tokens
         summary.total_cost_usd += cost
         summary.calls.append(call)
+        # เก็บเฉพาะ call ล่าสุด (ยอดรวมด้านบนยังนับทุก call)
+        max_calls = settings.cost_tracker_max_calls_per_session
+        if max_calls and len(summary.calls) > max_calls:
+            del summary.calls[: len(summary.calls) - max_calls]
         summary.last_updated = datetime.utcnow().isoformat()
         
         # Log the call
@@ -195,6 +215,57 @@ class CostTracker:
         
         return cost
     
+    def track_cache_event(
+        self,
+        hit: bool,
+        model: str,
+        brain_type: str,
+        saved_input_tokens: int = 0,
+        saved_output_tokens: int = 0,
+    ) -> float:
+        """
+        Record an LLM response-cache lookup and return the estimated USD saved (0 on a miss).
+
+        Args:
+            hit: Whether the cached response replaced a model call
+            model: Model the cached response came from
+            brain_type: Call context (e.g. "title", "travel_extraction", "intelligence")
+            saved_input_tokens: Estimated prompt tokens not sent because of the hit
+            saved_output_tokens: Estimated output tokens not generated because of the hit
+        """
+        stats = self._cache_stats.setdefault(
+            brain_type,
+            {"hits": 0, "misses": 0, "saved_input_tokens": 0, "saved_output_tokens": 0, "saved_cost_usd": 0.0},
+        )
+        if not hit:
+            stats["misses"] += 1
+            return 0.0
+        saved = self._calculate_cost(model, saved_input_tokens, saved_output_tokens)
+        stats["hits"] += 1
+        stats["saved_input_tokens"] += saved_input_tokens
+        stats["saved_output_tokens"] += saved_output_tokens
+        stats["saved_cost_usd"] += saved
+        logger.debug(f"[COST] cache hit {brain_type} ({model}): saved {saved_input_tokens}→{saved_output_tokens} tokens, ${saved:.6f}")
+        return saved
+
+    def get_cache_summary(self) -> Dict[str, Any]:
+        """LLM response-cache hit/miss totals and estimated savings, overall and per brain type."""
+        totals = {"hits": 0, "misses": 0, "saved_input_tokens": 0, "saved_output_tokens": 0, "saved_cost_usd": 0.0}
+        for stats in self._cache_stats.values():
+            for k in totals:
+                totals[k] += stats[k]
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            **totals,
+            "saved_cost_usd": round(totals["saved_cost_usd"], 6),
+            "saved_cost_thb": round(totals["saved_cost_usd"] * 35, 2),
+            "hit_rate": round(totals["hits"] / lookups, 3) if lookups else 0.0,
+            "by_brain_type": {
+                name: {**stats, "saved_cost_usd": round(stats["saved_cost_usd"], 6)}
+                for name, stats in self._cache_stats.items()
+            },
+        }
+
     def _calculate_cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
         """Calculate cost for a model call"""
         # Try to find pricing by matching model name directly
@@ -273,8 +344,7 @@ class CostTracker:
     
     def reset_session(self, session_id: str):
         """Reset cost tracking for a session"""
-        if session_id in self._session_costs:
-            del self._session_costs[session_id]
+        if self._session_costs.pop(session_id) is not None:
             logger.info(f"[COST] Reset cost tracking for session {session_id}")
     
     def export_to_dict(self, session_id: Optional[str] = None) -> Dict[str, Any]:
@@ -299,7 +369,8 @@ class CostTracker:
             "total_cost_usd": sum(s.total_cost_usd for s in self._session_costs.values()),
             "total_calls": sum(s.total_calls for s in self._session_costs.values()),
             "total_tokens": sum(s.total_tokens for s in self._session_costs.values()),
-            "sessions": [s.to_dict() for s in self._session_costs.values()]
+            "sessions": [s.to_dict() for s in self._session_costs.values()],
+            "llm_cache": self.get_cache_summary(),
         }
     
     def get_cost_by_brain_type(self, session_id: str) -> Dict[str, float]:
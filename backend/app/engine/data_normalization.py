@@ -6,7 +6,10 @@
 from __future__ import annotations
 from typing import List, Dict, Any, Optional, Union
 
+import numpy as np
+
 from app.core.logging import get_logger
+from app.engine.ranking_engine import minmax_normalize
 
 logger = get_logger(__name__)
 
@@ -72,16 +75,15 @@ class DataNormalizer:
         if not values:
             return []
         
+        arr = np.asarray(values, dtype=np.float64)
         # Calculate min/max if not provided
-        if min_value is None:
-            min_value = min(values)
-        if max_value is None:
-            max_value = max(values)
-        
-        return [
-            DataNormalizer.normalize_value(v, min_value, max_value)
-            for v in values
-        ]
+        lo = float(arr.min()) if min_value is None else float(min_value)
+        hi = float(arr.max()) if max_value is None else float(max_value)
+        if hi == lo:
+            # Avoid division by zero - return 0.5 as neutral value
+            return [0.5] * len(values)
+        
+        return np.clip((arr - lo) / (hi - lo), 0.0, 1.0).tolist()
     
     @staticmethod
     def normalize_criteria(
@@ -105,54 +107,26 @@ class DataNormalizer:
         
         inverse = inverse or {}
         
-        # Extract values for each criterion
-        criterion_values: Dict[str, List[float]] = {}
-        for criterion in criteria:
-            values = []
-            for item in data:
-                value = item.get(criterion)
-                if value is not None:
-                    try:
-                        values.append(float(value))
-                    except (ValueError, TypeError):
-                        pass
-            
-            if values:
-                criterion_values[criterion] = values
-        
-        # Normalize each criterion
-        normalized_data = []
-        for item in data:
-            normalized_item = {}
-            
-            for criterion in criteria:
-                if criterion not in criterion_values:
-                    normalized_item[criterion] = 0.5  # Default neutral value
-                    continue
-                
+        # Column matrix (n × k): ค่าที่ไม่มี/แปลงเป็นตัวเลขไม่ได้ = NaN → ได้ 0.5 (neutral)
+        X = np.full((len(data), len(criteria)), np.nan, dtype=np.float64)
+        for i, item in enumerate(data):
+            for j, criterion in enumerate(criteria):
                 value = item.get(criterion)
                 if value is None:
-                    normalized_item[criterion] = 0.5  # Default neutral value
                     continue
-                
                 try:
-                    value_float = float(value)
-                    min_val = min(criterion_values[criterion])
-                    max_val = max(criterion_values[criterion])
-                    
-                    normalized = DataNormalizer.normalize_value(value_float, min_val, max_val)
-                    
-                    # Apply inverse if needed (for criteria where lower is better)
-                    if inverse.get(criterion, False):
-                        normalized = 1.0 - normalized
-                    
-                    normalized_item[criterion] = normalized
+                    X[i, j] = float(value)
                 except (ValueError, TypeError):
-                    normalized_item[criterion] = 0.5  # Default neutral value
-            
-            normalized_data.append(normalized_item)
+                    pass
+        
+        # Min-Max ต่อเกณฑ์ (vectorized) + clamp [0, 1] + inverse สำหรับเกณฑ์ที่ต่ำ = ดี
+        normalized = minmax_normalize(
+            X,
+            [bool(inverse.get(c, False)) for c in criteria],
+            clamp=True,
+        )
         
-        return normalized_data
+        return [dict(zip(criteria, row)) for row in normalized.tolist()]
     
     @staticmethod
     def normalize_option_scores(
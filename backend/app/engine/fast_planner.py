@@ -0,0 +1,458 @@
+"""
+Fast-path planner: แปลงข้อความที่ชัดเจน + สถานะ slot ปัจจุบันเป็น ControllerAction โดยไม่เรียก Controller LLM
+
+- ใช้ผล MLKeywordService.decode_keywords (intent + confidence) ร่วมกับตัวดึงข้อมูลแบบกฎ
+  (เมือง/สนามบินจาก AirportIndex, วันที่, จำนวนวัน/คืน, จำนวนคน)
+- กฎที่รองรับ (นอกนั้นคืน None → run_controller เรียก LLM ตามเดิม):
+  1. แผนว่าง + ปลายทาง/วันไป/วันกลับ (หรือจำนวนวัน) ชัดเจน → CREATE_ITINERARY
+     (Agent Mode: เฉพาะเมื่อ caller บอกว่ารู้จัก user พอ — can_plan_from_zero)
+  2. แผนมีอยู่แล้ว + เปลี่ยนจำนวนคนอย่างเดียว → BATCH UPDATE_REQ (flights + accommodation)
+  3. รอบถัดไปหลัง fast path ใน turn เดียวกัน: segment ที่ข้อมูลครบแต่ยังไม่ค้น → BATCH CALL_SEARCH
+  4. ค้นครบแล้ว (normal mode) → ASK_USER ให้ผู้ใช้เลือก
+- ข้อความที่มีงบประมาณ ฤดู/เทศกาล ช่วงเวลา จุดแวะ คำถาม หรือปลายทางกำกวม → ให้ LLM ตัดสินใจเสมอ
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.engine.workflow_manager import SlotManager, SlotType, get_slot_manager
+from app.models.actions import ActionType, ControllerAction
+from app.models.trip_plan import SegmentStatus, TripPlan
+from app.services.airport_index import get_airport_index
+
+logger = get_logger(__name__)
+
+# intent จาก ML ที่สอดคล้องกับการวางแผนทริปใหม่
+PLANNING_INTENTS = frozenset({"flight", "hotel", "destination", "date", "booking", "general"})
+EDIT_INTENTS = frozenset({"edit", "general", "flight", "hotel"})
+
+_THAI_MONTHS = {
+    "มกราคม": 1, "มกรา": 1, "ม.ค.": 1, "มค": 1,
+    "กุมภาพันธ์": 2, "กุมภา": 2, "ก.พ.": 2, "กพ": 2,
+    "มีนาคม": 3, "มีนา": 3, "มี.ค.": 3, "มีค": 3,
+    "เมษายน": 4, "เมษา": 4, "เม.ย.": 4, "เมย": 4,
+    "พฤษภาคม": 5, "พฤษภา": 5, "พ.ค.": 5, "พค": 5,
+    "มิถุนายน": 6, "มิถุนา": 6, "มิ.ย.": 6, "มิย": 6,
+    "กรกฎาคม": 7, "กรกฎา": 7, "ก.ค.": 7, "กค": 7,
+    "สิงหาคม": 8, "สิงหา": 8, "ส.ค.": 8, "สค": 8,
+    "กันยายน": 9, "กันยา": 9, "ก.ย.": 9, "กย": 9,
+    "ตุลาคม": 10, "ตุลา": 10, "ต.ค.": 10, "ตค": 10,
+    "พฤศจิกายน": 11, "พฤศจิกา": 11, "พ.ย.": 11, "พย": 11,
+    "ธันวาคม": 12, "ธันวา": 12, "ธ.ค.": 12, "ธค": 12,
+}
+_EN_MONTHS = {
+    "january": 1, "february": 2, "march": 3, "april": 4, "may": 5, "june": 6, "july": 7,
+    "august": 8, "september": 9, "october": 10, "november": 11, "december": 12,
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "jun": 6, "jul": 7, "aug": 8, "sep": 9, "sept": 9,
+    "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTHS = {**_THAI_MONTHS, **_EN_MONTHS}
+# ยาวก่อน เพื่อให้ "มีนาคม" ชนะ "มีนา"
+_MONTH_RE = "|".join(re.escape(m) for m in sorted(_MONTHS, key=len, reverse=True))
+
+_ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_RANGE_RE = re.compile(
+    rf"(\d{{1,2}})\s*(?:-|–|ถึง|to)\s*(\d{{1,2}})\s*({_MONTH_RE})\.?\s*(\d{{4}})?", re.IGNORECASE
+)
+_DAY_MONTH_RE = re.compile(rf"(\d{{1,2}})\s*({_MONTH_RE})\.?\s*(\d{{4}})?", re.IGNORECASE)
+_MONTH_DAY_RE = re.compile(rf"\b({_MONTH_RE})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s*(\d{{4}}))?", re.IGNORECASE)
+_SLASH_DATE_RE = re.compile(r"(?<![\d/])(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?(?![\d/])")
+# รูปแบบเดียวกับที่ _execute_create_itinerary ใช้คำนวณ end_date (ตัวเลขแรก = จำนวนวันที่ค้าง)
+_DURATION_RE = re.compile(r"(\d+)\s*(?:วัน|days?|คืน|nights?)", re.IGNORECASE)
+_PAX_RE = re.compile(r"(\d+)\s*(?:คน|ท่าน|people|persons?|adults?|pax|ผู้ใหญ่)", re.IGNORECASE)
+_ADULTS_RE = re.compile(r"ผู้ใหญ่\s*(\d+)", re.IGNORECASE)
+_CHILDREN_RE = re.compile(r"(?:เด็ก\s*(\d+))|(?:(\d+)\s*(?:children|kids?|เด็ก))", re.IGNORECASE)
+_THAI_NUMBER_WORDS = {"หนึ่ง": 1, "สอง": 2, "สาม": 3, "สี่": 4, "ห้า": 5, "หก": 6, "เจ็ด": 7, "แปด": 8, "เก้า": 9}
+_THAI_PAX_RE = re.compile(r"(หนึ่ง|สอง|สาม|สี่|ห้า|หก|เจ็ด|แปด|เก้า)\s*(?:คน|ท่าน)")
+_COUPLE_MARKERS = ("กับแฟน", "couple", "ไปกันสองคน")
+
+_ORIGIN_MARKERS = ("จาก", "from", "ออกจาก", "ต้นทาง")
+_DEST_MARKERS = ("ไป", "to", "ถึง", "ปลายทาง", "เที่ยว")
+_ONE_WAY_MARKERS = ("เที่ยวเดียว", "ขาเดียว", "one way", "one-way")
+_CHANGE_MARKERS = ("เปลี่ยน", "แก้", "เพิ่มเป็น", "ลดเป็น", "change", "instead", "update")
+# ข้อความที่ต้องอาศัยการตีความของ LLM (payload มีฟิลด์ที่กฎไม่ครอบคลุม)
+_NEEDS_LLM_MARKERS = (
+    # งบประมาณ / ราคา
+    "งบ", "budget", "บาท", "ไม่เกิน", "ราคา", "ถูกที่สุด", "cheap", "thb", "฿",
+    # ฤดู / เทศกาล / อีเวนต์
+    "เทศกาล", "ซากุระ", "ใบไม้เปลี่ยนสี", "สงกรานต์", "ลอยกระทง", "หิมะ", "festival", "season", "cherry", "event",
+    # ช่วงเวลาเดินทาง
+    "เช้า", "บ่าย", "เย็น", "ค่ำ", "ดึก", "morning", "afternoon", "evening", "night flight",
+    # หลายเมือง / จุดแวะ
+    "แวะ", "ผ่าน", "ต่อไป", "แล้วไป", " และ ", "via", "stopover", "multi",
+    # คำถาม / ขอคำแนะนำ / กำกวม
+    "?", "ไหม", "มั้ย", "อะไร", "ยังไง", "เท่าไหร่", "ที่ไหนดี", "แนะนำ", "recommend", "หรือ", " or ",
+    # ขอบเขตเฉพาะ (focus) / ครอบครัว / ที่พักให้เช่า
+    "เฉพาะ", "แค่", "only", "ไม่ต้อง", "ไม่เอา", "ครอบครัว", "family", "รถเช่า", "บ้านพัก", "airbnb",
+    # เงื่อนไขเพิ่มเติมเรื่องที่พัก / ทำเล
+    "แต่", "ใกล้", "ติดทะเล", "near", "but ",
+    # วันที่แบบสัมพัทธ์ที่ตีความได้หลายแบบ
+    "เสาร์", "อาทิตย์หน้า", "สัปดาห์หน้า", "เดือนหน้า", "weekend", "next week", "next month",
+)
+
+
+@dataclass
+class TripEntities:
+    """Rule-extracted trip fields from one user message."""
+    origin: Optional[str] = None
+    destination: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    nights: Optional[int] = None
+    adults: Optional[int] = None
+    children: int = 0
+    one_way: bool = False
+    places: List[str] = field(default_factory=list)
+    needs_llm: List[str] = field(default_factory=list)
+
+    @property
+    def has_pax(self) -> bool:
+        return self.adults is not None
+
+
+@dataclass
+class FastPlan:
+    """Planner decision: the action to execute instead of a controller LLM call."""
+    action: ControllerAction
+    confidence: float
+    rule: str
+
+
+@dataclass
+class FastPathTurn:
+    """Per-turn planner memory (one per run_controller call)."""
+    rules: List[str] = field(default_factory=list)
+    entities: Optional[TripEntities] = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.rules)
+
+
+def _year_for(day: int, month: int, year: Optional[int], today: date) -> Optional[date]:
+    if year is not None:
+        if year >= 2400:  # พ.ศ.
+            year -= 543
+        elif year < 100:
+            year = 2000 + year if year < 60 else 2500 + year - 543
+    try:
+        d = date(year or today.year, month, day)
+    except ValueError:
+        return None
+    if year is None and d < today:
+        try:
+            d = date(today.year + 1, month, day)
+        except ValueError:
+            return None
+    return d
+
+
+def _find_dates(text: str, today: date) -> List[Tuple[int, date]]:
+    """All explicit dates in the message as (position, date), in order of appearance."""
+    found: List[Tuple[int, date]] = []
+    taken: List[Tuple[int, int]] = []
+
+    def _add(m: "re.Match[str]", d: Optional[date]) -> None:
+        if d is None or any(s < m.end() and m.start() < e for s, e in taken):
+            return
+        taken.append((m.start(), m.end()))
+        found.append((m.start(), d))
+
+    for m in _ISO_DATE_RE.finditer(text):
+        try:
+            _add(m, date(int(m.group(1)), int(m.group(2)), int(m.group(3))))
+        except ValueError:
+            pass
+    for m in _RANGE_RE.finditer(text):
+        month = _MONTHS[m.group(3).lower()]
+        year = int(m.group(4)) if m.group(4) else None
+        start = _year_for(int(m.group(1)), month, year, today)
+        end = _year_for(int(m.group(2)), month, year or (start.year if start else None), today)
+        if start and end and end >= start:
+            taken.append((m.start(), m.end()))
+            found.extend([(m.start(), start), (m.start() + 1, end)])
+    for m in _DAY_MONTH_RE.finditer(text):
+        _add(m, _year_for(int(m.group(1)), _MONTHS[m.group(2).lower()], int(m.group(3)) if m.group(3) else None, today))
+    for m in _MONTH_DAY_RE.finditer(text):
+        _add(m, _year_for(int(m.group(2)), _MONTHS[m.group(1).lower()], int(m.group(3)) if m.group(3) else None, today))
+    for m in _SLASH_DATE_RE.finditer(text):
+        # ไทยเขียน วัน/เดือน
+        _add(m, _year_for(int(m.group(1)), int(m.group(2)), int(m.group(3)) if m.group(3) else None, today))
+    lowered = text.lower()
+    for word, offset in (("มะรืนนี้", 2), ("มะรืน", 2), ("พรุ่งนี้", 1), ("tomorrow", 1)):
+        pos = lowered.find(word)
+        if pos >= 0 and not any(s <= pos < e for s, e in taken):
+            taken.append((pos, pos + len(word)))
+            found.append((pos, today + timedelta(days=offset)))
+    found.sort(key=lambda item: item[0])
+    return found
+
+
+def _role_of(place: Dict[str, Any], key: str) -> Optional[str]:
+    """'origin' / 'destination' from the words right before a place mention (normalized text)."""
+    before = key[max(0, place["start"] - 12):place["start"]].strip()
+    for marker in _ORIGIN_MARKERS:
+        if before.endswith(marker):
+            return "origin"
+    for marker in _DEST_MARKERS:
+        if before.endswith(marker):
+            return "destination"
+    return None
+
+
+def extract_trip_entities(text: str, today: Optional[date] = None) -> TripEntities:
+    """Extract origin/destination/dates/pax from a message with rules only (no network, no LLM)."""
+    from app.services.airport_index import normalize_place_name
+
+    today = today or datetime.now().date()
+    raw = text or ""
+    lowered = raw.lower()
+    ent = TripEntities()
+    ent.needs_llm = [m.strip() or m for m in _NEEDS_LLM_MARKERS if m in lowered]
+    ent.one_way = any(m in lowered for m in _ONE_WAY_MARKERS)
+
+    key = normalize_place_name(raw)
+    places = get_airport_index().find_places(raw)
+    ent.places = [p.get("city") or p.get("name") for p in places]
+    roles: Dict[str, str] = {}
+    unassigned = []
+    for p in places:
+        role = _role_of(p, key)
+        name = p.get("city") or p.get("name")
+        if role and role not in roles:
+            roles[role] = name
+        else:
+            unassigned.append(name)
+    for name in unassigned:
+        if "destination" not in roles:
+            roles["destination"] = name
+        elif "origin" not in roles and name != roles["destination"]:
+            roles["origin"] = name
+    ent.origin = roles.get("origin")
+    ent.destination = roles.get("destination")
+
+    dates = _find_dates(raw, today)
+    if dates:
+        ent.start_date = dates[0][1].isoformat()
+        if len(dates) > 1 and dates[1][1] > dates[0][1]:
+            ent.end_date = dates[1][1].isoformat()
+    duration = _DURATION_RE.search(raw)
+    if duration:
+        ent.nights = int(duration.group(1))
+        if ent.start_date and not ent.end_date and ent.nights > 0:
+            ent.end_date = (date.fromisoformat(ent.start_date) + timedelta(days=ent.nights)).isoformat()
+
+    adults_m = _ADULTS_RE.search(raw)
+    children_m = _CHILDREN_RE.search(raw)
+    if children_m:
+        ent.children = int(children_m.group(1) or children_m.group(2))
+    if adults_m:
+        ent.adults = int(adults_m.group(1))
+    else:
+        pax = _PAX_RE.search(raw)
+        thai = _THAI_PAX_RE.search(raw)
+        if pax:
+            ent.adults = max(1, int(pax.group(1)) - ent.children)
+        elif thai:
+            ent.adults = max(1, _THAI_NUMBER_WORDS[thai.group(1)] - ent.children)
+        elif any(m in lowered for m in _COUPLE_MARKERS):
+            ent.adults = 2
+    return ent
+
+
+class FastPathPlanner:
+    """
+    Rule-driven controller for high-confidence turns.
+
+    plan() returns a FastPlan or None; None always means "ask the controller LLM".
+    """
+
+    def __init__(self, min_confidence: Optional[float] = None, slot_manager: Optional[SlotManager] = None):
+        self.min_confidence = float(min_confidence if min_confidence is not None else settings.fast_planner_min_confidence)
+        self.slot_manager = slot_manager or get_slot_manager()
+        self._stats: Dict[str, Any] = {"planned": {}, "declined": {}, "controller_calls_saved": 0}
+
+    # ---------- helpers ----------
+
+    @staticmethod
+    def _ml_factor(ml_intent_hint: Optional[Dict[str, Any]], intents: frozenset) -> float:
+        if not ml_intent_hint:
+            return 0.6
+        conf = float(ml_intent_hint.get("confidence") or 0.0)
+        if ml_intent_hint.get("intent") in intents:
+            return 0.6 + 0.4 * min(1.0, max(0.0, conf))
+        return 0.5
+
+    def _decline(self, reason: str) -> None:
+        self._stats["declined"][reason] = self._stats["declined"].get(reason, 0) + 1
+        return None
+
+    def _accept(self, turn: FastPathTurn, rule: str, action: ControllerAction, confidence: float) -> Optional[FastPlan]:
+        if confidence < self.min_confidence:
+            return self._decline(f"{rule}:low_confidence")
+        turn.rules.append(rule)
+        self._stats["planned"][rule] = self._stats["planned"].get(rule, 0) + 1
+        self._stats["controller_calls_saved"] += 1
+        return FastPlan(action=action, confidence=round(confidence, 3), rule=rule)
+
+    # ---------- rules ----------
+
+    def _plan_create(self, ent: TripEntities, ml_intent_hint: Optional[Dict[str, Any]], turn: FastPathTurn) -> Optional[FastPlan]:
+        if not ent.destination:
+            return self._decline("create:no_destination")
+        if not ent.start_date:
+            return self._decline("create:no_start_date")
+        if not ent.end_date and not ent.one_way:
+            return self._decline("create:no_end_date")
+        if len(set(ent.places)) > 2:
+            return self._decline("create:multi_city")
+        if ent.origin and ent.origin == ent.destination:
+            return self._decline("create:same_origin_destination")
+        confidence = (1.0 if ent.origin else 0.9) * self._ml_factor(ml_intent_hint, PLANNING_INTENTS)
+        payload: Dict[str, Any] = {
+            "origin": ent.origin or "Bangkok",
+            "destination": ent.destination,
+            "start_date": ent.start_date,
+            "travel_mode": "both",
+            "trip_type": "one_way" if ent.one_way else "round_trip",
+            "guests": (ent.adults or 1) + ent.children,
+            "adults": ent.adults or 1,
+            "children": ent.children,
+            "focus": ["flights", "hotels", "transfers"],
+        }
+        if ent.end_date and not ent.one_way:
+            payload["end_date"] = ent.end_date
+        if ent.nights:
+            payload["days"] = ent.nights
+        action = ControllerAction(
+            thought=f"Fast path: clear new-trip request ({payload['origin']} → {ent.destination}, {ent.start_date}) — creating itinerary without the controller LLM.",
+            action=ActionType.CREATE_ITINERARY,
+            payload=payload,
+        )
+        return self._accept(turn, "create_itinerary", action, confidence)
+
+    def _plan_pax_update(self, trip_plan: TripPlan, ent: TripEntities, user_input: str,
+                         ml_intent_hint: Optional[Dict[str, Any]], turn: FastPathTurn) -> Optional[FastPlan]:
+        lowered = (user_input or "").lower()
+        if not ent.has_pax or ent.places or ent.start_date or ent.nights:
+            return self._decline("update:not_pax_only")
+        if not any(m in lowered for m in _CHANGE_MARKERS):
+            return self._decline("update:no_change_marker")
+        guests = ent.adults + ent.children
+        batch: List[Dict[str, Any]] = []
+        for slot_name, seg, idx in self.slot_manager.get_all_segments(trip_plan):
+            if seg.status == SegmentStatus.CONFIRMED:
+                return self._decline("update:confirmed_segment")
+            if slot_name in (SlotType.FLIGHTS_OUTBOUND.value, SlotType.FLIGHTS_INBOUND.value):
+                updates = {"adults": ent.adults, "children": ent.children, "guests": guests}
+            elif slot_name == SlotType.ACCOMMODATION.value:
+                updates = {"guests": guests}
+            else:
+                continue
+            if all(seg.requirements.get(k) == v for k, v in updates.items()):
+                continue
+            batch.append({
+                "action": ActionType.UPDATE_REQ.value,
+                "payload": {"slot": slot_name, "segment_index": idx, "updates": updates, "clear_existing": True},
+            })
+        if not batch:
+            return self._decline("update:nothing_to_change")
+        action = ControllerAction(
+            thought=f"Fast path: traveller count changed to {guests} — updating flight/hotel requirements.",
+            action=ActionType.BATCH,
+            payload={},
+            batch_actions=batch,
+        )
+        return self._accept(turn, "update_pax", action, 0.9 * self._ml_factor(ml_intent_hint, EDIT_INTENTS))
+
+    def _plan_followup(self, trip_plan: TripPlan, mode: str, turn: FastPathTurn) -> Optional[FastPlan]:
+        segments = self.slot_manager.get_all_segments(trip_plan)
+        if any(seg.status == SegmentStatus.SEARCHING for _, seg, _ in segments):
+            return self._decline("followup:search_in_progress")
+        pending = [(slot, idx) for slot, seg, idx in segments if seg.needs_search()]
+        if pending and "call_search" not in turn.rules:
+            action = ControllerAction(
+                thought=f"Fast path: {len(pending)} segment(s) have complete requirements — searching all in parallel.",
+                action=ActionType.BATCH,
+                payload={},
+                batch_actions=[
+                    {"action": ActionType.CALL_SEARCH.value, "payload": {"slot": slot, "segment_index": idx}}
+                    for slot, idx in pending
+                ],
+            )
+            return self._accept(turn, "call_search", action, 1.0)
+        if pending:
+            return self._decline("followup:search_incomplete")
+        if mode == "normal" and "call_search" in turn.rules and any(seg.options_pool for _, seg, _ in segments):
+            action = ControllerAction(
+                thought="Fast path: search finished — presenting options for the user to choose.",
+                action=ActionType.ASK_USER,
+                payload={"missing_fields": []},
+            )
+            return self._accept(turn, "present_options", action, 1.0)
+        return self._decline("followup:no_rule")
+
+    # ---------- public API ----------
+
+    def plan(
+        self,
+        trip_plan: TripPlan,
+        user_input: str,
+        ml_intent_hint: Optional[Dict[str, Any]],
+        *,
+        turn: FastPathTurn,
+        mode: str = "normal",
+        iteration: int = 0,
+        max_iterations: int = 3,
+        ml_validation_result: Optional[Dict[str, Any]] = None,
+        can_plan_from_zero: bool = True,
+    ) -> Optional[FastPlan]:
+        """
+        Decide this controller iteration without the LLM, or return None to fall back to it.
+        can_plan_from_zero=False declines CREATE_ITINERARY on an empty plan (Agent Mode without enough user context).
+        """
+        if ml_validation_result and ml_validation_result.get("valid") is False:
+            return self._decline("ml_validation_failed")
+        if iteration > 0:
+            # รอบถัดไปใช้ fast path ต่อได้เฉพาะเมื่อรอบก่อนหน้าใน turn นี้มาจาก fast path เช่นกัน
+            if not turn.active:
+                return self._decline("followup:llm_turn")
+            return self._plan_followup(trip_plan, mode, turn)
+
+        ent = extract_trip_entities(user_input)
+        turn.entities = ent
+        if ent.needs_llm:
+            return self._decline("needs_llm")
+        if not self.slot_manager.get_all_segments(trip_plan):
+            if max_iterations < 2:
+                # ไม่มีรอบให้ CALL_SEARCH ต่อ — LLM จะ BATCH CREATE + SEARCH ในรอบเดียว
+                return self._decline("create:single_iteration")
+            if not can_plan_from_zero:
+                # ตัดสินก่อน _accept: turn ต้องไม่ถูกนับเป็น fast path ถ้า LLM เป็นคนตัดสินรอบนี้
+                return self._decline("create:unknown_user")
+            return self._plan_create(ent, ml_intent_hint, turn)
+        return self._plan_pax_update(trip_plan, ent, user_input, ml_intent_hint, turn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "planned": dict(self._stats["planned"]),
+            "declined": dict(self._stats["declined"]),
+            "controller_calls_saved": self._stats["controller_calls_saved"],
+            "min_confidence": self.min_confidence,
+        }
+
+
+_fast_planner: Optional[FastPathPlanner] = None
+
+
+def get_fast_planner() -> FastPathPlanner:
+    """Get or create the process-wide fast-path planner."""
+    global _fast_planner
+    if _fast_planner is None:
+        _fast_planner = FastPathPlanner()
+    return _fast_planner
@@ -19,9 +19,13 @@ Features ที่เรียนรู้:
 from __future__ import annotations
 
 import math
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
+import numpy as np
+
 from app.core.logging import get_logger
+from app.engine.ranking_engine import round4, sigmoid
 
 logger = get_logger(__name__)
 
@@ -108,77 +112,159 @@ LOW_COST_AIRLINES = {
 }
 
 def _is_budget_airline(airline: str) -> float:
-    a = (airline or "").lower()
+    return _budget_airline_flag((airline or "").lower())
+
+
+@lru_cache(maxsize=1024)
+def _budget_airline_flag(a: str) -> float:
+    # ชื่อสายการบินใน pool ซ้ำกันมาก — cache ผล substring scan
     if any(k in a for k in LOW_COST_AIRLINES):
         return 1.0
     return 0.0
 
 
-def extract_features(option: Any, slot: str) -> Dict[str, float]:
-    """
-    แปลง option dict → feature dict (ทุก value อยู่ใน [0, 1])
-    slot: 'flights_outbound' | 'flights_inbound' | 'accommodation' | 'ground_transport' | generic
-    """
-    if not isinstance(option, dict):
-        return {}
+FLIGHT_FEATURES = ("f_price", "f_cabin", "f_is_direct", "f_duration", "f_budget_airline")
+HOTEL_FEATURES = ("h_price", "h_stars")
+TRANSPORT_FEATURES = ("t_price", "t_is_private")
 
-    slot_lower = (slot or "").lower()
-    feats: Dict[str, float] = {}
 
+def _slot_kind(slot: str) -> Optional[str]:
+    """'flight' | 'hotel' | 'transport' | None — same precedence as extract_features"""
+    slot_lower = (slot or "").lower()
     if "flight" in slot_lower or "outbound" in slot_lower or "inbound" in slot_lower:
-        # ✈ Flight features
+        return "flight"
+    if "accommodation" in slot_lower or "hotel" in slot_lower:
+        return "hotel"
+    if "transport" in slot_lower or "ground" in slot_lower:
+        return "transport"
+    return None
+
+
+def _raw_fields(option: Dict[str, Any], kind: str) -> tuple:
+    """
+    ค่าดิบของ feature (ก่อนแบ่ง bucket) ตามลำดับ *_FEATURES
+    ใช้ร่วมกันระหว่าง extract_features (ทีละ option) และ extract_feature_matrix (vectorized)
+    """
+    if kind == "flight":
         price = option.get("price_total") or option.get("price_amount") or option.get("price", 0)
-        feats["f_price"] = _price_bucket(price)
+        segs = option.get("segments") or []
+        first_seg = segs[0] if segs and isinstance(segs[0], dict) else {}
 
-        cabin = option.get("cabin_class") or ""
-        if not cabin:
-            segs = option.get("segments") or []
-            if segs and isinstance(segs[0], dict):
-                cabin = segs[0].get("cabin_class") or ""
-        feats["f_cabin"] = _cabin_index(cabin)
+        cabin = option.get("cabin_class") or first_seg.get("cabin_class") or ""
 
         # Direct flight
         stops = option.get("stops")
         if stops is None:
-            segs = option.get("segments") or []
             stops = max(0, len(segs) - 1) if segs else 0
-        feats["f_is_direct"] = 1.0 if (stops == 0) else 0.0
 
         # Duration
         dur = option.get("total_duration_minutes") or option.get("duration_minutes") or 0
         if not dur:
-            segs = option.get("segments") or []
             dur = sum(s.get("duration_minutes", 0) for s in segs if isinstance(s, dict))
-        feats["f_duration"] = _duration_bucket(dur)
 
         # Airline budget
         airline = option.get("airline") or option.get("carrier") or ""
         if not airline:
-            segs = option.get("segments") or []
-            if segs and isinstance(segs[0], dict):
-                airline = segs[0].get("airline") or segs[0].get("carrier") or ""
-        feats["f_budget_airline"] = _is_budget_airline(airline)
+            airline = first_seg.get("airline") or first_seg.get("carrier") or ""
+        return price, _cabin_index(cabin), 1.0 if (stops == 0) else 0.0, dur, _is_budget_airline(airline)
 
-    elif "accommodation" in slot_lower or "hotel" in slot_lower:
-        # 🏨 Hotel features
+    if kind == "hotel":
         price = option.get("price_total") or option.get("price_per_night") or option.get("price", 0)
-        feats["h_price"] = _hotel_price_bucket(price)
-
         stars = option.get("stars") or option.get("rating") or option.get("category") or 3
-        try:
-            feats["h_stars"] = min(1.0, max(0.0, (float(stars) - 1) / 4.0))
-        except (TypeError, ValueError):
-            feats["h_stars"] = 0.5
+        return price, stars
+
+    # transport
+    price = option.get("price_total") or option.get("price", 0)
+    transport_type = (option.get("type") or option.get("mode") or "").lower()
+    return price, 1.0 if any(k in transport_type for k in ("private", "taxi", "sedan")) else 0.0
+
+
+def _stars_feature(stars: Any) -> float:
+    try:
+        return min(1.0, max(0.0, (float(stars) - 1) / 4.0))
+    except (TypeError, ValueError):
+        return 0.5
 
-    elif "transport" in slot_lower or "ground" in slot_lower:
+
+def extract_features(option: Any, slot: str) -> Dict[str, float]:
+    """
+    แปลง option dict → feature dict (ทุก value อยู่ใน [0, 1])
+    slot: 'flights_outbound' | 'flights_inbound' | 'accommodation' | 'ground_transport' | generic
+    """
+    if not isinstance(option, dict):
+        return {}
+
+    kind = _slot_kind(slot)
+    if kind == "flight":
+        # ✈ Flight features
+        price, cabin, is_direct, dur, budget = _raw_fields(option, kind)
+        return {
+            "f_price": _price_bucket(price),
+            "f_cabin": cabin,
+            "f_is_direct": is_direct,
+            "f_duration": _duration_bucket(dur),
+            "f_budget_airline": budget,
+        }
+    if kind == "hotel":
+        # 🏨 Hotel features
+        price, stars = _raw_fields(option, kind)
+        return {"h_price": _hotel_price_bucket(price), "h_stars": _stars_feature(stars)}
+    if kind == "transport":
         # 🚗 Transport features
-        price = option.get("price_total") or option.get("price", 0)
-        feats["t_price"] = _price_bucket(price)
+        price, is_private = _raw_fields(option, kind)
+        return {"t_price": _price_bucket(price), "t_is_private": is_private}
+    return {}
+
+
+def _float_or_nan(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return float("nan")
 
-        transport_type = (option.get("type") or option.get("mode") or "").lower()
-        feats["t_is_private"] = 1.0 if any(k in transport_type for k in ("private", "taxi", "sedan")) else 0.0
 
-    return feats
+def _bucket_vec(values: "np.ndarray", thresholds: List[float]) -> "np.ndarray":
+    """Vectorized _price_bucket/_hotel_price_bucket: count of thresholds <= value, /4; NaN → 0.5"""
+    out = np.searchsorted(np.asarray(thresholds, dtype=np.float64), values, side="right") / 4.0
+    return np.where(np.isnan(values), 0.5, out)
+
+
+def _duration_bucket_vec(minutes: "np.ndarray") -> "np.ndarray":
+    out = np.select([minutes < 90, minutes < 240, minutes < 480], [0.0, 0.25, 0.5], default=1.0)
+    return np.where(np.isnan(minutes), 0.5, out)
+
+
+def extract_feature_matrix(options: List[Any], slot: str) -> tuple:
+    """
+    Vectorized extract_features: (feature_names, X [n × k], has_features mask [n]).
+    ดึงค่าดิบของทุก option ครั้งเดียว แล้วแบ่ง bucket / scale เป็น array operation.
+    Option ที่ไม่ใช่ dict (หรือ slot ที่ไม่รู้จัก) มี has_features=False (score = neutral).
+    """
+    kind = _slot_kind(slot)
+    n = len(options)
+    names = {"flight": FLIGHT_FEATURES, "hotel": HOTEL_FEATURES, "transport": TRANSPORT_FEATURES}.get(kind, ())
+    mask = np.array([isinstance(o, dict) for o in options], dtype=bool) if kind else np.zeros(n, dtype=bool)
+    X = np.zeros((n, len(names)), dtype=np.float64)
+    if not names or not mask.any():
+        return names, X, mask
+
+    rows = [_raw_fields(o, kind) if ok else None for o, ok in zip(options, mask)]
+    idx = np.flatnonzero(mask)
+    cols = list(zip(*(rows[i] for i in idx)))
+    price = np.array([_float_or_nan(v) for v in cols[0]], dtype=np.float64)
+    if kind == "flight":
+        X[idx, 0] = _bucket_vec(price, [3000, 8000, 15000, 30000])
+        X[idx, 1] = np.asarray(cols[1], dtype=np.float64)
+        X[idx, 2] = np.asarray(cols[2], dtype=np.float64)
+        X[idx, 3] = _duration_bucket_vec(np.array([_float_or_nan(v) for v in cols[3]], dtype=np.float64))
+        X[idx, 4] = np.asarray(cols[4], dtype=np.float64)
+    elif kind == "hotel":
+        X[idx, 0] = _bucket_vec(price, [500, 1500, 3000, 6000])
+        X[idx, 1] = [_stars_feature(v) for v in cols[1]]
+    else:
+        X[idx, 0] = _bucket_vec(price, [3000, 8000, 15000, 30000])
+        X[idx, 1] = np.asarray(cols[1], dtype=np.float64)
+    return names, X, mask
 
 
 def _sigmoid(x: float) -> float:
@@ -204,6 +290,31 @@ def _label_from_action(action_type: str, context: Optional[Dict] = None) -> Opti
     return LABEL_MAP.get(action_type)
 
 
+def mode_key(session_mode: str) -> str:
+    """ask/agent เรียนรู้แยกกัน; chat/booking/'' รวมเป็น 'any'"""
+    mode = (session_mode or "").lower().strip()
+    return mode if mode in ("ask", "agent") else "any"
+
+
+def apply_gradient(weights: Dict[str, float], feats: Dict[str, float], y: float) -> tuple:
+    """One online logistic-regression step (in place). Returns (y_hat, error)."""
+    y_hat = _sigmoid(_dot(weights, feats))
+    error = y - y_hat
+    # gradient update with L2 regularization
+    for feat, x in feats.items():
+        grad = error * x - REGULARIZATION * weights.get(feat, 0.0)
+        new_w = weights.get(feat, 0.0) + LEARNING_RATE * grad
+        weights[feat] = max(-MAX_WEIGHT, min(MAX_WEIGHT, new_w))
+    return y_hat, error
+
+
+def _pending_weights(user_id: str, slot_type: str, mode: str) -> Optional[Dict[str, float]]:
+    """Weights updated by the RL event pipeline but not yet persisted (None = use MongoDB)."""
+    from app.engine.rl_pipeline import peek_rl_pipeline
+    pipeline = peek_rl_pipeline()
+    return pipeline.pending_weights(user_id, slot_type, mode) if pipeline is not None else None
+
+
 # ─── Feature Weight Learner ────────────────────────────────────────────────────
 
 class FeatureWeightLearner:
@@ -221,6 +332,10 @@ class FeatureWeightLearner:
     # ── Load / Save weights ──────────────────────────────────────────────────
 
     async def _load_weights(self, user_id: str, slot_type: str, mode: str = "") -> Dict[str, float]:
+        if mode:
+            pending = _pending_weights(user_id, slot_type, mode)
+            if pending is not None:
+                return pending
         db = self._get_db()
         if db is None:
             return {}
@@ -290,30 +405,22 @@ class FeatureWeightLearner:
 
         slot_type = _normalize_slot(slot_name)
         # แยก mode key: ask/agent เรียนรู้แยกกัน; chat/booking/'' รวมเป็น 'any'
-        mode_key = session_mode.lower().strip() if session_mode.lower().strip() in ("ask", "agent") else "any"
+        mode = mode_key(session_mode)
         db = self._get_db()
         if db is None:
             return
 
         try:
-            query = {"user_id": user_id, "slot_type": slot_type, "mode": mode_key}
+            query = {"user_id": user_id, "slot_type": slot_type, "mode": mode}
             doc = await db[COLLECTION_FWL].find_one(query)
             weights = dict(doc.get("weights", {})) if doc else {}
             update_count = (doc.get("update_count", 0) if doc else 0) + 1
 
-            # prediction
-            y_hat = _sigmoid(_dot(weights, feats))
-            error = y - y_hat
-
-            # gradient update with L2 regularization
-            for feat, x in feats.items():
-                grad = error * x - REGULARIZATION * weights.get(feat, 0.0)
-                new_w = weights.get(feat, 0.0) + LEARNING_RATE * grad
-                weights[feat] = max(-MAX_WEIGHT, min(MAX_WEIGHT, new_w))
+            y_hat, error = apply_gradient(weights, feats, y)
 
-            await self._save_weights(user_id, slot_type, weights, update_count, mode=mode_key)
+            await self._save_weights(user_id, slot_type, weights, update_count, mode=mode)
             logger.info(
-                f"\U0001f52c FWL update: user={user_id[:8]} slot={slot_type} mode={mode_key} "
+                f"\U0001f52c FWL update: user={user_id[:8]} slot={slot_type} mode={mode} "
                 f"action={action_type} y={y:.2f} \u0177={y_hat:.2f} error={error:+.2f}"
             )
         except Exception as e:
@@ -337,24 +444,22 @@ class FeatureWeightLearner:
             return [0.5] * len(options)
 
         slot_type = _normalize_slot(slot_name)
-        mode_key = session_mode.lower().strip() if session_mode.lower().strip() in ("ask", "agent") else "any"
+        mode = mode_key(session_mode)
 
-        # โหลด weights: ใช้ mode-specific ก่อน fallback ไป 'any'
-        weights = await self._load_weights(user_id, slot_type, mode_key)
-        if not weights and mode_key != "any":
+        # โหลด weights: ใช้ mode-specific ก่อน fallback ไป 'any' (รวม update ที่ยังค้างใน RL pipeline)
+        weights = await self._load_weights(user_id, slot_type, mode)
+        if not weights and mode != "any":
             weights = await self._load_weights(user_id, slot_type, "any")
         if not weights:
             return [0.5] * len(options)
 
-        scores = []
-        for opt in options:
-            feats = extract_features(opt, slot_name)
-            if not feats:
-                scores.append(0.5)
-            else:
-                raw = _dot(weights, feats)
-                scores.append(round(_sigmoid(raw), 4))
-        return scores
+        # Vectorized: feature matrix ครั้งเดียว → sigmoid(X · w)
+        names, X, mask = extract_feature_matrix(options, slot_name)
+        if not names:
+            return [0.5] * len(options)
+        w = np.array([weights.get(k, 0.0) for k in names], dtype=np.float64)
+        scores = np.where(mask, sigmoid(X @ w), 0.5)
+        return round4(scores)
 
     # ── Human-readable preference summary ─────────────────────────────────────
 
@@ -0,0 +1,256 @@
+"""
+Ranking engine แบบ vectorized (NumPy) สำหรับจัดอันดับตัวเลือกการเดินทาง
+
+ดึง feature ของทุก option เป็น column matrix ครั้งเดียว แล้วคำนวณทั้งหมดเป็น array operation:
+- Min-Max normalization ต่อเกณฑ์ (กลับค่าเกณฑ์ที่ต่ำ = ดี)
+- Weighted Sum ตามประเภท (TYPE_WEIGHTS): S_i = Σ w_j * x_ij'
+- ผสมคะแนนเฉพาะ user: RL Q-score + FWL (learned feature weights)
+คืนลำดับ (ranked indices) พร้อม explanation vector (คะแนนย่อยของแต่ละเกณฑ์) ต่อ option
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+# ── Weighted Sum weights per type ───────────────────────────────────────────────
+#   flight : price=0.35, duration=0.30, stops=0.20, rating=0.10, review_count=0.05
+#   hotel  : price=0.30, rating=0.35, review_count=0.20, distance=0.15
+#   transfer: price=0.40, duration=0.35, rating=0.25
+#   default: price=0.50, rating=0.30, review_count=0.20
+TYPE_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "flight":   {"price": 0.35, "duration_min": 0.30, "stops": 0.20, "rating": 0.10, "review_count": 0.05},
+    "hotel":    {"price": 0.30, "rating": 0.35, "review_count": 0.20, "distance": 0.15},
+    "transfer": {"price": 0.40, "duration_min": 0.35, "rating": 0.25},
+    "default":  {"price": 0.50, "rating": 0.30, "review_count": 0.20},
+}
+# Criteria where lower = better (inverted after normalization)
+INVERSE_CRITERIA = frozenset({"price", "duration_min", "stops", "distance"})
+
+# RL/FWL blend (เหมือน Agent Mode): q = 0.6*rl + 0.4*(fwl-0.5)*2, bonus = (q+1)/2 * 0.20
+RL_WEIGHT = 0.6
+FWL_WEIGHT = 0.4
+RL_BONUS_SCALE = 0.20
+
+
+def dur_to_min(d: Optional[str]) -> float:
+    """ISO 8601 duration → minutes, e.g. PT2H30M → 150"""
+    if not d or not d.startswith("PT"):
+        return 0.0
+    return _parse_pt_minutes(d)
+
+
+@lru_cache(maxsize=4096)
+def _parse_pt_minutes(d: str) -> float:
+    # pool หนึ่งมี duration ซ้ำกันมาก — cache ผล parse
+    try:
+        h = int(d.split('H')[0].replace('PT', '')) if 'H' in d else 0
+        m_part = d.split('H')[1] if 'H' in d else d.replace('PT', '')
+        m = int(m_part.replace('M', '')) if 'M' in m_part else 0
+        return float(h * 60 + m)
+    except Exception:
+        return 0.0
+
+
+def item_value(item: Any, key: str) -> float:
+    """Extract a numeric ranking criterion from a StandardizedItem (0.0 when missing)."""
+    if key == "price":
+        return item.price_amount if item.is_price_available else 0.0
+    if key == "duration_min":
+        return dur_to_min(item.duration or "")
+    if key == "stops":
+        return float(getattr(item, "stops", 0) or 0)
+    if key == "rating":
+        r = getattr(item, "rating", None) or getattr(item, "stars", None)
+        return float(r) if r else 0.0
+    if key == "review_count":
+        rc = getattr(item, "review_count", None) or getattr(item, "reviews_count", None)
+        return float(rc) if rc else 0.0
+    if key == "distance":
+        d = getattr(item, "distance", None) or getattr(item, "distance_km", None)
+        return float(d) if d else 0.0
+    return 0.0
+
+
+def _opt_float(value: Any) -> float:
+    return float(value) if value else 0.0
+
+
+def _field(item: Any, name: str) -> Any:
+    """
+    getattr(item, name, None) ที่เร็วกับ pydantic model: attribute ที่ไม่มีใน model
+    (stops / stars / distance บน StandardizedItem) ทำให้ getattr วิ่งผ่าน __getattr__ + exception ทุกครั้ง
+    """
+    d = getattr(item, "__dict__", None)
+    if d is not None and name in d:
+        return d[name]
+    if isinstance(item, BaseModel):
+        extra = item.__pydantic_extra__
+        return extra.get(name) if extra else None
+    return getattr(item, name, None)
+
+
+# คอลัมน์ละหนึ่ง list comprehension (เร็วกว่าเรียก item_value ทีละ cell) — ต้องให้ผลเท่ากับ item_value
+_COLUMN_EXTRACTORS: Dict[str, Any] = {
+    "price": lambda items: [it.price_amount if it.is_price_available else 0.0 for it in items],
+    "duration_min": lambda items: [dur_to_min(it.duration or "") for it in items],
+    "stops": lambda items: [float(_field(it, "stops") or 0) for it in items],
+    "rating": lambda items: [_opt_float(_field(it, "rating") or _field(it, "stars")) for it in items],
+    "review_count": lambda items: [
+        _opt_float(_field(it, "review_count") or _field(it, "reviews_count")) for it in items
+    ],
+    "distance": lambda items: [_opt_float(_field(it, "distance") or _field(it, "distance_km")) for it in items],
+}
+
+
+def item_feature_matrix(items: Sequence[Any], criteria: Sequence[str]) -> np.ndarray:
+    """Column matrix (n_items × n_criteria) of raw criterion values, extracted column by column."""
+    X = np.zeros((len(items), len(criteria)), dtype=np.float64)
+    if not len(items):
+        return X
+    for j, k in enumerate(criteria):
+        extract = _COLUMN_EXTRACTORS.get(k)
+        if extract is not None:
+            X[:, j] = extract(items)
+    return X
+
+
+def minmax_normalize(
+    X: np.ndarray,
+    inverse: Optional[Iterable[bool]] = None,
+    clamp: bool = False,
+) -> np.ndarray:
+    """
+    Column-wise Min-Max: x' = (x - min) / (max - min).
+    NaN = missing → 0.5; constant (or all-missing) column → 0.5; inverse columns → 1 - x'.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X[:, None]
+    if X.size == 0:
+        return X.copy()
+    valid = ~np.isnan(X)
+    lo = np.where(valid, X, np.inf).min(axis=0)
+    hi = np.where(valid, X, -np.inf).max(axis=0)
+    span = hi - lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        N = np.where(span > 0, (X - lo) / np.where(span > 0, span, 1.0), 0.5)
+    N = np.where(valid, N, 0.5)
+    if clamp:
+        np.clip(N, 0.0, 1.0, out=N)
+    if inverse is not None:
+        inv = np.asarray(list(inverse), dtype=bool)
+        if inv.any():
+            N[:, inv] = 1.0 - N[:, inv]
+    return N
+
+
+def sigmoid(z: np.ndarray) -> np.ndarray:
+    """Numerically stable element-wise sigmoid."""
+    z = np.asarray(z, dtype=np.float64)
+    out = np.empty_like(z)
+    pos = z >= 0
+    out[pos] = 1.0 / (1.0 + np.exp(-z[pos]))
+    e = np.exp(z[~pos])
+    out[~pos] = e / (1.0 + e)
+    return out
+
+
+def round4(values: Iterable[float]) -> List[float]:
+    """Round like the scalar code paths (Python round, 4 dp) so stored scores stay identical."""
+    return [round(float(v), 4) for v in values]
+
+
+def blend_rl_fwl(rl_scores: Sequence[float], fwl_scores: Sequence[float]) -> np.ndarray:
+    """combined = 0.6 * rl + 0.4 * (fwl - 0.5) * 2 — FWL 0.5 (no data) leaves the RL score unchanged."""
+    rl = np.asarray(rl_scores, dtype=np.float64)
+    fwl = np.asarray(fwl_scores, dtype=np.float64)
+    return rl * RL_WEIGHT + (fwl - 0.5) * 2.0 * FWL_WEIGHT
+
+
+def rl_bonus(q_scores: Sequence[float]) -> np.ndarray:
+    """Map combined RL/FWL Q [-1, +1] → [0, 0.2]."""
+    return (np.asarray(q_scores, dtype=np.float64) + 1.0) / 2.0 * RL_BONUS_SCALE
+
+
+@dataclass
+class RankResult:
+    """
+    ผลการจัดอันดับ
+    - order: index ของ option จากดีที่สุด → แย่ที่สุด
+    - scores: คะแนนรวมต่อ option (index ตรงกับ input)
+    - contributions: explanation vectors (n × k) = คะแนนย่อยของแต่ละ component ใน `components`
+    """
+    components: List[str]
+    raw: np.ndarray
+    normalized: np.ndarray
+    contributions: np.ndarray
+    scores: np.ndarray
+    order: np.ndarray = field(default=None)  # type: ignore[assignment]
+
+    def __post_init__(self) -> None:
+        if self.order is None:
+            self.order = _stable_desc(self.scores)
+
+    def explain(self, index: int) -> Dict[str, float]:
+        """Per-component score contributions of one option (e.g. for tooltips / LLM context)."""
+        return {c: round(float(v), 4) for c, v in zip(self.components, self.contributions[index])}
+
+    def with_personalization(self, q_scores: Sequence[float]) -> "RankResult":
+        """Add the RL/FWL bonus as an extra explanation component and re-rank."""
+        bonus = rl_bonus(q_scores)
+        contributions = np.column_stack([self.contributions, bonus])
+        scores = self.scores + bonus
+        return RankResult(
+            components=[*self.components, "rl_bonus"],
+            raw=self.raw,
+            normalized=self.normalized,
+            contributions=contributions,
+            scores=scores,
+        )
+
+
+def _stable_desc(scores: np.ndarray) -> np.ndarray:
+    # stable เหมือน list.sort(key=-score): ค่าเท่ากันคงลำดับเดิม
+    return np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable")
+
+
+def rank_matrix(
+    X: np.ndarray,
+    criteria: Sequence[str],
+    weights: Dict[str, float],
+    inverse: Iterable[str] = INVERSE_CRITERIA,
+) -> RankResult:
+    """Normalize a raw criterion matrix and apply type weights: S_i = Σ w_j * x_ij'."""
+    inverse = set(inverse)
+    N = minmax_normalize(X, [k in inverse for k in criteria])
+    w = np.array([weights.get(k, 0.0) for k in criteria], dtype=np.float64)
+    contributions = N * w
+    return RankResult(
+        components=list(criteria),
+        raw=np.asarray(X, dtype=np.float64),
+        normalized=N,
+        contributions=contributions,
+        scores=contributions.sum(axis=1),
+    )
+
+
+def rank_items(items: Sequence[Any], request_type: str) -> RankResult:
+    """Weighted Sum ranking of StandardizedItems using TYPE_WEIGHTS[request_type]."""
+    weights = TYPE_WEIGHTS.get(request_type, TYPE_WEIGHTS["default"])
+    criteria = list(weights)
+    return rank_matrix(item_feature_matrix(items, criteria), criteria, weights)
+
+
+def personalized_final_scores(
+    weighted_scores: Sequence[float], q_scores: Sequence[float]
+) -> np.ndarray:
+    """final = weighted_score + rl_bonus(q) — the blend used by Agent Mode and the ask-mode recommender."""
+    ws = np.asarray(weighted_scores, dtype=np.float64)
+    q = np.zeros(len(ws), dtype=np.float64)
+    n = min(len(ws), len(q_scores))
+    q[:n] = np.asarray(q_scores[:n], dtype=np.float64)
+    return ws + rl_bonus(q)
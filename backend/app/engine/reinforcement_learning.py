@@ -11,7 +11,10 @@ from datetime import datetime, timedelta
 import json
 import asyncio
 
+from app.core.config import settings
 from app.core.logging import get_logger
+from app.engine.rl_pipeline import RewardEvent, get_rl_pipeline, peek_rl_pipeline
+from app.engine.ranking_engine import blend_rl_fwl, personalized_final_scores, round4
 
 logger = get_logger(__name__)
 
@@ -78,7 +81,9 @@ class RLService:
       user_id, slot_name, option_key, q_value, visit_count, last_updated
 
     Reward history schema (collection: user_feedback_history):
-      user_id, action_type, slot_name, option_key, reward, context, created_at
+      user_id, action_type, slot_name, option_key, reward, context, created_at, created_ts (TTL)
+
+    record_reward ส่ง event เข้า RLEventPipeline (write-behind) เมื่อเปิด rl_pipeline_enabled
     """
 
     GAMMA = 0.9          # discount factor
@@ -132,6 +137,27 @@ class RLService:
         reward = _calc_reward(action_type, context)
         option_key = self._option_key(slot_name, option) if option else f"{slot_name}:unknown"
 
+        if settings.rl_pipeline_enabled:
+            # write-behind: คืนทันที — worker รวม event แล้วเขียนเป็น bulk_write (ดู rl_pipeline)
+            try:
+                await get_rl_pipeline().submit(RewardEvent(
+                    user_id=user_id,
+                    action_type=action_type,
+                    slot_name=slot_name,
+                    option_key=option_key,
+                    reward=reward,
+                    option=option,
+                    context=context or {},
+                    session_mode=session_mode,
+                ))
+                logger.info(
+                    f"🧠 RL: user={user_id[:8]} action={action_type} "
+                    f"slot={slot_name} reward={reward:+.2f} key={option_key[:30]} (queued)"
+                )
+            except Exception as e:
+                logger.warning(f"RL record_reward enqueue error: {e}")
+            return
+
         db = self._get_db()
         if db is None:
             logger.warning("RL: DB not available, skipping record_reward")
@@ -148,6 +174,7 @@ class RLService:
                 "reward": reward,
                 "context": context or {},
                 "created_at": datetime.utcnow().isoformat(),
+                "created_ts": datetime.utcnow(),
             })
 
             # ตัด history เก่าออก (keep MAX_HISTORY ล่าสุด)
@@ -201,6 +228,8 @@ class RLService:
                 f"🧠 RL: user={user_id[:8]} action={action_type} "
                 f"slot={slot_name} reward={reward:+.2f} key={option_key[:30]}"
             )
+            from app.services.selection_preferences import schedule_selection_summary_refresh
+            schedule_selection_summary_refresh(user_id)
 
             # ── ML Feature Weight Learning (FWL) ─────────────────────────────
             # อัปเดต feature weights ต่อ user ทันที (Online Gradient Descent)
@@ -251,7 +280,12 @@ class RLService:
             ).to_list(length=len(keys))
 
             q_map = {d["option_key"]: d["q_value"] for d in docs}
-            rl_scores = [q_map.get(k, 0.0) for k in keys]
+            pipeline = peek_rl_pipeline()
+            if pipeline is not None and pipeline.has_pending_q(user_id, slot_name):
+                # reward ที่ยังไม่ถูก flush ลง MongoDB
+                rl_scores = [pipeline.adjust_q(user_id, slot_name, k, q_map.get(k, 0.0)) for k in keys]
+            else:
+                rl_scores = [q_map.get(k, 0.0) for k in keys]
 
             # ── Blend RL Q-score + FWL score ────────────────────────────────
             # combined = 0.6 * rl_score_normalized + 0.4 * (fwl_score - 0.5)*2
@@ -264,12 +298,8 @@ class RLService:
             except Exception:
                 fwl_scores = [0.5] * len(options)
 
-            combined = []
-            for rl, fwl in zip(rl_scores, fwl_scores):
-                fwl_delta = (fwl - 0.5) * 2.0   # re-center: 0.5→0, 1.0→+1, 0.0→-1
-                blended = rl * 0.6 + fwl_delta * 0.4
-                combined.append(round(blended, 4))
-            return combined
+            # fwl re-center: 0.5→0, 1.0→+1, 0.0→-1 (vectorized)
+            return round4(blend_rl_fwl(rl_scores, fwl_scores))
 
         except Exception as e:
             logger.warning(f"RL get_option_scores error: {e}")
@@ -540,11 +570,9 @@ async def apply_personalized_recommendation_to_options(
         rl_svc = get_rl_service()
         pool = list(options)
         rl_scores = await rl_svc.get_option_scores(user_id, slot_name, pool, session_mode=session_mode)
-        for i, opt in enumerate(pool):
-            ws = float(opt.get("weighted_score", 0.5))
-            q = float(rl_scores[i]) if i < len(rl_scores) else 0.0
-            rl_bonus = (q + 1.0) / 2.0 * 0.20
-            opt["_final_score"] = round(ws + rl_bonus, 4)
+        final = personalized_final_scores([float(opt.get("weighted_score", 0.5)) for opt in pool], rl_scores)
+        for opt, score in zip(pool, round4(final)):
+            opt["_final_score"] = score
 
         pool.sort(key=lambda x: -x.get("_final_score", 0.0))
 
@@ -0,0 +1,456 @@
+"""
+Write-behind pipeline ของ RL reward / Feature Weight Learning
+
+เดิม RLService.record_reward ทำงานกับ MongoDB ตรงๆ ทุก event (insert history → count_documents →
+find+delete_many ตัด history → find_one+update/insert Q-table → FWL find_one+update_one) = 7+ round trip
+ต่อการคลิกหนึ่งครั้ง และ select_choice / auto-select ใน Agent Mode ต้องรอจนครบ
+
+ตอนนี้ record_reward แค่ใส่ RewardEvent ลง asyncio.Queue แบบมีขอบเขต แล้ว worker เดียวต่อ process:
+- รวม Q-update ต่อ (user, slot, option_key) เป็น affine delta: Q ← Q + α(r − Q) ซ้ำ k ครั้ง
+  = (1−α)^k·Q + Σ α(1−α)^(k−i)·r_i → เขียนด้วย update pipeline (upsert) โดยไม่ต้องอ่าน Q เดิม
+- FWL: โหลด weights ที่ยังไม่มีในหน่วยความจำด้วย find เดียวต่อ batch แล้วทำ gradient step ในหน่วยความจำ
+  (โหลดไม่ได้ → เก็บ event ไว้รอโหลดรอบหน้า ไม่เริ่มจาก weights ว่าง ซึ่งจะ $set ทับค่าที่เรียนไว้)
+- ทุก flush_interval วินาที (หรือครบ flush_batch_size event) เขียน history / Q-table / weights
+  อย่างละหนึ่ง bulk_write
+- ตัด history: TTL index บน created_ts แทน count + delete ต่อ event
+get_option_scores / score_options อ่านค่าที่ยังค้างอยู่ในนี้ทับค่าจาก MongoDB (ระหว่าง bulk_write
+ที่กำลังเขียนอยู่ delta ถูกย้ายออกจาก _q_pending แล้วแต่ยังไม่ลง MongoDB → อาจเห็นค่าขาด delta นั้นชั่วคราว
+จนกว่า flush จะจบ)
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+from pymongo import InsertOne, UpdateOne
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.engine.feature_learning import (
+    COLLECTION_FWL,
+    _label_from_action,
+    _normalize_slot,
+    apply_gradient,
+    extract_features,
+    mode_key,
+)
+
+logger = get_logger(__name__)
+
+COLLECTION_REWARDS = "user_feedback_history"
+COLLECTION_QTABLE = "user_preference_scores"
+
+QKey = Tuple[str, str, str]        # (user_id, slot_name, option_key)
+WeightKey = Tuple[str, str, str]   # (user_id, slot_type, mode)
+
+
+@dataclass
+class RewardEvent:
+    user_id: str
+    action_type: str
+    slot_name: str
+    option_key: str
+    reward: float
+    option: Any = None
+    context: Dict[str, Any] = field(default_factory=dict)
+    session_mode: str = ""
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass
+class QDelta:
+    """Pending Q-learning updates for one key as Q_new = mult * Q_old + add."""
+    mult: float = 1.0
+    add: float = 0.0
+    visits: int = 0
+    last_action: str = ""
+
+    def apply_reward(self, reward: float, alpha: float, action_type: str) -> None:
+        self.mult *= 1.0 - alpha
+        self.add = self.add * (1.0 - alpha) + alpha * reward
+        self.visits += 1
+        self.last_action = action_type
+
+    def value(self, q_old: float) -> float:
+        return self.mult * q_old + self.add
+
+    def then(self, later: "QDelta") -> "QDelta":
+        """This delta followed by `later` (used to merge back after a failed flush)."""
+        return QDelta(
+            mult=self.mult * later.mult,
+            add=later.mult * self.add + later.add,
+            visits=self.visits + later.visits,
+            last_action=later.last_action or self.last_action,
+        )
+
+
+@dataclass
+class WeightState:
+    weights: Dict[str, float]
+    update_count: int
+    dirty: int = 0   # gradient steps not yet persisted
+
+
+class RLEventPipeline:
+    """Bounded reward-event queue + one background worker that batches MongoDB writes."""
+
+    def __init__(
+        self,
+        alpha: float,
+        queue_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        flush_batch_size: Optional[int] = None,
+        db: Any = None,
+    ):
+        self.alpha = alpha
+        self.flush_interval = flush_interval or settings.rl_flush_interval_seconds
+        self.flush_batch_size = flush_batch_size or settings.rl_flush_batch_size
+        self._queue: "asyncio.Queue[RewardEvent]" = asyncio.Queue(maxsize=queue_size or settings.rl_event_queue_size)
+        # history ที่ยังไม่ถูกเขียนมีเพดานเท่าขนาดคิว (DB ล่ม/ไม่มี → ทิ้งตัวเก่าสุดแทนการโตไม่จำกัด)
+        self._max_pending_history = queue_size or settings.rl_event_queue_size
+        self._last_no_db_warning = 0.0
+        self._db = db
+        self._q_pending: Dict[QKey, QDelta] = {}
+        self._weights: Dict[WeightKey, WeightState] = {}
+        # FWL events ของ key ที่ยังโหลด weights เดิมไม่ได้ (รอโหลดสำเร็จก่อนค่อยทำ gradient step)
+        self._fwl_pending: Dict[WeightKey, List[Tuple[Dict[str, float], float]]] = {}
+        self._fwl_pending_count = 0
+        self._history: List[Dict[str, Any]] = []
+        self._unflushed = 0
+        self._worker: Optional["asyncio.Task[None]"] = None
+        self._flush_lock = asyncio.Lock()
+        self._apply_lock = asyncio.Lock()
+        self._stats = {
+            "events": 0, "applied": 0, "flushes": 0, "bulk_writes": 0, "queue_full": 0, "errors": 0,
+            "history_dropped": 0, "flush_skipped_no_db": 0, "fwl_load_failed": 0, "fwl_dropped": 0,
+        }
+
+    def _get_db(self):
+        if self._db is not None:
+            return self._db
+        from app.storage.connection_manager import ConnectionManager
+        return ConnectionManager.get_instance().get_mongo_database()
+
+    # ---------- producer side ----------
+
+    async def submit(self, event: RewardEvent) -> None:
+        """Enqueue without waiting for MongoDB; when the queue is full, flush inline once (backpressure)."""
+        self._stats["events"] += 1
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            self._stats["queue_full"] += 1
+        await self._drain_and_flush()
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # worker ยังตามไม่ทัน → ใช้ event นี้ตรงๆ (ไม่ทิ้ง)
+            await self._apply_batch([event])
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            return
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    # ---------- worker ----------
+
+    async def _run(self) -> None:
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                if self._unflushed >= self.flush_batch_size and self._get_db() is None:
+                    # ไม่มี DB: หยุดดึงจากคิว ให้คิวเต็มแล้ว submit ใช้ backpressure แทนการสะสมในหน่วยความจำ
+                    await asyncio.sleep(self.flush_interval)
+                    await self.flush()
+                    deadline = time.monotonic() + self.flush_interval
+                    continue
+                timeout = max(0.0, deadline - time.monotonic())
+                try:
+                    first = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                    batch = [first]
+                    while len(batch) < self.flush_batch_size:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except asyncio.QueueEmpty:
+                            break
+                    await self._apply_batch(batch)
+                except asyncio.TimeoutError:
+                    pass
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    logger.warning(f"RL pipeline apply error: {e}")
+                if time.monotonic() >= deadline or self._unflushed >= self.flush_batch_size:
+                    try:
+                        await self.flush()
+                    except Exception as e:
+                        self._stats["errors"] += 1
+                        logger.warning(f"RL pipeline flush error: {e}")
+                    deadline = time.monotonic() + self.flush_interval
+        except asyncio.CancelledError:
+            pass
+
+    async def _apply_batch(self, events: List[RewardEvent]) -> None:
+        """Fold events into the in-memory Q deltas, FWL weights and pending history."""
+        async with self._apply_lock:
+            await self._apply_locked(events)
+
+    async def _apply_locked(self, events: List[RewardEvent]) -> None:
+        fwl_events = []
+        for ev in events:
+            self._history.append({
+                "user_id": ev.user_id,
+                "action_type": ev.action_type,
+                "slot_name": ev.slot_name,
+                "option_key": ev.option_key,
+                "reward": ev.reward,
+                "context": ev.context,
+                "created_at": ev.created_at.isoformat(),
+                "created_ts": ev.created_at,  # TTL index (rl_feedback_ttl_days)
+            })
+            key = (ev.user_id, ev.slot_name, ev.option_key)
+            self._q_pending.setdefault(key, QDelta()).apply_reward(ev.reward, self.alpha, ev.action_type)
+            if ev.option is not None:
+                y = _label_from_action(ev.action_type, ev.context)
+                feats = extract_features(ev.option, ev.slot_name) if y is not None else None
+                if feats:
+                    fwl_events.append(((ev.user_id, _normalize_slot(ev.slot_name), mode_key(ev.session_mode)), feats, y))
+        if fwl_events or self._fwl_pending:
+            await self._load_weights({k for k, _, _ in fwl_events} | set(self._fwl_pending))
+            self._replay_pending_weights()
+            for key, feats, y in fwl_events:
+                if key in self._weights:
+                    self._apply_gradient(key, feats, y)
+                else:
+                    self._defer_gradient(key, feats, y)
+        self._trim_history()
+        self._unflushed += len(events)
+        self._stats["applied"] += len(events)
+
+    def _trim_history(self) -> None:
+        over = len(self._history) - self._max_pending_history
+        if over > 0:
+            del self._history[:over]
+            self._stats["history_dropped"] += over
+
+    def _apply_gradient(self, key: WeightKey, feats: Dict[str, float], y: float) -> None:
+        state = self._weights[key]
+        apply_gradient(state.weights, feats, y)
+        state.update_count += 1
+        state.dirty += 1
+
+    def _defer_gradient(self, key: WeightKey, feats: Dict[str, float], y: float) -> None:
+        self._fwl_pending.setdefault(key, []).append((feats, y))
+        self._fwl_pending_count += 1
+        if self._fwl_pending_count > self._max_pending_history:
+            # เพดานเดียวกับ history: ทิ้ง event เก่าสุดของ key ที่ค้างมากที่สุด
+            busiest = max(self._fwl_pending, key=lambda k: len(self._fwl_pending[k]))
+            self._fwl_pending[busiest].pop(0)
+            if not self._fwl_pending[busiest]:
+                del self._fwl_pending[busiest]
+            self._fwl_pending_count -= 1
+            self._stats["fwl_dropped"] += 1
+
+    def _replay_pending_weights(self) -> None:
+        """Apply deferred FWL events whose base weights have been loaded since."""
+        for key in [k for k in self._fwl_pending if k in self._weights]:
+            events = self._fwl_pending.pop(key)
+            self._fwl_pending_count -= len(events)
+            for feats, y in events:
+                self._apply_gradient(key, feats, y)
+
+    async def _load_weights(self, keys: set) -> None:
+        """Load stored weights for keys not in memory; on no DB / read error, create no state for them."""
+        missing = [k for k in keys if k not in self._weights]
+        if not missing:
+            return
+        db = self._get_db()
+        if db is None:
+            return
+        docs: Dict[WeightKey, Dict[str, Any]] = {}
+        try:
+            cursor = db[COLLECTION_FWL].find(
+                {"$or": [{"user_id": u, "slot_type": s, "mode": m} for u, s, m in missing]},
+                {"user_id": 1, "slot_type": 1, "mode": 1, "weights": 1, "update_count": 1, "_id": 0},
+            )
+            for doc in await cursor.to_list(length=len(missing)):
+                docs[(doc.get("user_id"), doc.get("slot_type"), doc.get("mode"))] = doc
+        except Exception as e:
+            self._stats["fwl_load_failed"] += 1
+            logger.warning(f"RL pipeline FWL load error, deferring {len(missing)} weight sets: {e}")
+            return
+        for key in missing:
+            doc = docs.get(key) or {}
+            self._weights.setdefault(key, WeightState(dict(doc.get("weights") or {}), int(doc.get("update_count") or 0)))
+
+    # ---------- flush ----------
+
+    async def _drain_and_flush(self) -> None:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        if batch:
+            await self._apply_batch(batch)
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Persist everything applied so far: one bulk_write per collection. Returns events flushed."""
+        if self._fwl_pending and self._get_db() is not None:
+            # ลองโหลด weights ของ event ที่ค้างอีกครั้ง (key นั้นอาจไม่มี event ใหม่เข้ามาอีก)
+            async with self._apply_lock:
+                await self._load_weights(set(self._fwl_pending))
+                self._replay_pending_weights()
+        async with self._flush_lock:
+            if not self._unflushed and not any(st.dirty for st in self._weights.values()):
+                # (weights ที่เพิ่ง replay จาก event ค้างยังต้องเขียน แม้ event ถูกนับว่า flush ไปแล้ว)
+                return 0
+            db = self._get_db()
+            if db is None:
+                self._stats["flush_skipped_no_db"] += 1
+                now = time.monotonic()
+                if now - self._last_no_db_warning >= 60.0:
+                    self._last_no_db_warning = now
+                    logger.warning(
+                        f"RL pipeline: DB not available, keeping {len(self._history)} pending history events "
+                        f"(cap {self._max_pending_history}, dropped so far {self._stats['history_dropped']})"
+                    )
+                return 0
+            history, self._history = self._history, []
+            q_pending, self._q_pending = self._q_pending, {}
+            dirty = {k: (st, st.dirty) for k, st in self._weights.items() if st.dirty}
+            flushed, self._unflushed = self._unflushed, 0
+            now_iso = datetime.utcnow().isoformat()
+
+            writes = []
+            if history:
+                writes.append(db[COLLECTION_REWARDS].bulk_write([InsertOne(d) for d in history], ordered=False))
+            if q_pending:
+                writes.append(db[COLLECTION_QTABLE].bulk_write(
+                    [self._q_update(key, delta, now_iso) for key, delta in q_pending.items()], ordered=False
+                ))
+            if dirty:
+                writes.append(db[COLLECTION_FWL].bulk_write([
+                    UpdateOne(
+                        {"user_id": u, "slot_type": s, "mode": m},
+                        {"$set": {
+                            "weights": dict(st.weights),
+                            "update_count": st.update_count,
+                            "mode": m,
+                            "last_updated": now_iso,
+                        }},
+                        upsert=True,
+                    )
+                    for (u, s, m), (st, _) in dirty.items()
+                ], ordered=False))
+            results = await asyncio.gather(*writes, return_exceptions=True)
+            errors = [r for r in results if isinstance(r, Exception)]
+            if errors:
+                self._stats["errors"] += len(errors)
+                logger.warning(f"RL pipeline flush failed ({len(errors)}/{len(writes)} bulk writes): {errors[0]}")
+                self._restore(history, q_pending, results, bool(history), flushed)
+            else:
+                for key, (st, count) in dirty.items():
+                    st.dirty -= count
+                    if not st.dirty:
+                        # persisted → อ่านจาก MongoDB (ได้ค่าจาก worker อื่นด้วย)
+                        self._weights.pop(key, None)
+                # reward ใหม่ลง MongoDB แล้ว → คำนวณสรุปความชอบ (selection_preferences) ใหม่
+                from app.services.selection_preferences import schedule_selection_summary_refresh
+                for user_id in {d["user_id"] for d in history}:
+                    schedule_selection_summary_refresh(user_id)
+            self._stats["flushes"] += 1
+            self._stats["bulk_writes"] += len(writes)
+            logger.debug(
+                f"RL pipeline flushed {flushed} events: {len(history)} history, {len(q_pending)} Q keys, "
+                f"{len(dirty)} FWL weight sets in {len(writes)} bulk writes"
+            )
+            return flushed
+
+    def _q_update(self, key: QKey, delta: QDelta, now_iso: str) -> UpdateOne:
+        user_id, slot_name, option_key = key
+        # update pipeline: ใช้ Q เดิมใน document (ไม่มี = 0) โดยไม่ต้อง find_one ก่อน
+        return UpdateOne(
+            {"user_id": user_id, "slot_name": slot_name, "option_key": option_key},
+            [{"$set": {
+                "q_value": {"$round": [
+                    {"$add": [{"$multiply": [{"$ifNull": ["$q_value", 0.0]}, delta.mult]}, delta.add]}, 4
+                ]},
+                "visit_count": {"$add": [{"$ifNull": ["$visit_count", 0]}, delta.visits]},
+                "last_updated": now_iso,
+                "last_action": delta.last_action,
+            }}],
+            upsert=True,
+        )
+
+    def _restore(self, history, q_pending, results, had_history: bool, flushed: int) -> None:
+        """Put back the parts whose bulk_write failed so the next flush retries them."""
+        idx = 0
+        if had_history:
+            if isinstance(results[idx], Exception):
+                self._history = history + self._history
+                self._trim_history()
+            idx += 1
+        if q_pending and isinstance(results[idx], Exception):
+            for key, delta in q_pending.items():
+                later = self._q_pending.get(key)
+                self._q_pending[key] = delta.then(later) if later else delta
+        # FWL: dirty counter ไม่ถูกลด → flush รอบหน้าเขียนซ้ำเอง
+        self._unflushed += flushed
+
+    async def close(self) -> None:
+        """Apply whatever is queued, flush, and stop the worker (lifespan shutdown)."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        await self._drain_and_flush()
+
+    # ---------- read side ----------
+
+    def adjust_q(self, user_id: str, slot_name: str, option_key: str, q_value: float) -> float:
+        delta = self._q_pending.get((user_id, slot_name, option_key))
+        return delta.value(q_value) if delta else q_value
+
+    def has_pending_q(self, user_id: str, slot_name: str) -> bool:
+        return any(k[0] == user_id and k[1] == slot_name for k in self._q_pending)
+
+    def pending_weights(self, user_id: str, slot_type: str, mode: str) -> Optional[Dict[str, float]]:
+        state = self._weights.get((user_id, slot_type, mode))
+        return dict(state.weights) if state is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize(),
+            "unflushed_events": self._unflushed,
+            "pending_q_keys": len(self._q_pending),
+            "pending_weight_sets": sum(1 for st in self._weights.values() if st.dirty),
+            "deferred_fwl_events": self._fwl_pending_count,
+            "pending_history": len(self._history),
+        }
+
+
+_pipeline: Optional[RLEventPipeline] = None
+
+
+def get_rl_pipeline() -> RLEventPipeline:
+    global _pipeline
+    if _pipeline is None:
+        from app.engine.reinforcement_learning import RLService
+        _pipeline = RLEventPipeline(alpha=RLService.ALPHA)
+    return _pipeline
+
+
+def peek_rl_pipeline() -> Optional[RLEventPipeline]:
+    """The pipeline if one was created in this process (read paths must not create it)."""
+    return _pipeline
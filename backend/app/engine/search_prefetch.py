@@ -0,0 +1,348 @@
+"""
+Speculative search prefetch: เริ่มค้นหา Amadeus ตั้งแต่ต้นเทิร์น (ขนานกับ Controller LLM)
+
+- ML intent (flight/hotel/ปลายทาง) ชัดพอ + slot ครบ → เดา requirements ที่ CALL_SEARCH จะใช้แล้วยิงค้นหาทันที
+- งานที่ค้างอยู่เก็บใน registry ต่อเทิร์น (ContextVar) โดยใช้ key เดียวกับ TravelAgent._create_cache_key
+- _execute_call_search เข้าร่วม (join) งานที่ตรง key + พารามิเตอร์ แทนการยิงใหม่
+- requirements สุดท้ายไม่ตรง (diverge) หรือจบเทิร์นแล้วไม่มีใครใช้ → ยกเลิก; สถิติ hit/miss ดูได้ที่ /api/monitoring/search-prefetch
+"""
+
+from __future__ import annotations
+from collections import deque
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TYPE_CHECKING
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from app.models.trip_plan import TripPlan
+
+logger = get_logger(__name__)
+
+FLIGHT_INTENTS = frozenset({"flight", "destination", "booking", "date"})
+HOTEL_INTENTS = frozenset({"hotel", "destination", "booking", "date"})
+
+_FLIGHT_SLOTS = ("flights_outbound", "flights_inbound")
+_HOTEL_SLOTS = ("accommodation",)
+# ต่ำกว่านี้ ไม่ใช้ intent จำกัดว่าจะค้นเฉพาะเที่ยวบินหรือเฉพาะที่พัก
+_SLOT_INTENT_CONFIDENCE = 0.5
+
+SearchResult = Tuple[Dict[str, Any], Optional[str]]
+
+
+def flight_search_params(req: Dict[str, Any], return_date: Optional[str], non_stop: bool) -> Dict[str, Any]:
+    """MCP search_flights params built from segment requirements (shared by CALL_SEARCH and the prefetch)."""
+    params = {
+        "origin": req.get("origin"),
+        "destination": req.get("destination"),
+        "departure_date": req.get("departure_date") or req.get("date"),
+        "adults": req.get("adults") or req.get("guests", 1),
+        "children": req.get("children", 0),
+        "infants": req.get("infants", 0),
+        "return_date": return_date,
+        "non_stop": non_stop,
+    }
+    for key in ("preferred_departure_time", "min_price", "max_price"):
+        if req.get(key):
+            params[key] = req[key]
+    return params
+
+
+def hotel_search_params(req: Dict[str, Any]) -> Dict[str, Any]:
+    """MCP search_hotels params built from segment requirements (shared by CALL_SEARCH and the prefetch)."""
+    return {
+        "location": req.get("location") or req.get("destination"),
+        "check_in": req.get("check_in"),
+        "check_out": req.get("check_out"),
+        "guests": req.get("guests") or req.get("adults", 1),
+    }
+
+
+@dataclass
+class PrefetchRequest:
+    """One predicted CALL_SEARCH: slot/segment, its _create_cache_key and the MCP call it would make."""
+    slot: str
+    segment_index: int
+    cache_key: str
+    tool: str
+    product: str
+    params: Dict[str, Any]
+
+
+@dataclass
+class _Entry:
+    request: PrefetchRequest
+    task: "asyncio.Task[SearchResult]"
+    started_at: float
+    claimed: bool = False
+
+
+class PrefetchStats:
+    """Process-wide counters: does the speculation pay off?"""
+
+    def __init__(self, window: int = 500):
+        self.counters: Dict[str, int] = {
+            "turns": 0, "started": 0, "joined": 0, "diverged": 0, "unused": 0, "failed": 0,
+        }
+        self._head_start_ms: Deque[float] = deque(maxlen=window)
+        self._join_wait_ms: Deque[float] = deque(maxlen=window)
+
+    def bump(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_join(self, head_start_ms: float, wait_ms: float) -> None:
+        self.bump("joined")
+        self._head_start_ms.append(head_start_ms)
+        self._join_wait_ms.append(wait_ms)
+
+    @staticmethod
+    def _p50(values: Deque[float]) -> float:
+        ordered = sorted(values)
+        return round(ordered[len(ordered) // 2], 1) if ordered else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        started = self.counters["started"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["joined"] / started, 3) if started else 0.0,
+            # เวลาที่ค้นหาล่วงหน้าไปแล้วตอน CALL_SEARCH มาถึง (≈ เวลาที่ประหยัดได้ต่อ hit, ถ้าค้นหายังไม่เสร็จ)
+            "head_start_ms_p50": self._p50(self._head_start_ms),
+            "join_wait_ms_p50": self._p50(self._join_wait_ms),
+        }
+
+
+_stats = PrefetchStats()
+
+
+def get_prefetch_stats() -> PrefetchStats:
+    return _stats
+
+
+class SearchPrefetchRegistry:
+    """Per-turn registry of speculative searches, keyed by TravelAgent._create_cache_key."""
+
+    def __init__(self, session_id: str = "", stats: Optional[PrefetchStats] = None):
+        self.session_id = session_id
+        self.stats = stats or _stats
+        self._entries: Dict[str, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def start(self, request: PrefetchRequest, fetch: Callable[[], Awaitable[SearchResult]]) -> bool:
+        if request.cache_key in self._entries:
+            return False
+        task = asyncio.ensure_future(fetch())
+        # ไม่มีใครรอผล (ถูกยกเลิก/ไม่ได้ใช้) → เก็บ exception ไว้ไม่ให้ log "never retrieved"
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._entries[request.cache_key] = _Entry(request=request, task=task, started_at=time.perf_counter())
+        self.stats.bump("started")
+        logger.info(
+            f"[Prefetch] {request.tool} for {request.slot}[{request.segment_index}] started speculatively "
+            f"(key={request.cache_key}, session={self.session_id})"
+        )
+        return True
+
+    def _cancel(self, entry: _Entry, reason: str) -> None:
+        entry.claimed = True
+        if not entry.task.done():
+            entry.task.cancel()
+        self.stats.bump(reason)
+        logger.info(f"[Prefetch] {entry.request.slot}[{entry.request.segment_index}] {reason} (key={entry.request.cache_key})")
+
+    async def join(
+        self,
+        slot: str,
+        segment_index: int,
+        cache_key: str,
+        params: Dict[str, Any],
+        timeout: float,
+    ) -> Optional[SearchResult]:
+        """
+        Result of the matching speculative search, or None when the caller must search itself.
+        A prefetch for the same slot/segment with a different key or different params is cancelled (diverged).
+        Timeouts propagate like a direct search would.
+        """
+        entry = self._entries.get(cache_key)
+        if entry is None or entry.claimed:
+            for other in self._entries.values():
+                if not other.claimed and other.request.slot == slot and other.request.segment_index == segment_index:
+                    self._cancel(other, "diverged")
+            return None
+        if entry.request.params != params:
+            self._cancel(entry, "diverged")
+            return None
+        entry.claimed = True
+        joined_at = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(entry.task), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats.bump("failed")
+            raise
+        except asyncio.CancelledError:
+            if entry.task.cancelled():
+                self.stats.bump("failed")
+                return None
+            raise
+        except Exception as e:
+            self.stats.bump("failed")
+            logger.warning(f"[Prefetch] speculative search for {slot}[{segment_index}] failed, searching directly: {e}")
+            return None
+        now = time.perf_counter()
+        self.stats.record_join((joined_at - entry.started_at) * 1000, (now - joined_at) * 1000)
+        logger.info(
+            f"[Prefetch] CALL_SEARCH {slot}[{segment_index}] joined speculative search "
+            f"(head start {(joined_at - entry.started_at) * 1000:.0f}ms, waited {(now - joined_at) * 1000:.0f}ms)"
+        )
+        return result
+
+    def close(self) -> None:
+        """End of turn: cancel prefetches nobody joined."""
+        for entry in self._entries.values():
+            if not entry.claimed:
+                self._cancel(entry, "unused")
+        self._entries.clear()
+
+
+_current_registry: ContextVar[Optional[SearchPrefetchRegistry]] = ContextVar("search_prefetch_registry", default=None)
+
+
+def current_prefetch() -> Optional[SearchPrefetchRegistry]:
+    return _current_registry.get()
+
+
+def activate_prefetch(registry: Optional[SearchPrefetchRegistry]) -> Token:
+    return _current_registry.set(registry)
+
+
+def deactivate_prefetch(token: Token) -> None:
+    registry = _current_registry.get()
+    if registry is not None:
+        registry.close()
+    _current_registry.reset(token)
+
+
+# ---------- prediction ----------
+
+def _existing_segment_requests(
+    trip_plan: "TripPlan",
+    slots: Tuple[str, ...],
+    cache_key: Callable[[Dict[str, Any], str], str],
+) -> List[PrefetchRequest]:
+    """Segments whose requirements are already complete (the controller will most likely CALL_SEARCH them as-is)."""
+    from app.engine.workflow_manager import get_slot_manager
+
+    requests: List[PrefetchRequest] = []
+    inbound = trip_plan.travel.flights.inbound
+    for slot, seg, idx in get_slot_manager().get_all_segments(trip_plan):
+        if slot not in slots or not seg.needs_search():
+            continue
+        req = dict(seg.requirements)
+        if slot in _FLIGHT_SLOTS:
+            # เหมือน _execute_call_search: default บินตรง, ขาไปแนบ return_date จากขากลับ
+            if "direct_flight" not in req and "non_stop" not in req:
+                req["non_stop"] = True
+            return_date = req.get("return_date")
+            if not return_date and slot == "flights_outbound" and inbound:
+                inv = inbound[0].requirements
+                return_date = inv.get("departure_date") or inv.get("date")
+                if return_date:
+                    req["return_date"] = return_date
+            non_stop = req.get("direct_flight") is True or req.get("non_stop") is True
+            requests.append(PrefetchRequest(slot, idx, cache_key(req, slot), "search_flights", "flight",
+                                            flight_search_params(req, return_date, non_stop)))
+        else:
+            requests.append(PrefetchRequest(slot, idx, cache_key(req, slot), "search_hotels", "hotel",
+                                            hotel_search_params(req)))
+    return requests
+
+
+def _new_trip_requests(
+    ent: Any,
+    slots: Tuple[str, ...],
+    cache_key: Callable[[Dict[str, Any], str], str],
+) -> List[PrefetchRequest]:
+    """Requirements CREATE_ITINERARY would build for a clear single-destination request."""
+    from app.services.airport_index import get_airport_index
+
+    if not ent.destination or not ent.start_date or (not ent.end_date and not ent.one_way):
+        return []
+    if len(set(ent.places)) > 2:
+        return []
+    index = get_airport_index()
+    origin_name = ent.origin or "Bangkok"
+    origin = index.lookup(origin_name) or {}
+    dest = index.lookup(ent.destination) or {}
+    if not origin.get("flight_code") or not dest.get("flight_code"):
+        return []
+    adults = ent.adults or 1
+    children = ent.children
+    pax = {"adults": adults, "children": children, "guests": adults + children}
+    round_trip = bool(ent.end_date) and not ent.one_way
+    requests: List[PrefetchRequest] = []
+    if "flights_outbound" in slots:
+        req = {"origin": origin["flight_code"], "destination": dest["flight_code"],
+               "departure_date": ent.start_date, **pax, "non_stop": True}
+        if round_trip:
+            req["return_date"] = ent.end_date
+        requests.append(PrefetchRequest("flights_outbound", 0, cache_key(req, "flights_outbound"), "search_flights", "flight",
+                                        flight_search_params(req, req.get("return_date"), True)))
+    if "flights_inbound" in slots and round_trip:
+        req = {"origin": dest["flight_code"], "destination": origin["flight_code"],
+               "departure_date": ent.end_date, **pax, "non_stop": True}
+        requests.append(PrefetchRequest("flights_inbound", 0, cache_key(req, "flights_inbound"), "search_flights", "flight",
+                                        flight_search_params(req, None, True)))
+    if "accommodation" in slots and round_trip:
+        req = {"location": ent.destination, "check_in": ent.start_date, "check_out": ent.end_date, **pax}
+        requests.append(PrefetchRequest("accommodation", 0, cache_key(req, "accommodation"), "search_hotels", "hotel",
+                                        hotel_search_params(req)))
+    return requests
+
+
+def predict_search_requests(
+    trip_plan: "TripPlan",
+    user_input: str,
+    ml_intent_hint: Optional[Dict[str, Any]],
+    cache_key: Callable[[Dict[str, Any], str], str],
+    *,
+    min_confidence: Optional[float] = None,
+    max_requests: Optional[int] = None,
+) -> List[PrefetchRequest]:
+    """Searches this turn is likely to issue, or [] when the intent or the slots are not clear enough."""
+    from app.engine.fast_planner import extract_trip_entities
+    from app.engine.workflow_manager import get_slot_manager
+
+    if not ml_intent_hint:
+        return []
+    intent = ml_intent_hint.get("intent")
+    threshold = float(min_confidence if min_confidence is not None else settings.search_prefetch_min_confidence)
+    if float(ml_intent_hint.get("confidence") or 0.0) < threshold:
+        return []
+    slots: Tuple[str, ...] = ()
+    if intent in FLIGHT_INTENTS:
+        slots += _FLIGHT_SLOTS
+    if intent in HOTEL_INTENTS:
+        slots += _HOTEL_SLOTS
+    if not slots:
+        return []
+    if float(ml_intent_hint.get("confidence") or 0.0) < _SLOT_INTENT_CONFIDENCE:
+        # intent ไม่ชัดว่าเป็นเที่ยวบินหรือที่พัก → ค้นทุก segment ที่พร้อม (controller มัก BATCH ทั้งหมด)
+        slots = _FLIGHT_SLOTS + _HOTEL_SLOTS
+
+    ent = extract_trip_entities(user_input)
+    if ent.needs_llm:
+        return []
+    if get_slot_manager().get_all_segments(trip_plan):
+        # ข้อความที่เปลี่ยนปลายทาง/วันที่/จำนวนคน → controller จะ UPDATE_REQ ก่อน ผลที่เดาไว้จะไม่ตรง
+        if ent.places or ent.start_date or ent.nights or ent.has_pax:
+            return []
+        requests = _existing_segment_requests(trip_plan, slots, cache_key)
+    else:
+        # ทริปใหม่: CREATE_ITINERARY สร้างทั้งเที่ยวบินและที่พัก (focus ปกติ) ไม่ว่า intent จะชี้ไปทางไหน
+        requests = _new_trip_requests(ent, _FLIGHT_SLOTS + _HOTEL_SLOTS, cache_key)
+    limit = int(max_requests if max_requests is not None else settings.search_prefetch_max_requests)
+    return requests[:limit]
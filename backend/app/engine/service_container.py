@@ -0,0 +1,122 @@
+"""คอนเทนเนอร์เซอร์วิสระดับโปรเซสสำหรับ TravelAgent: สร้าง collaborator หนัก ๆ ครั้งเดียวแล้วแจก agent ราคาถูกต่อเทิร์น."""
+
+from __future__ import annotations
+from typing import Any, Optional
+import asyncio
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class AgentServices:
+    """
+    Heavy collaborators shared by every TravelAgent in this process.
+
+    - llm: LLMServiceWithMCP (shared Gemini client)
+    - intent_llm: IntentBasedLLM wrapping the same llm
+    - production_llm: LangChain three-brain LLM (global singleton)
+    - memory: MemoryService bound to the shared llm
+    - orchestrator: one TravelOrchestrator (one pooled httpx.AsyncClient)
+    - mcp_executor: MCPToolExecutor reusing the same orchestrator
+    """
+
+    def __init__(self):
+        from app.services.llm import LLMServiceWithMCP, IntentBasedLLM, get_production_llm
+        from app.services.memory import MemoryService
+        from app.services.travel_service import TravelOrchestrator
+        from app.services.mcp_server import MCPToolExecutor
+
+        # LLMServiceWithMCP raises LLMException when Gemini is not configured — let it propagate
+        self.llm = LLMServiceWithMCP()
+        try:
+            self.intent_llm = IntentBasedLLM(llm_service=self.llm)
+        except Exception as e:
+            logger.warning(f"AgentServices: IntentBasedLLM unavailable: {e}")
+            self.intent_llm = None
+        try:
+            self.production_llm = get_production_llm()
+        except Exception as e:
+            logger.warning(f"AgentServices: Production LLM unavailable: {e}")
+            self.production_llm = None
+        self.memory = MemoryService(self.llm)
+        self.orchestrator = TravelOrchestrator()
+        try:
+            self.mcp_executor = MCPToolExecutor(orchestrator=self.orchestrator)
+        except Exception as e:
+            logger.warning(f"AgentServices: MCPToolExecutor unavailable: {e}")
+            self.mcp_executor = None
+        try:
+            from app.storage.connection_manager import MongoConnectionManager
+            self.db = MongoConnectionManager.get_instance().get_database()
+        except Exception as e:
+            logger.warning(f"AgentServices: database unavailable: {e}")
+            self.db = None
+
+    async def close(self) -> None:
+        """Close pooled clients. The orchestrator is shared with the MCP executor, so it is closed once here."""
+        try:
+            await self.orchestrator.close()
+        except Exception as e:
+            logger.warning(f"AgentServices: error closing orchestrator: {e}")
+
+
+class AgentServiceContainer:
+    """
+    Lifespan-managed container: builds AgentServices once per process and hands out
+    cheap per-turn TravelAgent facades that share them.
+
+    startup() is called from the FastAPI lifespan; if it fails there (e.g. GEMINI_API_KEY
+    missing at boot) the first request retries the build.
+    """
+
+    def __init__(self):
+        self._services: Optional[AgentServices] = None
+        self._storage = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_started(self) -> bool:
+        return self._services is not None
+
+    async def startup(self) -> None:
+        await self.get_services()
+        logger.info("AgentServiceContainer started (shared LLM, memory, orchestrator, MCP executor)")
+
+    async def get_services(self) -> AgentServices:
+        if self._services is not None:
+            return self._services
+        async with self._lock:
+            if self._services is None:
+                self._services = AgentServices()
+        return self._services
+
+    def get_storage(self):
+        """Shared MongoStorage; rebuilt if it was created while MongoDB was unavailable."""
+        if self._storage is None or getattr(self._storage, "db", None) is None:
+            from app.storage.mongodb_storage import MongoStorage
+            self._storage = MongoStorage()
+        return self._storage
+
+    async def create_agent(self, storage: Any = None, **agent_kwargs: Any):
+        """Return a per-turn TravelAgent bound to the shared services (no clients or LLMs are created)."""
+        from app.engine.agent import TravelAgent
+        services = await self.get_services()
+        return TravelAgent(storage or self.get_storage(), services=services, **agent_kwargs)
+
+    async def shutdown(self) -> None:
+        async with self._lock:
+            services, self._services = self._services, None
+        if services is not None:
+            await services.close()
+            logger.info("AgentServiceContainer shut down (pooled clients closed)")
+
+
+_agent_container: Optional[AgentServiceContainer] = None
+
+
+def get_agent_container() -> AgentServiceContainer:
+    global _agent_container
+    if _agent_container is None:
+        _agent_container = AgentServiceContainer()
+    return _agent_container
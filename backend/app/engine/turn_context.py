@@ -0,0 +1,119 @@
+"""ขั้น prefetch ของแต่ละเทิร์น: ดึง memory / conversation / user profile / workflow state พร้อมกันก่อนเรียก Controller."""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, List, Optional, TYPE_CHECKING
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from app.engine.agent import TravelAgent
+    from app.models.database import Memory
+    from app.models.session import UserSession
+
+logger = get_logger(__name__)
+
+
+def _source_timeouts() -> Dict[str, float]:
+    """Per-source timeouts (seconds). conversation can trigger an LLM compaction (rolling summary disabled) so it gets the longer budget."""
+    fast = float(settings.turn_prefetch_timeout_seconds)
+    return {
+        "memories": fast,
+        "conversation": float(settings.turn_prefetch_context_timeout_seconds),
+        "user_doc": fast,
+        "selection_summary": fast,
+        "workflow_state": fast,
+    }
+
+
+@dataclass
+class TurnContext:
+    """Everything the controller/responder need before the first LLM call of a turn."""
+    memories: List["Memory"] = field(default_factory=list)
+    memory_context: str = ""
+    conversation_context: str = ""
+    user_doc: Optional[Dict[str, Any]] = None
+    selection_summary: str = ""
+    user_profile_context: str = ""
+    workflow_state: Optional[Dict[str, Any]] = None
+    # source -> short error string (timeout / exception); empty when every source succeeded
+    errors: Dict[str, str] = field(default_factory=dict)
+    # source -> elapsed ms
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.errors)
+
+
+async def _timed(name: str, coro: Awaitable[Any], timeout: float, ctx: TurnContext, default: Any) -> Any:
+    """Await one source with its own timeout; on failure record the error and return default."""
+    started = time.perf_counter()
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        ctx.errors[name] = f"timeout after {timeout:.1f}s"
+        logger.warning(f"[TurnContext] {name} timed out after {timeout:.1f}s — continuing without it")
+    except Exception as e:
+        ctx.errors[name] = str(e)[:200]
+        logger.warning(f"[TurnContext] {name} failed: {e} — continuing without it")
+    finally:
+        ctx.timings_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+    return default
+
+
+async def prefetch_turn_context(agent: "TravelAgent", session: "UserSession", user_input: str) -> TurnContext:
+    """
+    Launch every pre-controller read concurrently and return a TurnContext.
+
+    Sources: memory recall, sliding-window conversation context, user document
+    (memoized on the agent for the whole turn), selection-preference summary and
+    workflow state. Each source has its own timeout; a failed source degrades to
+    its empty default instead of failing the turn.
+    """
+    ctx = TurnContext()
+    timeouts = _source_timeouts()
+    user_id = session.user_id
+    started = time.perf_counter()
+
+    async def _selection_summary() -> str:
+        if not user_id or user_id == "anonymous":
+            return ""
+        from app.services.selection_preferences import get_selection_preferences_summary
+        return await get_selection_preferences_summary(user_id) or ""
+
+    async def _workflow_state() -> Optional[Dict[str, Any]]:
+        from app.services.workflow_state import get_workflow_state_service
+        return await get_workflow_state_service().get_workflow_state(session.session_id)
+
+    memories, conversation_context, user_doc, selection_summary, workflow_state = await asyncio.gather(
+        _timed("memories", agent.memory.recall(user_id), timeouts["memories"], ctx, []),
+        _timed(
+            "conversation",
+            agent.memory.build_conversation_context(session_id=session.session_id, current_input=user_input),
+            timeouts["conversation"], ctx, "",
+        ),
+        _timed("user_doc", agent._get_user_doc(user_id), timeouts["user_doc"], ctx, None),
+        _timed("selection_summary", _selection_summary(), timeouts["selection_summary"], ctx, ""),
+        _timed("workflow_state", _workflow_state(), timeouts["workflow_state"], ctx, None),
+    )
+
+    ctx.memories = memories or []
+    ctx.memory_context = agent.memory.format_memories_for_prompt(ctx.memories)
+    ctx.conversation_context = conversation_context or ""
+    ctx.user_doc = user_doc
+    ctx.selection_summary = selection_summary or ""
+    ctx.user_profile_context = agent._format_user_profile_context(user_doc, ctx.selection_summary)
+    ctx.workflow_state = workflow_state
+    ctx.total_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    logger.info(
+        f"[TurnContext] prefetched in {ctx.total_ms}ms (sources: {ctx.timings_ms})"
+        + (f" degraded={list(ctx.errors)}" if ctx.errors else ""),
+        extra={"session_id": session.session_id, "user_id": user_id},
+    )
+    return ctx
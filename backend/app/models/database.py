@@ -9,6 +9,7 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 from bson import ObjectId
 from pymongo import IndexModel
+from app.core.config import settings
 
 from app.models.trip_plan import TripPlan, Segment, SegmentStatus
 
@@ -341,6 +342,12 @@ CONVERSATION_INDEXES = [
     IndexModel([("session_id", 1), ("updated_at", -1)])
 ]
 
+# ข้อความแชทแบบ bucket: conversations = head (ตัวนับ + hash ข้อความล่าสุด), conversation_buckets = ก้อนละ N ข้อความ
+CONVERSATION_BUCKET_INDEXES = [
+    IndexModel([("session_id", 1), ("bucket", -1)], unique=True, name="conv_bucket_session_bucket"),
+    IndexModel([("user_id", 1)], name="conv_bucket_user"),
+]
+
 BOOKING_INDEXES = [
     IndexModel([("booking_id", 1)], unique=True, sparse=True),  # Sparse: ignore null values
     IndexModel([("user_id", 1)]),
@@ -375,6 +382,38 @@ RL_REWARDS_INDEXES = [
     IndexModel([("user_id", 1), ("created_at", -1)], name="feedback_user_time"),
     IndexModel([("user_id", 1), ("slot_name", 1)], name="feedback_user_slot"),
     IndexModel([("created_at", -1)], name="feedback_time"),
+    # ตัด history เก่าด้วย TTL (RL pipeline ไม่ count + delete ต่อ event แล้ว)
+    IndexModel([("created_ts", 1)], name="feedback_ttl", expireAfterSeconds=settings.rl_feedback_ttl_days * 86400),
+]
+
+# ประวัติการเลือก (selection_preferences): สรุปอ่าน choice ล่าสุดของ user
+CHOICE_HISTORY_INDEXES = [
+    IndexModel([("user_id", 1), ("created_at", -1)], name="choice_user_time"),
+]
+
+# การประเมินทริป: learning monitor อ่านรายการล่าสุดต่อ user ครั้งละหลาย user
+TRIP_EVALUATION_INDEXES = [
+    IndexModel([("user_id", 1), ("updated_at", -1)], name="trip_eval_user_time"),
+]
+
+# สรุปตัวชี้วัดการเรียนรู้รายช่วงเวลา (_id = bucket key) — bucket_start ใช้ทั้ง query ช่วงเวลาและ TTL
+LEARNING_METRICS_ROLLUP_INDEXES = [
+    IndexModel(
+        [("bucket_start", 1)],
+        name="learning_rollup_bucket_ttl",
+        expireAfterSeconds=settings.learning_metrics_rollup_retention_days * 86400,
+    ),
+]
+
+# ดัชนีเสริมข้อมูลที่พัก Amadeus → Google Place (_id = "hotel:{hotelId}" หรือ fallback key)
+HOTEL_PLACE_INDEX_INDEXES = [
+    IndexModel([("fallback_key", 1)], name="hotel_place_fallback_key"),
+    IndexModel([("refreshed_at", 1)], name="hotel_place_refreshed"),
+]
+
+# raw offer blob store (_id = sha256 ของ raw payload) — ลบอัตโนมัติเมื่อถึง expires_at
+OFFER_BLOB_INDEXES = [
+    IndexModel([("expires_at", 1)], name="offer_blob_ttl", expireAfterSeconds=0),
 ]
 
 # =============================================================================
@@ -411,19 +450,14 @@ TRIP_INDEXES = [
 
 
 MEMORY_INDEXES = [
-    # ✅ SECURITY: Index on user_id for fast queries and data isolation
-    IndexModel([("user_id", 1)], name="user_id_idx"),
-    # Index on importance for sorting
-    IndexModel([("importance", -1)], name="importance_idx"),
-    # Compound index for user-specific memory queries (user_id + importance)
+    # ✅ SECURITY: ทุก query กรอง user_id — recall (user_id + sort importance) ใช้ index นี้
+    # และครอบ query ที่กรอง user_id อย่างเดียวด้วย (prefix) จึงไม่ต้องมี index user_id แยก
     IndexModel([("user_id", 1), ("importance", -1)], name="user_importance_idx"),
-    # Index on category for filtering
-    IndexModel([("category", 1)], name="category_idx"),
+    # ชื่อเดียวกับที่ MongoDB ตั้งให้ index นี้บนฐานข้อมูลที่มีอยู่ (ตั้งชื่ออื่น = startup ชน error 85)
+    IndexModel([("user_id", 1), ("created_at", -1)], name="user_id_1_created_at_-1"),
     # Index on last_accessed for cleanup of old memories
     IndexModel([("last_accessed", -1)], name="last_accessed_idx"),
-    IndexModel([("user_id", 1)]),
-    IndexModel([("category", 1)]),
-    IndexModel([("created_at", -1)]),
-    IndexModel([("user_id", 1), ("created_at", -1)])
 ]
+# index เดิมที่ซ้ำ/ไม่มี query ใช้ — ลบด้วย scripts/reconcile_memory_indexes.py
+LEGACY_MEMORY_INDEX_NAMES = ("user_id_idx", "user_id_1", "importance_idx", "category_idx", "category_1", "created_at_-1")
 
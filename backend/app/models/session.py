@@ -3,9 +3,9 @@
 """
 
 from __future__ import annotations
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
 from datetime import datetime
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
 
 from app.models.trip_plan import TripPlan
 
@@ -60,6 +60,10 @@ class UserSession(BaseModel):
         default="idle",
         description="Current stage in booking funnel: idle | confirming_search | searching | selecting | confirming_booking | completed"
     )
+    # สถานะล่าสุดที่เขียนลง MongoDB แล้ว (app.storage.session_delta.PersistedState) — ใช้คำนวณ delta ตอน save
+    _persisted_state: Any = PrivateAttr(default=None)
+    # path ที่ถูกแก้แบบ in-place ซึ่งตรวจจับเองไม่ได้ (เช่น dict ภายใน options_pool) — บังคับเขียนใน save ถัดไป
+    _dirty_paths: Set[str] = PrivateAttr(default_factory=set)
     
     @field_validator('session_id', 'user_id', 'trip_id', 'chat_id')
     @classmethod
@@ -85,6 +89,15 @@ class UserSession(BaseModel):
         """Update the last_updated timestamp"""
         self.last_updated = datetime.utcnow().isoformat()
     
+    def mark_dirty(self, *paths: str) -> None:
+        """
+        Force paths (dotted, document layout e.g. "trip_plan" or
+        "trip_plan.travel.flights.outbound.0.options_pool") to be written on the next save.
+        Needed only for in-place mutation of options_pool items; field assignment and
+        requirements/selected_option edits are detected automatically.
+        """
+        self._dirty_paths.update(paths or ("trip_plan",))
+
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization"""
         return self.model_dump()
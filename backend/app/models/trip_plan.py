@@ -4,9 +4,9 @@
 """
 
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from enum import Enum
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
 
 
 class SegmentStatus(str, Enum):
@@ -47,6 +47,22 @@ class Segment(BaseModel):
         default=None,
         description="The option that user has selected"
     )
+    # Bumped on every field assignment (status, options_pool, selected_option, extras...).
+    # Used by app.engine.controller_view to reuse the serialized controller view of unchanged segments.
+    _version: int = PrivateAttr(default=0)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            private = getattr(self, "__pydantic_private__", None)
+            if private is not None:
+                private["_version"] = private.get("_version", 0) + 1
+    
+    @property
+    def version(self) -> int:
+        """Change counter for field assignments (not in-place dict mutation)."""
+        private = getattr(self, "__pydantic_private__", None) or {}
+        return private.get("_version", 0)
     
     @field_validator('status', mode='before')
     @classmethod
@@ -303,3 +319,15 @@ class TripPlan(BaseModel):
     def is_complete(self) -> bool:
         """Check if all parts of the plan are complete"""
         return self.travel.is_complete() and self.accommodation.is_complete()
+
+    def segment_lists(self) -> List[Tuple[str, List[Segment]]]:
+        """
+        (dotted path, segment list) ของทุก slot — path ตรงกับโครงสร้างใน model_dump()/เอกสาร MongoDB
+        ใช้โดย delta persistence (app.storage.session_delta) เพื่อติดตามการเปลี่ยนแปลงราย segment
+        """
+        return [
+            ("travel.flights.outbound", self.travel.flights.outbound),
+            ("travel.flights.inbound", self.travel.flights.inbound),
+            ("travel.ground_transport", self.travel.ground_transport),
+            ("accommodation.segments", self.accommodation.segments),
+        ]
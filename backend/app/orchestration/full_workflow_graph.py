@@ -14,6 +14,7 @@ from app.core.logging import get_logger
 from app.core.config import settings
 from app.core.constants import FALLBACK_RESPONSE_EMPTY
 from app.models import ControllerAction, ActionLog, ActionType
+from app.engine.fast_planner import FastPathTurn
 
 logger = get_logger(__name__)
 
@@ -42,10 +43,12 @@ class FullWorkflowState(TypedDict, total=False):
     max_iterations: int
     response_text: str
     workflow_state: Optional[Dict[str, Any]]
+    prefetched_workflow_state: Optional[Dict[str, Any]]
     ml_intent_hint: Optional[Dict[str, Any]]
     ml_validation_result: Optional[Dict[str, Any]]
     action_history: List[tuple]
     loop_detection_threshold: int
+    fast_path_turn: Optional[Any]
 
 
 async def _controller_node(state: FullWorkflowState) -> Dict[str, Any]:
@@ -76,19 +79,23 @@ async def _controller_node(state: FullWorkflowState) -> Dict[str, Any]:
         return out
 
     # Workflow state & ML hints (เหมือนใน run_controller)
-    workflow_state = None
-    ml_intent_hint = None
+    # รอบแรกใช้ workflow state ที่ TurnContext prefetch มาแล้ว; รอบถัดไปอ่านใหม่ (action อาจเปลี่ยน state)
+    workflow_state = state.get("prefetched_workflow_state") if iteration == 0 else None
+    # ML intent ของข้อความนี้ถอดมาแล้วใน run_turn (หรือรอบก่อนหน้า) — ข้อความไม่เปลี่ยนระหว่างรอบ
+    ml_intent_hint = state.get("ml_intent_hint")
     ml_validation_result = None
-    try:
-        from app.services.workflow_state import get_workflow_state_service
-        wf = get_workflow_state_service()
-        workflow_state = await wf.get_workflow_state(session.session_id)
-    except Exception as e:
-        logger.debug(f"Workflow state: {e}")
+    if workflow_state is None:
+        try:
+            from app.services.workflow_state import get_workflow_state_service
+            wf = get_workflow_state_service()
+            workflow_state = await wf.get_workflow_state(session.session_id)
+        except Exception as e:
+            logger.debug(f"Workflow state: {e}")
     try:
         from app.services.ml_keyword_service import get_ml_keyword_service
         ml_svc = get_ml_keyword_service()
-        ml_intent_hint = ml_svc.decode_keywords(user_input)
+        if ml_intent_hint is None:
+            ml_intent_hint = ml_svc.decode_keywords(user_input)
         extracted = agent._extract_trip_data_for_ml_validation(session.trip_plan)
         if extracted:
             ml_validation_result = ml_svc.validate_extracted_data(extracted)
@@ -99,26 +106,37 @@ async def _controller_node(state: FullWorkflowState) -> Dict[str, Any]:
     out["ml_intent_hint"] = ml_intent_hint
     out["ml_validation_result"] = ml_validation_result
 
-    from app.engine.agent import _strip_options_pool_for_controller
-    stripped_state = _strip_options_pool_for_controller(session.trip_plan.model_dump())
-    state_json = json.dumps(stripped_state, ensure_ascii=False, indent=2)
+    from app.engine.controller_view import controller_state_json
+    state_json = controller_state_json(session.trip_plan)
 
     conversation_context = state.get("conversation_context", "")
 
-    action = await agent._call_controller_llm(
-        state_json,
-        user_input,
-        action_log,
-        memory_context=memory_context,
-        user_profile_context=user_profile_context,
-        mode=mode,
-        session_id=session.session_id,
-        user_id=session.user_id,
-        workflow_validation=workflow_state,
-        ml_intent_hint=ml_intent_hint,
-        ml_validation_result=ml_validation_result,
-        conversation_context=conversation_context,
-    )
+    # ⚡ Fast path (เหมือน run_controller): intent/slot ชัดเจน → ไม่ต้องเรียก Controller LLM
+    action = None
+    fast_turn = state.get("fast_path_turn")
+    if fast_turn is not None:
+        action = agent._fast_path_action(
+            session, user_input, ml_intent_hint, fast_turn,
+            mode=mode, iteration=iteration, max_iterations=max_iterations,
+            ml_validation_result=ml_validation_result,
+            memory_context=memory_context,
+            user_profile_context=user_profile_context,
+        )
+    if action is None:
+        action = await agent._call_controller_llm(
+            state_json,
+            user_input,
+            action_log,
+            memory_context=memory_context,
+            user_profile_context=user_profile_context,
+            mode=mode,
+            session_id=session.session_id,
+            user_id=session.user_id,
+            workflow_validation=workflow_state,
+            ml_intent_hint=ml_intent_hint,
+            ml_validation_result=ml_validation_result,
+            conversation_context=conversation_context,
+        )
 
     if not action:
         action = ControllerAction(
@@ -261,10 +279,13 @@ async def run_full_workflow(
     memory_context: str = "",
     user_profile_context: str = "",
     conversation_context: str = "",
+    workflow_state: Optional[Dict[str, Any]] = None,
+    ml_intent_hint: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     รัน full workflow ผ่าน LangGraph (controller -> execute -> ... -> responder).
     คืน response_text สำหรับส่งกลับผู้ใช้
+    ml_intent_hint: ผล decode_keywords ที่ run_turn ถอดไว้แล้ว (None = ให้ controller node ถอดเอง)
     """
     graph = get_full_workflow_graph()
     if graph is None:
@@ -288,10 +309,12 @@ async def run_full_workflow(
         "max_iterations": max_iterations,
         "response_text": "",
         "workflow_state": None,
-        "ml_intent_hint": None,
+        "prefetched_workflow_state": workflow_state,
+        "ml_intent_hint": ml_intent_hint,
         "ml_validation_result": None,
         "action_history": [],
         "loop_detection_threshold": 2,
+        "fast_path_turn": FastPathTurn(),
     }
 
     try:
@@ -7,12 +7,14 @@ Implement interface เดียวกับ ProductionLLMService เพื่
 
 from __future__ import annotations
 import json
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional
 
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.core.exceptions import LLMException
-from app.services.llm import BrainType, ModelType
+from app.services.llm import BrainType, ModelType, StreamTiming
+from app.services.llm_cache import LLMCachePolicy, get_llm_cache
+from app.services.llm_scheduler import LLMPriority, get_llm_scheduler
 
 logger = get_logger(__name__)
 
@@ -148,10 +150,11 @@ class LangChainProductionLLM:
         """Generate controller decision (JSON) via LCEL chain."""
         try:
             sys = system_prompt or "You are the Brain of a Travel Agent. Output JSON only."
-            result = await self._controller_chain.ainvoke({
-                "system_prompt": sys,
-                "prompt": prompt,
-            })
+            async with get_llm_scheduler().slot(LLMPriority.INTERACTIVE, label="langchain_controller"):
+                result = await self._controller_chain.ainvoke({
+                    "system_prompt": sys,
+                    "prompt": prompt,
+                })
             parsed = _extract_json_from_text(result)
             if not parsed or not isinstance(parsed, dict):
                 logger.warning("LangChain Controller returned invalid JSON, using fallback")
@@ -173,10 +176,11 @@ class LangChainProductionLLM:
         """Generate responder message (text) via LCEL chain."""
         try:
             sys = system_prompt or "You are the voice of a friendly Travel Agent. Respond in Thai."
-            result = await self._responder_chain.ainvoke({
-                "system_prompt": sys,
-                "prompt": prompt,
-            })
+            async with get_llm_scheduler().slot(LLMPriority.INTERACTIVE, label="langchain_responder"):
+                result = await self._responder_chain.ainvoke({
+                    "system_prompt": sys,
+                    "prompt": prompt,
+                })
             if not result or not str(result).strip():
                 raise LLMException("LangChain responder returned empty response")
             return str(result).strip()
@@ -186,22 +190,69 @@ class LangChainProductionLLM:
             logger.error(f"LangChain responder_generate error: {e}", exc_info=True)
             raise LLMException(f"LangChain responder failed: {e}") from e
 
+    async def responder_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        complexity: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        """Stream responder text chunks via LCEL astream (same chain as responder_generate)."""
+        sys = system_prompt or "You are the voice of a friendly Travel Agent. Respond in Thai."
+        timing = StreamTiming()
+        try:
+            async with get_llm_scheduler().slot(LLMPriority.INTERACTIVE, label="langchain_responder_stream"):
+                async for chunk in self._responder_chain.astream({
+                    "system_prompt": sys,
+                    "prompt": prompt,
+                }):
+                    text = str(chunk) if chunk else ""
+                    if not text:
+                        continue
+                    timing.mark(text)
+                    yield text
+        except Exception as e:
+            logger.error(f"LangChain responder_stream error after {timing.chunks} chunks: {e}", exc_info=True)
+            raise LLMException(f"LangChain responder stream failed: {e}") from e
+        if not timing.chunks:
+            raise LLMException("LangChain responder returned empty response")
+        timing.finish()
+        logger.info(f"[Stream] LangChain responder ttft={timing.ttft_ms:.0f}ms total={timing.total_ms:.0f}ms chunks={timing.chunks}")
+        if stats is not None:
+            stats.update(timing.as_dict(model=getattr(self._llm_responder, "model", None)))
+
     async def intelligence_generate(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
         model_type: Optional[ModelType] = None,
         complexity: Optional[str] = None,
+        cache: Optional[LLMCachePolicy] = None,
     ) -> Dict[str, Any]:
-        """Generate intelligence analysis (JSON) via LCEL chain."""
-        try:
-            sys = system_prompt or "You are the Intelligence brain. Output JSON only."
-            result = await self._intelligence_chain.ainvoke({
-                "system_prompt": sys,
-                "prompt": prompt,
-            })
+        """Generate intelligence analysis (JSON) via LCEL chain. cache: opt-in response cache (None = bypass)."""
+        sys = system_prompt or "You are the Intelligence brain. Output JSON only."
+
+        async def _generate() -> Dict[str, Any]:
+            async with get_llm_scheduler().slot(LLMPriority.INTERACTIVE, label="langchain_intelligence"):
+                result = await self._intelligence_chain.ainvoke({
+                    "system_prompt": sys,
+                    "prompt": prompt,
+                })
             parsed = _extract_json_from_text(result)
             return parsed if isinstance(parsed, dict) else {}
+
+        try:
+            return await get_llm_cache().get_or_generate(
+                model=getattr(self._llm_intelligence, "model", None) or "intelligence",
+                prompt=prompt,
+                system_prompt=sys,
+                temperature=self.BRAIN_TEMPERATURE[BrainType.INTELLIGENCE],
+                max_tokens=None,
+                policy=cache,
+                generate=_generate,
+                accept=lambda data: isinstance(data, dict) and bool(data),
+                brain_type="intelligence",
+            )
         except Exception as e:
             logger.error(f"LangChain intelligence_generate error: {e}", exc_info=True)
             return {}
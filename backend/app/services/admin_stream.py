@@ -0,0 +1,401 @@
+"""
+Admin /stream broadcaster: producer ตัวเดียวสร้าง snapshot ของระบบแล้วส่งให้ทุก admin ที่เปิด dashboard
+
+เดิมแต่ละ SSE connection วน loop ของตัวเอง (psutil ทุก 2s, sessions.find({}) เต็มเอกสารทุก 10s, readlines() ทั้งไฟล์ log ทุก 5s,
+เช็ค Gemini / Amadeus / Omise ทุก 60s) → admin 3 คน = โหลด Mongo / ดิสก์ / API ภายนอก 3 เท่า
+- producer เริ่มเมื่อมี subscriber คนแรก และหยุดเองใน tick ถัดไปเมื่อไม่มีใครดูแล้ว
+- sessions: aggregate $sort/$limit + ตัด trip_plan ฝั่ง Mongo (คำนวณ trip_plan_summary ใน pipeline)
+- log: อ่านต่อจาก offset ล่าสุด เก็บ 100 บรรทัดท้ายใน deque (ไฟล์ถูก rotate / truncate → เริ่มใหม่)
+- subscriber เก็บเฉพาะ frame ล่าสุด (client ช้าไม่ทำให้ frame ค้าง), ผู้ที่เข้ามาระหว่างทางได้ sessions / logs ล่าสุดทันที
+"""
+
+from __future__ import annotations
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set
+import asyncio
+import json
+import os
+import time
+
+import psutil
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.agent_monitor import agent_monitor
+
+logger = get_logger(__name__)
+
+TICK_SECONDS = 2.0
+SERVICE_CHECK_SECONDS = 60.0
+SESSIONS_REFRESH_SECONDS = 10.0
+LOGS_REFRESH_SECONDS = 5.0
+LOG_TAIL_LINES = 100
+SESSIONS_LIMIT = 50
+
+_PROCESS = psutil.Process(os.getpid())
+_PROCESS_START = _PROCESS.create_time()
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, default=_json_default)
+
+
+# trip_plan_summary คำนวณใน Mongo แล้วตัด trip_plan ทิ้งก่อนส่งกลับ (ไม่ต้องดึง options_pool / raw_data มาที่ app)
+_SESSIONS_PIPELINE = [
+    {"$sort": {"last_updated": -1}},
+    {"$limit": SESSIONS_LIMIT},
+    {"$addFields": {
+        "trip_plan_summary": {
+            "$cond": [
+                {"$eq": [{"$type": "$trip_plan"}, "missing"]},
+                "$$REMOVE",
+                {
+                    "has_flights": {"$or": [
+                        {"$gt": [{"$size": {"$ifNull": ["$trip_plan.travel.flights.outbound", []]}}, 0]},
+                        {"$gt": [{"$size": {"$ifNull": ["$trip_plan.travel.flights.inbound", []]}}, 0]},
+                    ]},
+                    "has_hotels": {"$gt": [{"$size": {"$ifNull": ["$trip_plan.accommodation.segments", []]}}, 0]},
+                    "has_transport": {"$gt": [{"$size": {"$ifNull": ["$trip_plan.travel.ground_transport", []]}}, 0]},
+                },
+            ]
+        }
+    }},
+    {"$project": {"trip_plan": 0}},
+]
+
+
+class LogTail:
+    """อ่านไฟล์ log ต่อจาก offset ล่าสุด — เก็บ N บรรทัดท้าย + จำนวนบรรทัดทั้งหมด"""
+
+    def __init__(self, max_lines: int = LOG_TAIL_LINES):
+        self.lines: Deque[str] = deque(maxlen=max_lines)
+        self.total_lines = 0
+        self.bytes_read = 0
+        self._path: Optional[Path] = None
+        self._offset = 0
+        self._partial = b""
+        self._inode: Optional[int] = None
+
+    def _reset(self, path: Path) -> None:
+        self.lines.clear()
+        self.total_lines = 0
+        self._path = path
+        self._offset = 0
+        self._partial = b""
+
+    def refresh(self, path: Path) -> Dict[str, Any]:
+        st = path.stat()
+        if path != self._path or st.st_size < self._offset or st.st_ino != self._inode:
+            self._reset(path)
+            self._inode = st.st_ino
+        if st.st_size > self._offset:
+            with open(path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(st.st_size - self._offset)
+            self._offset += len(chunk)
+            self.bytes_read += len(chunk)
+            data = self._partial + chunk
+            parts = data.split(b"\n")
+            self._partial = parts.pop()
+            for raw in parts:
+                self.lines.append(raw.decode("utf-8", "replace") + "\n")
+            self.total_lines += len(parts)
+        content = list(self.lines)
+        if self._partial:
+            content = (content + [self._partial.decode("utf-8", "replace")])[-self.lines.maxlen:]
+        return {"content": content, "total_lines": self.total_lines + (1 if self._partial else 0)}
+
+
+class AdminStreamSubscriber:
+    """หนึ่ง SSE connection: เก็บเฉพาะ frame ล่าสุด"""
+
+    def __init__(self):
+        self._frame: Optional[str] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self.skipped = 0
+
+    def offer(self, frame: str) -> None:
+        if self._frame is not None:
+            self.skipped += 1
+        self._frame = frame
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next_frame(self, timeout: float) -> Optional[str]:
+        if self._frame is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                self._waiter = None
+        frame, self._frame = self._frame, None
+        return frame
+
+
+class AdminStreamBroadcaster:
+    def __init__(self, tick_seconds: float = TICK_SECONDS, mongo_manager: Any = None):
+        self.tick_seconds = tick_seconds
+        self._mongo_manager_override = mongo_manager
+        self._subscribers: Set[AdminStreamSubscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._service_cache: Dict[str, Dict[str, str]] = {
+            "gemini": {"status": "unknown", "message": "Initializing..."},
+            "amadeus": {"status": "unknown", "message": "Initializing..."},
+            "omise": {"status": "unknown", "message": "Initializing..."},
+        }
+        self._omise_checked = False
+        self._last_service_check = 0.0
+        self._last_sessions_refresh = 0.0
+        self._last_logs_refresh = 0.0
+        self._sessions: Optional[List[Dict[str, Any]]] = None
+        self._logs: Optional[Dict[str, Any]] = None
+        self._last_status: Optional[Dict[str, Any]] = None
+        self._log_tail = LogTail()
+        self._stats = {
+            "producer_starts": 0,
+            "ticks": 0,
+            "mongo_ops": 0,
+            "sessions_queries": 0,
+            "service_checks": 0,
+            "frames_broadcast": 0,
+            "frames_skipped": 0,
+            "errors": 0,
+        }
+
+    # ---------- subscribers ----------
+
+    def subscribe(self) -> AdminStreamSubscriber:
+        sub = AdminStreamSubscriber()
+        self._subscribers.add(sub)
+        if self._last_status is not None:
+            # เข้ามาระหว่างทาง: ส่ง snapshot ล่าสุดพร้อม sessions / logs ที่มีอยู่ ไม่ต้องรอรอบ refresh
+            full = dict(self._last_status)
+            if self._sessions is not None:
+                full["sessions"] = self._sessions
+            if self._logs is not None:
+                full["logs"] = self._logs
+            sub.offer(_dumps(full))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub: AdminStreamSubscriber) -> None:
+        self._subscribers.discard(sub)
+        self._stats["frames_skipped"] += sub.skipped
+
+    # ---------- producer ----------
+
+    async def _run(self) -> None:
+        self._stats["producer_starts"] += 1
+        logger.info(f"Admin stream producer started ({len(self._subscribers)} subscriber(s))")
+        loop = asyncio.get_running_loop()
+        try:
+            if not self._omise_checked:
+                self._omise_checked = True
+                await self._check_omise()
+            while self._subscribers:
+                started = loop.time()
+                try:
+                    frame = await self._snapshot()
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    logger.error(f"Admin stream error: {e}")
+                    await asyncio.sleep(5)
+                    continue
+                for sub in list(self._subscribers):
+                    sub.offer(frame)
+                self._stats["frames_broadcast"] += 1
+                await asyncio.sleep(max(0.0, self.tick_seconds - (loop.time() - started)))
+        finally:
+            logger.info("Admin stream producer stopped (no subscribers)")
+
+    async def _snapshot(self) -> str:
+        self._stats["ticks"] += 1
+        # 1. Mongo Status (ทุก tick — ping + list_collection_names ครั้งเดียวไม่ว่าจะมีกี่ viewer)
+        mongo_manager = self._mongo_manager_override
+        if mongo_manager is None:
+            from app.storage.connection_manager import ConnectionManager
+            mongo_manager = ConnectionManager.get_instance()
+        self._stats["mongo_ops"] += 1
+        mongo_ok = await mongo_manager.mongo_ping()
+        if mongo_ok:
+            try:
+                db = mongo_manager.get_mongo_database()
+                self._stats["mongo_ops"] += 1
+                collections = await db.list_collection_names()
+                mongo_details = f"Connected ({len(collections)} collections)"
+            except Exception as db_err:
+                mongo_details = f"Connected (ping OK, DB error: {str(db_err)[:50]})"
+        else:
+            mongo_details = "Disconnected (Ping failed)"
+
+        # 2. Services status (API calls) ทุก 60 วินาที
+        current_time = time.time()
+        if current_time - self._last_service_check > SERVICE_CHECK_SECONDS:
+            self._last_service_check = current_time
+            self._stats["service_checks"] += 1
+            await asyncio.gather(self._check_gemini(), self._check_amadeus(), self._check_omise())
+
+        # 3. System Resources
+        status_data: Dict[str, Any] = {
+            "timestamp": datetime.now().isoformat(),
+            "services": {
+                "mongodb": {"status": "ok" if mongo_ok else "error", "message": mongo_details},
+                "gemini": self._service_cache["gemini"],
+                "amadeus": self._service_cache["amadeus"],
+                "google_maps": {"status": "ok" if settings.google_maps_api_key else "error", "message": "Key present" if settings.google_maps_api_key else "Key missing"},
+                "omise": self._service_cache.get("omise", {"status": "unknown", "message": "Not checked yet"}),
+            },
+            "agent_activities": agent_monitor.get_activities(),
+            "system": {
+                "uptime_seconds": int(current_time - _PROCESS_START),
+                "memory_usage_mb": int(_PROCESS.memory_info().rss / 1024 / 1024),
+                "cpu_usage_percent": psutil.cpu_percent(),  # Global CPU
+                "process_cpu_percent": _PROCESS.cpu_percent(),  # Process CPU
+                "active_threads": _PROCESS.num_threads(),
+            },
+            "config": {
+                "amadeus_safety_guard": settings.amadeus_env == "test",
+                "amadeus_env": settings.amadeus_env,
+                "amadeus_search_env": settings.amadeus_search_env,
+                "amadeus_booking_env": settings.amadeus_booking_env,
+                "gemini_model": settings.gemini_model_name,
+            },
+        }
+        self._last_status = dict(status_data)
+
+        # 4. Sessions ทุก 10 วินาที (projection ฝั่ง Mongo)
+        if mongo_ok and current_time - self._last_sessions_refresh > SESSIONS_REFRESH_SECONDS:
+            self._last_sessions_refresh = current_time
+            try:
+                db = mongo_manager.get_mongo_database()
+                self._stats["mongo_ops"] += 1
+                self._stats["sessions_queries"] += 1
+                sessions = []
+                async for doc in db.sessions.aggregate(_SESSIONS_PIPELINE):
+                    doc["_id"] = str(doc["_id"])
+                    sessions.append(doc)
+                self._sessions = sessions
+                status_data["sessions"] = sessions
+            except Exception as sessions_err:
+                logger.warning(f"Failed to refresh sessions in SSE: {sessions_err}")
+
+        # 5. Logs ทุก 5 วินาที (อ่านเฉพาะส่วนที่เพิ่มขึ้น)
+        if current_time - self._last_logs_refresh > LOGS_REFRESH_SECONDS:
+            self._last_logs_refresh = current_time
+            try:
+                if settings.log_file:
+                    log_path = Path(settings.log_file)
+                    if log_path.exists():
+                        self._logs = await asyncio.to_thread(self._log_tail.refresh, log_path)
+                        status_data["logs"] = self._logs
+            except Exception as logs_err:
+                logger.warning(f"Failed to refresh logs in SSE: {logs_err}")
+
+        return _dumps(status_data)
+
+    # ---------- service checks ----------
+
+    async def _check_gemini(self) -> None:
+        if not settings.gemini_api_key:
+            self._service_cache["gemini"] = {"status": "error", "message": "API Key missing"}
+            return
+        try:
+            # Use a lightweight call to verify key/connectivity (SDK แบบ sync → รันใน thread)
+            from google import genai
+
+            def _list_models():
+                client = genai.Client(api_key=settings.gemini_api_key)
+                return list(client.models.list(config={'page_size': 1}))
+
+            await asyncio.to_thread(_list_models)
+            self._service_cache["gemini"] = {"status": "ok", "message": f"Model: {settings.gemini_model_name} (Active)"}
+        except Exception as e:
+            self._service_cache["gemini"] = {"status": "error", "message": f"API Error: {str(e)}"}
+
+    async def _check_amadeus(self) -> None:
+        # ✅ Amadeus Check (using search keys for testing)
+        if not settings.amadeus_search_api_key or not settings.amadeus_search_api_secret:
+            self._service_cache["amadeus"] = {"status": "error", "message": "Search API credentials missing"}
+            return
+        try:
+            import httpx
+            search_env = settings.amadeus_search_env.lower()
+            auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token" if search_env == "test" else "https://api.amadeus.com/v1/security/oauth2/token"
+            async with httpx.AsyncClient() as client:
+                resp = await client.post(
+                    auth_url,
+                    data={
+                        "grant_type": "client_credentials",
+                        "client_id": settings.amadeus_search_api_key,
+                        "client_secret": settings.amadeus_search_api_secret,
+                    },
+                    timeout=5.0,
+                )
+            if resp.status_code == 200:
+                search_key_status = "✅"
+                booking_key_status = "✅" if (settings.amadeus_booking_api_key and settings.amadeus_booking_api_secret) else "❌"
+                self._service_cache["amadeus"] = {"status": "ok", "message": f"Search: {settings.amadeus_search_env} ({search_key_status}) | Booking: {settings.amadeus_booking_env} ({booking_key_status}) (Authenticated)"}
+            else:
+                self._service_cache["amadeus"] = {"status": "error", "message": f"Auth failed: {resp.status_code}"}
+        except Exception as e:
+            self._service_cache["amadeus"] = {"status": "error", "message": f"Connection error: {str(e)}"}
+
+    async def _check_omise(self) -> None:
+        import httpx
+        try:
+            if not settings.omise_secret_key or not settings.omise_public_key:
+                self._service_cache["omise"] = {"status": "error", "message": "API Keys missing"}
+                return
+            secret_valid = settings.omise_secret_key.startswith("skey_")
+            public_valid = settings.omise_public_key.startswith("pkey_")
+            mode = "TEST" if settings.omise_secret_key.startswith("skey_test_") else "LIVE"
+            if not (secret_valid and public_valid):
+                self._service_cache["omise"] = {"status": "error", "message": f"Invalid key format (secret: {'valid' if secret_valid else 'invalid'}, public: {'valid' if public_valid else 'invalid'})"}
+                return
+            try:
+                async with httpx.AsyncClient(timeout=10.0) as client:
+                    resp = await asyncio.wait_for(
+                        client.get("https://api.omise.co/account", auth=(settings.omise_secret_key, ""), timeout=10.0),
+                        timeout=10.0,
+                    )
+                if resp.status_code == 200:
+                    email = resp.json().get("email", "N/A")
+                    self._service_cache["omise"] = {"status": "ok", "message": f"{mode} mode - Connected (Account: {email[:20]}...)"}
+                else:
+                    error_text = resp.text[:100] if resp.text else f"HTTP {resp.status_code}"
+                    self._service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Auth failed (HTTP {resp.status_code}): {error_text}"}
+            except (httpx.TimeoutException, asyncio.TimeoutError):
+                self._service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Connection timeout (10s)"}
+            except httpx.RequestError as req_err:
+                self._service_cache["omise"] = {"status": "error", "message": f"{mode} mode - Network error: {str(req_err)[:50]}"}
+        except Exception as e:
+            logger.error(f"Omise status check error: {e}", exc_info=True)
+            self._service_cache["omise"] = {"status": "error", "message": f"Check error: {str(e)[:50]}"}
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["subscribers"] = len(self._subscribers)
+        stats["producer_running"] = self._task is not None and not self._task.done()
+        stats["log_bytes_read"] = self._log_tail.bytes_read
+        return stats
+
+
+_admin_stream_broadcaster: Optional[AdminStreamBroadcaster] = None
+
+
+def get_admin_stream_broadcaster() -> AdminStreamBroadcaster:
+    global _admin_stream_broadcaster
+    if _admin_stream_broadcaster is None:
+        _admin_stream_broadcaster = AdminStreamBroadcaster()
+    return _admin_stream_broadcaster
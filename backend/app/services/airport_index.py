@@ -0,0 +1,327 @@
+"""
+ดัชนีสนามบิน/เมืองแบบออฟไลน์ (โหลดจาก app/data/airports.json เข้า memory ครั้งเดียว)
+
+- ค้นชื่อเมือง/สนามบิน ทั้งภาษาไทย อังกฤษ และชื่อเรียกอื่น (alias) → รหัส IATA / รหัสเมือง Amadeus
+- หา "สนามบินที่ใกล้ที่สุด" จากพิกัดด้วย grid index (ช่องละ 1 องศา) + haversine
+- TravelOrchestrator / LocationService ใช้ดัชนีนี้ก่อนยิง Amadeus หรือ Google Maps ทุกครั้ง
+  ชื่อที่ไม่อยู่ในดัชนีจะ fallback ไป network ตามเดิม
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import math
+import re
+import unicodedata
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "airports.json"
+# รัศมีเดียวกับ Amadeus /locations/airports ที่ใช้อยู่ (find_nearest_iata radius=100)
+DEFAULT_RADIUS_KM = 100.0
+CELL_DEG = 1.0
+_KM_PER_DEG = 111.195
+_EARTH_RADIUS_KM = 6371.0
+
+# คำนำหน้า/ต่อท้ายที่ไม่มีผลกับการระบุเมือง ("จังหวัดเชียงใหม่", "Chiang Mai airport", ...)
+_PREFIXES = ("ท่าอากาศยาน", "สนามบิน", "จังหวัด", "เมือง", "city of ")
+_SUFFIXES = (" international airport", " airport", " province", " city", " intl")
+_THAI_PLACE_MARKERS = ("ไป", "จาก", "ถึง", "ที่", "จังหวัด", "เที่ยว", "เมือง")
+_PUNCT_RE = re.compile(r"[\.,;:!?\"'()\[\]/\\–—-]+")
+
+
+def normalize_place_name(text: Any) -> str:
+    """Lowercase, NFKC, punctuation → space, collapsed whitespace."""
+    if not text:
+        return ""
+    s = unicodedata.normalize("NFKC", str(text)).lower()
+    s = _PUNCT_RE.sub(" ", s)
+    return " ".join(s.split())
+
+
+def _strip_affixes(name: str) -> str:
+    changed = True
+    while changed and name:
+        changed = False
+        for p in _PREFIXES:
+            if name.startswith(p) and len(name) > len(p):
+                name = name[len(p):].strip()
+                changed = True
+        for sfx in _SUFFIXES:
+            if name.endswith(sfx) and len(name) > len(sfx):
+                name = name[: -len(sfx)].strip()
+                changed = True
+    return name
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class AirportIndex:
+    """
+    In-memory airport/city index.
+
+    cities[code]: {code, name, name_th, country, lat, lng, airports: [iata], aliases, metro}
+    airports[iata]: {iata, name, name_th, city, lat, lng, aliases}
+    `metro` = รหัสเมืองใช้ค้นเที่ยวบินได้โดยตรง (TYO, LON, BKK); ไม่ใช่ metro ใช้สนามบินแรกของเมือง
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else DATA_PATH
+        self.cities: Dict[str, Dict[str, Any]] = {}
+        self.airports: Dict[str, Dict[str, Any]] = {}
+        # normalized name -> ("city" | "airport", code)
+        self._names: Dict[str, Tuple[str, str]] = {}
+        # (lat cell, lng cell) -> [iata]
+        self._grid: Dict[Tuple[int, int], List[str]] = {}
+        self._lng_cells = int(round(360 / CELL_DEG))
+        self._stats = {"name_hits": 0, "name_misses": 0, "nearest_hits": 0, "nearest_misses": 0}
+        self._max_name_len = 0
+        self._load()
+
+    # ---------- build ----------
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"AirportIndex: cannot load {self.path}: {e}")
+            return
+
+        for ap in data.get("airports") or []:
+            iata = str(ap.get("iata") or "").upper()
+            if len(iata) != 3:
+                continue
+            ap = {**ap, "iata": iata, "city": str(ap.get("city") or iata).upper()}
+            self.airports[iata] = ap
+            self._grid.setdefault(self._cell(ap["lat"], ap["lng"]), []).append(iata)
+        for city in data.get("cities") or []:
+            code = str(city.get("code") or "").upper()
+            if len(code) != 3:
+                continue
+            airports = [a.upper() for a in city.get("airports") or [] if a.upper() in self.airports]
+            self.cities[code] = {**city, "code": code, "airports": airports, "metro": bool(city.get("metro"))}
+
+        # ชื่อสนามบินก่อน แล้วให้ชื่อเมืองทับเมื่อชนกัน (ผู้ใช้พิมพ์ชื่อเมืองบ่อยกว่า)
+        for iata, ap in self.airports.items():
+            for name in [ap.get("name"), ap.get("name_th"), *(ap.get("aliases") or [])]:
+                self._add_name(name, "airport", iata)
+        for code, city in self.cities.items():
+            for name in [city.get("name"), city.get("name_th"), *(city.get("aliases") or [])]:
+                self._add_name(name, "city", code)
+        logger.info(
+            f"AirportIndex loaded {len(self.cities)} cities, {len(self.airports)} airports, "
+            f"{len(self._names)} names, {len(self._grid)} grid cells"
+        )
+
+    def _add_name(self, name: Any, kind: str, code: str) -> None:
+        key = normalize_place_name(name)
+        if not key:
+            return
+        for k in {key, _strip_affixes(key), key.replace(" ", "")}:
+            if k:
+                self._names[k] = (kind, code)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / CELL_DEG)), int(math.floor(lng / CELL_DEG)) % self._lng_cells
+
+    def _ring(self, ci: int, cj: int, r: int) -> Iterator[Tuple[int, int]]:
+        if r == 0:
+            yield ci, cj
+            return
+        for di in range(-r, r + 1):
+            step = 1 if abs(di) == r else 2 * r
+            for dj in range(-r, r + 1, step):
+                yield ci + di, (cj + dj) % self._lng_cells
+
+    # ---------- name lookup ----------
+
+    def _match(self, key: str) -> Optional[Tuple[str, str]]:
+        if not key:
+            return None
+        return self._names.get(key) or self._names.get(_strip_affixes(key)) or self._names.get(key.replace(" ", ""))
+
+    def lookup(self, name: Any) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a free-text place name (Thai/English/alias, or an IATA/city code) to a match:
+        {type, city_code, flight_code, airport, name, name_th, country, lat, lng}. None when unknown.
+        """
+        key = normalize_place_name(name)
+        if not key:
+            return None
+        hit = self._match(key)
+        if hit is None and "," in str(name):
+            # "Paris, France" / "เชียงใหม่, ประเทศไทย" → ส่วนแรกก่อน comma
+            hit = self._match(normalize_place_name(str(name).split(",", 1)[0]))
+        if hit is None and len(key) == 3 and key.isalpha():
+            code = key.upper()
+            hit = ("city", code) if code in self.cities else ("airport", code) if code in self.airports else None
+        if hit is None:
+            self._stats["name_misses"] += 1
+            return None
+        self._stats["name_hits"] += 1
+        return self._describe(*hit)
+
+    def _describe(self, kind: str, code: str) -> Dict[str, Any]:
+        if kind == "airport":
+            ap = self.airports[code]
+            city = self.cities.get(ap["city"]) or {}
+            return {
+                "type": "airport",
+                "city_code": ap["city"],
+                "flight_code": code,
+                "airport": code,
+                "name": ap.get("name"),
+                "name_th": ap.get("name_th"),
+                "city": city.get("name") or ap.get("name"),
+                "country": city.get("country"),
+                "lat": ap["lat"],
+                "lng": ap["lng"],
+            }
+        city = self.cities[code]
+        primary = city["airports"][0] if city["airports"] else None
+        return {
+            "type": "city",
+            "city_code": code,
+            "flight_code": code if city["metro"] or not primary else primary,
+            "airport": primary,
+            "name": city.get("name"),
+            "name_th": city.get("name_th"),
+            "city": city.get("name"),
+            "country": city.get("country"),
+            "lat": city["lat"],
+            "lng": city["lng"],
+        }
+
+    def find_places(self, text: Any) -> List[Dict[str, Any]]:
+        """
+        Known city/airport names mentioned inside free text ("อยากไปเชียงใหม่จากกรุงเทพ"), in order.
+        Longest match wins at each position; Thai needs no word boundary (short Thai names need a
+        "ไป"/"จาก"/"จังหวัด" marker), Latin names need one and at least 4 letters (avoids matching
+        short English words). Each hit is lookup() output plus
+        start/end offsets into normalize_place_name(text).
+        """
+        key = normalize_place_name(text)
+        if not key or not self._names:
+            return []
+        max_len = self._max_name_len or max(len(k) for k in self._names)
+        self._max_name_len = max_len
+        found: List[Dict[str, Any]] = []
+        i = 0
+        while i < len(key):
+            hit = None
+            for length in range(min(max_len, len(key) - i), 2, -1):
+                sub = key[i:i + length]
+                if sub not in self._names or sub != sub.strip():
+                    continue
+                if sub.isascii():
+                    before = key[i - 1] if i else " "
+                    after = key[i + length] if i + length < len(key) else " "
+                    if length < 4 or before.isalnum() and before.isascii() or after.isalnum() and after.isascii():
+                        continue
+                elif length <= 3 and not key[:i].rstrip().endswith(_THAI_PLACE_MARKERS):
+                    # ชื่อไทยสั้นที่เป็นคำทั่วไปด้วย ("เลย", "ตาก") → นับเป็นสถานที่เฉพาะเมื่อตามหลัง "ไป"/"จาก"/"จังหวัด"
+                    continue
+                hit = (sub, self._names[sub])
+                break
+            if hit is None:
+                i += 1
+                continue
+            sub, (kind, code) = hit
+            found.append({**self._describe(kind, code), "start": i, "end": i + len(sub), "text": sub})
+            i += len(sub)
+        return found
+
+    def city_code(self, name: Any) -> Optional[str]:
+        """Amadeus city code for hotel-by-city queries (Tokyo -> TYO, Don Mueang -> BKK)."""
+        match = self.lookup(name)
+        return match["city_code"] if match else None
+
+    def flight_code(self, name: Any) -> Optional[str]:
+        """Location code for flight-offers: metro city code (TYO, LON) or the city's primary airport."""
+        match = self.lookup(name)
+        return match["flight_code"] if match else None
+
+    def coordinates(self, name: Any) -> Optional[Dict[str, Any]]:
+        """Geocoding-shaped result ({lat, lng, address, city, country_code}) for a known city/airport."""
+        match = self.lookup(name)
+        if not match:
+            return None
+        address = match["name"] if match["type"] == "airport" else f"{match['name']}, {match['country']}"
+        return {
+            "lat": match["lat"],
+            "lng": match["lng"],
+            "address": address,
+            "city": match["city"],
+            "country_code": match["country"],
+        }
+
+    # ---------- spatial lookup ----------
+
+    def nearest_airports(
+        self, lat: float, lng: float, limit: int = 1, max_km: float = DEFAULT_RADIUS_KM
+    ) -> List[Dict[str, Any]]:
+        """
+        Airports within max_km sorted by distance (closest first), each with distance_km.
+        Scans grid rings outward and stops once no unscanned cell can hold a closer airport.
+        """
+        try:
+            lat, lng = float(lat), float(lng)
+        except (TypeError, ValueError):
+            return []
+        ci, cj = self._cell(lat, lng)
+        found: List[Tuple[float, str]] = []
+        r = 0
+        while r <= 180:
+            for cell in self._ring(ci, cj, r):
+                for iata in self._grid.get(cell, ()):
+                    ap = self.airports[iata]
+                    d = haversine_km(lat, lng, ap["lat"], ap["lng"])
+                    if d <= max_km:
+                        found.append((d, iata))
+            # จุดที่ยังไม่สแกนอยู่ห่างอย่างน้อย r ช่องทั้งแนว lat หรือ lng (lng หดตาม cos(lat))
+            lat_edge = min(89.9, abs(lat) + (r + 1) * CELL_DEG)
+            bound = r * CELL_DEG * _KM_PER_DEG * math.cos(math.radians(lat_edge))
+            if bound > max_km:
+                break
+            if len(found) >= limit:
+                found.sort()
+                if found[limit - 1][0] <= bound:
+                    break
+            r += 1
+        found.sort()
+        return [{**self.airports[iata], "distance_km": round(d, 1)} for d, iata in found[:limit]]
+
+    def nearest_airport(self, lat: float, lng: float, max_km: float = DEFAULT_RADIUS_KM) -> Optional[Dict[str, Any]]:
+        result = self.nearest_airports(lat, lng, limit=1, max_km=max_km)
+        self._stats["nearest_hits" if result else "nearest_misses"] += 1
+        return result[0] if result else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "cities": len(self.cities),
+            "airports": len(self.airports),
+            "names": len(self._names),
+            "grid_cells": len(self._grid),
+        }
+
+
+_airport_index: Optional[AirportIndex] = None
+
+
+def get_airport_index() -> AirportIndex:
+    """Get or create the process-wide airport index (loaded once from app/data/airports.json)."""
+    global _airport_index
+    if _airport_index is None:
+        _airport_index = AirportIndex()
+    return _airport_index
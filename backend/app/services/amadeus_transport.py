@@ -0,0 +1,561 @@
+"""
+ชั้น transport กลางของ Amadeus (ทั้ง process)
+
+เดิม TravelOrchestrator แต่ละตัว (agent, data aggregator, MCP, diagnostics ...) สร้าง httpx.AsyncClient และขอ OAuth token
+ของตัวเอง และรู้ว่าโดน rate limit ก็ต่อเมื่อได้ 429 แล้ว (backoff ใน _amadeus_get) — ตอนโหลดสูงเกิด 429 เป็นชุด
+ตอนนี้ทุกการเรียก Amadeus ผ่าน AmadeusTransport ตัวเดียว:
+- httpx.AsyncClient ตัวเดียว (HTTP/2 เมื่อมีแพ็กเกจ h2, keep-alive pool ปรับได้)
+- OAuth token ต่อ environment (search / booking) ใช้ร่วมกัน และรีเฟรชล่วงหน้าเบื้องหลังก่อนหมดอายุ
+- token bucket ต่อ endpoint family (shopping / reference / schedule / booking) ตาม TPS ของ Amadeus — เกินแล้วรอคิว
+  แทนการยิงไปโดน 429; คิวให้ INTERACTIVE (ผู้ใช้รอ) ก่อน MONITOR (FlightMonitor / งานเบื้องหลัง)
+- 429 → เคารพ Retry-After, หยุด bucket นั้นชั่วคราวแล้วเข้าคิวใหม่
+- latency histogram ต่อ endpoint (ดูที่ /api/monitoring/amadeus)
+"""
+
+from __future__ import annotations
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import re
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.exceptions import AmadeusException
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx ใช้ HTTP/2 ได้เมื่อมีแพ็กเกจนี้: pip install httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+SANDBOX_BASE_URL = "https://test.api.amadeus.com"
+PRODUCTION_BASE_URL = "https://api.amadeus.com"
+TOKEN_PATH = "/v1/security/oauth2/token"
+
+_LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_RETRYABLE_STATUS = (500, 502, 503, 504)
+
+
+class AmadeusPriority(str, Enum):
+    """Queue class of an Amadeus call (lower rank is served first)."""
+    INTERACTIVE = "interactive"  # แชท / ค้นหา / จอง ที่ผู้ใช้รอผลอยู่
+    MONITOR = "monitor"          # FlightMonitor, งานเบื้องหลัง
+
+    @property
+    def rank(self) -> int:
+        return 0 if self is AmadeusPriority.INTERACTIVE else 1
+
+
+_amadeus_priority: ContextVar[AmadeusPriority] = ContextVar("amadeus_priority", default=AmadeusPriority.INTERACTIVE)
+
+
+@contextmanager
+def amadeus_priority_scope(priority: AmadeusPriority) -> Iterator[None]:
+    """Every Amadeus call made inside this scope (same task / child tasks) is queued as `priority`."""
+    token = _amadeus_priority.set(priority)
+    try:
+        yield
+    finally:
+        _amadeus_priority.reset(token)
+
+
+def endpoint_family(path: str) -> str:
+    """Rate-limit family of an Amadeus path."""
+    if TOKEN_PATH in path:
+        return "auth"
+    if "/booking/" in path or "/flight-orders" in path or "/hotel-orders" in path:
+        return "booking"
+    if "/shopping/" in path:
+        return "shopping"
+    if "/schedule/" in path:
+        return "schedule"
+    if "/reference-data/" in path:
+        return "reference"
+    return "other"
+
+
+_ID_SEGMENT_RE = re.compile(r"/(?=[^/]*\d)[A-Za-z0-9%=_\-]{12,}")
+
+
+def endpoint_name(path: str) -> str:
+    """Histogram key: path without host, query and opaque ids (/v1/booking/flight-orders/{id})."""
+    path = path.split("?", 1)[0]
+    if "://" in path:
+        path = "/" + path.split("://", 1)[1].split("/", 1)[-1]
+    return _ID_SEGMENT_RE.sub("/{id}", path)
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """'shopping=6,reference=3' → {'shopping': 6.0, 'reference': 3.0} (ignores malformed parts)."""
+    limits: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        try:
+            if name.strip() and float(value) > 0:
+                limits[name.strip()] = float(value)
+        except ValueError:
+            logger.warning(f"AMADEUS_RATE_LIMITS: ignoring '{part}'")
+    return limits
+
+
+def _pct(samples: Deque[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 1)
+
+
+class TokenBucket:
+    """
+    Async token bucket with a priority queue: `rate` requests/second, bursts up to `burst`.
+    Waiters are served strictly by priority, FIFO within a class.
+    burst ค่าเริ่มต้น 1 = เว้นระยะคำขอเท่ากัน (Amadeus นับ TPS เป็นช่วง 100 ms — ยิงรวดเดียวหลายคำขอก็โดน 429)
+    """
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None, window: int = 500):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # heap ของผู้รอ: (rank, seq, priority, enqueued_at, future)
+        self._waiters: List[Tuple[int, int, AmadeusPriority, float, "asyncio.Future[None]"]] = []
+        self._seq = itertools.count()
+        self._pump: Optional["asyncio.Task[None]"] = None
+        self.granted = 0
+        self.queued = 0
+        self.throttled = 0
+        self.queue_ms: Dict[AmadeusPriority, Deque[float]] = {p: deque(maxlen=window) for p in AmadeusPriority}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self, now: float) -> bool:
+        if now < self._paused_until:
+            return False
+        self._refill(now)
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def _has_waiters(self) -> bool:
+        return any(not fut.done() for *_, fut in self._waiters)
+
+    async def acquire(self, priority: AmadeusPriority = AmadeusPriority.INTERACTIVE) -> float:
+        """Wait for a request slot; returns seconds spent queued."""
+        now = time.monotonic()
+        if not self._has_waiters() and self._take(now):
+            self.granted += 1
+            self.queue_ms[priority].append(0.0)
+            return 0.0
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority.rank, next(self._seq), priority, now, fut))
+        self.queued += 1
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.ensure_future(self._run_pump())
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._tokens = min(self.burst, self._tokens + 1.0)  # ได้ slot พร้อมกับถูกยกเลิก → คืน
+            raise
+        waited = time.monotonic() - now
+        self.queue_ms[priority].append(waited * 1000)
+        return waited
+
+    async def _run_pump(self) -> None:
+        while self._waiters:
+            now = time.monotonic()
+            while self._waiters and self._waiters[0][4].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                break
+            if self._take(now):
+                *_, fut = heapq.heappop(self._waiters)
+                self.granted += 1
+                fut.set_result(None)
+                continue
+            if now < self._paused_until:
+                delay = self._paused_until - now
+            else:
+                delay = max(0.001, (1.0 - self._tokens) / self.rate)
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Stop granting slots for `seconds` (Amadeus answered 429)."""
+        self.throttled += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, seconds))
+        self._tokens = 0.0
+        self._updated = self._paused_until  # เติม token ใหม่นับจากหมดช่วงพัก
+
+    def get_stats(self) -> Dict[str, Any]:
+        waiting: Dict[str, int] = {p.value: 0 for p in AmadeusPriority}
+        for _, _, priority, _, fut in self._waiters:
+            if not fut.done():
+                waiting[priority.value] += 1
+        return {
+            "rate_per_s": self.rate,
+            "burst": self.burst,
+            "granted": self.granted,
+            "queued": self.queued,
+            "throttled_429": self.throttled,
+            "waiting": waiting,
+            "queue_ms_p95": {p.value: _pct(q, 0.95) for p, q in self.queue_ms.items()},
+        }
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (ms) + rolling p50/p95 for one endpoint."""
+
+    def __init__(self, window: int = 500):
+        self.buckets = [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.status: Dict[int, int] = {}
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, ms: float, status: Optional[int]) -> None:
+        idx = next((i for i, bound in enumerate(_LATENCY_BUCKETS_MS) if ms <= bound), len(_LATENCY_BUCKETS_MS))
+        self.buckets[idx] += 1
+        self.count += 1
+        self.samples.append(ms)
+        if status is None or status >= 400:
+            self.errors += 1
+        if status is not None:
+            self.status[status] = self.status.get(status, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in _LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "status": dict(self.status),
+            "p50_ms": _pct(self.samples, 0.5),
+            "p95_ms": _pct(self.samples, 0.95),
+            "buckets_ms": dict(zip(labels, self.buckets)),
+        }
+
+
+class _Credentials:
+    """OAuth client-credentials token for one Amadeus environment, shared by every caller."""
+
+    def __init__(self, name: str, base_url: str, client_id: str, client_secret: str):
+        self.name = name
+        self.base_url = base_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+        self.refresh_task: Optional["asyncio.Task[str]"] = None
+        self.refreshes = 0
+        self.last_status: Optional[int] = None
+        self.fell_back_to_test = False
+
+    @property
+    def env_type(self) -> str:
+        return "test" if "test." in self.base_url else "production"
+
+
+class AmadeusTransport:
+    """Process-wide Amadeus HTTP client, token cache and rate limiter."""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, rate_limits: Optional[Dict[str, float]] = None):
+        self._client = client
+        search_env = (settings.amadeus_search_env or "test").lower()
+        booking_env = (settings.amadeus_booking_env or "test").lower()
+        if booking_env == "production":
+            logger.error("🚨 SECURITY: AMADEUS_BOOKING_ENV=production is NOT ALLOWED! Using sandbox instead.")
+        self.credentials: Dict[str, _Credentials] = {
+            "search": _Credentials(
+                "search",
+                PRODUCTION_BASE_URL if search_env == "production" else SANDBOX_BASE_URL,
+                settings.amadeus_search_api_key,
+                settings.amadeus_search_api_secret,
+            ),
+            # Booking: sandbox เท่านั้น (ห้ามใช้ production)
+            "booking": _Credentials(
+                "booking", SANDBOX_BASE_URL, settings.amadeus_booking_api_key, settings.amadeus_booking_api_secret,
+            ),
+        }
+        self.rate_limits = rate_limits if rate_limits is not None else parse_rate_limits(settings.amadeus_rate_limits)
+        self.refresh_margin = float(settings.amadeus_token_refresh_margin_seconds)
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._stats = {"requests": 0, "retries": 0, "token_refreshes": 0, "token_reuse": 0, "auth_retries": 0}
+
+    # ---------- client / limits ----------
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(float(settings.amadeus_http_timeout_seconds), connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=int(settings.amadeus_http_max_connections),
+                    max_keepalive_connections=int(settings.amadeus_http_max_keepalive),
+                    keepalive_expiry=float(settings.amadeus_http_keepalive_seconds),
+                ),
+            )
+            logger.info(
+                f"AmadeusTransport client created: http2={HTTP2_AVAILABLE} "
+                f"max_connections={settings.amadeus_http_max_connections} limits={self.rate_limits}"
+            )
+        return self._client
+
+    def base_url(self, env: str = "search") -> str:
+        return self.credentials[env].base_url
+
+    def bucket(self, env: str, family: str) -> Optional[TokenBucket]:
+        rate = self.rate_limits.get(family) or self.rate_limits.get("default")
+        if not rate:
+            return None
+        key = (env, family)
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(f"{env}:{family}", rate)
+        return self._buckets[key]
+
+    # ---------- OAuth ----------
+
+    async def get_token(self, env: str = "search", force: bool = False) -> str:
+        """
+        Shared OAuth token. Refreshed in the background once it is within refresh_margin of expiry,
+        so callers almost never wait on the token endpoint.
+        """
+        cred = self.credentials[env]
+        now = time.time()
+        if not force and cred.token and now < cred.expires_at:
+            self._stats["token_reuse"] += 1
+            if cred.expires_at - now < self.refresh_margin and (cred.refresh_task is None or cred.refresh_task.done()):
+                cred.refresh_task = asyncio.ensure_future(self._refresh(cred, stale=cred.token))
+                cred.refresh_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            return cred.token
+        return await self._refresh(cred, stale=cred.token if force else None)
+
+    async def _refresh(self, cred: _Credentials, stale: Optional[str] = None) -> str:
+        async with cred.lock:
+            # อีก coroutine รีเฟรชให้แล้วระหว่างรอ lock
+            if cred.token and cred.token != stale and time.time() < cred.expires_at - self.refresh_margin:
+                return cred.token
+            try:
+                return await self._fetch_token(cred)
+            except AmadeusException:
+                if not self._fallback_search_to_test(cred):
+                    raise
+        return await self._refresh(cred)
+
+    async def _fetch_token(self, cred: _Credentials) -> str:
+        logger.info(f"Refreshing Amadeus OAuth2 token for {cred.name} ({cred.env_type})...")
+        bucket = self.bucket(cred.name, "auth")
+        if bucket is not None:
+            await bucket.acquire(AmadeusPriority.INTERACTIVE)
+        started = time.monotonic()
+        status: Optional[int] = None
+        try:
+            response = await self.client.post(
+                f"{cred.base_url}{TOKEN_PATH}",
+                data={"grant_type": "client_credentials", "client_id": cred.client_id, "client_secret": cred.client_secret},
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+            status = response.status_code
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            cred.last_status = status
+            logger.error(f"Failed to authenticate with Amadeus ({cred.name}, {cred.env_type}): {e}")
+            raise AmadeusException(
+                f"Authentication failed with Amadeus API ({cred.env_type}). "
+                "Check AMADEUS_SEARCH_API_KEY and AMADEUS_SEARCH_API_SECRET in .env (production keys from api.amadeus.com)."
+            ) from e
+        finally:
+            self._observe(TOKEN_PATH, (time.monotonic() - started) * 1000, status)
+        cred.token = data["access_token"]
+        cred.expires_at = time.time() + float(data.get("expires_in", 1799)) - 10
+        cred.refreshes += 1
+        self._stats["token_refreshes"] += 1
+        logger.info(f"Amadeus token refreshed for {cred.name} ({cred.env_type}), expires in {data.get('expires_in')}s")
+        return cred.token
+
+    def _fallback_search_to_test(self, cred: _Credentials) -> bool:
+        """Production search keys rejected (401) → use the sandbox so search keeps working."""
+        if cred.name != "search" or cred.fell_back_to_test or cred.env_type != "production" or cred.last_status != 401:
+            return False
+        test_id = settings.amadeus_booking_api_key or cred.client_id
+        test_secret = settings.amadeus_booking_api_secret or cred.client_secret
+        if not (test_id and test_secret):
+            return False
+        logger.warning(
+            "Amadeus production auth failed (401). Falling back to test environment for search. "
+            "To use production, set valid AMADEUS_SEARCH_API_KEY and AMADEUS_SEARCH_API_SECRET in .env"
+        )
+        cred.fell_back_to_test = True
+        cred.base_url = SANDBOX_BASE_URL
+        cred.client_id = test_id
+        cred.client_secret = test_secret
+        cred.token = None
+        cred.expires_at = 0
+        return True
+
+    # ---------- requests ----------
+
+    def _observe(self, path: str, ms: float, status: Optional[int]) -> None:
+        name = endpoint_name(path)
+        hist = self._latency.get(name)
+        if hist is None:
+            hist = self._latency[name] = LatencyHistogram()
+        hist.observe(ms, status)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response, attempt: int) -> float:
+        try:
+            return max(0.1, min(10.0, float(response.headers.get("Retry-After", ""))))
+        except ValueError:
+            return 0.5 * (2 ** attempt)
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        env: str = "search",
+        params: Optional[Dict[str, Any]] = None,
+        json: Any = None,
+        data: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        priority: Optional[AmadeusPriority] = None,
+        timeout: Optional[float] = None,
+        retries: int = 3,
+        raise_for_status: bool = False,
+    ) -> httpx.Response:
+        """
+        Authenticated Amadeus call through the shared pool and rate limiter.
+
+        url: full URL or a path ("/v2/shopping/flight-offers") relative to the environment's base URL.
+        429 is always retried after Retry-After (the request was rejected, not processed); 5xx and network
+        errors are retried for GET only — bookings are never resent. 401 refreshes the token once.
+        """
+        method = method.upper()
+        if not url.startswith("http"):
+            url = f"{self.base_url(env)}{url}"
+        family = endpoint_family(url)
+        priority = priority or _amadeus_priority.get()
+        bucket = self.bucket(env, family)
+        idempotent = method == "GET"
+        self._stats["requests"] += 1
+        auth_retried = False
+        last_exc: Optional[Exception] = None
+        attempt = 0
+        while attempt < max(1, retries):
+            if bucket is not None:
+                await bucket.acquire(priority)
+            token = await self.get_token(env)
+            req_headers = {**(headers or {}), "Authorization": f"Bearer {token}"}
+            started = time.monotonic()
+            try:
+                response = await self.client.request(
+                    method, url, params=params, json=json, data=data, headers=req_headers,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+            except httpx.HTTPError as e:
+                self._observe(url, (time.monotonic() - started) * 1000, None)
+                last_exc = e
+                attempt += 1
+                if not idempotent or attempt >= retries:
+                    raise
+                self._stats["retries"] += 1
+                wait = 0.8 * (2 ** (attempt - 1))
+                logger.warning(f"Amadeus {method} failed attempt={attempt}/{retries} wait={wait:.1f}s url={url} err={e}")
+                await asyncio.sleep(wait)
+                continue
+            self._observe(url, (time.monotonic() - started) * 1000, response.status_code)
+
+            if response.status_code == 401 and not auth_retried:
+                auth_retried = True
+                self._stats["auth_retries"] += 1
+                await self.get_token(env, force=True)
+                continue
+            if response.status_code == 429 and attempt + 1 < retries:
+                wait = self._retry_after(response, attempt)
+                if bucket is not None:
+                    bucket.pause(wait)
+                attempt += 1
+                self._stats["retries"] += 1
+                logger.warning(f"Amadeus 429 on {family} — pausing bucket {wait:.1f}s (attempt {attempt}/{retries})")
+                if bucket is None:
+                    await asyncio.sleep(wait)
+                continue
+            if response.status_code in _RETRYABLE_STATUS and idempotent and attempt + 1 < retries:
+                attempt += 1
+                self._stats["retries"] += 1
+                wait = 0.8 * (2 ** (attempt - 1))
+                logger.warning(f"Amadeus {method} retryable status={response.status_code} attempt={attempt}/{retries} wait={wait:.1f}s url={url}")
+                await asyncio.sleep(wait)
+                continue
+            if raise_for_status:
+                response.raise_for_status()
+            return response
+        raise last_exc if last_exc else AmadeusException(f"Amadeus {method} failed: {url}")
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    # ---------- lifecycle / stats ----------
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "http2": HTTP2_AVAILABLE,
+            "environments": {
+                name: {
+                    "env": cred.env_type,
+                    "has_token": bool(cred.token),
+                    "expires_in_s": round(cred.expires_at - time.time()) if cred.token else None,
+                    "refreshes": cred.refreshes,
+                }
+                for name, cred in self.credentials.items()
+            },
+            "limiters": {bucket.name: bucket.get_stats() for bucket in self._buckets.values()},
+            "endpoints": {name: hist.as_dict() for name, hist in sorted(self._latency.items())},
+        }
+
+    async def aclose(self) -> None:
+        for cred in self.credentials.values():
+            if cred.refresh_task is not None and not cred.refresh_task.done():
+                cred.refresh_task.cancel()
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+
+_transport: Optional[AmadeusTransport] = None
+
+
+def get_amadeus_transport() -> AmadeusTransport:
+    """Get or create the process-wide Amadeus transport."""
+    global _transport
+    if _transport is None:
+        _transport = AmadeusTransport()
+    return _transport
+
+
+def peek_amadeus_transport() -> Optional[AmadeusTransport]:
+    return _transport
@@ -16,6 +16,8 @@ import asyncio
 from app.core.logging import get_logger
 from app.core.config import settings
 from app.services.travel_service import TravelOrchestrator
+from app.services.search_cache import get_search_cache
+from app.services.hotel_place_enrichment import get_hotel_place_index
 from app.models.trip_plan import (
     MergedHotelOption, HotelBookingDetails, HotelPricing, HotelRoom, HotelPolicy,
     HotelAmenities, HotelLocation, HotelVisuals, AIPerspective
@@ -412,79 +414,15 @@ class DataAggregator:
                     except (ValueError, TypeError):
                         logger.warning(f"Invalid max_price format: {kwargs['max_price']}")
 
-                # ── Weighted Sum Scoring ──────────────────────────────────────────
+                # ── Weighted Sum Scoring (vectorized, app/engine/ranking_engine.py) ──
                 # S_i = Σ w_j * f_j(x_ij)  (Min-Max normalized, lower-is-better inverted)
-                # Weights per type:
-                #   flight : price=0.35, duration=0.30, stops=0.20, rating=0.10, review_count=0.05
-                #   hotel  : price=0.30, rating=0.35, review_count=0.20, distance=0.15
-                #   transfer: price=0.40, duration=0.35, rating=0.25
-                #   default: price=0.50, rating=0.30, review_count=0.20
+                # Weights per type: TYPE_WEIGHTS (flight / hotel / transfer / default)
                 # ─────────────────────────────────────────────────────────────────
-                WEIGHTS: dict = {
-                    "flight":   {"price": 0.35, "duration_min": 0.30, "stops": 0.20, "rating": 0.10, "review_count": 0.05},
-                    "hotel":    {"price": 0.30, "rating": 0.35, "review_count": 0.20, "distance": 0.15},
-                    "transfer": {"price": 0.40, "duration_min": 0.35, "rating": 0.25},
-                    "default":  {"price": 0.50, "rating": 0.30, "review_count": 0.20},
-                }
-                # Criteria where lower = better (will be inverted after normalization)
-                INVERSE = {"price", "duration_min", "stops", "distance"}
-
-                def _dur_to_min(d: str) -> float:
-                    """ISO 8601 duration → minutes, e.g. PT2H30M → 150"""
-                    if not d or not d.startswith("PT"):
-                        return 0.0
-                    try:
-                        h = int(d.split('H')[0].replace('PT', '')) if 'H' in d else 0
-                        m_part = d.split('H')[1] if 'H' in d else d.replace('PT', '')
-                        m = int(m_part.replace('M', '')) if 'M' in m_part else 0
-                        return float(h * 60 + m)
-                    except Exception:
-                        return 0.0
-
-                def _extract_raw(item, key: str) -> float:
-                    """Extract a numeric feature from a StandardizedItem."""
-                    if key == "price":
-                        return item.price_amount if item.is_price_available else 0.0
-                    if key == "duration_min":
-                        return _dur_to_min(item.duration or "")
-                    if key == "stops":
-                        return float(getattr(item, "stops", 0) or 0)
-                    if key == "rating":
-                        r = getattr(item, "rating", None) or getattr(item, "stars", None)
-                        return float(r) if r else 0.0
-                    if key == "review_count":
-                        rc = getattr(item, "review_count", None) or getattr(item, "reviews_count", None)
-                        return float(rc) if rc else 0.0
-                    if key == "distance":
-                        d = getattr(item, "distance", None) or getattr(item, "distance_km", None)
-                        return float(d) if d else 0.0
-                    return 0.0
-
-                weights = WEIGHTS.get(request_type, WEIGHTS["default"])
-
-                # Collect raw feature values per criterion
-                raw: dict[str, list[float]] = {k: [] for k in weights}
-                for item in results:
-                    for k in weights:
-                        raw[k].append(_extract_raw(item, k))
-
-                # Min-Max normalize each criterion
-                def _minmax(vals: list[float]) -> list[float]:
-                    lo, hi = min(vals), max(vals)
-                    if hi == lo:
-                        return [0.5] * len(vals)
-                    return [(v - lo) / (hi - lo) for v in vals]
-
-                norm: dict[str, list[float]] = {}
-                for k, vals in raw.items():
-                    n = _minmax(vals)
-                    # Invert lower-is-better criteria
-                    norm[k] = [1.0 - v if k in INVERSE else v for v in n]
-
-                # Compute weighted sum score for each item
-                for idx, item in enumerate(results):
-                    score = sum(weights[k] * norm[k][idx] for k in weights)
-                    item.weighted_score = round(score, 4)
+                # import ภายในฟังก์ชัน: app.engine.__init__ → agent → data_aggregator (circular)
+                from app.engine.ranking_engine import dur_to_min, rank_items, round4
+                ranking = rank_items(results, request_type)
+                for item, score in zip(results, round4(ranking.scores)):
+                    item.weighted_score = score
 
                 # Sort by weighted score descending (higher = better)
                 results.sort(key=lambda x: (-(getattr(x, "weighted_score", 0.0)),
@@ -500,7 +438,7 @@ class DataAggregator:
 
                 # 2. Special tags for flights
                 if request_type == "flight":
-                    dur_vals = [(i, _dur_to_min(x.duration or "")) for i, x in enumerate(results)]
+                    dur_vals = [(i, dur_to_min(x.duration or "")) for i, x in enumerate(results)]
                     valid_dur = [(i, d) for i, d in dur_vals if d > 0]
                     if valid_dur:
                         fastest_idx = min(valid_dur, key=lambda t: t[1])[0]
@@ -744,16 +682,30 @@ class DataAggregator:
         mapped_cabin = cabin_mapping.get(cabin_class, cabin_class) if cabin_class else None
         
         return_date = kwargs.get("return_date")
-        raw_data = await self.orchestrator.get_flights(
-            origin=origin,
-            destination=destination,
-            departure_date=date,
-            adults=adults,
-            non_stop=use_non_stop,
-            cabin_class=mapped_cabin,
-            return_date=return_date,
+        # ✅ Shared search cache: request เดียวกันจากทุกเซสชันใช้ผล Amadeus ร่วมกัน (single-flight)
+        raw_data, _ = await get_search_cache().get_or_fetch(
+            "flight",
+            {
+                "origin": origin,
+                "destination": destination,
+                "departure_date": date,
+                "return_date": return_date,
+                "adults": adults,
+                "cabin_class": mapped_cabin,
+                "non_stop": use_non_stop,
+            },
+            lambda: self.orchestrator.get_flights(
+                origin=origin,
+                destination=destination,
+                departure_date=date,
+                adults=adults,
+                non_stop=use_non_stop,
+                cabin_class=mapped_cabin,
+                return_date=return_date,
+            ),
+            source="flight_offers",
         )
-        return [self._normalize_flight(item) for item in raw_data]
+        return [self._normalize_flight(item) for item in raw_data or []]
 
     async def _get_hotels(self, location: str, check_in: str, check_out: str, guests: int = 1, **kwargs) -> List[StandardizedItem]:
         """
@@ -784,7 +736,12 @@ class DataAggregator:
                 location = enhanced_location
         
         # 1. Fetch from Amadeus (Source of truth for booking/pricing)
-        raw_data = await self.orchestrator.get_hotels(location_name=location, check_in=check_in, check_out=check_out, guests=guests)
+        raw_data, _ = await get_search_cache().get_or_fetch(
+            "hotel",
+            {"location": location, "check_in": check_in, "check_out": check_out, "guests": guests},
+            lambda: self.orchestrator.get_hotels(location_name=location, check_in=check_in, check_out=check_out, guests=guests),
+            source="hotel_offers",
+        )
         
         if raw_data:
             logger.info(f"Found {len(raw_data)} hotels in Amadeus for {location}. Syncing with Google...")
@@ -865,12 +822,59 @@ class DataAggregator:
             ),
         ]
 
+    async def _resolve_google_place(
+        self, hotel_name: str, city_code: str, lat: Optional[float], lng: Optional[float]
+    ) -> Dict[str, Any]:
+        """
+        Google lookups for one hotel (prefer Find Place by name for accuracy, then text search, then nearby).
+        Returns place details including place_id, or {} when no match.
+        Raises when a Google call failed and no place was found, or Place Details failed — HotelPlaceIndex
+        must not remember a transient error as "no match".
+        """
+        from app.engine.agent import LocationIntelligence
+
+        last_error: Optional[Exception] = None
+        found = None
+        place_id = None
+        try:
+            found = await LocationIntelligence.find_hotel_place_google(hotel_name, city_code, lat, lng, raise_errors=True)
+        except Exception as e:
+            last_error = e
+        if found:
+            place_id = found.get("place_id")
+        if not place_id:
+            try:
+                text_found = await LocationIntelligence.search_hotel_text_google(hotel_name, city_code, lat, lng, raise_errors=True)
+            except Exception as e:
+                last_error, text_found = e, None
+            if text_found:
+                place_id = text_found.get("place_id")
+        if not place_id:
+            search_query = f"{hotel_name} {city_code or ''}".strip()
+            try:
+                nearby = await LocationIntelligence.search_nearby_google(search_query, radius=2000, raise_errors=True)
+            except Exception as e:
+                last_error, nearby = e, []
+            if nearby:
+                place_id = nearby[0]["place_id"]
+        if not place_id:
+            if last_error is not None:
+                raise last_error
+            return {}
+        details = await LocationIntelligence.get_place_details_google(place_id, raise_errors=True)
+        if not details:
+            return {}
+        details = dict(details)
+        details["place_id"] = place_id
+        # Fallback: use photos from Find Place if Place Details has none
+        if not details.get("photos") and found and found.get("photos"):
+            details["photos"] = found["photos"]
+        return details
+
     async def _normalize_and_sync_hotel(self, amadeus_raw: Dict[str, Any]) -> Optional[StandardizedItem]:
         """
         Normalize Amadeus hotel and enrich with Google Place data.
         """
-        from app.engine.agent import LocationIntelligence
-        
         hotel_meta = amadeus_raw.get("hotel", {})
         hotel_name = hotel_meta.get("name", "Unknown Hotel")
         city_code_raw = amadeus_raw.get("_debug", {}).get("city_code_used", "")
@@ -885,35 +889,16 @@ class DataAggregator:
         else:
             city_code = city_code_raw
         
-        # 1. Try to find the matching Google Place (prefer Find Place by name for accuracy)
+        # 1. Google Place details: ดัชนีถาวร (hotelId → place) ก่อน, เรียก Google เฉพาะเมื่อยังไม่มี/ข้อมูลเก่า
         google_place_details = {}
         try:
             lat = hotel_meta.get("latitude")
             lng = hotel_meta.get("longitude")
-            # Prefer Find Place (text search by hotel name) - more accurate than nearby
-            found = await LocationIntelligence.find_hotel_place_google(hotel_name, city_code, lat, lng)
-            place_id = None
-            if found:
-                place_id = found.get("place_id")
-            if not place_id:
-                text_found = await LocationIntelligence.search_hotel_text_google(hotel_name, city_code, lat, lng)
-                if text_found:
-                    place_id = text_found.get("place_id")
-            if not place_id:
-                search_query = f"{hotel_name} {city_code or ''}".strip()
-                nearby = await LocationIntelligence.search_nearby_google(search_query, radius=2000)
-                if nearby:
-                    place_id = nearby[0]["place_id"]
-            if place_id:
-                details = await LocationIntelligence.get_place_details_google(place_id)
-                if details:
-                    google_place_details = details
-                    # Fallback: use photos from Find Place if Place Details has none
-                    if not google_place_details.get("photos") and found and found.get("photos"):
-                        google_place_details = dict(google_place_details)
-                        google_place_details["photos"] = found["photos"]
-                        if not google_place_details.get("place_id"):
-                            google_place_details["place_id"] = place_id
+            google_place_details = await get_hotel_place_index().get_or_resolve(
+                amadeus_raw,
+                lambda: self._resolve_google_place(hotel_name, city_code, lat, lng),
+                city_code=city_code,
+            )
         except Exception as e:
             logger.warning(f"Failed to sync hotel '{hotel_name}' with Google: {e}")
 
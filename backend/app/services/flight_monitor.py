@@ -129,9 +129,8 @@ class FlightMonitorService:
         This is a best-effort call — failures are silently swallowed.
         """
         try:
-            from app.services.travel_service import TravelService
-
-            travel_svc = TravelService()
+            from app.services.amadeus_transport import AmadeusPriority, amadeus_priority_scope
+            from app.services.travel_service import orchestrator
 
             # Extract flight number + date from booking segments
             segments = booking_doc.get("segments") or []
@@ -147,23 +146,27 @@ class FlightMonitorService:
                 return None
 
             flight_num_only = "".join(filter(str.isdigit, flight_number))
-            result = await travel_svc.get_flight_schedule(
-                carrier_code=carrier_code,
-                flight_number=flight_num_only,
-                scheduled_departure_date=departure_date,
-            )
+            # ใช้ transport/token กลางร่วมกับแชท แต่เข้าคิว rate limit หลังคำขอของผู้ใช้ (MONITOR)
+            with amadeus_priority_scope(AmadeusPriority.MONITOR):
+                result = await orchestrator.get_flight_schedule(
+                    carrier_code=carrier_code,
+                    flight_number=flight_num_only,
+                    scheduled_departure_date=departure_date,
+                )
             if not result:
                 return None
 
-            # Parse delay from result
-            delay = result.get("delay_minutes") or result.get("delayMinutes")
-            if delay is not None:
-                return int(delay)
-
-            # Infer from status string
+            # Cancelled ก่อน — เที่ยวบินที่ยกเลิกอาจมี delay_minutes มาด้วย
             status_str = (result.get("status") or "").lower()
             if "cancel" in status_str:
                 return -1
+
+            # Parse delay from result
+            delay = result.get("delay_minutes")
+            if delay is None:
+                delay = result.get("delayMinutes")
+            if delay is not None:
+                return int(delay)
             return 0
         except Exception as e:
             logger.debug(f"[FlightMonitor] _fetch_delay_minutes error: {e}")
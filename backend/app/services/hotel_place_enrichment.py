@@ -1,17 +1,34 @@
 """
 เสริมข้อมูลที่พักจาก Google Places (ที่อยู่ + รูป) สำหรับผลค้นหา Amadeus
 ใช้เมื่อ API Amadeus v3 ไม่คืน address และ media
+
+HotelPlaceIndex: ดัชนีถาวร hotelId → Google place (Mongo "hotel_place_index" + hot layer ใน memory)
+- key หลัก "hotel:{hotelId}", key สำรอง ชื่อ + พิกัดปัด 3 ตำแหน่ง (~100 ม.)
+- ข้อมูลเก่ากว่า HOTEL_PLACE_STALE_DAYS → คืนค่าเดิมทันทีแล้ว refresh เบื้องหลัง
+- หาไม่เจอ → จำผลลบไว้ HOTEL_PLACE_NEGATIVE_TTL_HOURS กันการค้น Google ซ้ำ
+  (เฉพาะ "ไม่มี candidate" จริง — resolver ที่ error เช่น timeout/quota ต้อง raise และจะไม่ถูกจำ)
 """
 
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import asyncio
+import re
 
+from app.core.bounded_cache import BoundedCache
 from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+INDEX_COLLECTION = "hotel_place_index"
+# ฟิลด์ Place Details ที่เก็บในดัชนี (ชุดเดียวกับที่ DataAggregator ใช้ merge)
+PLACE_DETAIL_FIELDS = [
+    "name", "formatted_address", "formatted_phone_number",
+    "geometry", "rating", "user_ratings_total", "reviews",
+    "website", "url", "price_level", "opening_hours", "photos",
+]
+
 
 def _get_gmaps():
     """Lazy Google Maps client (sync)."""
@@ -25,41 +42,33 @@ def _get_gmaps():
         return None
 
 
-async def enrich_hotel_with_google_place(amadeus_hotel: Dict[str, Any]) -> Dict[str, Any]:
+def _city_code_from_debug(amadeus_hotel: Dict[str, Any]) -> str:
+    """ดึง city code จาก _debug.city_code_used ("city:BKK" / "cityCode:PAR" / "geo:lat,lng")."""
+    city_raw = (amadeus_hotel.get("_debug") or {}).get("city_code_used", "")
+    if ":" in city_raw:
+        part = city_raw.split(":")[-1].strip()
+        if len(part) == 3 and part.isupper():
+            return part
+        if part and not part[0].isdigit():
+            return part.split(",")[0] if "," in part else part
+        return ""
+    return city_raw
+
+
+async def _resolve_place_details(hotel_name: str, city_code: str) -> Dict[str, Any]:
     """
-    เสริมที่อยู่และรูปภาพจาก Google Places สำหรับรายการที่พัก 1 รายการ
-    คืนค่า dict ที่มี key: address, image_urls (และคง key เดิมของ amadeus_hotel)
-    ไม่แก้ amadeus_hotel เดิม; ถ้าไม่มี Google key หรือหา place ไม่เจอ คืนค่า address/image_urls เป็นค่าว่าง
+    Google: find_place → text search → place details. คืน details (มี place_id) หรือ {} ถ้าไม่พบ.
+    Raise เมื่อ Google error แล้วหา place ไม่ได้ หรือ Place Details error (ไม่ใช่ "ไม่พบ" → ห้ามจำเป็นผลลบ)
     """
-    out: Dict[str, Any] = {"address": "", "image_urls": []}
     gmaps = _get_gmaps()
     if not gmaps:
-        return out
-
-    hotel_meta = amadeus_hotel.get("hotel") or {}
-    hotel_name = (hotel_meta.get("name") or amadeus_hotel.get("name") or "").strip()
-    if not hotel_name:
-        return out
-
-    city_code = ""
-    debug = amadeus_hotel.get("_debug") or {}
-    city_raw = debug.get("city_code_used", "")
-    if ":" in city_raw:
-        part = city_raw.split(":")[-1].strip()
-        if len(part) == 3 and part.isupper():
-            city_code = part
-        elif part and not (part and part[0].isdigit()):
-            city_code = part.split(",")[0] if "," in part else part
-    else:
-        city_code = city_raw
-
-    lat = hotel_meta.get("latitude")
-    lng = hotel_meta.get("longitude")
+        return {}
     loop = asyncio.get_event_loop()
+    query = f"{hotel_name} {city_code}".strip()
 
     place_id = None
+    last_error: Optional[Exception] = None
     try:
-        query = f"{hotel_name} {city_code}".strip()
         result = await loop.run_in_executor(
             None,
             lambda: gmaps.find_place(
@@ -73,13 +82,14 @@ async def enrich_hotel_with_google_place(amadeus_hotel: Dict[str, Any]) -> Dict[
         if candidates:
             place_id = candidates[0].get("place_id")
     except Exception as e:
+        last_error = e
         logger.debug(f"find_place failed for '{hotel_name}': {e}")
 
     if not place_id:
         try:
             text_result = await loop.run_in_executor(
                 None,
-                lambda: gmaps.places(query=f"{hotel_name} {city_code}".strip(), language="th"),
+                lambda: gmaps.places(query=query, language="th"),
             )
             results = text_result.get("results") or []
             for p in results[:3]:
@@ -87,61 +97,86 @@ async def enrich_hotel_with_google_place(amadeus_hotel: Dict[str, Any]) -> Dict[
                     place_id = p["place_id"]
                     break
         except Exception as e:
+            last_error = e
             logger.debug(f"places text search failed for '{hotel_name}': {e}")
 
     if not place_id:
+        if last_error is not None:
+            raise last_error
+        return {}
+
+    place_result = await loop.run_in_executor(
+        None,
+        lambda: gmaps.place(place_id=place_id, fields=PLACE_DETAIL_FIELDS, language="th"),
+    )
+    result = place_result.get("result")
+    if not result:
+        return {}
+    return {**result, "place_id": place_id}
+
+
+def _enrichment_from_details(details: Dict[str, Any], lat: Any, lng: Any) -> Dict[str, Any]:
+    """แปลง Google place details เป็น address + image_urls (รูปจาก photo reference หรือ Static Map)."""
+    out: Dict[str, Any] = {"address": "", "image_urls": []}
+    if not details:
         return out
+    out["address"] = details.get("formatted_address") or ""
 
-    try:
-        place_result = await loop.run_in_executor(
-            None,
-            lambda: gmaps.place(
-                place_id=place_id,
-                # Request geometry so we can build a Static Map fallback if photos are missing.
-                fields=["formatted_address", "photos", "name", "rating", "user_ratings_total", "geometry"],
-                language="th",
-            ),
-        )
-        result = place_result.get("result")
-        if not result:
-            return out
-
-        out["address"] = result.get("formatted_address") or ""
-
-        photos = result.get("photos") or []
-        api_key = getattr(settings, "google_maps_api_key", "") or ""
-        if photos and api_key:
-            for p in photos[:5]:
-                url = None
-                ref = p.get("photo_reference")
-                name = p.get("name")
-                if ref:
-                    url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photo_reference={ref}&key={api_key}"
-                elif name:
-                    url = f"https://places.googleapis.com/v1/{name}/media?maxWidthPx=400&key={api_key}"
-                if url:
-                    out["image_urls"].append(url)
-
-        # ถ้า Google Places ไม่คืน photos เลย ให้ใช้ Static Map เป็นรูป fallback จากพิกัด
-        if not out["image_urls"] and api_key:
-            loc = (result.get("geometry") or {}).get("location") or {}
-            static_lat = loc.get("lat") or lat
-            static_lng = loc.get("lng") or lng
-            if static_lat is not None and static_lng is not None:
-                static_url = (
-                    "https://maps.googleapis.com/maps/api/staticmap"
-                    f"?center={static_lat},{static_lng}"
-                    "&zoom=16&size=400x300&maptype=roadmap"
-                    f"&markers=color:red%7C{static_lat},{static_lng}"
-                    f"&key={api_key}"
-                )
-                out["image_urls"].append(static_url)
-    except Exception as e:
-        logger.debug(f"place details failed for place_id={place_id}: {e}")
+    photos = details.get("photos") or []
+    api_key = getattr(settings, "google_maps_api_key", "") or ""
+    if photos and api_key:
+        for p in photos[:5]:
+            url = None
+            ref = p.get("photo_reference")
+            name = p.get("name")
+            if ref:
+                url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photo_reference={ref}&key={api_key}"
+            elif name:
+                url = f"https://places.googleapis.com/v1/{name}/media?maxWidthPx=400&key={api_key}"
+            if url:
+                out["image_urls"].append(url)
 
+    # ถ้า Google Places ไม่คืน photos เลย ให้ใช้ Static Map เป็นรูป fallback จากพิกัด
+    if not out["image_urls"] and api_key:
+        loc = (details.get("geometry") or {}).get("location") or {}
+        static_lat = loc.get("lat") or lat
+        static_lng = loc.get("lng") or lng
+        if static_lat is not None and static_lng is not None:
+            static_url = (
+                "https://maps.googleapis.com/maps/api/staticmap"
+                f"?center={static_lat},{static_lng}"
+                "&zoom=16&size=400x300&maptype=roadmap"
+                f"&markers=color:red%7C{static_lat},{static_lng}"
+                f"&key={api_key}"
+            )
+            out["image_urls"].append(static_url)
     return out
 
 
+async def enrich_hotel_with_google_place(amadeus_hotel: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    เสริมที่อยู่และรูปภาพจาก Google Places สำหรับรายการที่พัก 1 รายการ
+    คืนค่า dict ที่มี key: address, image_urls (และคง key เดิมของ amadeus_hotel)
+    ไม่แก้ amadeus_hotel เดิม; ถ้าไม่มี Google key หรือหา place ไม่เจอ คืนค่า address/image_urls เป็นค่าว่าง
+    อ่านจาก HotelPlaceIndex ก่อน — เรียก Google เฉพาะโรงแรมที่ยังไม่มีในดัชนีหรือข้อมูลเก่า
+    """
+    if not _get_gmaps():
+        return {"address": "", "image_urls": []}
+
+    hotel_meta = amadeus_hotel.get("hotel") or {}
+    hotel_name = (hotel_meta.get("name") or amadeus_hotel.get("name") or "").strip()
+    if not hotel_name:
+        return {"address": "", "image_urls": []}
+
+    city_code = _city_code_from_debug(amadeus_hotel)
+    details = await get_hotel_place_index().get_or_resolve(
+        amadeus_hotel,
+        lambda: _resolve_place_details(hotel_name, city_code),
+        city_code=city_code,
+    )
+    return _enrichment_from_details(details, hotel_meta.get("latitude"), hotel_meta.get("longitude"))
+
+
 async def enrich_hotels_with_google(hotels: List[Dict[str, Any]]) -> None:
     """
     แก้ไข list ของ hotel ใน place โดยเพิ่ม address และ image_urls จาก Google
@@ -159,3 +194,208 @@ async def enrich_hotels_with_google(hotels: List[Dict[str, Any]]) -> None:
             h["address"] = res["address"]
         if res.get("image_urls"):
             h["image_urls"] = res["image_urls"]
+
+
+# =============================================================================
+# Persistent enrichment index
+# =============================================================================
+
+def _normalize_name(name: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", (name or "").lower()).split())
+
+
+def hotel_index_keys(amadeus_hotel: Dict[str, Any], city_code: str = "") -> Tuple[Optional[str], str]:
+    """(primary key จาก Amadeus hotelId หรือ None, fallback key จากชื่อ + พิกัดปัดเศษ)"""
+    meta = amadeus_hotel.get("hotel") or {}
+    hotel_id = meta.get("hotelId") or amadeus_hotel.get("hotelId")
+    name = _normalize_name(meta.get("name") or amadeus_hotel.get("name") or "")
+    try:
+        fallback = f"geo:{name}:{float(meta.get('latitude')):.3f}:{float(meta.get('longitude')):.3f}"
+    except (TypeError, ValueError):
+        fallback = f"name:{name}:{(city_code or '').upper()}"
+    return (f"hotel:{hotel_id}" if hotel_id else None), fallback
+
+
+class HotelPlaceIndex:
+    """
+    Amadeus hotel → Google place details index.
+
+    Lookup order: hot memory (BoundedCache) → Mongo → Google resolver (single-flight per hotel).
+    Stale positive entries are served immediately and refreshed in the background.
+    """
+
+    def __init__(self, use_db: bool = True):
+        self._use_db = use_db
+        self._hot = BoundedCache(
+            "hotel_place_index",
+            max_entries=settings.hotel_place_hot_max_entries,
+            default_ttl=6 * 3600,
+            sizeof=lambda doc: 2048,
+        )
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._refreshing: set = set()
+        self._stats = {
+            "hot_hits": 0, "db_hits": 0, "misses": 0, "stale_refreshes": 0, "google_resolves": 0, "google_errors": 0,
+        }
+
+    def _collection(self):
+        if not self._use_db:
+            return None
+        try:
+            from app.storage.connection_manager import MongoConnectionManager
+            return MongoConnectionManager.get_instance().get_database()[INDEX_COLLECTION]
+        except Exception as e:
+            logger.debug(f"HotelPlaceIndex: database unavailable: {e}")
+            return None
+
+    @staticmethod
+    def _is_stale(doc: Dict[str, Any]) -> bool:
+        refreshed_at = doc.get("refreshed_at")
+        if not isinstance(refreshed_at, datetime):
+            return True
+        if doc.get("found"):
+            max_age = timedelta(days=settings.hotel_place_stale_days)
+        else:
+            max_age = timedelta(hours=settings.hotel_place_negative_ttl_hours)
+        return datetime.utcnow() - refreshed_at > max_age
+
+    def _remember(self, doc: Dict[str, Any], primary: Optional[str], fallback: str) -> None:
+        for key in (primary, fallback):
+            if key:
+                self._hot.set(key, doc)
+
+    async def lookup(self, primary: Optional[str], fallback: str) -> Optional[Dict[str, Any]]:
+        for key in (primary, fallback):
+            doc = self._hot.get(key) if key else None
+            if doc is not None:
+                self._stats["hot_hits"] += 1
+                return doc
+        coll = self._collection()
+        if coll is None:
+            return None
+        try:
+            doc = await coll.find_one({"$or": [{"_id": primary or fallback}, {"fallback_key": fallback}]})
+        except Exception as e:
+            logger.warning(f"HotelPlaceIndex lookup failed: {e}")
+            return None
+        if doc is not None:
+            self._stats["db_hits"] += 1
+            self._remember(doc, primary, fallback)
+        return doc
+
+    async def store(
+        self, primary: Optional[str], fallback: str, name: str, details: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        doc = {
+            "_id": primary or fallback,
+            "hotel_id": primary.split(":", 1)[1] if primary else None,
+            "fallback_key": fallback,
+            "name": name,
+            "place_id": details.get("place_id"),
+            "found": bool(details.get("place_id")),
+            "details": details,
+            "refreshed_at": now,
+        }
+        self._remember(doc, primary, fallback)
+        coll = self._collection()
+        if coll is not None:
+            try:
+                await coll.update_one(
+                    {"_id": doc["_id"]},
+                    {"$set": {k: v for k, v in doc.items() if k != "_id"}, "$setOnInsert": {"created_at": now}},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.warning(f"HotelPlaceIndex store failed for {doc['_id']}: {e}")
+        return doc
+
+    async def _resolve_and_store(
+        self,
+        primary: Optional[str],
+        fallback: str,
+        name: str,
+        resolver: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        self._stats["google_resolves"] += 1
+        # resolver raise (timeout/quota/details error) → ไม่เก็บอะไร ให้ครั้งหน้าลองใหม่; {} = ไม่พบจริง → จำผลลบ
+        details = await resolver() or {}
+        await self.store(primary, fallback, name, details)
+        return details
+
+    def _schedule_refresh(self, primary, fallback, name, resolver) -> None:
+        key = primary or fallback
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self._stats["stale_refreshes"] += 1
+
+        async def _refresh():
+            try:
+                details = await resolver() or {}
+                if details.get("place_id"):
+                    await self.store(primary, fallback, name, details)
+            except Exception as e:
+                logger.debug(f"HotelPlaceIndex background refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        try:
+            asyncio.get_running_loop().create_task(_refresh())
+        except RuntimeError:
+            self._refreshing.discard(key)
+
+    async def get_or_resolve(
+        self,
+        amadeus_hotel: Dict[str, Any],
+        resolver: Callable[[], Awaitable[Dict[str, Any]]],
+        city_code: str = "",
+    ) -> Dict[str, Any]:
+        """
+        Google place details for one Amadeus hotel ({} when the hotel has no Google match or Google failed).
+        resolver() performs the Google calls: details including place_id, {} for a genuine "no candidate"
+        (remembered as a negative entry), or raise on errors (not remembered, retried on the next lookup).
+        """
+        primary, fallback = hotel_index_keys(amadeus_hotel, city_code)
+        meta = amadeus_hotel.get("hotel") or {}
+        name = meta.get("name") or amadeus_hotel.get("name") or ""
+
+        doc = await self.lookup(primary, fallback)
+        if doc is not None:
+            if not self._is_stale(doc):
+                return dict(doc.get("details") or {})
+            if doc.get("found"):
+                self._schedule_refresh(primary, fallback, name, resolver)
+                return dict(doc.get("details") or {})
+
+        if not getattr(settings, "google_maps_api_key", None):
+            return {}
+
+        self._stats["misses"] += 1
+        key = primary or fallback
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._resolve_and_store(primary, fallback, name, resolver))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f, k=key: self._inflight.pop(k, None))
+        try:
+            return dict(await asyncio.shield(future))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._stats["google_errors"] += 1
+            logger.debug(f"HotelPlaceIndex: Google resolve failed for {key}, not cached: {e}")
+            return {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "hot_entries": len(self._hot), "refreshing": len(self._refreshing)}
+
+
+_hotel_place_index: Optional[HotelPlaceIndex] = None
+
+
+def get_hotel_place_index() -> HotelPlaceIndex:
+    global _hotel_place_index
+    if _hotel_place_index is None:
+        _hotel_place_index = HotelPlaceIndex()
+    return _hotel_place_index
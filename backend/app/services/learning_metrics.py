@@ -0,0 +1,379 @@
+"""
+Learning metrics: query ฝั่ง MongoDB สำหรับ admin learning monitor (/api/admin/learning-monitor, /ai-learning-metrics)
+
+เดิม learning monitor ยิง query ต่อ user ~7–8 ครั้ง (users, choice count, trip eval, session, reward count, Q count,
+top Q, FWL) → 50 users ≈ 400 round-trips และ ai-learning-metrics ใช้ count_documents({}) + distinct("user_id")
+ที่ดึง user_id ทุกค่ากลับมานับในแอป
+- per-user: รวมเป็น batch ด้วย {"user_id": {"$in": ids}} + $group (query จำนวนคงที่ ไม่ขึ้นกับจำนวน user)
+- ภาพรวม: estimated_document_count (metadata) + $group/$count บน server + $facet สำหรับสถิติ reward
+- rollup: สรุปตัวชี้วัดเป็น bucket ตามช่วงเวลา (learning_metrics_rollups) สำหรับกราฟย้อนหลัง
+"""
+
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+REWARDS_COL = "user_feedback_history"
+QTABLE_COL = "user_preference_scores"
+MEMORIES_COL = "memories"
+ROLLUP_COL = "learning_metrics_rollups"
+
+# จำนวน reward ล่าสุดที่ใช้คำนวณ rl_score (ค่าเดิมของ ai-learning-metrics)
+RECENT_REWARD_WINDOW = 100
+# เพดาน FWL docs ต่อ user (เท่ากับ get_user_weights_doc)
+FWL_DOCS_PER_USER = 20
+
+USER_PROJECTION = {
+    "user_id": 1, "preferences": 1, "full_name": 1, "first_name": 1, "last_name": 1,
+    "first_name_th": 1, "last_name_th": 1, "email": 1,
+}
+
+
+def _reward_stats_group() -> Dict[str, Any]:
+    # reward ที่ไม่มีค่าคิดเป็น 0 เหมือน r.get("reward", 0) เดิม
+    return {
+        "_id": None,
+        "n": {"$sum": 1},
+        "avg": {"$avg": {"$ifNull": ["$reward", 0]}},
+        "positive": {"$sum": {"$cond": [{"$gt": ["$reward", 0]}, 1, 0]}},
+    }
+
+
+def _reward_stats(row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    n = int((row or {}).get("n") or 0)
+    avg = float((row or {}).get("avg") or 0.0) if n else 0.0
+    positive = int((row or {}).get("positive") or 0)
+    return {"count": n, "avg_reward": avg, "positive_ratio_pct": (positive / n * 100) if n else 0.0}
+
+
+class LearningMetricsService:
+    """Batched / aggregated reads over the learning collections. ทุก method คืน dict ดิบ — การจัดรูปแบบอยู่ที่ admin API"""
+
+    def __init__(self, db: Any = None):
+        self._db = db
+        self._stats = {
+            "summary_calls": 0,
+            "user_batches": 0,
+            "users_loaded": 0,
+            "queries": 0,
+            "rollups_written": 0,
+            "rollup_errors": 0,
+            "last_rollup_bucket": None,
+            "last_rollup_ms": 0.0,
+        }
+
+    def _get_db(self):
+        if self._db is not None:
+            return self._db
+        from app.storage.connection_manager import ConnectionManager
+        return ConnectionManager.get_instance().get_mongo_database()
+
+    def is_available(self) -> bool:
+        return self._get_db() is not None
+
+    async def _aggregate(self, col, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self._stats["queries"] += 1
+        return await col.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+    async def _count_users(self, col) -> int:
+        # $sort ตาม user_id ก่อน $group ให้ server ใช้ index ที่ขึ้นต้นด้วย user_id (DISTINCT_SCAN) แทน distinct() ที่ส่งทุกค่ากลับมา
+        rows = await self._aggregate(col, [
+            {"$sort": {"user_id": 1}},
+            {"$group": {"_id": "$user_id"}},
+            {"$count": "n"},
+        ])
+        return int(rows[0]["n"]) if rows else 0
+
+    async def _estimated_count(self, col) -> int:
+        self._stats["queries"] += 1
+        return int(await col.estimated_document_count())
+
+    # ---------- ai-learning-metrics ----------
+
+    async def summary(self) -> Optional[Dict[str, Any]]:
+        """ตัวเลขภาพรวม RL / choice / memory — None เมื่อไม่มี DB"""
+        db = self._get_db()
+        if db is None:
+            return None
+        from app.services.selection_preferences import COLLECTION_CHOICE_HISTORY
+        self._stats["summary_calls"] += 1
+        rewards, qtable = db[REWARDS_COL], db[QTABLE_COL]
+        choices, memories = db[COLLECTION_CHOICE_HISTORY], db[MEMORIES_COL]
+        (
+            total_rewards, total_q, total_choices, total_memories,
+            users_rewards, users_q, users_choices, users_memories,
+            recent,
+        ) = await asyncio.gather(
+            self._estimated_count(rewards),
+            self._estimated_count(qtable),
+            self._estimated_count(choices),
+            self._estimated_count(memories),
+            self._count_users(rewards),
+            self._count_users(qtable),
+            self._count_users(choices),
+            self._count_users(memories),
+            self._aggregate(rewards, [
+                {"$sort": {"created_at": -1}},
+                {"$limit": RECENT_REWARD_WINDOW},
+                {"$group": _reward_stats_group()},
+            ]),
+        )
+        return {
+            "total_reward_records": total_rewards,
+            "total_q_entries": total_q,
+            "total_choices": total_choices,
+            "total_memories": total_memories,
+            "users_with_rewards": users_rewards,
+            "users_with_q": users_q,
+            "users_with_choices": users_choices,
+            "users_with_memories": users_memories,
+            "recent_rewards": _reward_stats(recent[0] if recent else None),
+        }
+
+    # ---------- learning-monitor ----------
+
+    async def candidate_user_ids(self, limit: int) -> List[str]:
+        """user_id ที่มีกิจกรรมการเรียนรู้ (sessions, trip_evaluations, choice_history, feedback_history) — เลือกแบบเดิม"""
+        db = self._get_db()
+        if db is None:
+            return []
+        from app.services.trip_evaluations import COLLECTION_NAME as TRIP_EVAL_COL
+        from app.services.selection_preferences import COLLECTION_CHOICE_HISTORY
+        col_names = ["sessions", TRIP_EVAL_COL, COLLECTION_CHOICE_HISTORY, REWARDS_COL]
+
+        async def _scan(col_name: str) -> List[Dict[str, Any]]:
+            self._stats["queries"] += 1
+            cursor = db[col_name].find({}, {"user_id": 1, "session_id": 1}).limit(limit * 2)
+            return await cursor.to_list(length=limit * 2)
+
+        user_ids = set()
+        for col_name, docs in zip(col_names, await asyncio.gather(*[_scan(c) for c in col_names])):
+            for doc in docs:
+                uid_val = doc.get("user_id")
+                if not uid_val and col_name == "sessions" and doc.get("session_id"):
+                    sid = str(doc["session_id"])
+                    if "::" in sid:
+                        uid_val = sid.split("::")[0]
+                if uid_val:
+                    user_ids.add(uid_val)
+        return list(user_ids)[:limit]
+
+    async def _counts_by_user(self, col, ids: List[str]) -> Dict[str, int]:
+        rows = await self._aggregate(col, [
+            {"$match": {"user_id": {"$in": ids}}},
+            {"$group": {"_id": "$user_id", "n": {"$sum": 1}}},
+        ])
+        return {r["_id"]: int(r["n"]) for r in rows}
+
+    async def _latest_trips(self, col, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        rows = await self._aggregate(col, [
+            {"$match": {"user_id": {"$in": ids}}},
+            {"$sort": {"user_id": 1, "updated_at": -1}},
+            {"$group": {
+                "_id": "$user_id",
+                "user_stars": {"$first": "$user_stars"},
+                "satisfaction_pct": {"$first": "$satisfaction_pct"},
+                "agent_accuracy_score": {"$first": "$agent_accuracy_score"},
+                "updated_at": {"$first": "$updated_at"},
+            }},
+        ])
+        return {r.pop("_id"): r for r in rows}
+
+    async def _last_sessions(self, col, ids: List[str]) -> Dict[str, Any]:
+        if not ids:
+            return {}
+        rows = await self._aggregate(col, [
+            {"$match": {"user_id": {"$in": ids}}},
+            {"$group": {"_id": "$user_id", "last_updated": {"$max": "$last_updated"}}},
+        ])
+        return {r["_id"]: r["last_updated"] for r in rows if r.get("last_updated")}
+
+    async def _top_q(self, col, ids: List[str], per_user: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+        if not ids:
+            return {}
+        rows = await self._aggregate(col, [
+            {"$match": {"user_id": {"$in": ids}, "q_value": {"$gt": 0}}},
+            {"$sort": {"user_id": 1, "q_value": -1}},
+            {"$group": {
+                "_id": "$user_id",
+                "top": {"$push": {"slot_name": "$slot_name", "option_key": "$option_key", "q_value": "$q_value"}},
+            }},
+            {"$project": {"top": {"$slice": ["$top", per_user]}}},
+        ])
+        return {r["_id"]: r["top"] for r in rows}
+
+    async def _find_grouped(self, col, ids: List[str], projection: Dict[str, Any], per_user: int) -> Dict[str, List[Dict[str, Any]]]:
+        self._stats["queries"] += 1
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        async for doc in col.find({"user_id": {"$in": ids}}, projection):
+            docs = grouped.setdefault(doc.get("user_id"), [])
+            if len(docs) < per_user:
+                docs.append(doc)
+        return grouped
+
+    async def load_users(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        ข้อมูลการเรียนรู้ของหลาย user ใน query จำนวนคงที่ (ไม่ใช่ต่อ user):
+        user_doc, choice_count, reward_count, q_count, last_trip, last_session, top_q, fwl_docs
+        """
+        db = self._get_db()
+        if db is None or not user_ids:
+            return {}
+        from app.services.trip_evaluations import COLLECTION_NAME as TRIP_EVAL_COL
+        from app.services.selection_preferences import COLLECTION_CHOICE_HISTORY
+        from app.engine.feature_learning import COLLECTION_FWL
+        self._stats["user_batches"] += 1
+        self._stats["users_loaded"] += len(user_ids)
+        ids = list(user_ids)
+
+        users, choice_counts, reward_counts, q_counts, trips, fwl = await asyncio.gather(
+            self._find_grouped(db["users"], ids, USER_PROJECTION, 1),
+            self._counts_by_user(db[COLLECTION_CHOICE_HISTORY], ids),
+            self._counts_by_user(db[REWARDS_COL], ids),
+            self._counts_by_user(db[QTABLE_COL], ids),
+            self._latest_trips(db[TRIP_EVAL_COL], ids),
+            self._find_grouped(db[COLLECTION_FWL], ids, {"_id": 0}, FWL_DOCS_PER_USER),
+        )
+
+        # รอบสอง (เฉพาะ user ที่ต้องใช้): session ล่าสุดเมื่อไม่มี trip eval, top Q เมื่อไม่มี travelPreferences
+        def _travel_prefs(uid: str) -> Dict[str, Any]:
+            doc = (users.get(uid) or [{}])[0]
+            return (doc.get("preferences") or {}).get("travelPreferences") or {}
+
+        need_session = [uid for uid in ids if not (trips.get(uid) or {}).get("updated_at")]
+        need_top_q = [uid for uid in ids if q_counts.get(uid) and not _travel_prefs(uid)]
+        last_sessions, top_q = await asyncio.gather(
+            self._last_sessions(db["sessions"], need_session),
+            self._top_q(db[QTABLE_COL], need_top_q),
+        )
+
+        return {
+            uid: {
+                "user_doc": (users.get(uid) or [None])[0],
+                "choice_count": choice_counts.get(uid, 0),
+                "reward_count": reward_counts.get(uid, 0),
+                "q_count": q_counts.get(uid, 0),
+                "last_trip": trips.get(uid),
+                "last_session": last_sessions.get(uid),
+                "top_q": top_q.get(uid, []),
+                "fwl_docs": fwl.get(uid, []),
+            }
+            for uid in ids
+        }
+
+    async def recent_events(self, limit: int = 50) -> List[Dict[str, Any]]:
+        db = self._get_db()
+        if db is None:
+            return []
+        self._stats["queries"] += 1
+        projection = {"user_id": 1, "action_type": 1, "slot_name": 1, "reward": 1, "context": 1, "created_at": 1}
+        cursor = db[REWARDS_COL].find({}, projection).sort("created_at", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    # ---------- rollups ----------
+
+    @staticmethod
+    def bucket_start(now: datetime, interval_minutes: int) -> datetime:
+        """จุดเริ่มของ bucket ที่ครอบ now (ปัดลงตาม interval นับจากเที่ยงคืน UTC)"""
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        minutes = int((now - midnight).total_seconds() // 60)
+        return midnight + timedelta(minutes=minutes - minutes % interval_minutes)
+
+    async def write_rollup(self, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        สรุป bucket ที่เพิ่งจบ (ช่วง interval ก่อนหน้า now): ยอดสะสม ณ ตอนสรุป + สถิติ reward ในช่วงนั้นผ่าน $facet
+        upsert ด้วย _id = bucket key → หลาย worker หรือรันซ้ำไม่เกิดข้อมูลซ้ำ
+        """
+        db = self._get_db()
+        if db is None:
+            return None
+        t0 = time.perf_counter()
+        interval = settings.learning_metrics_rollup_interval_minutes
+        now = now or datetime.utcnow()
+        end = self.bucket_start(now, interval)
+        start = end - timedelta(minutes=interval)
+        try:
+            summary, window = await asyncio.gather(
+                self.summary(),
+                self._aggregate(db[REWARDS_COL], [
+                    {"$match": {"created_ts": {"$gte": start, "$lt": end}}},
+                    {"$facet": {
+                        "rewards": [{"$group": _reward_stats_group()}],
+                        "active_users": [{"$group": {"_id": "$user_id"}}, {"$count": "n"}],
+                        "actions": [{"$group": {"_id": "$action_type", "n": {"$sum": 1}}}],
+                    }},
+                ]),
+            )
+            facet = window[0] if window else {}
+            active = facet.get("active_users") or []
+            doc = {
+                "bucket_start": start,
+                "bucket_end": end,
+                "interval_minutes": interval,
+                "totals": {k: v for k, v in (summary or {}).items() if k != "recent_rewards"},
+                "recent_rewards": (summary or {}).get("recent_rewards", {}),
+                "window": {
+                    **_reward_stats((facet.get("rewards") or [None])[0]),
+                    "active_users": int(active[0]["n"]) if active else 0,
+                    "actions": {str(a["_id"] or "unknown"): int(a["n"]) for a in facet.get("actions") or []},
+                },
+                "created_at": datetime.utcnow(),
+            }
+            self._stats["queries"] += 1
+            await db[ROLLUP_COL].replace_one({"_id": start.strftime("%Y-%m-%dT%H:%M")}, doc, upsert=True)
+            self._stats["rollups_written"] += 1
+            self._stats["last_rollup_bucket"] = start.isoformat()
+            self._stats["last_rollup_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            return doc
+        except Exception as e:
+            self._stats["rollup_errors"] += 1
+            logger.warning(f"LearningMetrics: rollup for {start.isoformat()} failed: {e}")
+            return None
+
+    async def history(self, days: int = 7) -> List[Dict[str, Any]]:
+        """bucket ย้อนหลัง days วัน เรียงตามเวลา (สำหรับกราฟ)"""
+        db = self._get_db()
+        if db is None:
+            return []
+        since = datetime.utcnow() - timedelta(days=days)
+        max_buckets = days * 24 * 60 // settings.learning_metrics_rollup_interval_minutes + 1
+        self._stats["queries"] += 1
+        cursor = db[ROLLUP_COL].find({"bucket_start": {"$gte": since}}).sort("bucket_start", 1).limit(max_buckets)
+        return await cursor.to_list(length=max_buckets)
+
+    async def run_rollup_loop(self) -> None:
+        """เขียน rollup ทุก interval (เริ่มหลัง bucket ปัจจุบันจบ) — ใช้กับ asyncio.create_task ใน lifespan"""
+        interval = settings.learning_metrics_rollup_interval_minutes
+        while True:
+            now = datetime.utcnow()
+            next_bucket = self.bucket_start(now, interval) + timedelta(minutes=interval)
+            # หน่วงเล็กน้อยหลังขอบ bucket ให้ event ที่กำลังเขียนอยู่ลงครบ
+            await asyncio.sleep((next_bucket - now).total_seconds() + 30)
+            try:
+                await self.write_rollup()
+            except Exception as e:
+                logger.warning(f"LearningMetrics: rollup loop error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["rollup_enabled"] = settings.learning_metrics_rollup_enabled
+        stats["rollup_interval_minutes"] = settings.learning_metrics_rollup_interval_minutes
+        stats["timestamp"] = time.time()
+        return stats
+
+
+_learning_metrics_service: Optional[LearningMetricsService] = None
+
+
+def get_learning_metrics_service() -> LearningMetricsService:
+    global _learning_metrics_service
+    if _learning_metrics_service is None:
+        _learning_metrics_service = LearningMetricsService()
+    return _learning_metrics_service
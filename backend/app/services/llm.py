@@ -6,18 +6,22 @@
 """
 
 from __future__ import annotations
-from typing import Optional, Dict, Any, List, Literal
+from typing import Optional, Dict, Any, List, Literal, AsyncIterator, Callable, Iterable
 from enum import Enum
 import json
 import asyncio
 import os
 import httpx
 import random
+import threading
+import time
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.core.exceptions import LLMException
+from app.services.llm_cache import LLMCachePolicy, get_llm_cache
+from app.services.llm_scheduler import LLMDeadlineExceeded, LLMPriority, get_llm_scheduler
 
 logger = get_logger(__name__)
 
@@ -45,7 +49,93 @@ if settings.enable_gemini:
         except ImportError:
             logger.warning("No Gemini SDK installed. Gemini support disabled.")
 
+class StreamTiming:
+    """
+    จับเวลาการ stream ข้อความจาก LLM
+    time-to-first-token (ttft) แยกจากเวลารวม เพื่อให้เห็นว่าผู้ใช้รอเห็นตัวอักษรแรกนานแค่ไหน
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.chunks = 0
+        self.chars = 0
+
+    def mark(self, chunk: str) -> None:
+        if self.first_at is None:
+            self.first_at = time.perf_counter()
+        self.chunks += 1
+        self.chars += len(chunk)
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        return None if self.first_at is None else (self.first_at - self.started) * 1000
+
+    @property
+    def total_ms(self) -> float:
+        return ((self.finished_at or time.perf_counter()) - self.started) * 1000
+
+    def as_dict(self, **extra: Any) -> Dict[str, Any]:
+        ttft = self.ttft_ms
+        return {
+            "ttft_ms": round(ttft, 1) if ttft is not None else None,
+            "total_ms": round(self.total_ms, 1),
+            "chunks": self.chunks,
+            "chars": self.chars,
+            **extra,
+        }
+
+
+async def iterate_in_thread(produce: Callable[[], Iterable[str]], idle_timeout: float, executor: Any = None) -> AsyncIterator[str]:
+    """
+    รัน iterator แบบ blocking (SDK stream) ใน executor thread แล้วส่ง chunk กลับเข้า event loop
+    ผ่าน asyncio.Queue (loop.call_soon_threadsafe) — event loop ไม่ถูกบล็อกระหว่างรอ token
+    idle_timeout: เวลารอ chunk ถัดไปสูงสุด (รวม chunk แรก) ก่อน raise asyncio.TimeoutError
+    ถ้าผู้เรียกเลิกอ่านกลางทาง thread จะหยุดดึง chunk ถัดไปเอง
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def _put(item) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            stop.set()  # event loop ปิดไปแล้ว
+
+    def _run() -> None:
+        try:
+            for chunk in produce():
+                if stop.is_set():
+                    return
+                _put(("chunk", chunk))
+        except BaseException as e:  # ส่งต่อ error ของ SDK ไปให้ฝั่ง async
+            _put(("error", e))
+        else:
+            _put(("done", None))
+
+    loop.run_in_executor(executor, _run)
+    try:
+        while True:
+            kind, value = await asyncio.wait_for(queue.get(), timeout=idle_timeout)
+            if kind == "chunk":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        stop.set()
+
+
 class LLMService:
+    # context ที่เป็นงานเบื้องหลัง (ผู้ใช้ไม่ได้รอผล) → LLMPriority.BACKGROUND ใน LLM scheduler
+    BACKGROUND_CONTEXTS = frozenset({"memory", "title", "familiarity"})
+
     def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None):
         # Gemini Configuration (Primary)
         self.gemini_api_key = api_key or settings.gemini_api_key
@@ -117,7 +207,9 @@ class LLMService:
         max_tokens: int = 2000,
         response_format: str = "text/plain",
         auto_select_model: bool = True,
-        context: Optional[str] = None
+        context: Optional[str] = None,
+        priority: Optional[LLMPriority] = None,
+        cache: Optional[LLMCachePolicy] = None,
     ) -> str:
         """
         Generate content from LLM with robust error handling.
@@ -131,28 +223,37 @@ class LLMService:
             response_format: Response format
             auto_select_model: Enable automatic model selection
             context: Optional context for model selection
+            priority: LLM scheduler class (default: derived from context)
+            cache: Opt-in response cache policy (None = bypass). Without cache.validate only
+                   text that contains a JSON object is stored.
         """
-        if self.enable_gemini:
-            return await self._generate_with_gemini(prompt, system_prompt, temperature, max_tokens, auto_select_model, context)
-        else:
+        if not self.enable_gemini:
             raise LLMException("Gemini is not enabled. Please set ENABLE_GEMINI=true and GEMINI_API_KEY in your .env file.")
 
-    async def _generate_with_gemini(
-        self,
-        prompt: str,
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 2000,
-        auto_select_model: bool = True,
-        context: Optional[str] = None
-    ) -> str:
-        """Generate content using Gemini API"""
-        if not self.enable_gemini or not _gemini_available:
-            raise LLMException("Gemini is disabled. Enable it in settings to use.")
-        
-        if not self.gemini_api_key:
-            raise LLMException("Gemini API Key is missing")
-        
+        served: Dict[str, Any] = {}
+
+        async def _generate() -> str:
+            return await self._generate_with_gemini(
+                prompt, system_prompt, temperature, max_tokens, auto_select_model, context, priority, served=served
+            )
+
+        if cache is None:
+            return await _generate()
+        return await get_llm_cache().get_or_generate(
+            model=self._resolve_gemini_model(prompt, auto_select_model, context),
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            policy=cache,
+            generate=_generate,
+            accept=None if cache.validate is not None else (lambda text: bool(self._extract_json_from_text(text))),
+            brain_type=context or "generate",
+            served_model=lambda: served.get("model"),
+        )
+
+    def _resolve_gemini_model(self, prompt: str, auto_select_model: bool = True, context: Optional[str] = None) -> str:
+        """เลือกโมเดล Gemini สำหรับ prompt นี้ (auto-select + แปลงชื่อโมเดลที่เลิกใช้แล้ว)"""
         # 🤖 Auto Model Selection
         selected_model = self.model_name
         if auto_select_model and settings.enable_auto_model_switching:
@@ -191,11 +292,51 @@ class LLMService:
         elif "1.5" in selected_model:
             selected_model = selected_model.replace("1.5", "2.5")
             logger.info(f"Auto-updated deprecated model to 2.5: {selected_model}")
+        return selected_model
 
-        # Fallback model chain: primary → flash → flash-8b
-        _FALLBACK_CHAIN = [selected_model, "gemini-2.5-flash", "gemini-2.0-flash-lite"]
+    def _priority_for(self, context: Optional[str], priority: Optional[LLMPriority] = None) -> LLMPriority:
+        if priority is not None:
+            return priority
+        return LLMPriority.BACKGROUND if context in self.BACKGROUND_CONTEXTS else LLMPriority.INTERACTIVE
+
+    def _gemini_fallback_models(self, selected_model: str, priority: LLMPriority = LLMPriority.INTERACTIVE) -> List[str]:
+        # Fallback model chain: primary → flash → flash-lite
+        lite_model = settings.llm_pressure_fallback_model
+        _FALLBACK_CHAIN = [selected_model, "gemini-2.5-flash", lite_model]
+        # คิวของ LLM scheduler แน่น → เริ่มที่ flash-lite เลย (ตอบเร็ว คืน slot ไว) ไม่ต้องรอให้ error ก่อน
+        if selected_model != lite_model and get_llm_scheduler().is_under_pressure(priority):
+            logger.warning(f"LLM queue pressure ({priority.value}): using {lite_model} instead of {selected_model}")
+            _FALLBACK_CHAIN.insert(0, lite_model)
         _seen: set = set()
-        fallback_models = [m for m in _FALLBACK_CHAIN if not (m in _seen or _seen.add(m))]
+        return [m for m in _FALLBACK_CHAIN if not (m in _seen or _seen.add(m))]
+
+    async def _generate_with_gemini(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        auto_select_model: bool = True,
+        context: Optional[str] = None,
+        priority: Optional[LLMPriority] = None,
+        served: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Generate content using Gemini API (blocking SDK calls run on the LLM scheduler's executor)
+
+        served: optional dict filled with the model that produced the text (may be a fallback model)
+        """
+        if not self.enable_gemini or not _gemini_available:
+            raise LLMException("Gemini is disabled. Enable it in settings to use.")
+        
+        if not self.gemini_api_key:
+            raise LLMException("Gemini API Key is missing")
+        
+        priority = self._priority_for(context, priority)
+        scheduler = get_llm_scheduler()
+        fallback_models = self._gemini_fallback_models(
+            self._resolve_gemini_model(prompt, auto_select_model, context), priority
+        )
 
         last_exc: Optional[Exception] = None
         for model_attempt, current_model in enumerate(fallback_models):
@@ -220,16 +361,14 @@ class LLMService:
                             temperature=temperature,
                             max_output_tokens=max_tokens,
                         )
-                        loop = asyncio.get_running_loop()
                         def _call_new(_c=_client, _m=current_model, _p=full_prompt, _cfg=config):
                             return _c.models.generate_content(
                                 model=_m,
                                 contents=_p,
                                 config=_cfg,
                             )
-                        raw = await asyncio.wait_for(
-                            loop.run_in_executor(None, _call_new),
-                            timeout=timeout_seconds,
+                        raw = await scheduler.run(
+                            _call_new, priority=priority, timeout=timeout_seconds, label=f"{context or 'generate'}:{current_model}"
                         )
                         text = raw.text if hasattr(raw, "text") else self._extract_text(raw)
                     else:
@@ -245,16 +384,14 @@ class LLMService:
                             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
                         }
                         model = genai.GenerativeModel(model_name=current_model)
-                        loop = asyncio.get_running_loop()
                         def _call_gemini():
                             return model.generate_content(
                                 full_prompt,
                                 generation_config=generation_config,
                                 safety_settings=safety_settings,
                             )
-                        raw = await asyncio.wait_for(
-                            loop.run_in_executor(None, _call_gemini),
-                            timeout=timeout_seconds,
+                        raw = await scheduler.run(
+                            _call_gemini, priority=priority, timeout=timeout_seconds, label=f"{context or 'generate'}:{current_model}"
                         )
                         text = self._extract_text(raw)
 
@@ -273,8 +410,14 @@ class LLMService:
                     except Exception:
                         pass
 
+                    if served is not None:
+                        served["model"] = current_model
                     return text
 
+                except LLMDeadlineExceeded:
+                    # หมดเวลาระหว่างรอคิว scheduler → ไม่ลองโมเดลอื่น (จะยิ่งเพิ่มคิว)
+                    raise
+
                 except asyncio.TimeoutError:
                     last_exc = LLMException(f"Gemini timed out after {timeout_seconds}s (model={current_model})")
                     logger.warning(f"Gemini timeout: model={current_model} retry={retry_attempt+1}/3")
@@ -322,6 +465,120 @@ class LLMService:
         logger.error(f"All Gemini fallback models failed. last_err={last_exc}")
         raise LLMException(f"Gemini call failed after all fallbacks: {str(last_exc)[:200]}") from (last_exc if isinstance(last_exc, Exception) else None)
 
+    async def stream_content(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        auto_select_model: bool = True,
+        context: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        priority: Optional[LLMPriority] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream text chunks from Gemini as they are generated.
+
+        The blocking SDK stream runs in an executor thread (see iterate_in_thread).
+        Falls back along the same model chain as generate_content, but only before the
+        first chunk — once text has been yielded a failure raises LLMException so the
+        caller can discard the partial reply. No per-model retry loop: callers that need
+        the retrying path should fall back to generate_content.
+
+        Args:
+            stats: Optional dict filled with ttft_ms / total_ms / chunks / chars / model when done
+            priority: LLM scheduler class; one slot is held for the whole stream
+        """
+        if not self.enable_gemini:
+            raise LLMException("Gemini is not enabled. Please set ENABLE_GEMINI=true and GEMINI_API_KEY in your .env file.")
+
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        timeout_seconds = max(settings.gemini_timeout_seconds, 30)
+        timing = StreamTiming()
+        priority = self._priority_for(context, priority)
+        scheduler = get_llm_scheduler()
+        last_exc: Optional[BaseException] = None
+        for current_model in self._gemini_fallback_models(self._resolve_gemini_model(prompt, auto_select_model, context), priority):
+            usage: Dict[str, int] = {}
+            try:
+                def _produce(_m=current_model, _u=usage):
+                    return self._open_gemini_stream(_m, full_prompt, temperature, max_tokens, _u)
+                async with scheduler.slot(priority, label=f"{context or 'stream'}:{current_model}"):
+                    async for chunk in iterate_in_thread(_produce, timeout_seconds, executor=scheduler.executor):
+                        if not chunk:
+                            continue
+                        timing.mark(chunk)
+                        yield chunk
+            except LLMDeadlineExceeded:
+                raise
+            except Exception as e:
+                if timing.chunks:
+                    raise LLMException(f"Gemini stream interrupted after {timing.chunks} chunks (model={current_model}): {str(e)[:150]}") from e
+                last_exc = e
+                logger.warning(f"Gemini stream failed before first chunk: model={current_model} err={str(e)[:100]} → trying fallback")
+                continue
+            if not timing.chunks:
+                last_exc = LLMException(f"Gemini stream returned empty text (model={current_model})")
+                logger.warning(f"Gemini stream returned empty text. model={current_model}")
+                continue
+            timing.finish()
+            if usage:
+                logger.info(f"[TokenUsage] model={current_model} input={usage.get('input', 0)} output={usage.get('output', 0)} total={usage.get('input', 0) + usage.get('output', 0)}")
+            logger.info(f"[Stream] model={current_model} ttft={timing.ttft_ms:.0f}ms total={timing.total_ms:.0f}ms chunks={timing.chunks}")
+            if stats is not None:
+                stats.update(timing.as_dict(model=current_model, input_tokens=usage.get("input"), output_tokens=usage.get("output")))
+            return
+
+        raise LLMException(f"Gemini stream failed after all fallbacks: {str(last_exc)[:200]}") from (last_exc if isinstance(last_exc, Exception) else None)
+
+    def _open_gemini_stream(
+        self,
+        model_name: str,
+        full_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        usage: Dict[str, int],
+    ) -> Iterable[str]:
+        """Blocking generator of text chunks (runs in the executor thread); fills `usage` from the last chunk."""
+        if _use_new_sdk:
+            config = genai_types.GenerateContentConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+            )
+            responses = self._gemini_client.models.generate_content_stream(
+                model=model_name,
+                contents=full_prompt,
+                config=config,
+            )
+        else:
+            generation_config = genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+            )
+            safety_settings = {
+                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+            }
+            responses = genai.GenerativeModel(model_name=model_name).generate_content(
+                full_prompt,
+                generation_config=generation_config,
+                safety_settings=safety_settings,
+                stream=True,
+            )
+        for response in responses:
+            meta = getattr(response, "usage_metadata", None)
+            if meta:
+                usage["input"] = getattr(meta, "prompt_token_count", 0) or 0
+                usage["output"] = getattr(meta, "candidates_token_count", 0) or 0
+            try:
+                text = response.text
+            except Exception:
+                text = None  # chunk ที่ไม่มี text part (เช่น finish_reason อย่างเดียว)
+            if text:
+                yield text
+
     def _extract_text(self, response) -> str:
         """Extract text from Gemini response safely"""
         try:
@@ -411,7 +668,9 @@ class LLMService:
         system_prompt: Optional[str] = None,
         temperature: float = 0.3,
         auto_select_model: bool = True,
-        context: Optional[str] = None
+        context: Optional[str] = None,
+        priority: Optional[LLMPriority] = None,
+        cache: Optional[LLMCachePolicy] = None,
     ) -> Dict[str, Any]:
         """
         Generate JSON response from LLM with validation and robust extraction.
@@ -423,20 +682,55 @@ class LLMService:
             temperature: Sampling temperature
             auto_select_model: Enable automatic model selection
             context: Optional context for model selection
+            priority: LLM scheduler class (default: derived from context)
+            cache: Opt-in response cache policy (None = bypass); error dicts are never stored
             
         Returns:
             Always a valid Dict (may be empty if extraction fails)
         """
+        served: Dict[str, Any] = {}
+
+        async def _generate() -> Dict[str, Any]:
+            return await self._generate_json(prompt, system_prompt, temperature, auto_select_model, context, priority, served)
+
+        if cache is None or not self.enable_gemini:
+            return await _generate()
+        return await get_llm_cache().get_or_generate(
+            model=self._resolve_gemini_model(prompt, auto_select_model, context),
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=4000,
+            policy=cache,
+            generate=_generate,
+            accept=lambda data: isinstance(data, dict) and bool(data) and "error" not in data,
+            brain_type=context or "generate_json",
+            served_model=lambda: served.get("model"),
+        )
+
+    async def _generate_json(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        auto_select_model: bool,
+        context: Optional[str],
+        priority: Optional[LLMPriority],
+        served: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         try:
-            # Increased max_tokens for JSON to prevent cutoff
-            text = await self.generate_content(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                temperature=temperature,
-                response_format="application/json",
-                max_tokens=4000,
-                auto_select_model=auto_select_model,  # 🤖 Pass through
-                context=context  # 🤖 Pass through
+            if not self.enable_gemini:
+                raise LLMException("Gemini is not enabled. Please set ENABLE_GEMINI=true and GEMINI_API_KEY in your .env file.")
+            # Increased max_tokens for JSON to prevent cutoff (ตรงไป _generate_with_gemini เพื่อรู้ว่าโมเดลไหนตอบ)
+            text = await self._generate_with_gemini(
+                prompt,
+                system_prompt,
+                temperature,
+                4000,
+                auto_select_model,  # 🤖 Pass through
+                context,  # 🤖 Pass through
+                priority,
+                served=served,
             )
             
             # Attempt to extract and parse JSON, even if it's malformed or has extra text
@@ -866,8 +1160,7 @@ class LLMServiceWithMCP(LLMService):
                 config=config
             )
         
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, _call)
+        return await get_llm_scheduler().run(_call, priority=LLMPriority.INTERACTIVE, label="mcp_tools")
 
 
 # =============================================================================
@@ -880,10 +1173,10 @@ class IntentBasedLLM:
     Analyzes user input to determine intent and automatically calls appropriate tools
     """
     
-    def __init__(self):
-        """Initialize Intent-Based LLM with tool calling support"""
+    def __init__(self, llm_service: Optional[LLMServiceWithMCP] = None):
+        """Initialize Intent-Based LLM with tool calling support (reuses llm_service when given)"""
         try:
-            self.llm = LLMServiceWithMCP()
+            self.llm = llm_service or LLMServiceWithMCP()
             logger.info("IntentBasedLLM initialized with tool calling support")
         except Exception as e:
             logger.error(f"Failed to initialize IntentBasedLLM: {e}")
@@ -0,0 +1,250 @@
+"""
+แคชคำตอบ LLM แบบ semantic key สำหรับ brain ที่ให้ผลคงที่ (extraction, title, familiarity, intelligence)
+
+- opt-in ต่อ call ผ่าน LLMCachePolicy — ไม่ส่ง policy = ไม่แคช (responder/คำตอบที่ผู้ใช้เห็นไม่ส่ง)
+- key = model + prompt/system ที่ normalize whitespace แล้ว + temperature + max_tokens + schema
+- เก็บเฉพาะผลที่สำเร็จและผ่าน validate แล้วเท่านั้น ในรูป JSON (Redis เมื่อพร้อม + สำเนาใน memory เสมอ)
+- ผลที่มาจากโมเดล fallback (คิวแน่น/โมเดลหลัก error) ไม่ถูกเก็บ — key เป็นของโมเดลหลัก
+- hit/miss และโทเค็นที่ประหยัดได้ถูกส่งเข้า CostTracker → เห็นใน /api/monitoring/cost/*
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+import hashlib
+import json
+
+from app.core.bounded_cache import BoundedCache
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.redis_client import get_redis
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "llm:v1"
+
+
+@dataclass
+class LLMCachePolicy:
+    """
+    Per-call cache opt-in.
+
+    schema: name + version of the expected output (e.g. "title:v1"); bump it when the prompt or parser changes.
+    validate: caller's check on the result (text or parsed dict); only results that pass are stored.
+    bypass: skip the cache for this call (read and write), e.g. an explicit "refresh".
+    """
+    schema: str
+    ttl: Optional[int] = None
+    validate: Optional[Callable[[Any], bool]] = None
+    bypass: bool = False
+
+
+def normalize_prompt(text: Optional[str]) -> str:
+    """Collapse whitespace so re-indented f-string prompts map to the same key."""
+    return " ".join((text or "").split())
+
+
+def estimate_tokens(text: Any) -> int:
+    """1 token ≈ 3 ตัวอักษร (ค่าเฉลี่ยไทย/อังกฤษ เหมือนที่ agent ใช้ประมาณ cost)"""
+    if not isinstance(text, str):
+        text = json.dumps(text, ensure_ascii=False, default=str)
+    return len(text) // 3
+
+
+class LLMResponseCache:
+    """
+    Bounded, TTL-based LLM response cache.
+
+    Entries are JSON documents {"value", "model", "input_tokens", "output_tokens"} so a hit can report
+    which model call and how many tokens it replaced.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self._memory = BoundedCache(
+            "llm_response_cache",
+            max_entries=max_entries or int(settings.llm_cache_max_entries),
+            default_ttl=int(settings.llm_cache_ttl_seconds),
+            sizeof=len,
+        )
+        self._stats = {
+            "hits": 0, "redis_hits": 0, "misses": 0, "stored": 0, "rejected": 0, "bypassed": 0, "errors": 0,
+            "fallback_not_stored": 0,
+        }
+
+    @staticmethod
+    def make_key(
+        model: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        schema: str,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        material = {
+            "model": model,
+            "prompt": normalize_prompt(prompt),
+            "system": normalize_prompt(system_prompt),
+            "temperature": round(float(temperature), 2),
+            "max_tokens": max_tokens,
+            "schema": schema,
+        }
+        digest = hashlib.sha1(
+            json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:24]
+        return f"{KEY_PREFIX}:{schema}:{digest}"
+
+    @staticmethod
+    def is_cacheable(policy: Optional[LLMCachePolicy], temperature: float) -> bool:
+        if policy is None or not settings.llm_cache_enabled:
+            return False
+        return float(temperature) <= float(settings.llm_cache_max_temperature)
+
+    # ---------- storage ----------
+
+    async def _load(self, key: str) -> Optional[str]:
+        encoded = self._memory.get(key)
+        if encoded is not None:
+            self._stats["hits"] += 1
+            return encoded
+        try:
+            redis = await get_redis()
+            if redis is not None:
+                encoded = await redis.get(key)
+                if encoded:
+                    ttl = await redis.ttl(key)
+                    self._memory.set(key, encoded, ttl=ttl if ttl and ttl > 0 else 60)
+                    self._stats["redis_hits"] += 1
+                    return encoded
+        except Exception as e:
+            logger.warning(f"LLMResponseCache Redis get failed: {e}")
+        return None
+
+    async def _store(self, key: str, encoded: str, ttl: int) -> None:
+        self._memory.set(key, encoded, ttl=ttl)
+        self._stats["stored"] += 1
+        try:
+            redis = await get_redis()
+            if redis is not None:
+                await redis.set(key, encoded, ex=ttl)
+        except Exception as e:
+            logger.warning(f"LLMResponseCache Redis set failed: {e}")
+
+    # ---------- public API ----------
+
+    async def get_or_generate(
+        self,
+        *,
+        model: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: Optional[int],
+        policy: Optional[LLMCachePolicy],
+        generate: Callable[[], Awaitable[Any]],
+        accept: Optional[Callable[[Any], bool]] = None,
+        brain_type: str = "llm",
+        served_model: Optional[Callable[[], Optional[str]]] = None,
+    ) -> Any:
+        """
+        Return the cached result, or run generate() and cache its result when it validates.
+
+        - accept(result) is the service-level check (e.g. the text contains a JSON object, no "error" key);
+          policy.validate(result) is the caller's check. Both must pass before anything is stored.
+        - A hit returns exactly what generate() returned on the miss that filled it.
+        - Errors from generate() propagate untouched and are never cached.
+        - served_model() names the model that actually answered; when it differs from `model`
+          (a fallback model served the call) the result is returned but not stored under `model`'s key.
+        """
+        if policy is None or policy.bypass or not self.is_cacheable(policy, temperature):
+            if policy is not None:
+                self._stats["bypassed"] += 1
+            return await generate()
+
+        key = self.make_key(model, prompt, system_prompt, temperature, policy.schema, max_tokens)
+        encoded = await self._load(key)
+        if encoded is not None:
+            try:
+                entry = json.loads(encoded)
+                self._account(True, entry.get("model") or model, brain_type, entry.get("input_tokens", 0), entry.get("output_tokens", 0))
+                logger.debug(f"LLMResponseCache hit {key}")
+                return entry["value"]
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"LLMResponseCache: corrupt entry {key} ignored: {e}")
+                self._memory.pop(key, None)
+
+        self._stats["misses"] += 1
+        self._account(False, model, brain_type, 0, 0)
+        raw = await generate()
+        try:
+            ok = raw is not None and (accept is None or bool(accept(raw)))
+            ok = ok and (policy.validate is None or bool(policy.validate(raw)))
+        except Exception as e:
+            logger.debug(f"LLMResponseCache: validation raised for {key}: {e}")
+            ok = False
+        if not ok:
+            self._stats["rejected"] += 1
+            return raw
+        answered_by = served_model() if served_model is not None else None
+        if answered_by and answered_by != model:
+            self._stats["fallback_not_stored"] += 1
+            logger.debug(f"LLMResponseCache: {key} served by fallback {answered_by} (key model {model}), not cached")
+            return raw
+        try:
+            encoded = json.dumps(
+                {
+                    "value": raw,
+                    "model": model,
+                    "input_tokens": estimate_tokens(f"{system_prompt or ''}{prompt}"),
+                    "output_tokens": estimate_tokens(raw),
+                },
+                ensure_ascii=False,
+            )
+        except (TypeError, ValueError) as e:
+            logger.warning(f"LLMResponseCache: value for {key} is not JSON-serializable, not cached: {e}")
+            self._stats["rejected"] += 1
+            return raw
+        await self._store(key, encoded, int(policy.ttl or settings.llm_cache_ttl_seconds))
+        return raw
+
+    def _account(self, hit: bool, model: str, brain_type: str, input_tokens: int, output_tokens: int) -> None:
+        try:
+            from app.engine.cost_tracker import cost_tracker
+            cost_tracker.track_cache_event(
+                hit=hit,
+                model=model,
+                brain_type=brain_type,
+                saved_input_tokens=input_tokens,
+                saved_output_tokens=output_tokens,
+            )
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.debug(f"LLMResponseCache: cost accounting failed: {e}")
+
+    async def invalidate(self, key: str) -> None:
+        self._memory.pop(key, None)
+        try:
+            redis = await get_redis()
+            if redis is not None:
+                await redis.delete(key)
+        except Exception as e:
+            logger.warning(f"LLMResponseCache Redis delete failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self._stats["hits"] + self._stats["redis_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "memory_entries": len(self._memory),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get or create the process-wide LLM response cache."""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
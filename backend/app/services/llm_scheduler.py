@@ -0,0 +1,332 @@
+"""
+ตัวจัดคิวการเรียก Gemini (LLM scheduler)
+
+เดิมทุกการเรียก Gemini ใช้ loop.run_in_executor(None, ...) ซึ่งแชร์ thread pool เดียวกับ googlemaps,
+Amadeus SDK, bcrypt และ smtplib — ช่วงโหลดสูง งานเบื้องหลัง (consolidate ความจำ, สรุปแชท, ตั้งชื่อทริป,
+วัด familiarity) แย่ง thread กับ Controller/Responder ที่ผู้ใช้รออยู่
+ตอนนี้การเรียก LLM ผ่าน LLMScheduler:
+- executor แยกของตัวเอง (llm_executor_workers thread)
+- priority class: INTERACTIVE (ผู้ใช้รอ) ได้ slot ก่อน BACKGROUND เสมอเมื่อมีคิว
+- จำกัดจำนวนที่รันพร้อมกันต่อ class (background มี cap ต่ำกว่า)
+- เก็บเวลาที่รอในคิว / เวลารันต่อ class (p50/p95)
+- deadline: งานที่หมดเวลาระหว่างรอคิวถูกตัดทิ้งโดยไม่เรียก API, งานที่รันอยู่เลิกรอเมื่อถึง deadline
+- is_under_pressure(): ให้ LLMService สลับไปใช้ gemini-2.0-flash-lite เมื่อคิวยาว (ไม่ต้องรอ error)
+"""
+
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+import asyncio
+import heapq
+import itertools
+import time
+
+from app.core.config import settings
+from app.core.exceptions import LLMException
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class LLMPriority(str, Enum):
+    """Priority class of an LLM call (lower rank is served first)."""
+    INTERACTIVE = "interactive"  # Controller / Responder / สิ่งที่ผู้ใช้รอผลอยู่
+    BACKGROUND = "background"    # consolidate ความจำ, rolling summary, title, familiarity
+
+    @property
+    def rank(self) -> int:
+        return 0 if self is LLMPriority.INTERACTIVE else 1
+
+
+class LLMDeadlineExceeded(LLMException):
+    """The call's deadline passed before (or while) it could run — do not retry or fall back."""
+    pass
+
+
+# deadline แบบ absolute (time.monotonic) ของงานปัจจุบัน เช่น ทั้ง turn ของแชท — ตั้งด้วย llm_deadline_scope
+_llm_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+@contextmanager
+def llm_deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """Bound every interactive LLM call made inside this scope (same task / child tasks) by `seconds` from now."""
+    if not seconds:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _llm_deadline.get()
+    token = _llm_deadline.set(min(deadline, current) if current else deadline)
+    try:
+        yield
+    finally:
+        _llm_deadline.reset(token)
+
+
+class _ClassStats:
+    """Counters and rolling latency samples for one priority class."""
+
+    def __init__(self, window: int = 500):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired_in_queue = 0
+        self.timed_out = 0
+        self.queue_ms: Deque[float] = deque(maxlen=window)
+        self.run_ms: Deque[float] = deque(maxlen=window)
+
+    @staticmethod
+    def _pct(samples: Deque[float], pct: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired_in_queue": self.expired_in_queue,
+            "timed_out": self.timed_out,
+            "queue_ms_p50": self._pct(self.queue_ms, 0.5),
+            "queue_ms_p95": self._pct(self.queue_ms, 0.95),
+            "run_ms_p50": self._pct(self.run_ms, 0.5),
+            "run_ms_p95": self._pct(self.run_ms, 0.95),
+        }
+
+
+class LLMScheduler:
+    """Priority admission + dedicated thread pool for blocking Gemini SDK calls."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        caps: Optional[Dict[LLMPriority, int]] = None,
+        pressure_queue_ms: Optional[float] = None,
+    ):
+        self.max_workers = max_workers or settings.llm_executor_workers
+        self.caps = caps or {
+            LLMPriority.INTERACTIVE: settings.llm_interactive_max_concurrency,
+            LLMPriority.BACKGROUND: settings.llm_background_max_concurrency,
+        }
+        self.pressure_queue_ms = pressure_queue_ms if pressure_queue_ms is not None else settings.llm_queue_pressure_ms
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm")
+        self._active: Dict[LLMPriority, int] = {p: 0 for p in LLMPriority}
+        # heap ของงานที่รอ: (rank, seq, priority, enqueued_at, future)
+        self._waiters: List[Tuple[int, int, LLMPriority, float, "asyncio.Future[None]"]] = []
+        self._seq = itertools.count()
+        self._stats: Dict[LLMPriority, _ClassStats] = {p: _ClassStats() for p in LLMPriority}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        return self._executor
+
+    # ---------- admission ----------
+
+    def _total_active(self) -> int:
+        return sum(self._active.values())
+
+    def _can_start(self, priority: LLMPriority) -> bool:
+        return self._active[priority] < self.caps.get(priority, self.max_workers) and self._total_active() < self.max_workers
+
+    def _has_waiter_at_or_above(self, priority: LLMPriority) -> bool:
+        return any(rank <= priority.rank and not fut.done() for rank, _, _, _, fut in self._waiters)
+
+    def _dispatch(self) -> None:
+        """Grant freed slots to waiters in priority order (FIFO within a class)."""
+        skipped = []
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            _, _, priority, _, fut = entry
+            if fut.done():
+                continue  # ยกเลิก/หมดเวลาไปแล้ว
+            if self._can_start(priority):
+                self._active[priority] += 1
+                fut.set_result(None)
+            else:
+                skipped.append(entry)
+                if self._total_active() >= self.max_workers:
+                    break
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    def _release(self, priority: LLMPriority) -> None:
+        self._active[priority] = max(0, self._active[priority] - 1)
+        self._dispatch()
+
+    @staticmethod
+    def _effective_deadline(priority: LLMPriority, timeout: Optional[float]) -> Optional[float]:
+        # deadline ของ turn ใช้กับงาน interactive เท่านั้น — งานเบื้องหลังที่ถูกสร้างระหว่าง turn ไม่ควรถูกตัดตาม turn
+        deadline = _llm_deadline.get() if priority is LLMPriority.INTERACTIVE else None
+        if timeout:
+            call_deadline = time.monotonic() + timeout
+            deadline = min(deadline, call_deadline) if deadline else call_deadline
+        return deadline
+
+    async def _acquire(self, priority: LLMPriority, deadline: Optional[float], label: str) -> float:
+        """Wait for a slot; returns seconds spent queued. Raises LLMDeadlineExceeded if the deadline passes first."""
+        stats = self._stats[priority]
+        stats.submitted += 1
+        enqueued = time.monotonic()
+        if self._can_start(priority) and not self._has_waiter_at_or_above(priority):
+            self._active[priority] += 1
+            stats.queue_ms.append(0.0)
+            return 0.0
+        fut: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority.rank, next(self._seq), priority, enqueued, fut))
+        self._dispatch()
+        remaining = None if deadline is None else deadline - enqueued
+        try:
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(asyncio.shield(fut), timeout=remaining)
+        except BaseException as e:
+            if fut.done() and not fut.cancelled():
+                self._release(priority)  # ได้ slot พร้อมกับที่หมดเวลา/ถูกยกเลิก → คืน slot
+            else:
+                fut.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                stats.expired_in_queue += 1
+                logger.warning(f"LLM call dropped in queue: class={priority.value} label={label} waited={(time.monotonic() - enqueued) * 1000:.0f}ms")
+                raise LLMDeadlineExceeded(f"LLM deadline passed while queued (class={priority.value}, label={label})") from None
+            raise
+        waited = time.monotonic() - enqueued
+        stats.queue_ms.append(waited * 1000)
+        return waited
+
+    # ---------- public API ----------
+
+    async def run(
+        self,
+        fn: Callable[[], T],
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        timeout: Optional[float] = None,
+        label: str = "",
+    ) -> T:
+        """
+        Run a blocking call on the LLM executor once a slot of `priority` is free.
+        `timeout` covers queue wait + execution and is further bounded by llm_deadline_scope.
+        Raises LLMDeadlineExceeded when dropped in queue, asyncio.TimeoutError when the call itself overruns.
+        """
+        deadline = self._effective_deadline(priority, timeout)
+        await self._acquire(priority, deadline, label)
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        stats = self._stats[priority]
+        if deadline is not None and deadline <= started:
+            self._release(priority)
+            stats.expired_in_queue += 1
+            raise LLMDeadlineExceeded(f"LLM deadline passed while queued (class={priority.value}, label={label})")
+        try:
+            future = self._executor.submit(fn)
+        except BaseException:
+            self._release(priority)
+            raise
+        # คืน slot ตอน thread ทำงานเสร็จจริง (ไม่ใช่ตอนผู้เรียกเลิกรอ) เพื่อไม่ให้ executor รับงานเกินจำนวน thread
+        def _done(_f) -> None:
+            try:
+                loop.call_soon_threadsafe(self._release, priority)
+            except RuntimeError:
+                pass
+        future.add_done_callback(_done)
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout=remaining)
+        except asyncio.TimeoutError:
+            stats.timed_out += 1
+            raise
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            stats.failed += 1
+            raise
+        stats.completed += 1
+        stats.run_ms.append((time.monotonic() - started) * 1000)
+        return result
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        timeout: Optional[float] = None,
+        label: str = "",
+    ) -> AsyncIterator[Optional[float]]:
+        """
+        Hold one slot of `priority` for the duration of the block (streams, async SDK clients).
+        Yields the absolute monotonic deadline (or None).
+        """
+        deadline = self._effective_deadline(priority, timeout)
+        await self._acquire(priority, deadline, label)
+        started = time.monotonic()
+        stats = self._stats[priority]
+        try:
+            yield deadline
+        except BaseException:
+            stats.failed += 1
+            raise
+        else:
+            stats.completed += 1
+            stats.run_ms.append((time.monotonic() - started) * 1000)
+        finally:
+            self._release(priority)
+
+    def is_under_pressure(self, priority: LLMPriority = LLMPriority.INTERACTIVE) -> bool:
+        """
+        True when calls of `priority` would queue noticeably: every slot of the class is busy and the
+        oldest waiter at or above this class has waited longer than llm_queue_pressure_ms.
+        """
+        if self._can_start(priority):
+            return False
+        now = time.monotonic()
+        oldest = min(
+            (enq for rank, _, _, enq, fut in self._waiters if rank <= priority.rank and not fut.done()),
+            default=None,
+        )
+        if oldest is None:
+            return False
+        return (now - oldest) * 1000 >= self.pressure_queue_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        waiting: Dict[str, int] = {p.value: 0 for p in LLMPriority}
+        for _, _, priority, _, fut in self._waiters:
+            if not fut.done():
+                waiting[priority.value] += 1
+        return {
+            "max_workers": self.max_workers,
+            "caps": {p.value: c for p, c in self.caps.items()},
+            "active": {p.value: n for p, n in self._active.items()},
+            "waiting": waiting,
+            "classes": {p.value: s.as_dict() for p, s in self._stats.items()},
+        }
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running SDK calls finish in their threads (lifespan shutdown)."""
+        for _, _, _, _, fut in self._waiters:
+            if not fut.done():
+                fut.cancel()
+        self._waiters.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+        logger.info(
+            f"LLMScheduler initialized: workers={_scheduler.max_workers} "
+            f"caps={ {p.value: c for p, c in _scheduler.caps.items()} } pressure={_scheduler.pressure_queue_ms}ms"
+        )
+    return _scheduler
+
+
+def peek_llm_scheduler() -> Optional[LLMScheduler]:
+    return _scheduler
@@ -16,6 +16,7 @@ from amadeus import Client, ResponseError
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.core.exceptions import AgentException
+from app.services.airport_index import get_airport_index
 
 logger = get_logger(__name__)
 
@@ -362,6 +363,12 @@ class LocationService:
         Raises:
             AgentException: If search fails
         """
+        # ดัชนีสนามบิน/เมืองออฟไลน์ก่อน (ชื่อไทย/อังกฤษ/alias) — ไม่ต้องเรียก Amadeus
+        iata_code = get_airport_index().city_code(city_name)
+        if iata_code:
+            logger.info(f"Converted '{city_name}' -> IATA: {iata_code} (offline index)")
+            return iata_code
+
         if not self.amadeus:
             raise AgentException("Amadeus API not configured")
         
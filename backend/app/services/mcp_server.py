@@ -49,9 +49,10 @@ class MCPToolExecutor:
     - Comprehensive logging
     """
 
-    def __init__(self):
+    def __init__(self, orchestrator: Optional[TravelOrchestrator] = None):
         try:
-            self.orchestrator = TravelOrchestrator()
+            # Reuse a caller-owned orchestrator (e.g. the process-wide AgentServices) when given
+            self.orchestrator = orchestrator or TravelOrchestrator()
             self.google_maps_client = get_google_maps_client()
             self.amadeus_mcp = AmadeusMCP(self.orchestrator)
             # GoogleMapsMCP shares the same orchestrator — close() is guarded to avoid double-close
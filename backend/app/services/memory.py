@@ -7,11 +7,15 @@
 from __future__ import annotations
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import asyncio
 import json
 
 from app.models.database import Memory, PyObjectId
 from app.storage.connection_manager import MongoConnectionManager
+from app.storage.conversation_store import ConversationStore
+from app.services.memory_access import get_memory_access_tracker
 from app.services.llm import LLMService
+from app.core.config import settings
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -19,6 +23,16 @@ logger = get_logger(__name__)
 MAX_CONTEXT_CHARS = 12_000
 MAX_HISTORY_MESSAGES = 20
 COMPACTION_TRIGGER_CHARS = 10_000
+# field ที่ recall ต้องใช้สร้าง Memory
+MEMORY_RECALL_PROJECTION = {
+    "user_id": 1, "content": 1, "category": 1, "importance": 1,
+    "created_at": 1, "last_accessed": 1, "metadata": 1,
+}
+# จำนวนข้อความสูงสุดที่สรุปต่อครั้ง (แชทยาวที่ยังไม่เคยมี summary)
+SUMMARY_MAX_FOLD_MESSAGES = 60
+
+# session_id -> task สรุปที่กำลังรัน (กันสรุปซ้อนกันใน process เดียว; ข้าม process ใช้ summary_upto)
+_summary_tasks: Dict[str, "asyncio.Task[bool]"] = {}
 
 
 class MemoryService:
@@ -26,7 +40,7 @@ class MemoryService:
     Production Memory Service with Sliding Window + Context Compaction.
     - Recall: ranked long-term memories per user
     - Consolidate: extract new facts from conversation
-    - build_conversation_context: sliding-window history + auto-compaction
+    - build_conversation_context: sliding-window history + persisted rolling summary
     """
     
     def __init__(self, llm_service: Optional[LLMService] = None):
@@ -59,10 +73,12 @@ class MemoryService:
         try:
             # ✅ SECURITY: CRITICAL - Strictly filter by user_id - no fallback or alternative queries
             # This ensures AI memory/brain is completely isolated per user
-            cursor = self.collection.find({"user_id": user_id}).sort("importance", -1).limit(limit)
+            # index user_importance_idx ครอบ filter + sort; projection เฉพาะ field ของ Memory
+            cursor = self.collection.find({"user_id": user_id}, MEMORY_RECALL_PROJECTION).sort("importance", -1).limit(limit)
             memories_data = await cursor.to_list(length=limit)
             
             memories = []
+            accessed_ids = []
             for m in memories_data:
                 # ✅ SECURITY: Double-check user_id matches before processing (defense in depth)
                 doc_user_id = m.get("user_id")
@@ -74,12 +90,12 @@ class MemoryService:
                     logger.error(f"🚨 SECURITY ALERT: Memory user_id mismatch: expected {user_id}, found {doc_user_id}, skipping to prevent data leakage")
                     continue
                 
-                # ✅ SECURITY: Update last accessed with user_id validation in filter
-                await self.collection.update_one(
-                    {"_id": m["_id"], "user_id": user_id},  # ✅ CRITICAL: Additional user_id check in update filter
-                    {"$set": {"last_accessed": datetime.utcnow()}}
-                )
                 memories.append(Memory(**m))
+                accessed_ids.append(m["_id"])
+            
+            # last_accessed: บันทึกลงบัฟเฟอร์ แล้ว flush เป็น bulk_write เดียว (กรอง user_id ตอนเขียน)
+            if accessed_ids:
+                get_memory_access_tracker().record(user_id, accessed_ids)
             
             logger.debug(f"Recalled {len(memories)} memories for user {user_id}")
             return memories
@@ -302,32 +318,63 @@ If no new information, return an empty list. Output JSON ONLY."""
     ) -> str:
         """
         Build a token-aware conversation context using sliding window.
-        When the raw history exceeds *max_chars* the oldest messages are
-        compacted into a short summary so the LLM never loses critical
-        context while staying within the token budget.
+        With the rolling summary enabled this never calls the LLM: it reads the
+        persisted summary (head document) plus the recent tail not yet folded into it.
+        Older messages are folded in the background after the turn (schedule_summary_update).
+        With it disabled, the oldest half is compacted inline when the history exceeds *max_chars*.
 
         Returns a ready-to-inject context string.
         """
-        conversations = self.db["conversations"]
-        doc = await conversations.find_one({"session_id": session_id})
-        if not doc or "messages" not in doc:
-            return ""
+        if not settings.rolling_summary_enabled:
+            return await self._build_context_inline(session_id, max_messages, max_chars)
 
-        all_msgs: list = doc["messages"]
-        if not all_msgs:
+        store = self._conversations()
+        # summary + bucket ท้ายอ่านพร้อมกัน → O(1) ไม่ขึ้นกับความยาวแชท
+        state, recent = await asyncio.gather(
+            store.summary_state(session_id),
+            store.tail(session_id, max_messages, keep_seq=True),
+        )
+        if not recent:
             return ""
 
-        recent = all_msgs[-max_messages:]
+        summary = state["summary"]
+        upto = state["summary_upto"]
+        if summary:
+            recent = [m for m in recent if m.get("seq") is None or m["seq"] >= upto]
+        lines = [self._format_line(m) for m in recent]
+
+        # เก็บบรรทัดใหม่สุดให้พอดีงบ (หักส่วน summary ออกก่อน)
+        budget = max_chars - len(summary)
+        kept: List[str] = []
+        used = 0
+        for line in reversed(lines):
+            if kept and used + len(line) > budget:
+                break
+            kept.append(line)
+            used += len(line)
+        kept.reverse()
+        dropped = lines[:len(lines) - len(kept)]
+
+        if not summary and not dropped:
+            return "\n".join(lines)
+        parts = []
+        if summary:
+            parts.append(f"[Conversation Summary]\n{summary}")
+        if dropped:
+            # ยังไม่ถูกสรุป (background ยังไม่ทัน) → ตัดสั้นแทน ไม่เรียก LLM บน critical path
+            older_block = "\n".join(dropped)
+            parts.append(f"[Earlier Messages]\n{older_block[:800]}...")
+        parts.append("[Recent Messages]\n" + "\n".join(kept))
+        return "\n\n".join(parts)
 
-        context_lines = []
-        total_chars = 0
-        for msg in recent:
-            role = "User" if msg.get("role") == "user" else "AI"
-            content = (msg.get("content") or "")[:2000]
-            line = f"{role}: {content}"
-            total_chars += len(line)
-            context_lines.append(line)
+    async def _build_context_inline(self, session_id: str, max_messages: int, max_chars: int) -> str:
+        """Legacy path: compact the older half with an LLM call inside the turn."""
+        recent = await self._conversations().tail(session_id, max_messages)
+        if not recent:
+            return ""
 
+        context_lines = [self._format_line(msg) for msg in recent]
+        total_chars = sum(len(line) for line in context_lines)
         if total_chars <= max_chars:
             return "\n".join(context_lines)
 
@@ -337,21 +384,43 @@ If no new information, return an empty list. Output JSON ONLY."""
         recent_block = "\n".join(context_lines[mid:])
 
         try:
-            summary = await self._compact_context(older_block)
+            # LLM ตอบว่าง → ตัดสั้นแทน (inline path ไม่ได้บันทึกผลสรุป)
+            summary = await self._compact_context(older_block) or older_block[:800]
         except Exception as e:
             logger.warning(f"Context compaction failed, truncating instead: {e}")
             summary = older_block[:800] + "..."
 
         return f"[Conversation Summary]\n{summary}\n\n[Recent Messages]\n{recent_block}"
 
-    async def _compact_context(self, text: str) -> str:
-        """Use LLM to create a concise summary of older conversation."""
-        prompt = (
-            "Summarize the following conversation history into 3-5 bullet points "
-            "in the SAME language the user used. Keep travel details "
-            "(dates, destinations, preferences). Output bullets only.\n\n"
-            f"{text[:6000]}"
-        )
+    def _conversations(self) -> ConversationStore:
+        return ConversationStore(self.db)
+
+    @staticmethod
+    def _format_line(msg: Dict[str, Any]) -> str:
+        role = "User" if msg.get("role") == "user" else "AI"
+        return f"{role}: {(msg.get('content') or '')[:2000]}"
+
+    async def _compact_context(self, text: str, previous_summary: str = "") -> str:
+        """
+        Use LLM to create a concise summary of older conversation (optionally extending a previous summary).
+        Returns "" when the LLM gives an empty reply — callers decide on a fallback
+        (the rolling summary must not persist raw truncated text in place of a summary).
+        """
+        if previous_summary:
+            prompt = (
+                "Update the running summary of a travel conversation with the new messages below. "
+                "Write 3-8 bullet points in the SAME language the user used. Keep travel details "
+                "(dates, destinations, preferences, decisions) and drop anything superseded. "
+                "Output bullets only.\n\n"
+                f"[Current Summary]\n{previous_summary[:2000]}\n\n[New Messages]\n{text[-6000:]}"
+            )
+        else:
+            prompt = (
+                "Summarize the following conversation history into 3-5 bullet points "
+                "in the SAME language the user used. Keep travel details "
+                "(dates, destinations, preferences). Output bullets only.\n\n"
+                f"{text[:6000]}"
+            )
         summary = await self.llm.generate_content(
             prompt=prompt,
             temperature=0.2,
@@ -359,7 +428,51 @@ If no new information, return an empty list. Output JSON ONLY."""
             auto_select_model=True,
             context="memory",
         )
-        return summary.strip() if summary else text[:800]
+        return summary.strip() if summary else ""
+
+    # ---------- Rolling summary (background, after the turn) ----------
+
+    def schedule_summary_update(self, session_id: str) -> None:
+        """Fire-and-forget update of the session's rolling summary (one in flight per session)."""
+        if not settings.rolling_summary_enabled or not session_id or session_id in _summary_tasks:
+            return
+        try:
+            task = asyncio.create_task(self.update_rolling_summary(session_id))
+        except RuntimeError:
+            return  # ไม่มี event loop
+        _summary_tasks[session_id] = task
+        task.add_done_callback(lambda _t: _summary_tasks.pop(session_id, None))
+
+    async def update_rolling_summary(self, session_id: str) -> bool:
+        """
+        Fold messages [summary_upto, message_count - keep_recent) into the persisted summary
+        once at least rolling_summary_batch of them are pending. Returns True when a new summary was stored.
+        """
+        try:
+            store = self._conversations()
+            state = await store.summary_state(session_id)
+            if not state["bucketed"]:
+                return False
+            upto = state["summary_upto"]
+            fold_to = state["message_count"] - settings.rolling_summary_keep_recent
+            if fold_to - upto < settings.rolling_summary_batch:
+                return False
+            # แชทเก่าที่ยังไม่เคยสรุป: สรุปเฉพาะช่วงท้าย (ข้อความก่อนหน้านั้นอยู่นอก window อยู่แล้ว)
+            start = max(upto, fold_to - SUMMARY_MAX_FOLD_MESSAGES)
+            messages = await store.range(session_id, start, fold_to, bucket_size=state["bucket_size"])
+            if not messages:
+                return False
+            block = "\n".join(self._format_line(m) for m in messages)
+            summary = await self._compact_context(block, previous_summary=state["summary"])
+            if not summary:
+                return False
+            saved = await store.save_summary(session_id, summary, upto=fold_to, expected_upto=upto)
+            if saved:
+                logger.debug(f"Rolling summary for {session_id}: folded {len(messages)} messages (upto={fold_to})")
+            return saved
+        except Exception as e:
+            logger.warning(f"Rolling summary update failed for {session_id}: {e}")
+            return False
 
     async def get_sliding_window_messages(
         self,
@@ -367,9 +480,5 @@ If no new information, return an empty list. Output JSON ONLY."""
         window_size: int = MAX_HISTORY_MESSAGES,
     ) -> List[Dict[str, Any]]:
         """Return the last *window_size* messages for a session."""
-        conversations = self.db["conversations"]
-        doc = await conversations.find_one({"session_id": session_id})
-        if not doc or "messages" not in doc:
-            return []
-        return doc["messages"][-window_size:]
+        return await ConversationStore(self.db).tail(session_id, window_size)
 
@@ -0,0 +1,133 @@
+"""
+บัฟเฟอร์เวลาเข้าถึงความจำ (memories.last_accessed)
+
+เดิม MemoryService.recall อ่านความจำแล้ว update_one ทีละรายการเพื่ออัปเดต last_accessed
+(N+1 round trip ไป Atlas บน critical path ของทุก turn)
+ตอนนี้ recall แค่บันทึก id ที่ถูกอ่านไว้ในหน่วยความจำ แล้ว flush เป็น bulk_write ครั้งเดียว
+(UpdateMany ต่อ user: {_id: {$in: ids}, user_id} → $set last_accessed) ทุก N วินาที,
+เมื่อค้างเกิน memory_access_flush_max_pending และตอน shutdown
+last_accessed ใช้แค่จัดลำดับ/ล้างความจำเก่า จึงยอมให้ล่าช้าได้ไม่กี่วินาที
+"""
+
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+import asyncio
+
+from pymongo import UpdateMany
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class MemoryAccessTracker:
+    """In-process buffer of recalled memory ids, flushed to MongoDB in one bulk_write."""
+
+    def __init__(
+        self,
+        collection: Any = None,
+        flush_interval: Optional[float] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self._collection = collection
+        self.flush_interval = flush_interval or settings.memory_access_flush_seconds
+        self.max_pending = max_pending or settings.memory_access_flush_max_pending
+        # (user_id, memory _id) -> เวลาที่อ่านล่าสุด
+        self._pending: Dict[Tuple[str, Any], datetime] = {}
+        self._flusher: Optional["asyncio.Task[None]"] = None
+        self._flush_lock = asyncio.Lock()
+        self._stats = {"recorded": 0, "flushes": 0, "written": 0, "errors": 0}
+
+    def _get_collection(self) -> Any:
+        if self._collection is None:
+            from app.storage.connection_manager import MongoConnectionManager
+            self._collection = MongoConnectionManager.get_instance().get_database().get_collection("memories")
+        return self._collection
+
+    def record(self, user_id: str, memory_ids: Iterable[Any], accessed_at: Optional[datetime] = None) -> None:
+        """Remember that `user_id` read these memories (no I/O)."""
+        now = accessed_at or datetime.utcnow()
+        for memory_id in memory_ids:
+            self._pending[(user_id, memory_id)] = now
+            self._stats["recorded"] += 1
+        self._ensure_flusher()
+        if len(self._pending) >= self.max_pending:
+            try:
+                asyncio.get_running_loop().create_task(self.flush())
+            except RuntimeError:
+                pass
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # ไม่มี event loop — flush ตอน record ครั้งถัดไป / shutdown
+        self._flusher = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.warning(f"MemoryAccessTracker flush loop error: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    async def flush(self) -> int:
+        """Write every pending access time in one bulk_write; returns memories updated."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            by_user: Dict[str, Tuple[list, datetime]] = {}
+            for (user_id, memory_id), accessed_at in pending.items():
+                ids, latest = by_user.get(user_id, ([], accessed_at))
+                ids.append(memory_id)
+                by_user[user_id] = (ids, max(latest, accessed_at))
+            # ✅ SECURITY: ทุก update กรอง user_id ด้วย (เหมือน update_one เดิม)
+            ops = [
+                UpdateMany({"_id": {"$in": ids}, "user_id": user_id}, {"$set": {"last_accessed": latest}})
+                for user_id, (ids, latest) in by_user.items()
+            ]
+            try:
+                result = await self._get_collection().bulk_write(ops, ordered=False)
+            except Exception as e:
+                self._stats["errors"] += 1
+                # ใส่คืน (ไม่ทับค่าที่ใหม่กว่าซึ่งเข้ามาระหว่าง flush) แล้วลองใหม่รอบหน้า
+                for key, accessed_at in pending.items():
+                    self._pending.setdefault(key, accessed_at)
+                logger.warning(f"MemoryAccessTracker flush failed ({len(pending)} pending kept): {e}")
+                return 0
+            self._stats["flushes"] += 1
+            self._stats["written"] += len(pending)
+            logger.debug(
+                f"MemoryAccessTracker flushed {len(pending)} access times in 1 bulk_write "
+                f"({len(ops)} users, matched={result.matched_count})"
+            )
+            return len(pending)
+
+    async def close(self) -> None:
+        """Stop the periodic flusher and write whatever is still pending (lifespan shutdown)."""
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+        self._flusher = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "pending": len(self._pending)}
+
+
+_tracker: Optional[MemoryAccessTracker] = None
+
+
+def get_memory_access_tracker() -> MemoryAccessTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = MemoryAccessTracker()
+    return _tracker
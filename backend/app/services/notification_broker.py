@@ -0,0 +1,290 @@
+"""
+Notification broker: fanout ของ notification ไปยัง SSE subscribers (/api/notification/stream)
+
+เดิมใช้ dict ของ asyncio.Queue ในโปรเซส → create_and_push_notification ถึงเฉพาะ client ที่ต่อกับ worker เดียวกัน
+- Redis (เมื่อมี REDIS_URL และ NOTIFICATION_BROKER != local): publish ไปที่ channel ต่อ user (notif:user:{user_id})
+  แต่ละ worker subscribe เฉพาะ channel ของ user ที่มี SSE เปิดอยู่กับตัวเอง (PubSub connection เดียวต่อโปรเซส)
+- Redis ใช้ไม่ได้ / publish ล้มเหลว → ส่งให้ subscriber ในโปรเซสตรงๆ (พฤติกรรมเดิม)
+- listener หลุด → reconnect แบบ backoff, subscribe channel เดิมทั้งหมดใหม่ แล้วส่ง resync ให้ client โหลดรายการใหม่
+- subscriber ช้า: buffer จำกัด (ทิ้งตัวเก่าสุด) + resync; burst ที่ค้างอยู่ส่งรวมใน write เดียว
+"""
+
+from __future__ import annotations
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+import asyncio
+import json
+import time
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+RESYNC_PAYLOAD = json.dumps({"type": "resync"})
+
+
+class NotificationSubscriber:
+    """หนึ่ง SSE connection: buffer จำกัดขนาด, ทิ้งตัวเก่าสุดเมื่อเต็ม"""
+
+    def __init__(self, broker: "NotificationBroker", user_id: str, maxsize: int):
+        self.broker = broker
+        self.user_id = user_id
+        self.maxsize = max(1, maxsize)
+        self._buffer: Deque[str] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self._resync = False
+        self.dropped = 0
+
+    def deliver(self, payload: str) -> None:
+        if len(self._buffer) >= self.maxsize:
+            self._buffer.popleft()
+            self.dropped += 1
+            self._resync = True
+            self.broker._stats["dropped"] += 1
+        self._buffer.append(payload)
+        self._wake()
+
+    def request_resync(self) -> None:
+        self._resync = True
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next_batch(self, timeout: float) -> List[str]:
+        """payload ที่ค้างทั้งหมด (รวม burst) หรือ [] เมื่อครบ timeout โดยไม่มี event"""
+        if not self._buffer and not self._resync:
+            loop = asyncio.get_running_loop()
+            self._waiter = loop.create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout=timeout)
+            except asyncio.TimeoutError:
+                return []
+            finally:
+                self._waiter = None
+            if settings.notification_coalesce_ms > 0:
+                await asyncio.sleep(settings.notification_coalesce_ms / 1000)
+        batch = list(self._buffer)
+        self._buffer.clear()
+        if self._resync:
+            self._resync = False
+            self.broker._stats["resyncs"] += 1
+            batch.append(RESYNC_PAYLOAD)
+        if len(batch) > 1:
+            self.broker._stats["coalesced"] += len(batch) - 1
+        return batch
+
+    async def close(self) -> None:
+        await self.broker.unsubscribe(self)
+
+
+class NotificationBroker:
+    """
+    Per-user fanout. Local subscribers live in this process; with Redis every publish goes through the user's
+    channel and each process forwards it to its own local subscribers.
+    """
+
+    def __init__(self, mode: Optional[str] = None, redis: Any = None):
+        self.mode = (mode or settings.notification_broker or "auto").lower()
+        self.prefix = settings.notification_channel_prefix
+        self._subscribers: Dict[str, Set[NotificationSubscriber]] = {}
+        self._redis = redis
+        self._redis_checked = redis is not None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._channels_ready = asyncio.Event()
+        self._connected = False
+        self._closed = False
+        self._lock = asyncio.Lock()
+        self._stats = {
+            "published": 0,
+            "published_redis": 0,
+            "fallback_local": 0,
+            "delivered": 0,
+            "redis_received": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "resyncs": 0,
+            "reconnects": 0,
+            "redis_errors": 0,
+        }
+
+    # ---------- backend ----------
+
+    async def _get_redis(self):
+        if self.mode == "local" or self._closed:
+            return None
+        if not self._redis_checked:
+            self._redis_checked = True
+            try:
+                from app.core.redis_client import get_redis
+                self._redis = await get_redis()
+            except Exception as e:
+                logger.warning(f"NotificationBroker: Redis unavailable, using in-process fanout: {e}")
+                self._redis = None
+            if self._redis is None and self.mode == "redis":
+                logger.warning("NotificationBroker: NOTIFICATION_BROKER=redis but Redis is not available — in-process only")
+        return self._redis
+
+    def _channel(self, user_id: str) -> str:
+        return f"{self.prefix}{user_id}"
+
+    def _user_from_channel(self, channel: Any) -> str:
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8", "replace")
+        return str(channel)[len(self.prefix):]
+
+    async def _ensure_listener(self, redis) -> None:
+        if self._listener is None or self._listener.done():
+            self._pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            self._listener = asyncio.create_task(self._listen(redis))
+
+    async def _listen(self, redis) -> None:
+        backoff = 0.5
+        recovering = False
+        while not self._closed:
+            try:
+                await self._channels_ready.wait()
+                if not self._connected:
+                    # เชื่อมใหม่: subscribe ทุก user ที่ยังมี SSE อยู่ในโปรเซสนี้
+                    # (ตั้ง _connected ก่อน → user ที่ subscribe ระหว่างนี้จะสั่ง SUBSCRIBE เอง ไม่ตกหล่นจาก snapshot)
+                    self._connected = True
+                    channels = [self._channel(uid) for uid in list(self._subscribers)]
+                    if channels:
+                        await self._pubsub.subscribe(*channels)
+                    if recovering:
+                        recovering = False
+                        self._stats["reconnects"] += 1
+                        for subs in self._subscribers.values():
+                            for sub in subs:
+                                sub.request_resync()
+                        logger.info(f"NotificationBroker: Redis pub/sub reconnected ({len(channels)} channel(s))")
+                    backoff = 0.5
+                if not self._pubsub.subscribed:
+                    self._channels_ready.clear()
+                    continue
+                message = await self._pubsub.get_message(timeout=1.0)
+                if message and message.get("type") == "message":
+                    self._stats["redis_received"] += 1
+                    data = message.get("data")
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8", "replace")
+                    self._dispatch_local(self._user_from_channel(message.get("channel")), data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._connected = False
+                recovering = True
+                self._stats["redis_errors"] += 1
+                logger.warning(f"NotificationBroker: Redis pub/sub error, reconnecting in {backoff:.1f}s: {e}")
+                try:
+                    await self._pubsub.aclose()
+                except Exception:
+                    pass
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                self._pubsub = redis.pubsub(ignore_subscribe_messages=True)
+
+    # ---------- subscribe ----------
+
+    async def subscribe(self, user_id: str, maxsize: Optional[int] = None) -> NotificationSubscriber:
+        sub = NotificationSubscriber(self, user_id, maxsize or settings.notification_subscriber_buffer)
+        first = user_id not in self._subscribers
+        self._subscribers.setdefault(user_id, set()).add(sub)
+        if first:
+            redis = await self._get_redis()
+            if redis is not None:
+                async with self._lock:
+                    await self._ensure_listener(redis)
+                    if self._connected:
+                        try:
+                            await self._pubsub.subscribe(self._channel(user_id))
+                        except Exception as e:
+                            # listener จะ reconnect และ subscribe ทุก channel ใหม่เอง
+                            logger.warning(f"NotificationBroker: subscribe {user_id} failed: {e}")
+                    self._channels_ready.set()
+        return sub
+
+    async def unsubscribe(self, sub: NotificationSubscriber) -> None:
+        subs = self._subscribers.get(sub.user_id)
+        if not subs or sub not in subs:
+            return
+        subs.discard(sub)
+        if subs:
+            return
+        del self._subscribers[sub.user_id]
+        if self._pubsub is not None and self._connected:
+            try:
+                async with self._lock:
+                    await self._pubsub.unsubscribe(self._channel(sub.user_id))
+            except Exception as e:
+                logger.debug(f"NotificationBroker: unsubscribe {sub.user_id} failed: {e}")
+
+    # ---------- publish ----------
+
+    def _dispatch_local(self, user_id: str, payload: str) -> int:
+        subs = self._subscribers.get(user_id)
+        if not subs:
+            return 0
+        for sub in list(subs):
+            sub.deliver(payload)
+        self._stats["delivered"] += len(subs)
+        return len(subs)
+
+    async def publish(self, user_id: str, event: Dict[str, Any]) -> None:
+        if not user_id:
+            return
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        self._stats["published"] += 1
+        redis = await self._get_redis()
+        if redis is not None:
+            try:
+                await redis.publish(self._channel(user_id), payload)
+                self._stats["published_redis"] += 1
+                return
+            except Exception as e:
+                self._stats["redis_errors"] += 1
+                self._stats["fallback_local"] += 1
+                logger.warning(f"NotificationBroker: Redis publish failed, delivering in-process only: {e}")
+        self._dispatch_local(user_id, payload)
+
+    # ---------- lifecycle ----------
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["backend"] = "redis" if self._redis is not None else "local"
+        stats["redis_connected"] = self._connected
+        stats["users"] = len(self._subscribers)
+        stats["subscribers"] = sum(len(s) for s in self._subscribers.values())
+        stats["timestamp"] = time.time()
+        return stats
+
+
+_notification_broker: Optional[NotificationBroker] = None
+
+
+def get_notification_broker() -> NotificationBroker:
+    global _notification_broker
+    if _notification_broker is None:
+        _notification_broker = NotificationBroker()
+    return _notification_broker
+
+
+def peek_notification_broker() -> Optional[NotificationBroker]:
+    return _notification_broker
@@ -0,0 +1,311 @@
+"""
+Raw offer blob store: raw Amadeus payload ของ option เก็บแยกนอก session / trip document
+
+เดิม Segment.options_pool เก็บ raw_data เต็ม (flight offer พร้อม travelerPricings ทุกคน, โรงแรมพร้อมรีวิว/รูป Google)
+ทุก option — get_session / save_session / save_trip / controller strip ต้องย้าย bytes เหล่านี้ทุกครั้ง
+ทั้งที่ payload เต็มใช้จริงแค่ตอนส่ง Amadeus (create_flight_order / create_hotel_booking)
+
+- content-addressed: key = sha256 ของ JSON แบบ canonical → offer เดียวกันจากหลายเซสชัน (shared search cache) เก็บครั้งเดียว
+- Mongo "offer_blobs": payload บีบอัด zlib, TTL index ที่ expires_at (เจอซ้ำ → ยืดอายุ), hot layer ใน memory
+- option เก็บ raw_data แบบย่อ (ฟิลด์ที่ UI / responder ใช้แสดงผล) + raw_ref {"digest", "bytes"}
+- booking เรียก resolve_option() ก่อนส่ง Amadeus; ถ้า store ใช้ไม่ได้ตอน offload → เก็บ raw inline ตามเดิม
+"""
+
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import zlib
+
+from app.core.bounded_cache import BoundedCache
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+BLOB_COLLECTION = "offer_blobs"
+RAW_REF_FIELD = "raw_ref"
+
+# subtree ที่ไม่มีใครอ่านนอกจาก booking / debug → ตัดออกจาก raw_data แบบย่อ
+_DROP_KEYS = frozenset({"dictionaries", "reviews", "html_attributions", "_debug"})
+# list ที่ UI แสดงแค่บางส่วน
+_LIST_CAPS = {"photos": 5, "image_urls": 5, "offers": 1}
+# fareDetailsBySegment: เก็บเฉพาะที่ใช้แสดง cabin / กระเป๋า
+_FARE_DETAIL_KEYS = ("segmentId", "cabin", "class", "brandedFare", "brandedFareLabel", "includedCheckedBags", "includedCabinBags")
+
+
+def canonical_bytes(raw: Any) -> bytes:
+    return json.dumps(raw, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def offer_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _compact_traveler_pricings(pricings: List[Any]) -> List[Any]:
+    """travelerPricings: ผู้โดยสารคนแรกพอสำหรับแสดง cabin / กระเป๋า (ราคารวมอยู่ที่ price)."""
+    first = pricings[0] if pricings and isinstance(pricings[0], dict) else None
+    if first is None:
+        return []
+    out = {k: v for k, v in first.items() if k != "fareDetailsBySegment"}
+    out["fareDetailsBySegment"] = [
+        {k: fd[k] for k in _FARE_DETAIL_KEYS if k in fd}
+        for fd in first.get("fareDetailsBySegment") or []
+        if isinstance(fd, dict)
+    ]
+    return [out]
+
+
+def _compact_value(key: Optional[str], value: Any, depth: int) -> Any:
+    if depth > 8:
+        return value
+    if isinstance(value, dict):
+        return {
+            k: _compact_value(k, v, depth + 1)
+            for k, v in value.items()
+            if k not in _DROP_KEYS
+        }
+    if isinstance(value, list):
+        if key == "travelerPricings":
+            return _compact_traveler_pricings(value)
+        cap = _LIST_CAPS.get(key or "")
+        items = value[:cap] if cap else value
+        return [_compact_value(None, v, depth + 1) for v in items]
+    return value
+
+
+def compact_raw(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """raw_data แบบย่อ: โครงสร้างเดิม (itineraries, price, enhanced_info, booking, visuals ...) ตัด subtree หนักที่ไม่ได้แสดงผล"""
+    return _compact_value(None, raw, 0)
+
+
+def iter_plan_segments(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """ทุก segment dict ใน trip_plan ที่ serialize แล้ว (flights, ground_transport, accommodation)."""
+    travel = plan.get("travel") or {}
+    flights = travel.get("flights") or {}
+    groups = [
+        flights.get("outbound"),
+        flights.get("inbound"),
+        travel.get("ground_transport"),
+        (plan.get("accommodation") or {}).get("segments"),
+    ]
+    for group in groups:
+        for seg in group or []:
+            if isinstance(seg, dict):
+                yield seg
+
+
+class OfferBlobStore:
+    """
+    Content-addressed store for raw offer payloads.
+
+    Lookup order: hot memory (BoundedCache) → Mongo. Writes are batched per search (one bulk upsert)
+    and skipped for digests this process already persisted.
+    """
+
+    def __init__(self, use_db: bool = True, collection: Any = None):
+        self._use_db = use_db
+        self._collection_override = collection
+        self._hot = BoundedCache(
+            "offer_blobs",
+            max_entries=20_000,
+            max_bytes=settings.offer_blob_hot_max_mb * 1024 * 1024,
+            default_ttl=6 * 3600,
+        )
+        # digest ที่เขียนลง Mongo แล้วในโปรเซสนี้ (ข้าม upsert ซ้ำ)
+        self._persisted = BoundedCache("offer_blob_digests", max_entries=200_000, default_ttl=3600, sizeof=lambda v: 64)
+        self._stats = {
+            "offloaded": 0,
+            "dedup_hits": 0,
+            "blobs_written": 0,
+            "inline_small": 0,
+            "write_failures": 0,
+            "raw_bytes": 0,
+            "compact_bytes": 0,
+            "resolves": 0,
+            "hot_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+        }
+
+    def _collection(self):
+        if self._collection_override is not None:
+            return self._collection_override
+        if not self._use_db:
+            return None
+        try:
+            from app.storage.connection_manager import MongoConnectionManager
+            return MongoConnectionManager.get_instance().get_database()[BLOB_COLLECTION]
+        except Exception as e:
+            logger.debug(f"OfferBlobStore: database unavailable: {e}")
+            return None
+
+    # ---------- write ----------
+
+    async def _write(self, collection, pending: Dict[str, bytes]) -> bool:
+        from pymongo import UpdateOne
+
+        loop = asyncio.get_running_loop()
+        compressed = await loop.run_in_executor(
+            None, lambda: {digest: zlib.compress(data, 6) for digest, data in pending.items()}
+        )
+        now = datetime.utcnow()
+        expires_at = now + timedelta(days=settings.offer_blob_ttl_days)
+        ops = [
+            UpdateOne(
+                {"_id": digest},
+                {
+                    "$setOnInsert": {
+                        "payload": compressed[digest],
+                        "bytes": len(data),
+                        "stored_bytes": len(compressed[digest]),
+                        "created_at": now,
+                    },
+                    "$max": {"expires_at": expires_at},
+                },
+                upsert=True,
+            )
+            for digest, data in pending.items()
+        ]
+        try:
+            await collection.bulk_write(ops, ordered=False)
+        except Exception as e:
+            self._stats["write_failures"] += 1
+            logger.warning(f"OfferBlobStore: bulk upsert of {len(ops)} blob(s) failed, keeping raw inline: {e}")
+            return False
+        for digest in pending:
+            self._persisted.set(digest, True)
+        self._stats["blobs_written"] += len(ops)
+        return True
+
+    async def offload_options(self, options: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Move each option's raw_data into the store. Returns new option dicts with compact raw_data + raw_ref
+        (or the input list unchanged when the store is disabled / unavailable).
+        """
+        if not settings.offer_blob_store_enabled or not options:
+            return options
+        collection = self._collection()
+        if collection is None:
+            return options
+        pending: Dict[str, bytes] = {}
+        out: List[Dict[str, Any]] = []
+        raw_bytes = compact_bytes = 0
+        for opt in options:
+            raw = opt.get("raw_data") if isinstance(opt, dict) else None
+            if not isinstance(raw, dict) or not raw or opt.get(RAW_REF_FIELD):
+                out.append(opt)
+                continue
+            data = canonical_bytes(raw)
+            if len(data) < settings.offer_blob_min_bytes:
+                self._stats["inline_small"] += 1
+                out.append(opt)
+                continue
+            digest = offer_digest(data)
+            if digest in self._persisted:
+                self._stats["dedup_hits"] += 1
+            else:
+                pending[digest] = data
+            self._hot.set(digest, raw, size=len(data))
+            compact = compact_raw(raw)
+            raw_bytes += len(data)
+            compact_bytes += len(canonical_bytes(compact))
+            out.append({**opt, "raw_data": compact, RAW_REF_FIELD: {"digest": digest, "bytes": len(data)}})
+        if pending and not await self._write(collection, pending):
+            return options
+        offloaded = sum(1 for opt in out if isinstance(opt, dict) and RAW_REF_FIELD in opt)
+        self._stats["offloaded"] += offloaded
+        self._stats["raw_bytes"] += raw_bytes
+        self._stats["compact_bytes"] += compact_bytes
+        if offloaded:
+            logger.debug(
+                f"OfferBlobStore: offloaded {offloaded} option(s), {raw_bytes} → {compact_bytes} bytes inline, "
+                f"{len(pending)} new blob(s)"
+            )
+        return out
+
+    async def offload_plan(self, plan: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Offload options_pool + selected_option of every segment in a serialized trip_plan (in place)."""
+        offloaded = 0
+        for seg in iter_plan_segments(plan):
+            pool = seg.get("options_pool")
+            if isinstance(pool, list) and pool:
+                seg["options_pool"] = await self.offload_options(pool)
+                offloaded += sum(1 for o in seg["options_pool"] if isinstance(o, dict) and RAW_REF_FIELD in o)
+            selected = seg.get("selected_option")
+            if isinstance(selected, dict) and selected.get("raw_data") and not selected.get(RAW_REF_FIELD):
+                seg["selected_option"] = (await self.offload_options([selected]))[0]
+                offloaded += 1 if RAW_REF_FIELD in seg["selected_option"] else 0
+        return plan, offloaded
+
+    # ---------- read ----------
+
+    async def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Full raw payload for a digest (None if expired / unknown)."""
+        if not digest:
+            return None
+        raw = self._hot.get(digest)
+        if raw is not None:
+            self._stats["hot_hits"] += 1
+            return raw
+        collection = self._collection()
+        if collection is None:
+            self._stats["misses"] += 1
+            return None
+        try:
+            doc = await collection.find_one({"_id": digest}, {"payload": 1})
+        except Exception as e:
+            logger.warning(f"OfferBlobStore: lookup {digest[:12]} failed: {e}")
+            doc = None
+        if not doc or doc.get("payload") is None:
+            self._stats["misses"] += 1
+            return None
+        payload = bytes(doc["payload"])
+        loop = asyncio.get_running_loop()
+        raw = await loop.run_in_executor(None, lambda: json.loads(zlib.decompress(payload)))
+        self._stats["db_hits"] += 1
+        self._hot.set(digest, raw, size=len(payload) * 4)
+        return raw
+
+    async def resolve_option(self, option: Any) -> Any:
+        """Option with its full raw_data restored (lazy; unchanged when it has no raw_ref)."""
+        if not isinstance(option, dict):
+            return option
+        ref = option.get(RAW_REF_FIELD)
+        if not isinstance(ref, dict):
+            return option
+        self._stats["resolves"] += 1
+        raw = await self.get(ref.get("digest", ""))
+        if raw is None:
+            logger.warning(
+                f"OfferBlobStore: raw payload {str(ref.get('digest'))[:12]} expired or missing — using compact raw_data"
+            )
+            return option
+        resolved = {k: v for k, v in option.items() if k != RAW_REF_FIELD}
+        resolved["raw_data"] = raw
+        return resolved
+
+    async def ensure_indexes(self) -> None:
+        collection = self._collection()
+        if collection is None:
+            return
+        from app.models.database import OFFER_BLOB_INDEXES
+        await collection.create_indexes(OFFER_BLOB_INDEXES)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["bytes_saved_inline"] = stats["raw_bytes"] - stats["compact_bytes"]
+        stats["hot_entries"] = len(self._hot)
+        return stats
+
+
+_offer_blob_store: Optional[OfferBlobStore] = None
+
+
+def get_offer_blob_store() -> OfferBlobStore:
+    global _offer_blob_store
+    if _offer_blob_store is None:
+        _offer_blob_store = OfferBlobStore()
+    return _offer_blob_store
@@ -1,6 +1,7 @@
 """
 เซอร์วิสแคชตัวเลือก (in-memory — Redis ถูกลบออกแล้ว)
 เก็บตัวเลือกทั้งหมด (เที่ยวบิน การเดินทาง ที่พัก) ใน memory สำหรับ AI และ TripSummary
+raw Amadeus ที่มาจาก shared search cache เก็บเป็น reference (ดู app/services/search_cache.py)
 """
 
 from typing import Dict, List, Optional, Any
@@ -10,19 +11,36 @@ import json
 from app.core.logging import get_logger
 from app.core.redis_client import get_redis, is_redis_available
 from app.core.config import settings
+from app.core.bounded_cache import BoundedCache, approx_size
+from app.services.search_cache import SHARED_REF_FIELD, get_search_cache
 
 logger = get_logger(__name__)
 
 DEFAULT_TTL_HOURS = 24
 DEFAULT_TTL_RAW_HOURS = 24
 
-# In-memory stores (fallback)
+# In-memory stores (fallback) — มีขอบเขตทั้งจำนวน entry, ขนาด และ TTL
 # options_store: cache_key -> cache_entry dict
-_options_store: Dict[str, Dict[str, Any]] = {}
+_options_store = BoundedCache(
+    "options_store",
+    max_entries=settings.options_cache_max_entries,
+    max_bytes=settings.options_cache_max_mb * 1024 * 1024,
+    default_ttl=DEFAULT_TTL_HOURS * 3600,
+)
 # session_index: session_id -> set of cache_keys
-_session_index: Dict[str, set] = {}
-# raw_store: "{session_id}:{slot_name}:{segment_index}" -> raw data
-_raw_store: Dict[str, Any] = {}
+_session_index = BoundedCache(
+    "options_session_index",
+    max_entries=settings.options_cache_max_entries,
+    default_ttl=DEFAULT_TTL_HOURS * 3600,
+    sizeof=lambda keys: 256,
+)
+# raw_store: "{session_id}:{slot_name}:{segment_index}" -> raw data (หรือ reference ไป shared search cache)
+_raw_store = BoundedCache(
+    "options_raw_store",
+    max_entries=settings.options_cache_max_entries,
+    max_bytes=settings.options_cache_max_mb * 1024 * 1024,
+    default_ttl=DEFAULT_TTL_RAW_HOURS * 3600,
+)
 
 
 def _serialize_dt(dt: datetime) -> Optional[str]:
@@ -38,6 +56,16 @@ def _deserialize_dt(s: Optional[str]) -> Optional[datetime]:
         return None
 
 
+async def _resolve_raw(payload: Any) -> Any:
+    """แปลง reference ที่ชี้ไป shared search cache กลับเป็น raw Amadeus list (สำเนาที่ pin ไว้ตอน save — อายุเท่า raw store)."""
+    if not (isinstance(payload, dict) and payload.get(SHARED_REF_FIELD)):
+        return payload
+    shared = await get_search_cache().get_pinned(payload[SHARED_REF_FIELD])
+    if isinstance(shared, dict):
+        return shared.get("flights") or shared.get("hotels") or shared.get("transfers")
+    return shared
+
+
 class OptionsCacheService:
     """
     Cache service เก็บตัวเลือกใน memory (Redis removed):
@@ -120,11 +148,11 @@ class OptionsCacheService:
 
         # In-memory fallback
         try:
-            _options_store[cache_key] = entry
+            _options_store.set(cache_key, entry, ttl=ttl_hours * 3600)
 
-            if session_id not in _session_index:
-                _session_index[session_id] = set()
-            _session_index[session_id].add(cache_key)
+            session_keys = _session_index.get(session_id) or set()
+            session_keys.add(cache_key)
+            _session_index.set(session_id, session_keys, ttl=ttl_hours * 3600)
 
             logger.info(
                 f"Cached {len(options)} options for {slot_name}[{segment_index}] in session {session_id} "
@@ -175,8 +203,7 @@ class OptionsCacheService:
             if expires_at and expires_at < datetime.utcnow():
                 logger.debug(f"Cache expired for {cache_key}")
                 _options_store.pop(cache_key, None)
-                if session_id in _session_index:
-                    _session_index[session_id].discard(cache_key)
+                _session_index.get(session_id, set()).discard(cache_key)
                 return None
 
             entry["last_accessed"] = _serialize_dt(datetime.utcnow())
@@ -311,9 +338,12 @@ class OptionsCacheService:
             if not entry:
                 logger.warning(f"Cannot save selected option: cache entry not found for {cache_key}")
                 return False
+            previous = entry.get("selected_option")
             entry["selected_option"] = selected_option
             entry["selected_at"] = _serialize_dt(datetime.utcnow())
             entry["last_accessed"] = _serialize_dt(datetime.utcnow())
+            # แก้ entry ในที่ → ปรับขนาดที่นับไว้ตอน set ให้ตรง
+            _options_store.adjust_size(cache_key, approx_size(selected_option) - (approx_size(previous) if previous else 0))
             logger.info(
                 f"Saved selected option for {slot_name}[{segment_index}] in session {session_id} (memory)"
             )
@@ -411,8 +441,14 @@ class OptionsCacheService:
         segment_index: int,
         raw_response: Any,
         ttl_hours: int = DEFAULT_TTL_RAW_HOURS,
+        shared_key: Optional[str] = None,
     ) -> bool:
         rk = self._raw_key(session_id, slot_name, segment_index)
+        # ผลค้นหาอยู่ใน shared search cache แล้ว → เก็บแค่ reference ไม่ต้องคัดลอก payload ต่อเซสชัน
+        # TTL ของผลค้นหา (เช่น flight 10 นาที) สั้นกว่า raw (24 ชม.) จึง pin สำเนาไว้เท่าอายุ raw ก่อน
+        # pin ไม่ได้ (entry หมดอายุ/ถูกไล่ออกแล้ว) → เก็บ payload inline แบบเดิม
+        if shared_key and await get_search_cache().pin(shared_key, int(ttl_hours * 3600)):
+            raw_response = {SHARED_REF_FIELD: shared_key}
 
         # Redis path
         if settings.enable_redis_cache and is_redis_available():
@@ -430,7 +466,7 @@ class OptionsCacheService:
 
         # In-memory fallback
         try:
-            _raw_store[rk] = raw_response
+            _raw_store.set(rk, raw_response, ttl=ttl_hours * 3600)
             logger.info(f"Saved raw Amadeus for {session_id} {slot_name}[{segment_index}] (memory)")
             return True
         except Exception as e:
@@ -451,7 +487,7 @@ class OptionsCacheService:
                     if slot_name is not None and segment_index is not None:
                         rk = self._raw_key(session_id, slot_name, segment_index)
                         raw = await redis.get(f"options:raw:{rk}")
-                        return json.loads(raw) if raw else None
+                        return await _resolve_raw(json.loads(raw)) if raw else None
                     # Return all for session
                     out: Dict[str, Any] = {}
                     pattern = f"options:raw:{session_id}:*"
@@ -462,7 +498,7 @@ class OptionsCacheService:
                             raw = await redis.get(full_key)
                             if not raw:
                                 continue
-                            payload = json.loads(raw)
+                            payload = await _resolve_raw(json.loads(raw))
                             # key format: options:raw:{session_id}:{slot_name}:{segment}
                             parts = full_key.split("options:raw:", 1)[-1].split(":")
                             if len(parts) >= 3:
@@ -479,7 +515,7 @@ class OptionsCacheService:
         try:
             if slot_name is not None and segment_index is not None:
                 rk = self._raw_key(session_id, slot_name, segment_index)
-                return _raw_store.get(rk)
+                return await _resolve_raw(_raw_store.get(rk))
             # Return all for session
             out = {}
             for k, v in _raw_store.items():
@@ -489,7 +525,7 @@ class OptionsCacheService:
                     if len(parts) == 2:
                         sname, segidx_str = parts
                         if slot_name is None or sname == slot_name:
-                            out[f"{sname}:{segidx_str}"] = v
+                            out[f"{sname}:{segidx_str}"] = await _resolve_raw(v)
             return out
         except Exception as e:
             logger.warning(f"get_raw_amadeus failed: {e}")
@@ -518,7 +554,7 @@ class OptionsCacheService:
 
         # In-memory fallback
         try:
-            keys_to_delete = [k for k in _raw_store if k.startswith(f"{session_id}:")]
+            keys_to_delete = [k for k in _raw_store.keys() if k.startswith(f"{session_id}:")]
             for k in keys_to_delete:
                 _raw_store.pop(k, None)
             logger.info(f"Cleared raw Amadeus for session {session_id} (memory)")
@@ -0,0 +1,327 @@
+"""
+แคชผลค้นหา Amadeus ระดับโปรเซส/คลัสเตอร์ (ใช้ร่วมกันทุกเซสชัน)
+
+- key มาจาก request ที่ normalize แล้วเท่านั้น (ต้นทาง ปลายทาง วันที่ ผู้โดยสาร cabin non-stop) — ไม่มี session_id
+- TTL แยกตามประเภทสินค้า (flight / hotel / transfer)
+- single-flight: request เดียวกันที่เข้ามาพร้อมกันรอ Amadeus call เดียว แทนการยิงซ้ำ
+- ใช้ Redis เมื่อพร้อม และเก็บสำเนาใน memory เสมอ (fallback เมื่อไม่มี Redis)
+- แคชของเซสชัน (OptionsCacheService) เก็บเพียง reference มาที่ tier นี้
+"""
+
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import copy
+import hashlib
+import json
+
+from app.core.bounded_cache import BoundedCache
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.redis_client import get_redis
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "search:v1"
+# ฟิลด์ใน session raw store ที่ชี้มาที่ shared tier
+SHARED_REF_FIELD = "_shared_search_ref"
+
+
+def _ttl_for(product: str) -> int:
+    if product == "flight":
+        return int(settings.search_cache_flight_ttl_seconds)
+    if product == "hotel":
+        return int(settings.search_cache_hotel_ttl_seconds)
+    return int(settings.search_cache_transfer_ttl_seconds)
+
+
+def _as_int(value: Any, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _as_date(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    return str(value).strip()[:10] or None
+
+
+def _upper(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    return str(value).strip().upper() or None
+
+
+def normalize_search_request(product: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a search request to the fields that determine the Amadeus response.
+    Server-side filters (price range, preferred time) are kept because they change the result set.
+    """
+    r = request or {}
+    if product == "flight":
+        normalized: Dict[str, Any] = {
+            "origin": _upper(r.get("origin")),
+            "destination": _upper(r.get("destination")),
+            "departure_date": _as_date(r.get("departure_date") or r.get("date")),
+            "return_date": _as_date(r.get("return_date")),
+            "adults": max(1, _as_int(r.get("adults") or r.get("guests"), 1)),
+            "children": max(0, _as_int(r.get("children"), 0)),
+            "infants": max(0, _as_int(r.get("infants"), 0)),
+            "cabin": _upper(r.get("cabin_class") or r.get("cabin")),
+            "non_stop": bool(r.get("non_stop")) or bool(r.get("direct_flight")),
+        }
+    elif product == "hotel":
+        location = r.get("location") or r.get("location_name") or r.get("city_code") or ""
+        normalized = {
+            "location": " ".join(str(location).lower().split()) or None,
+            "check_in": _as_date(r.get("check_in")),
+            "check_out": _as_date(r.get("check_out")),
+            "guests": max(1, _as_int(r.get("guests") or r.get("adults"), 1)),
+        }
+    else:
+        normalized = {
+            k: v for k, v in sorted(r.items())
+            if not k.startswith("_") and (v is None or isinstance(v, (str, int, float, bool)))
+        }
+    filters = {
+        k: r.get(k) for k in ("min_price", "max_price", "preferred_departure_time")
+        if r.get(k) not in (None, "")
+    }
+    if filters and product != "transfer":
+        normalized["filters"] = filters
+    return normalized
+
+
+class SharedSearchCache:
+    """
+    Shared search-result tier with single-flight coalescing.
+
+    Values are stored JSON-encoded (memory and Redis), so every reader gets its own copy and
+    callers may mutate results freely (normalize_mcp_results / ranking tag raw dicts in place).
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        # key -> encoded JSON (TTL ต่อ entry ตามประเภทสินค้า)
+        self._memory = BoundedCache(
+            "shared_search_cache",
+            max_entries=max_entries or int(settings.search_cache_max_entries),
+            sizeof=len,
+        )
+        # สำเนาที่ session raw store อ้างถึง (key -> encoded JSON) อายุเท่า raw store ไม่ใช่ TTL ความสดของผลค้นหา
+        # — หลายเซสชันที่อ้าง search เดียวกันใช้สำเนาเดียว; ไม่ถูกใช้ตอบ search ใหม่
+        self._pinned = BoundedCache(
+            "shared_search_pins",
+            max_entries=max_entries or int(settings.search_cache_max_entries),
+            max_bytes=settings.options_cache_max_mb * 1024 * 1024,
+            sizeof=len,
+        )
+        self._inflight: Dict[str, "asyncio.Future[Tuple[Any, Optional[str]]]"] = {}
+        self._stats = {
+            "hits": 0, "redis_hits": 0, "misses": 0, "coalesced": 0, "stored": 0, "errors": 0,
+            "pinned": 0, "pin_reads": 0, "pin_misses": 0,
+        }
+
+    @staticmethod
+    def make_key(product: str, request: Dict[str, Any], source: str = "amadeus") -> str:
+        normalized = normalize_search_request(product, request)
+        digest = hashlib.sha1(
+            json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()[:24]
+        return f"{KEY_PREFIX}:{product}:{source}:{digest}"
+
+    # ---------- storage ----------
+
+    async def _load(self, key: str, count: bool = True) -> Optional[str]:
+        """count=False: อ่านแทน reference ของเซสชัน — ไม่นับเป็น search hit"""
+        encoded = self._memory.get(key)
+        if encoded is not None:
+            if count:
+                self._stats["hits"] += 1
+            return encoded
+        try:
+            redis = await get_redis()
+            if redis is not None:
+                encoded = await redis.get(key)
+                if encoded:
+                    ttl = await redis.ttl(key)
+                    self._memory.set(key, encoded, ttl=ttl if ttl and ttl > 0 else 60)
+                    if count:
+                        self._stats["redis_hits"] += 1
+                    return encoded
+        except Exception as e:
+            logger.warning(f"SharedSearchCache Redis get failed: {e}")
+        return None
+
+    async def _store(self, key: str, encoded: str, ttl: int) -> None:
+        self._memory.set(key, encoded, ttl=ttl)
+        self._stats["stored"] += 1
+        try:
+            redis = await get_redis()
+            if redis is not None:
+                await redis.set(key, encoded, ex=ttl)
+        except Exception as e:
+            logger.warning(f"SharedSearchCache Redis set failed: {e}")
+
+    # ---------- public API ----------
+
+    async def get(self, key: str) -> Any:
+        """Cached value for a shared key (a fresh copy), or None when missing/expired."""
+        encoded = await self._load(key)
+        return json.loads(encoded) if encoded is not None else None
+
+    async def get_or_fetch(
+        self,
+        product: str,
+        request: Dict[str, Any],
+        fetch: Callable[[], Awaitable[Any]],
+        *,
+        source: str = "amadeus",
+        cacheable: Optional[Callable[[Any], bool]] = None,
+        bypass: bool = False,
+    ) -> Tuple[Any, str]:
+        """
+        Return (value, key). Concurrent calls with the same normalized request share one fetch.
+
+        - cacheable(value) decides whether the result is stored (default: truthy value);
+          empty/failed results are never cached so the next request retries Amadeus.
+        - The fetch runs in its own task: a caller that times out or is cancelled does not
+          abort the search for the other waiters.
+        """
+        key = self.make_key(product, request, source)
+        if bypass or not settings.search_cache_enabled:
+            return await fetch(), key
+
+        encoded = await self._load(key)
+        if encoded is not None:
+            logger.info(f"SharedSearchCache hit {key}")
+            return json.loads(encoded), key
+
+        future = self._inflight.get(key)
+        leader = future is None
+        if leader:
+            self._stats["misses"] += 1
+            future = asyncio.ensure_future(self._fetch_and_store(key, product, fetch, cacheable))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f, k=key: self._drop_inflight(k, f))
+        else:
+            self._stats["coalesced"] += 1
+            logger.debug(f"SharedSearchCache joined in-flight search {key}")
+
+        value, encoded = await asyncio.shield(future)
+        if leader:
+            return value, key
+        # ผู้รอร่วมได้สำเนาของตัวเอง
+        return (json.loads(encoded) if encoded is not None else copy.deepcopy(value)), key
+
+    def _drop_inflight(self, key: str, future: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is future:
+            self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is not None:
+            self._stats["errors"] += 1
+
+    async def _fetch_and_store(
+        self,
+        key: str,
+        product: str,
+        fetch: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]],
+    ) -> Tuple[Any, Optional[str]]:
+        value = await fetch()
+        encoded: Optional[str] = None
+        try:
+            encoded = json.dumps(value, ensure_ascii=False, default=str)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"SharedSearchCache: result for {key} is not JSON-serializable, not cached: {e}")
+            return value, None
+        ok = cacheable(value) if cacheable is not None else bool(value)
+        if ok:
+            await self._store(key, encoded, _ttl_for(product))
+        return value, encoded
+
+    # ---------- pins (session raw references) ----------
+
+    @staticmethod
+    def _pin_key(key: str) -> str:
+        return f"{key}:pin"
+
+    async def pin(self, key: str, ttl: int) -> bool:
+        """
+        Keep the value behind key readable for ttl seconds for session references (get_pinned),
+        independent of the search TTL. False when the entry is already gone — the caller stores inline.
+        """
+        pin_key = self._pin_key(key)
+        if key in self._pinned and self._pinned.touch(key, ttl=ttl):
+            encoded = None
+        else:
+            encoded = await self._load(key, count=False)
+            if encoded is None:
+                return False
+            self._pinned.set(key, encoded, ttl=ttl)
+            self._stats["pinned"] += 1
+        try:
+            redis = await get_redis()
+            if redis is not None:
+                if encoded is None:
+                    # มีสำเนาใน memory แล้ว: ต่ออายุ pin ใน Redis (ถ้าหายไปก็เขียนใหม่)
+                    if not await redis.expire(pin_key, ttl):
+                        await redis.set(pin_key, self._pinned.get(key), ex=ttl)
+                else:
+                    await redis.set(pin_key, encoded, ex=ttl)
+        except Exception as e:
+            logger.warning(f"SharedSearchCache Redis pin failed: {e}")
+        return True
+
+    async def get_pinned(self, key: str) -> Any:
+        """Value for a session reference: pinned copy (memory → Redis), then the live entry; None when gone."""
+        self._stats["pin_reads"] += 1
+        encoded = self._pinned.get(key)
+        if encoded is None:
+            try:
+                redis = await get_redis()
+                if redis is not None:
+                    pin_key = self._pin_key(key)
+                    encoded = await redis.get(pin_key)
+                    if encoded:
+                        ttl = await redis.ttl(pin_key)
+                        self._pinned.set(key, encoded, ttl=ttl if ttl and ttl > 0 else 60)
+            except Exception as e:
+                logger.warning(f"SharedSearchCache Redis pin get failed: {e}")
+        if encoded is None:
+            encoded = await self._load(key, count=False)
+        if encoded is None:
+            self._stats["pin_misses"] += 1
+            return None
+        return json.loads(encoded)
+
+    async def invalidate(self, key: str) -> None:
+        self._memory.pop(key, None)
+        try:
+            redis = await get_redis()
+            if redis is not None:
+                await redis.delete(key)
+        except Exception as e:
+            logger.warning(f"SharedSearchCache Redis delete failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["redis_hits"] + self._stats["misses"] + self._stats["coalesced"]
+        saved = self._stats["hits"] + self._stats["redis_hits"] + self._stats["coalesced"]
+        return {
+            **self._stats,
+            "memory_entries": len(self._memory),
+            "pinned_entries": len(self._pinned),
+            "inflight": len(self._inflight),
+            "hit_rate": round(saved / lookups, 3) if lookups else 0.0,
+        }
+
+
+_search_cache: Optional[SharedSearchCache] = None
+
+
+def get_search_cache() -> SharedSearchCache:
+    """Get or create the process-wide shared search cache."""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SharedSearchCache()
+    return _search_cache
@@ -1,23 +1,39 @@
 """
 Selection Preferences Service — เรียนรู้จากประวัติการเลือก (Choice History) + RL
 รวมกับ RL/ML เพื่อใช้ใน User Profile และ Agent Mode
+สรุปถูก materialize ไว้ใน user_preference_summaries และคำนวณใหม่เมื่อมี choice / reward ใหม่
 """
 
 from __future__ import annotations
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from collections import Counter
+import asyncio
 
+from pymongo import ReturnDocument
+
+from app.core.bounded_cache import BoundedCache
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
 COLLECTION_CHOICE_HISTORY = "user_choice_history"
+# สรุปความชอบที่ materialize ต่อ user: {_id: user_id, version, text, learn_from_choices, schema, updated_at}
+COLLECTION_PREFERENCE_SUMMARY = "user_preference_summaries"
+# เพิ่มเมื่อเปลี่ยนวิธีสร้างข้อความ → เอกสารเดิมถูกคำนวณใหม่เมื่ออ่าน
+SUMMARY_SCHEMA = 1
+# cache ใน process: worker อื่นอาจคำนวณใหม่ จึงให้อายุสั้น
+SUMMARY_CACHE_TTL_SECONDS = 60
+SUMMARY_REFRESH_DELAY_SECONDS = 1.0
 MAX_CHOICES_FOR_SUMMARY = 150
 PRICE_BUCKET_LOW = 5000
 PRICE_BUCKET_HIGH = 25000
 
 
+_summary_cache = BoundedCache("selection_preferences_summary", max_entries=5000, default_ttl=SUMMARY_CACHE_TTL_SECONDS)
+_refresh_tasks: Dict[str, "asyncio.Task[None]"] = {}
+
+
 def _get_db():
     from app.storage.connection_manager import ConnectionManager
     return ConnectionManager.get_instance().get_mongo_database()
@@ -108,6 +124,7 @@ async def record_choice(
             "created_at": datetime.utcnow(),
         }
         await col.insert_one(doc)
+        schedule_selection_summary_refresh(user_id)
         # Keep per-user history bounded
         count = await col.count_documents({"user_id": user_id})
         if count > MAX_CHOICES_FOR_SUMMARY * 2:
@@ -123,19 +140,101 @@ async def get_selection_preferences_summary(user_id: str) -> str:
     สรุปความชอบจากการเลือก (Choice History) + สถิติจาก RL
     ใช้ใน User Profile และ Agent Mode selection prompt.
     คืนค่าว่างถ้า learnFromMyChoices = False หรือไม่มีข้อมูล
+    อ่านจากสรุปที่ materialize ไว้ (cache ใน process → find_one ตาม _id) ไม่สแกนประวัติทุก turn
     """
+    _, text = await get_selection_preferences_snapshot(user_id)
+    return text
+
+
+async def get_selection_preferences_snapshot(user_id: str) -> Tuple[int, str]:
+    """(version, text) ของสรุปความชอบ — version เพิ่มทุกครั้งที่คำนวณใหม่ (ใช้เป็น key ของ prompt cache ได้)"""
     if not user_id or user_id == "anonymous":
-        return ""
+        return 0, ""
+    cached = _summary_cache.get(user_id)
+    if cached is not None:
+        return cached
     db = _get_db()
     if not db:
-        return ""
-    if not await _user_learn_from_choices(db, user_id):
-        return ""
+        return 0, ""
+    try:
+        doc = await db[COLLECTION_PREFERENCE_SUMMARY].find_one(
+            {"_id": user_id}, {"version": 1, "text": 1, "schema": 1}
+        )
+    except Exception as e:
+        logger.warning(f"SelectionPreferences summary read error: {e}")
+        doc = None
+    if not doc or doc.get("schema") != SUMMARY_SCHEMA:
+        # ยังไม่เคย materialize (หรือรูปแบบเก่า) → คำนวณครั้งเดียวแล้วเก็บ
+        return await refresh_selection_preferences_summary(user_id)
+    snapshot = (int(doc.get("version") or 0), doc.get("text") or "")
+    _summary_cache.set(user_id, snapshot)
+    return snapshot
+
+
+async def refresh_selection_preferences_summary(user_id: str) -> Tuple[int, str]:
+    """คำนวณสรุปจากประวัติใหม่แล้วเก็บลง user_preference_summaries (version + 1)."""
+    if not user_id or user_id == "anonymous":
+        return 0, ""
+    db = _get_db()
+    if not db:
+        return 0, ""
+    learn = await _user_learn_from_choices(db, user_id)
+    text = await _compute_selection_summary(db, user_id) if learn else ""
+    version = 0
+    try:
+        doc = await db[COLLECTION_PREFERENCE_SUMMARY].find_one_and_update(
+            {"_id": user_id},
+            {
+                "$set": {"text": text, "learn_from_choices": learn, "schema": SUMMARY_SCHEMA, "updated_at": datetime.utcnow()},
+                "$inc": {"version": 1},
+            },
+            projection={"version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        version = int((doc or {}).get("version") or 0)
+    except Exception as e:
+        logger.warning(f"SelectionPreferences summary write error: {e}")
+    snapshot = (version, text)
+    _summary_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def schedule_selection_summary_refresh(user_id: str, delay: float = SUMMARY_REFRESH_DELAY_SECONDS) -> None:
+    """
+    คำนวณสรุปใหม่ใน background หลัง record_choice / reward / คะแนนดาว
+    (รวมหลาย event ที่มาติดกันภายใน delay วินาทีเป็นการคำนวณครั้งเดียว)
+    """
+    if not user_id or user_id == "anonymous" or user_id in _refresh_tasks:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+
+    async def _run() -> None:
+        me = asyncio.current_task()
+        try:
+            await asyncio.sleep(delay)
+            _refresh_tasks.pop(user_id, None)  # event ที่มาระหว่างคำนวณจะตั้งรอบใหม่
+            await refresh_selection_preferences_summary(user_id)
+        except Exception as e:
+            logger.warning(f"SelectionPreferences summary refresh error: {e}")
+        finally:
+            if _refresh_tasks.get(user_id) is me:
+                _refresh_tasks.pop(user_id, None)
+
+    _refresh_tasks[user_id] = loop.create_task(_run())
+
 
+async def _compute_selection_summary(db, user_id: str) -> str:
+    """สแกน choice history + RL แล้วสร้างข้อความสรุป (เรียกตอนมีข้อมูลใหม่ ไม่ใช่ทุก turn)"""
     parts: List[str] = []
     try:
         col = db[COLLECTION_CHOICE_HISTORY]
-        cursor = col.find({"user_id": user_id}).sort("created_at", -1).limit(MAX_CHOICES_FOR_SUMMARY)
+        cursor = col.find(
+            {"user_id": user_id}, {"price": 1, "destination": 1, "origin": 1, "name": 1, "_id": 0}
+        ).sort("created_at", -1).limit(MAX_CHOICES_FOR_SUMMARY)
         choices = await cursor.to_list(length=MAX_CHOICES_FOR_SUMMARY)
         if not choices:
             # User ใหม่: ยังไม่มี choice history — ใช้ความพึงพอใจจากคะแนนดาว (trip_evaluations / RL) เพื่อให้ AI รู้จักพฤติกรรมจากแค่ 1–2 ทริป
@@ -182,7 +281,7 @@ async def get_selection_preferences_summary(user_id: str) -> str:
         if satisfaction_line:
             parts.append(satisfaction_line)
     except Exception as e:
-        logger.warning(f"SelectionPreferences get_selection_preferences_summary error: {e}")
+        logger.warning(f"SelectionPreferences summary compute error: {e}")
 
     return "\n".join(parts) if parts else ""
 
@@ -212,8 +311,10 @@ async def _rl_aggregate_summary(db, user_id: str) -> str:
     try:
         rewards_col = db["user_feedback_history"]
         qtable_col = db["user_preference_scores"]
-        recent = await rewards_col.find({"user_id": user_id}).sort("created_at", -1).limit(200).to_list(length=200)
-        q_entries = await qtable_col.find({"user_id": user_id}).to_list(length=500)
+        recent = await rewards_col.find(
+            {"user_id": user_id}, {"slot_name": 1, "action_type": 1, "_id": 0}
+        ).sort("created_at", -1).limit(200).to_list(length=200)
+        q_entries = await qtable_col.find({"user_id": user_id}, {"q_value": 1, "_id": 0}).to_list(length=500)
         selected_slots = [r["slot_name"] for r in recent if r.get("action_type") == "select_option"]
         if not selected_slots and not q_entries:
             return ""
@@ -8,6 +8,8 @@ from typing import Optional
 import re
 
 from app.services.llm import LLMService
+from app.services.llm_cache import LLMCachePolicy
+from app.services.llm_scheduler import LLMPriority
 from app.core.logging import get_logger
 from app.core.exceptions import LLMException
 
@@ -42,7 +44,14 @@ Output JUST the title, no explanation, no quotes, no markdown."""
             prompt=prompt,
             system_prompt="You are a title generator. Output only the title, nothing else.",
             temperature=0.5,
-            max_tokens=20  # Short title only
+            max_tokens=20,  # Short title only
+            context="title",
+            priority=LLMPriority.BACKGROUND,
+            # บทสนทนาเปิดที่ซ้ำกัน (ทักทาย/คำถามยอดฮิต) ได้หัวข้อเดิม — แคชเฉพาะหัวข้อที่ใช้ได้จริง
+            cache=LLMCachePolicy(
+                schema="chat_title:v1",
+                validate=lambda text: _clean_title(text) != "การสนทนาใหม่",
+            ),
         )
         
         # Clean the title
@@ -7,7 +7,7 @@
 from __future__ import annotations
 from typing import Optional, Dict, Any, List, Union
 import asyncio
-import time
+import re
 import logging
 from datetime import datetime, timedelta
 
@@ -18,6 +18,8 @@ from pydantic import BaseModel, Field
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.core.exceptions import AmadeusException, AgentException
+from app.services.airport_index import get_airport_index
+from app.services.amadeus_transport import get_amadeus_transport
 
 logger = get_logger(__name__)
 
@@ -46,6 +48,17 @@ class UnifiedTravelResponse(BaseModel):
     popular_destinations: Optional[List[Dict[str, Any]]] = None  # จุดหมายยอดนิยม
     summary: str
 
+_ISO_DURATION_RE = re.compile(r"^-?P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$")
+
+
+def _iso_duration_minutes(value: Optional[str]) -> Optional[int]:
+    """'PT1H20M' → 80 (Amadeus flight-status delay); None if not an ISO-8601 duration."""
+    match = _ISO_DURATION_RE.match((value or "").strip())
+    if not match:
+        return None
+    days, hours, minutes = (int(g or 0) for g in match.groups())
+    return days * 1440 + hours * 60 + minutes
+
 # =============================================================================
 # TravelOrchestrator Service
 # =============================================================================
@@ -74,20 +87,11 @@ class TravelOrchestrator:
         self.amadeus_client_id = self.amadeus_search_client_id
         self.amadeus_client_secret = self.amadeus_search_client_secret
         
-        # ✅ แยก Search และ Booking Environment
-        # Search: ใช้ production สำหรับข้อมูลจริง
-        search_env = settings.amadeus_search_env.lower()
-        self.amadeus_search_base_url = "https://api.amadeus.com" if search_env == "production" else "https://test.api.amadeus.com"
-        
-        # Booking: ใช้ sandbox เท่านั้น (ห้ามใช้ production)
-        booking_env = settings.amadeus_booking_env.lower()
-        if booking_env == "production":
-            logger.error("🚨 SECURITY: AMADEUS_BOOKING_ENV=production is NOT ALLOWED! Using sandbox instead.")
-            booking_env = "test"
-        self.amadeus_booking_base_url = "https://test.api.amadeus.com"  # Always sandbox for booking
-        
-        # Legacy: สำหรับ backward compatibility
-        self.amadeus_base_url = self.amadeus_search_base_url  # Default to search URL
+        # ✅ แยก Search และ Booking Environment (base URL / token / connection pool อยู่ที่ AmadeusTransport ตัวกลาง)
+        # Search: production หรือ test ตาม AMADEUS_SEARCH_ENV; Booking: sandbox เท่านั้น (ห้ามใช้ production)
+        self.transport = get_amadeus_transport()
+        search_env = self.transport.credentials["search"].env_type
+        booking_env = self.transport.credentials["booking"].env_type
         
         # Log key usage (masked for security)
         search_key_preview = f"{self.amadeus_search_client_id[:6]}...{self.amadeus_search_client_id[-4:]}" if len(self.amadeus_search_client_id) > 10 else "***"
@@ -97,54 +101,42 @@ class TravelOrchestrator:
         # Google Maps
         self.gmaps = googlemaps.Client(key=settings.google_maps_api_key) if settings.google_maps_api_key else None
         
-        # Auth & Cache (search token — production/test)
-        self._token: Optional[str] = None
-        self._token_expiry: float = 0
-        self._token_lock = asyncio.Lock()  # Prevent concurrent token refresh
-        # Booking token cache (sandbox only — แยกออกจาก search token)
-        self._booking_token: Optional[str] = None
-        self._booking_token_expiry: float = 0
-        self._booking_token_lock = asyncio.Lock()
         # LRU-style bounded caches (max 500 entries each)
         self._geocoding_cache: Dict[str, Dict[str, Any]] = {}
         self._geocoding_cache_order: list = []
         self._iata_cache: Dict[str, str] = {}
         self._iata_cache_order: list = []
         self._CACHE_MAX = 500
-        # เมื่อ Production auth ล้มเหลว (401) ใช้ Test แทนเพื่อให้ค้นหาทำงานได้
-        self._search_fallback_to_test: bool = False
-        
-        # ✅ HTTP Client with optimized timeout for 1.5-minute search completion
-        self.client = httpx.AsyncClient(timeout=12.0)  # ✅ Reduced from 15s to 12s for faster responses
+
+    # Base URL มาจาก transport — ถ้า production search auth ล้มเหลว (401) transport สลับไป test ให้ทุก instance พร้อมกัน
+    @property
+    def amadeus_search_base_url(self) -> str:
+        return self.transport.base_url("search")
+
+    @property
+    def amadeus_booking_base_url(self) -> str:
+        return self.transport.base_url("booking")  # Always sandbox for booking
+
+    @property
+    def amadeus_base_url(self) -> str:
+        """Legacy: สำหรับ backward compatibility (default to search URL)"""
+        return self.amadeus_search_base_url
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Legacy: httpx client ที่ใช้ร่วมกันทั้ง process — การเรียก Amadeus ควรผ่าน self.transport (auth + rate limit)"""
+        return self.transport.client
 
     async def _amadeus_get(
         self,
         url: str,
-        token: str,
-        params: Dict[str, Any],
+        token: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
         retries: int = 3,
         use_booking_env: Optional[bool] = None,
     ) -> httpx.Response:
-        """GET with basic retry/backoff for 429/5xx to reduce flaky empty results. use_booking_env is ignored (search always uses search base URL)."""
-        last_exc: Optional[Exception] = None
-        for attempt in range(retries):
-            try:
-                resp = await self.client.get(url, params=params, headers={"Authorization": f"Bearer {token}"})
-                # Retry on rate limit / transient errors
-                if resp.status_code in (429, 500, 502, 503, 504):
-                    wait = 0.8 * (2 ** attempt)
-                    logger.warning(f"Amadeus GET retryable status={resp.status_code} attempt={attempt+1}/{retries} wait={wait:.1f}s url={url}")
-                    await asyncio.sleep(wait)
-                    continue
-                resp.raise_for_status()
-                return resp
-            except Exception as e:
-                last_exc = e
-                wait = 0.8 * (2 ** attempt)
-                logger.warning(f"Amadeus GET failed attempt={attempt+1}/{retries} wait={wait:.1f}s url={url} err={e}")
-                await asyncio.sleep(wait)
-                continue
-        raise last_exc if last_exc else AmadeusException("Amadeus GET failed")
+        """GET through the shared transport (rate limiter, retry on 429/5xx). token/use_booking_env are ignored: the transport authenticates the search environment itself."""
+        return await self.transport.get(url, params=params, retries=retries, raise_for_status=True)
 
     # -------------------------------------------------------------------------
     # Authentication Management
@@ -152,68 +144,10 @@ class TravelOrchestrator:
     
     async def _get_amadeus_token(self) -> str:
         """
-        Get or refresh Amadeus OAuth2 token for search operations.
-        Uses search API keys; if production returns 401, falls back to test environment so search still works.
-        Protected by asyncio.Lock to prevent concurrent refresh races.
+        Get Amadeus OAuth2 token for search operations (shared by all orchestrators, refreshed ahead of expiry).
+        If production returns 401 the transport falls back to the test environment so search still works.
         """
-        # Fast path: check without lock first
-        if self._token and time.time() < self._token_expiry:
-            return self._token
-        async with self._token_lock:
-            # Re-check inside lock (another coroutine may have refreshed already)
-            if self._token and time.time() < self._token_expiry:
-                return self._token
-
-            base_url = self.amadeus_search_base_url
-            client_id = self.amadeus_search_client_id
-            client_secret = self.amadeus_search_client_secret
-            logger.info("Refreshing Amadeus OAuth2 token for search environment...")
-            try:
-                response = await self.client.post(
-                    f"{base_url}/v1/security/oauth2/token",
-                    data={
-                        "grant_type": "client_credentials",
-                        "client_id": client_id,
-                        "client_secret": client_secret
-                    },
-                    headers={"Content-Type": "application/x-www-form-urlencoded"}
-                )
-                response.raise_for_status()
-                data = response.json()
-                self._token = data["access_token"]
-                self._token_expiry = time.time() + data["expires_in"] - 10
-                env_type = "production" if "api.amadeus.com" in base_url and "test." not in base_url else "test"
-                logger.info(f"Amadeus token refreshed successfully for {env_type} environment")
-                return self._token
-            except Exception as e:
-                resp = getattr(e, "response", None)
-                is_401 = resp is not None and getattr(resp, "status_code", None) == 401
-                if not is_401:
-                    is_401 = "401" in str(e) or "Unauthorized" in str(e).lower()
-                # ถ้า Production คืน 401 และยังไม่เคย fallback ให้ลองใช้ Test
-                if is_401 and not self._search_fallback_to_test and "api.amadeus.com" in base_url and "test." not in base_url:
-                    test_url = "https://test.api.amadeus.com"
-                    test_id = settings.amadeus_booking_api_key or client_id
-                    test_secret = settings.amadeus_booking_api_secret or client_secret
-                    if test_id and test_secret:
-                        logger.warning(
-                            "Amadeus production auth failed (401). Falling back to test environment for search. "
-                            "To use production, set valid AMADEUS_SEARCH_API_KEY and AMADEUS_SEARCH_API_SECRET in .env"
-                        )
-                        self._search_fallback_to_test = True
-                        self.amadeus_search_base_url = test_url
-                        self.amadeus_search_client_id = test_id
-                        self.amadeus_search_client_secret = test_secret
-                        self._token = None
-                        self._token_expiry = 0
-                    # Recursive call must happen outside the lock to avoid deadlock
-                    return await self._get_amadeus_token()
-                env_type = "production" if "api.amadeus.com" in base_url and "test." not in base_url else "test"
-                logger.error(f"Failed to authenticate with Amadeus ({env_type}): {e}", exc_info=True)
-                raise AmadeusException(
-                    f"Authentication failed with Amadeus API ({env_type}). "
-                    "Check AMADEUS_SEARCH_API_KEY and AMADEUS_SEARCH_API_SECRET in .env (production keys from api.amadeus.com)."
-                )
+        return await self.transport.get_token("search")
 
     # -------------------------------------------------------------------------
     # Bounded LRU Cache helpers
@@ -252,6 +186,12 @@ class TravelOrchestrator:
         if cache_key in self._geocoding_cache:
             logger.debug(f"Cache hit for geocoding: {place_name}")
             return self._geocoding_cache[cache_key]
+
+        # ✅ ดัชนีสนามบิน/เมืองออฟไลน์ก่อน (ชื่อเมือง/สนามบิน/IATA ที่รู้จัก ไม่ต้องยิง Amadeus/Google)
+        offline = get_airport_index().coordinates(place_name)
+        if offline:
+            logger.debug(f"Offline airport index hit for geocoding: {place_name}")
+            return offline
         
         # ✅ Check if place_name is an IATA code (3 uppercase letters)
         # If it's an IATA code, try to find coordinates via Amadeus Airport Search first
@@ -374,6 +314,12 @@ class TravelOrchestrator:
         cache_key = f"city:{city_name.lower().strip()}"
         if cache_key in self._iata_cache:
             return self._iata_cache[cache_key]
+
+        # 0. Offline airport/city index (Thai/English names + aliases) — no network call
+        code = get_airport_index().city_code(city_name)
+        if code:
+            logger.info(f"Resolved '{city_name}' to '{code}' via offline airport index")
+            return code
             
         # 1. Try Hardcoded Major Cities Map first for speed and reliability
         from app.engine.agent import LocationIntelligence
@@ -541,6 +487,12 @@ class TravelOrchestrator:
         cache_key = f"{lat},{lng}"
         if cache_key in self._iata_cache:
             return self._iata_cache[cache_key]
+
+        # ✅ Offline grid index first (same 100 km radius as the Amadeus query below)
+        nearest = get_airport_index().nearest_airport(lat, lng)
+        if nearest:
+            logger.debug(f"Nearest airport for {lat},{lng} via offline index: {nearest['iata']} ({nearest['distance_km']} km)")
+            return nearest["iata"]
             
         token = await self._get_amadeus_token()
         try:
@@ -764,7 +716,6 @@ class TravelOrchestrator:
             return_date: Return date in YYYY-MM-DD format (round-trip if provided)
             max_price: Maximum price per traveler in THB (Amadeus maxPrice filter)
         """
-        token = await self._get_amadeus_token()
         
         # Use provided date or default to 30 days from now; normalize Buddhist year (พ.ศ.) to Christian
         if not departure_date:
@@ -800,7 +751,7 @@ class TravelOrchestrator:
                 f"   3. Amadeus API is accessible"
             )
             return []
-        
+
         # Normalize return_date (Buddhist year → Christian)
         norm_return_date = None
         if return_date:
@@ -882,10 +833,9 @@ class TravelOrchestrator:
             logger.info(f"🔍 Amadeus Flight Search ({env_label}): {self.amadeus_search_base_url} | {origin_code} → {dest_code} on {date} ({adults} adult(s))")
             
             # ✅ Search: ใช้ production environment
-            resp = await self.client.get(
+            resp = await self.transport.get(
                 f"{self.amadeus_search_base_url}/v2/shopping/flight-offers",
-                params=params,
-                headers={"Authorization": f"Bearer {token}"}
+                params=params
             )
             resp.raise_for_status()
             
@@ -935,10 +885,9 @@ class TravelOrchestrator:
                 logger.info(f"🔄 Trying alternate airport ITM (Osaka Itami) for {origin_code} → Osaka (same date)")
                 params_itm = {**params, "destinationLocationCode": "ITM"}
                 try:
-                    resp_itm = await self.client.get(
+                    resp_itm = await self.transport.get(
                         f"{self.amadeus_search_base_url}/v2/shopping/flight-offers",
-                        params=params_itm,
-                        headers={"Authorization": f"Bearer {token}"}
+                        params=params_itm
                     )
                     if resp_itm.status_code == 200:
                         data_itm = resp_itm.json().get("data", [])
@@ -956,10 +905,9 @@ class TravelOrchestrator:
                 await asyncio.sleep(1.0 * attempt)
                 logger.info(f"🔄 Retry {attempt}/2 same date {date} (ไม่เปลี่ยนวัน)")
                 try:
-                    retry_resp = await self.client.get(
+                    retry_resp = await self.transport.get(
                         f"{self.amadeus_search_base_url}/v2/shopping/flight-offers",
-                        params=params,
-                        headers={"Authorization": f"Bearer {token}"}
+                        params=params
                     )
                     retry_resp.raise_for_status()
                     retry_json = retry_resp.json()
@@ -977,10 +925,9 @@ class TravelOrchestrator:
                 logger.info(f"🔄 Same date {date}: relaxing to include connecting flights (ไม่เปลี่ยนวัน)")
                 params_relaxed = {**params, "nonStop": "false"}
                 try:
-                    relax_resp = await self.client.get(
+                    relax_resp = await self.transport.get(
                         f"{self.amadeus_search_base_url}/v2/shopping/flight-offers",
-                        params=params_relaxed,
-                        headers={"Authorization": f"Bearer {token}"}
+                        params=params_relaxed
                     )
                     relax_resp.raise_for_status()
                     data = relax_resp.json().get("data", [])
@@ -1012,10 +959,9 @@ class TravelOrchestrator:
                                 pass
                         logger.info(f"🔄 Trying adjacent day: {adj_date} (original {date})")
                         try:
-                            adj_resp = await self.client.get(
+                            adj_resp = await self.transport.get(
                                 f"{self.amadeus_search_base_url}/v2/shopping/flight-offers",
-                                params=params_adj,
-                                headers={"Authorization": f"Bearer {token}"}
+                                params=params_adj
                             )
                             adj_resp.raise_for_status()
                             adj_json = adj_resp.json()
@@ -1071,6 +1017,11 @@ class TravelOrchestrator:
     async def _city_to_iata_sync(self, city_name: str) -> Optional[str]:
         """Convert city name to IATA code synchronously (using smart resolver with fallbacks)"""
         try:
+            # ✅ Strategy 0: Offline index — metro city code (TYO, LON) or the city's airport (Pattaya -> UTP)
+            iata = get_airport_index().flight_code(city_name)
+            if iata:
+                return iata
+
             # ✅ Strategy 1: Prefer the smart 'find_city_iata' which uses Amadeus City Search first
             iata = await self.find_city_iata(city_name)
             if iata:
@@ -1162,8 +1113,6 @@ class TravelOrchestrator:
 
     async def get_hotels(self, city_code: str = None, location_name: str = None, check_in: str = None, check_out: str = None, guests: int = 1) -> List[Dict[str, Any]]:
         """Fetch Hotel Offers with flexible location input"""
-        token = await self._get_amadeus_token()
-
         # 1) Build a list of cityCode candidates.
         # In Amadeus sandbox, /reference-data/locations keyword search does NOT reliably return
         # Tokyo/Seoul/Osaka city codes. So we must also try nearest AIRPORT IATA as a candidate.
@@ -1207,6 +1156,9 @@ class TravelOrchestrator:
             logger.error(f"Could not resolve any code for hotel search: location_name={location_name} city_code={city_code}")
             return []
 
+        # resolve ด้วยดัชนีออฟไลน์ก่อน แล้วค่อยขอ token (ไม่ยิง network ถ้าหา code ไม่ได้)
+        token = await self._get_amadeus_token()
+
         try:
             # 2) Search Hotels (try candidates by-city first, then by-geocode as fallback)
             hotels = []
@@ -1460,18 +1412,62 @@ class TravelOrchestrator:
 
     async def get_activities(self, lat: float, lng: float, radius: int = 10) -> List[Dict[str, Any]]:
         """Fetch Experiences/Activities"""
-        token = await self._get_amadeus_token()
         try:
-            resp = await self.client.get(
+            resp = await self.transport.get(
                 f"{self.amadeus_search_base_url}/v1/shopping/activities",
-                params={"latitude": lat, "longitude": lng, "radius": max(1, min(radius, 100))},
-                headers={"Authorization": f"Bearer {token}"}
+                params={"latitude": lat, "longitude": lng, "radius": max(1, min(radius, 100))}
             )
             return resp.json().get("data", [])
         except Exception as e:
             logger.error(f"Activities API error: {e}")
             return []
 
+    async def get_flight_schedule(self, carrier_code: str, flight_number: str, scheduled_departure_date: str) -> Optional[Dict[str, Any]]:
+        """
+        On-Demand Flight Status (GET /v2/schedule/flights) — ใช้โดย FlightMonitor
+        Returns {"status", "delay_minutes", "departure", "arrival", "raw"} หรือ None ถ้าไม่พบเที่ยวบิน/API ใช้ไม่ได้
+        delay_minutes เป็น None เมื่อ API ไม่รายงาน delay (ให้ผู้เรียกดู status ต่อ เช่น cancelled)
+        ลำดับคิวของ rate limiter มาจาก amadeus_priority_scope ของผู้เรียก (FlightMonitor = MONITOR)
+        """
+        try:
+            resp = await self.transport.get(
+                f"{self.amadeus_search_base_url}/v2/schedule/flights",
+                params={
+                    "carrierCode": carrier_code.strip().upper(),
+                    "flightNumber": flight_number,
+                    "scheduledDepartureDate": str(scheduled_departure_date)[:10],
+                },
+                retries=2,
+                raise_for_status=True,
+            )
+            data = resp.json().get("data") or []
+        except Exception as e:
+            logger.warning(f"Flight schedule API error for {carrier_code}{flight_number} on {scheduled_departure_date}: {e}")
+            return None
+        if not data:
+            return None
+
+        flight = data[0]
+        points = flight.get("flightPoints") or []
+        delay_minutes: Optional[int] = None
+        for point in points:
+            for leg in ("departure", "arrival"):
+                for timing in (point.get(leg) or {}).get("timings") or []:
+                    for delay in timing.get("delays") or []:
+                        minutes = _iso_duration_minutes(delay.get("duration"))
+                        if minutes is not None:
+                            delay_minutes = max(delay_minutes or 0, minutes)
+        departure = (points[0].get("departure") or {}) if points else {}
+        arrival = (points[-1].get("arrival") or {}) if points else {}
+        status = (flight.get("flightStatus") or flight.get("status") or ("delayed" if delay_minutes else "scheduled"))
+        return {
+            "status": str(status).lower(),
+            "delay_minutes": delay_minutes,
+            "departure": {"iata": points[0].get("iataCode") if points else None, "timings": departure.get("timings") or []},
+            "arrival": {"iata": points[-1].get("iataCode") if points else None, "timings": arrival.get("timings") or []},
+            "raw": flight,
+        }
+
     async def get_hotels_google(self, location_name: str, limit: int = 10, radius_m: int = 8000) -> List[Dict[str, Any]]:
         """
         Fallback accommodation discovery - delegates to get_accommodations_google.
@@ -1545,11 +1541,10 @@ class TravelOrchestrator:
 
     async def get_transfers(self, airport_code: str, address: str) -> List[Dict[str, Any]]:
         """Fetch Transfer Offers (Legacy: Code to Address)"""
-        token = await self._get_amadeus_token()
         date_time = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%dT10:00:00")
         try:
             # ✅ Search: ใช้ production environment
-            resp = await self.client.get(
+            resp = await self.transport.get(
                 f"{self.amadeus_search_base_url}/v1/shopping/transfer-offers",
                 params={
                     "startLocationCode": airport_code,
@@ -1557,8 +1552,7 @@ class TravelOrchestrator:
                     "startDateTime": date_time,
                     "passengers": 1,
                     "currency": "THB"
-                },
-                headers={"Authorization": f"Bearer {token}"}
+                }
             )
             return resp.json().get("data", [])
         except Exception as e:
@@ -1567,15 +1561,13 @@ class TravelOrchestrator:
 
     async def get_transfers_by_geo(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float, start_time: str = None, passengers: int = 1) -> List[Dict[str, Any]]:
         """Fetch Transfer Offers using Geo Coordinates"""
-        token = await self._get_amadeus_token()
-        
         # Default time if not provided
         if not start_time:
             start_time = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%dT10:00:00")
         
         try:
             # ✅ Search: ใช้ production environment
-            resp = await self.client.post(
+            resp = await self.transport.post(
                 f"{self.amadeus_search_base_url}/v1/shopping/transfer-offers",
                 json={
                     "startLocation": {
@@ -1594,7 +1586,7 @@ class TravelOrchestrator:
                     "passengers": passengers,
                     "currency": "THB"
                 },
-                headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+                headers={"Content-Type": "application/json"}
             )
             resp.raise_for_status()
             return resp.json().get("data", [])
@@ -1611,41 +1603,8 @@ class TravelOrchestrator:
         Get Amadeus OAuth2 token for booking operations (sandbox only)
         ✅ SECURITY: Always uses sandbox environment and separate booking API keys
         """
-        # ✅ SECURITY: Force sandbox for booking
-        booking_env = settings.amadeus_booking_env.lower()
-        if booking_env == "production":
-            logger.error("🚨 SECURITY: AMADEUS_BOOKING_ENV=production is NOT ALLOWED! Using sandbox instead.")
-            booking_env = "test"
-        
-        base_url = self.amadeus_booking_base_url  # Always sandbox
-        
-        # ใช้ booking token cache แยกต่างหาก (ไม่ปนกับ search token)
-        if self._booking_token and time.time() < self._booking_token_expiry - 300:
-            return self._booking_token
-        
-        logger.info("Refreshing Amadeus OAuth2 token for booking (sandbox only)...")
-        try:
-            # ✅ Use separate booking API keys for security
-            response = await self.client.post(
-                f"{base_url}/v1/security/oauth2/token",
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": self.amadeus_booking_client_id,
-                    "client_secret": self.amadeus_booking_client_secret
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            self._booking_token = data["access_token"]
-            self._booking_token_expiry = time.time() + data["expires_in"] - 10
-            
-            logger.info("Amadeus booking token refreshed successfully (sandbox)")
-            return self._booking_token
-        except Exception as e:
-            logger.error(f"Failed to authenticate with Amadeus (booking/sandbox): {e}")
-            raise AmadeusException("Authentication failed with Amadeus API (booking/sandbox)")
+        # ใช้ booking token แยกต่างหาก (ไม่ปนกับ search token) — transport บังคับ sandbox เสมอ
+        return await self.transport.get_token("booking")
     
     async def create_flight_order(self, flight_offer: Dict[str, Any], travelers: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -1669,12 +1628,11 @@ class TravelOrchestrator:
             logger.error(error_msg)
             raise AmadeusException(error_msg)
         
-        token = await self._get_amadeus_booking_token()
-        
         try:
             # Use booking base URL (sandbox)
-            response = await self.client.post(
+            response = await self.transport.post(
                 f"{self.amadeus_booking_base_url}/v1/booking/flight-orders",
+                env="booking",
                 json={
                     "data": {
                         "type": "flight-order",
@@ -1682,10 +1640,7 @@ class TravelOrchestrator:
                         "travelers": travelers
                     }
                 },
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json"
-                },
+                headers={"Content-Type": "application/json"},
                 timeout=30.0
             )
             response.raise_for_status()
@@ -1716,12 +1671,11 @@ class TravelOrchestrator:
             logger.error(error_msg)
             raise AmadeusException(error_msg)
         
-        token = await self._get_amadeus_booking_token()
-        
         try:
             # Use booking base URL (sandbox)
-            response = await self.client.post(
+            response = await self.transport.post(
                 f"{self.amadeus_booking_base_url}/v3/booking/hotel-bookings",
+                env="booking",
                 json={
                     "data": {
                         "offerId": hotel_offer.get("id"),
@@ -1736,10 +1690,7 @@ class TravelOrchestrator:
                         }]
                     }
                 },
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json"
-                },
+                headers={"Content-Type": "application/json"},
                 timeout=30.0
             )
             response.raise_for_status()
@@ -1757,13 +1708,12 @@ class TravelOrchestrator:
         if booking_env == "production":
             logger.warning("Amadeus booking env is production — skip delete flight order")
             return
-        token = await self._get_amadeus_booking_token()
         from urllib.parse import quote
         safe_id = quote(flight_order_id, safe="")
         try:
-            response = await self.client.delete(
+            response = await self.transport.delete(
                 f"{self.amadeus_booking_base_url}/v1/booking/flight-orders/{safe_id}",
-                headers={"Authorization": f"Bearer {token}"},
+                env="booking",
                 timeout=30.0
             )
             response.raise_for_status()
@@ -1773,8 +1723,8 @@ class TravelOrchestrator:
             raise AmadeusException(f"Failed to cancel flight order: {str(e)}")
 
     async def close(self):
-        """Cleanup resources"""
-        await self.client.aclose()
+        """Cleanup resources (connection pool เป็นของ AmadeusTransport ตัวกลาง — ปิดตอน shutdown ใน main.py)"""
+        return None
 
 # Global instance
 orchestrator = TravelOrchestrator()
@@ -82,6 +82,10 @@ async def upsert_trip_evaluation(
                 "updated_at": now,
             })
             logger.info(f"Trip evaluation created: session_id={session_id[:20]}... accuracy={agent_accuracy_score} stars={user_stars}")
+        if user_stars is not None:
+            # บรรทัดความพึงพอใจล่าสุดอยู่ในสรุปความชอบที่ materialize ไว้
+            from app.services.selection_preferences import schedule_selection_summary_refresh
+            schedule_selection_summary_refresh(user_id)
         return True
     except Exception as e:
         logger.warning(f"Trip evaluation upsert error: {e}")
@@ -100,12 +100,16 @@ class TTSService:
             ),
         )
 
+        from app.services.llm_scheduler import LLMPriority, get_llm_scheduler
+
         client = genai.Client(api_key=self.api_key)
-        response = await client.aio.models.generate_content(
-            model=self.model_id,
-            contents=content,
-            config=config,
-        )
+        # นับรวมกับ concurrency ของ Gemini ใน LLM scheduler (ผู้ใช้รอฟังเสียงอยู่ → interactive)
+        async with get_llm_scheduler().slot(LLMPriority.INTERACTIVE, timeout=settings.gemini_timeout_seconds, label="tts"):
+            response = await client.aio.models.generate_content(
+                model=self.model_id,
+                contents=content,
+                config=config,
+            )
 
         if not response.candidates or not response.candidates[0].content.parts:
             logger.warning("TTS response had no candidates or parts")
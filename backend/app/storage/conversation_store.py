@@ -0,0 +1,357 @@
+"""
+ที่เก็บข้อความแชทแบบ bucket pattern
+
+เดิมทุกข้อความถูก $push ลง array `messages` เดียวใน conversations (ไม่มีขอบเขต) และทุกการอ่าน/เขียน
+find_one ทั้งเอกสาร → แชทยาวช้าลงทุก turn และเสี่ยงชนเพดาน 16MB ของ MongoDB
+
+โครงสร้างใหม่:
+- conversations (head ต่อแชท): session_id, user_id, layout="bucketed", message_count, bucket_size,
+  next_seq (seq ถัดไปที่จองได้), last_hash (ลายนิ้วมือข้อความล่าสุดสำหรับ idempotent append), created_at, updated_at
+  + summary / summary_upto / summary_updated_at (rolling summary ของ MemoryService — ข้อความ seq < summary_upto ถูกสรุปแล้ว)
+- conversation_buckets: {session_id, user_id, bucket, first_seq, count, messages[≤ bucket_size]}
+append = จอง seq บน head ($inc next_seq แบบ atomic + กันข้อความซ้ำในคำสั่งเดียว) → $push ลง bucket ที่ seq // bucket_size
+  → ค่อยเลื่อน message_count ($max) — message_count นับเฉพาะข้อความที่อยู่ใน bucket แล้ว (push ล้ม = seq ว่าง ไม่ใช่ข้อความผี)
+อ่าน tail = query bucket ท้ายสุดไม่กี่ก้อน (sort bucket desc + limit + $slice) → เวลาไม่ขึ้นกับความยาวแชท
+เอกสารรูปแบบเดิม (มี `messages` บน head) อ่านได้ด้วย $slice และถูกย้ายเป็น bucket อัตโนมัติเมื่อมีข้อความใหม่
+หรือย้ายทั้งหมดด้วย scripts/migrate_conversation_buckets.py
+"""
+
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import hashlib
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+BUCKETED_LAYOUT = "bucketed"
+HEADS_COLLECTION = "conversations"
+BUCKETS_COLLECTION = "conversation_buckets"
+
+
+def message_fingerprint(message: Dict[str, Any]) -> str:
+    """Dedupe key: role + first 200 chars of content (same rule as the legacy idempotent guard)."""
+    raw = f"{message.get('role') or ''}\x00{(message.get('content') or '')[:200]}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _strip_seq(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: v for k, v in m.items() if k != "seq"} for m in messages]
+
+
+class ConversationStore:
+    """Bucketed chat history on top of the `conversations` (head) and `conversation_buckets` collections."""
+
+    def __init__(self, db: Any, bucket_size: Optional[int] = None):
+        self.db = db
+        self.heads = db[HEADS_COLLECTION]
+        self.buckets = db[BUCKETS_COLLECTION]
+        self.bucket_size = bucket_size or settings.conversation_bucket_size
+
+    # ---------- write ----------
+
+    async def append(self, session_id: str, user_id: str, message: Dict[str, Any]) -> bool:
+        """
+        Append one message (idempotent against the last message).
+        Returns False only when the conversation belongs to another user.
+
+        Order: reserve seq on the head ($inc next_seq) → $push into the bucket → advance message_count.
+        message_count only ever counts messages that reached a bucket; a failed push leaves an unused seq
+        (a gap, never a phantom message) and restores last_hash so the same message can be retried.
+        """
+        fingerprint = message_fingerprint(message)
+        for _ in range(3):
+            now = datetime.utcnow()
+            head = await self.heads.find_one_and_update(
+                {
+                    "session_id": session_id,
+                    "user_id": user_id,
+                    "layout": BUCKETED_LAYOUT,
+                    "next_seq": {"$exists": True},
+                    "last_hash": {"$ne": fingerprint},
+                },
+                {"$inc": {"next_seq": 1}, "$set": {"last_hash": fingerprint, "updated_at": now}},
+                projection={"next_seq": 1, "bucket_size": 1, "last_hash": 1, "_id": 0},
+                return_document=ReturnDocument.BEFORE,
+            )
+            if head is not None:
+                seq = int(head["next_seq"])
+                try:
+                    await self._push(session_id, user_id, seq, head.get("bucket_size") or self.bucket_size, message, now)
+                except Exception:
+                    await self._release_hash(session_id, fingerprint, head.get("last_hash"))
+                    raise
+                await self.heads.update_one({"session_id": session_id}, {"$max": {"message_count": seq + 1}})
+                return True
+
+            # ไม่ match: ยังไม่มี head / เป็นข้อความซ้ำ / user ไม่ตรง / เอกสารรูปแบบเดิม / head ก่อนมี next_seq
+            existing = await self.heads.find_one(
+                {"session_id": session_id},
+                {"user_id": 1, "layout": 1, "last_hash": 1, "next_seq": 1, "message_count": 1, "_id": 0},
+            )
+            if existing is None:
+                await self._create_head(session_id, user_id, now)
+                continue
+            existing_user_id = existing.get("user_id")
+            if existing_user_id and existing_user_id != user_id:
+                logger.warning(f"Attempted to save message to conversation with mismatched user_id: session_id={session_id}")
+                return False
+            if existing.get("layout") != BUCKETED_LAYOUT or not existing_user_id:
+                await self.migrate(session_id, user_id=user_id)
+                continue
+            if "next_seq" not in existing:
+                # head แบบ bucket ที่สร้างก่อนมีตัวจอง seq: เริ่มจอง seq ต่อจาก message_count
+                await self.heads.update_one(
+                    {"session_id": session_id, "next_seq": {"$exists": False}},
+                    {"$set": {"next_seq": int(existing.get("message_count") or 0)}},
+                )
+                continue
+            if existing.get("last_hash") == fingerprint:
+                logger.debug(f"Idempotent skip: duplicate message for session_id={session_id}")
+                return True
+        logger.warning(f"Could not append message for session_id={session_id} after retries")
+        return False
+
+    async def _release_hash(self, session_id: str, fingerprint: str, previous: Optional[str]) -> None:
+        """Push failed after the seq was reserved: give the dedupe slot back (only if no later append took it)."""
+        try:
+            await self.heads.update_one(
+                {"session_id": session_id, "last_hash": fingerprint},
+                {"$set": {"last_hash": previous}},
+            )
+        except Exception as e:
+            logger.warning(f"Could not release last_hash for session_id={session_id} (run repair): {e}")
+
+    async def _create_head(self, session_id: str, user_id: str, now: datetime) -> None:
+        await self.heads.update_one(
+            {"session_id": session_id},
+            {
+                "$setOnInsert": {
+                    "session_id": session_id,
+                    "user_id": user_id,
+                    "layout": BUCKETED_LAYOUT,
+                    "message_count": 0,
+                    "next_seq": 0,
+                    "bucket_size": self.bucket_size,
+                    "last_hash": None,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            },
+            upsert=True,
+        )
+
+    async def _push(
+        self, session_id: str, user_id: str, seq: int, bucket_size: int, message: Dict[str, Any], now: datetime
+    ) -> None:
+        bucket = seq // bucket_size
+        update = {
+            # $sort ตาม seq: append พร้อมกันหลาย request ยังเรียงตามลำดับที่จองไว้บน head
+            "$push": {"messages": {"$each": [{**message, "seq": seq}], "$sort": {"seq": 1}}},
+            "$inc": {"count": 1},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"user_id": user_id, "first_seq": bucket * bucket_size, "created_at": now},
+        }
+        query = {"session_id": session_id, "bucket": bucket}
+        try:
+            await self.buckets.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # upsert ชนกับ append อื่นที่สร้าง bucket เดียวกันพร้อมกัน → bucket มีแล้ว
+            await self.buckets.update_one(query, update)
+
+    # ---------- read ----------
+
+    async def tail(
+        self, session_id: str, limit: int, user_id: Optional[str] = None, keep_seq: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Last `limit` messages (oldest → newest), reading only the trailing buckets.
+        keep_seq=True leaves each message's `seq` (position in the conversation) in place.
+        """
+        if limit <= 0:
+            return []
+        query: Dict[str, Any] = {"session_id": session_id}
+        if user_id:
+            query["user_id"] = user_id
+        batch = limit // self.bucket_size + 2
+        docs: List[Dict[str, Any]] = []
+        collected = 0
+        bucket_query = dict(query)
+        while True:
+            cursor = self.buckets.find(
+                bucket_query, {"messages": {"$slice": -limit}, "bucket": 1, "_id": 0}
+            ).sort("bucket", -1).limit(batch)
+            page = await cursor.to_list(length=batch)
+            docs.extend(page)
+            collected += sum(len(d.get("messages") or []) for d in page)
+            # bucket อาจมีข้อความน้อยกว่า bucket_size (append ที่ล้มกลางทาง / bucket_size เปลี่ยน) → อ่านต่อ
+            if collected >= limit or len(page) < batch:
+                break
+            bucket_query = {**query, "bucket": {"$lt": page[-1]["bucket"]}}
+
+        if not docs:
+            return await self._legacy_tail(query, limit)
+        messages: List[Dict[str, Any]] = []
+        for doc in reversed(docs):
+            messages.extend(doc.get("messages") or [])
+        return messages[-limit:] if keep_seq else _strip_seq(messages[-limit:])
+
+    async def range(
+        self, session_id: str, start_seq: int, end_seq: int, bucket_size: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Messages with start_seq <= seq < end_seq (bucketed conversations only), seq kept."""
+        if end_seq <= start_seq:
+            return []
+        size = bucket_size or self.bucket_size
+        cursor = self.buckets.find(
+            {"session_id": session_id, "bucket": {"$gte": start_seq // size, "$lte": (end_seq - 1) // size}},
+            {"messages": 1, "bucket": 1, "_id": 0},
+        ).sort("bucket", 1)
+        messages: List[Dict[str, Any]] = []
+        for doc in await cursor.to_list(length=None):
+            messages.extend(m for m in doc.get("messages") or [] if start_seq <= m.get("seq", -1) < end_seq)
+        return messages
+
+    # ---------- rolling summary ----------
+
+    async def summary_state(self, session_id: str) -> Dict[str, Any]:
+        """
+        Head fields for the rolling summary: message_count, bucket_size, summary and
+        summary_upto (high-water mark — messages with seq < summary_upto are folded into summary).
+        """
+        head = await self.heads.find_one(
+            {"session_id": session_id},
+            {"message_count": 1, "bucket_size": 1, "layout": 1, "summary": 1, "summary_upto": 1, "_id": 0},
+        ) or {}
+        return {
+            "bucketed": head.get("layout") == BUCKETED_LAYOUT,
+            "message_count": int(head.get("message_count") or 0),
+            "bucket_size": int(head.get("bucket_size") or self.bucket_size),
+            "summary": head.get("summary") or "",
+            "summary_upto": int(head.get("summary_upto") or 0),
+        }
+
+    async def save_summary(self, session_id: str, summary: str, upto: int, expected_upto: int) -> bool:
+        """
+        Store a new rolling summary if nobody advanced the high-water mark meanwhile
+        (optimistic concurrency across workers). Returns True when written.
+        """
+        expected = {"$in": [0, None]} if not expected_upto else expected_upto
+        result = await self.heads.update_one(
+            {"session_id": session_id, "summary_upto": expected},
+            {"$set": {"summary": summary, "summary_upto": upto, "summary_updated_at": datetime.utcnow()}},
+        )
+        return bool(result.modified_count)
+
+    async def _legacy_tail(self, query: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+        """Conversation not migrated yet: server-side $slice on the embedded array."""
+        doc = await self.heads.find_one(query, {"messages": {"$slice": -limit}, "user_id": 1, "layout": 1})
+        if not doc or doc.get("layout") == BUCKETED_LAYOUT:
+            return []
+        user_id = query.get("user_id")
+        if user_id and doc.get("user_id") and doc["user_id"] != user_id:
+            return []
+        return doc.get("messages") or []
+
+    async def count(self, session_id: str) -> int:
+        head = await self.heads.find_one({"session_id": session_id}, {"message_count": 1, "_id": 0})
+        return int((head or {}).get("message_count") or 0)
+
+    # ---------- delete / migrate ----------
+
+    async def delete(self, query: Dict[str, Any]) -> int:
+        """Delete conversations matching a head query on session_id/user_id (heads + buckets). Returns heads deleted."""
+        heads = await self.heads.delete_many(query)
+        await self.buckets.delete_many(query)
+        return heads.deleted_count
+
+    async def migrate(self, session_id: str, user_id: Optional[str] = None) -> int:
+        """
+        Move a legacy embedded `messages` array into buckets (idempotent).
+        Returns the number of messages moved (0 when already bucketed or missing).
+        """
+        doc = await self.heads.find_one({"session_id": session_id})
+        if not doc:
+            return 0
+        owner = doc.get("user_id") or user_id or (session_id.split("::")[0] if "::" in session_id else session_id)
+        if doc.get("layout") == BUCKETED_LAYOUT:
+            if not doc.get("user_id"):
+                await self.heads.update_one({"_id": doc["_id"]}, {"$set": {"user_id": owner}})
+            return 0
+        messages = doc.get("messages") or []
+        size = self.bucket_size
+        now = datetime.utcnow()
+        ops = []
+        for bucket, start in enumerate(range(0, len(messages), size)):
+            chunk = [{**m, "seq": start + i} for i, m in enumerate(messages[start:start + size])]
+            ops.append(UpdateOne(
+                {"session_id": session_id, "bucket": bucket},
+                {
+                    "$set": {
+                        "user_id": owner,
+                        "first_seq": start,
+                        "count": len(chunk),
+                        "messages": chunk,
+                        "updated_at": now,
+                    },
+                    "$setOnInsert": {"created_at": doc.get("created_at") or now},
+                },
+                upsert=True,
+            ))
+        if ops:
+            await self.buckets.bulk_write(ops, ordered=False)
+        result = await self.heads.update_one(
+            # guard: ถ้ามีการ $push แบบเดิมแทรกระหว่างย้าย จำนวนจะไม่ตรง → ไม่ปิด migration (รอบหน้าย้ายใหม่)
+            {"_id": doc["_id"], "layout": {"$ne": BUCKETED_LAYOUT}, "messages": {"$size": len(messages)}}
+            if "messages" in doc else {"_id": doc["_id"], "layout": {"$ne": BUCKETED_LAYOUT}},
+            {
+                "$set": {
+                    "user_id": owner,
+                    "layout": BUCKETED_LAYOUT,
+                    "message_count": len(messages),
+                    "next_seq": len(messages),
+                    "bucket_size": size,
+                    "last_hash": message_fingerprint(messages[-1]) if messages else None,
+                    "updated_at": doc.get("updated_at") or now,
+                },
+                "$unset": {"messages": ""},
+            },
+        )
+        if result.modified_count:
+            logger.info(f"Migrated conversation {session_id} to buckets: {len(messages)} messages, {len(ops)} buckets")
+            return len(messages)
+        return 0
+
+    async def repair(self, session_id: str) -> Dict[str, Any]:
+        """
+        Reconcile a bucketed head with its buckets after an interrupted append (process died between
+        reserving a seq and writing the bucket, or between the bucket write and the count bump):
+        message_count = last stored seq + 1, last_hash = last stored message, next_seq never moves back.
+        Returns {"before": ..., "after": ...} counters, or {} when the conversation is not bucketed.
+        """
+        head = await self.heads.find_one(
+            {"session_id": session_id},
+            {"layout": 1, "message_count": 1, "next_seq": 1, "last_hash": 1, "_id": 0},
+        )
+        if not head or head.get("layout") != BUCKETED_LAYOUT:
+            return {}
+        docs = await self.buckets.find(
+            {"session_id": session_id}, {"messages": {"$slice": -1}, "_id": 0}
+        ).sort("bucket", -1).limit(1).to_list(length=1)
+        last = (docs[0].get("messages") or [None])[-1] if docs else None
+        committed = int(last["seq"]) + 1 if last else 0
+        last_hash = message_fingerprint(last) if last else None
+        await self.heads.update_one(
+            {"session_id": session_id},
+            {"$set": {"message_count": committed, "last_hash": last_hash}, "$max": {"next_seq": committed}},
+        )
+        before = {"message_count": int(head.get("message_count") or 0), "next_seq": head.get("next_seq")}
+        after = {"message_count": committed, "next_seq": max(committed, int(head.get("next_seq") or 0))}
+        if before != after or head.get("last_hash") != last_hash:
+            logger.info(f"Repaired conversation head {session_id}: {before} -> {after}")
+        return {"before": before, "after": after}
@@ -1,8 +1,9 @@
 """เก็บเซสชัน แชท และข้อมูลอื่นใน MongoDB ตาม StorageInterface."""
 from __future__ import annotations
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
+from bson.raw_bson import RawBSONDocument
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
 from pymongo.errors import DuplicateKeyError
 
@@ -18,11 +19,25 @@ from app.models.database import (
     MEMORY_INDEXES,
     BOOKING_INDEXES,
     CONVERSATION_INDEXES,
+    CONVERSATION_BUCKET_INDEXES,
     SAVED_CARDS_INDEXES,
     WORKFLOW_HISTORY_INDEXES,
     RL_QTABLE_INDEXES,
+    CHOICE_HISTORY_INDEXES,
     RL_REWARDS_INDEXES,
     TRIP_INDEXES,
+    HOTEL_PLACE_INDEX_INDEXES,
+    OFFER_BLOB_INDEXES,
+    TRIP_EVALUATION_INDEXES,
+    LEARNING_METRICS_ROLLUP_INDEXES,
+)
+from app.storage.conversation_store import ConversationStore
+from app.storage.session_delta import (
+    SessionDelta,
+    UnsupportedDelta,
+    compute_session_delta,
+    encoded_size,
+    snapshot_session,
 )
 from app.core.config import settings
 from app.core.exceptions import StorageException
@@ -81,6 +96,18 @@ class MongoStorage(StorageInterface):
             self.saved_cards_collection = None
             self.family_collection = None
             self.trips_collection = None
+        # สถิติ save_session: จำนวน full/delta write, bytes ที่เขียนจริง, trips mirror ที่ข้ามได้
+        self._save_stats: Dict[str, int] = {
+            "saves": 0,
+            "full_writes": 0,
+            "delta_writes": 0,
+            "session_bytes": 0,
+            "trip_mirror_full": 0,
+            "trip_mirror_delta": 0,
+            "trip_mirror_skipped": 0,
+            "trip_bytes": 0,
+        }
+        self.last_save_report: Optional[Dict[str, Any]] = None
         
         logger.info(f"MongoStorage initialized with shared connection: database={self.database_name}")
     
@@ -141,6 +168,7 @@ class MongoStorage(StorageInterface):
             await create_indexes_safe(self.memories_collection, MEMORY_INDEXES, "memories")
             await create_indexes_safe(self.bookings_collection, BOOKING_INDEXES, "bookings")
             await create_indexes_safe(self.conversations_collection, CONVERSATION_INDEXES, "conversations")
+            await create_indexes_safe(self.db["conversation_buckets"], CONVERSATION_BUCKET_INDEXES, "conversation_buckets")
             if hasattr(self, "saved_cards_collection") and self.saved_cards_collection is not None:
                 await create_indexes_safe(self.saved_cards_collection, SAVED_CARDS_INDEXES, "user_saved_cards")
             workflow_history_coll = self.db["workflow_history"]
@@ -149,8 +177,16 @@ class MongoStorage(StorageInterface):
             await create_indexes_safe(pref_scores_coll, RL_QTABLE_INDEXES, "user_preference_scores")
             feedback_coll = self.db["user_feedback_history"]
             await create_indexes_safe(feedback_coll, RL_REWARDS_INDEXES, "user_feedback_history")
+            await create_indexes_safe(self.db["user_choice_history"], CHOICE_HISTORY_INDEXES, "user_choice_history")
             trips_coll = self.db["trips"]
             await create_indexes_safe(trips_coll, TRIP_INDEXES, "trips")
+            hotel_place_coll = self.db["hotel_place_index"]
+            await create_indexes_safe(hotel_place_coll, HOTEL_PLACE_INDEX_INDEXES, "hotel_place_index")
+            await create_indexes_safe(self.db["offer_blobs"], OFFER_BLOB_INDEXES, "offer_blobs")
+            await create_indexes_safe(self.db["trip_evaluations"], TRIP_EVALUATION_INDEXES, "trip_evaluations")
+            await create_indexes_safe(
+                self.db["learning_metrics_rollups"], LEARNING_METRICS_ROLLUP_INDEXES, "learning_metrics_rollups"
+            )
 
             logger.info("MongoDB indexes verified via shared connection (including user_id indexes for data isolation)")
         except Exception as e:
@@ -222,16 +258,27 @@ class MongoStorage(StorageInterface):
             session = session_doc.to_user_session()
 
             # ✅ Load trip_plan from trips collection (single source of truth)
+            trip_synced_id = None
             if session.trip_id:
                 try:
                     from app.models.trip_plan import TripPlan
                     trip_doc = await self.get_trip(session.trip_id, session.user_id)
                     if trip_doc and trip_doc.get("trip_plan"):
                         session.trip_plan = TripPlan(**trip_doc["trip_plan"])
+                        trip_synced_id = session.trip_id
+                        if trip_doc["trip_plan"] != doc.get("trip_plan"):
+                            # สำเนาใน sessions ไม่ตรงกับ trips → save ถัดไปเขียน trip_plan ลง sessions ทั้งก้อน
+                            session.mark_dirty("trip_plan")
                         logger.debug(f"Loaded trip_plan from trips collection: trip_id={session.trip_id}")
                 except Exception as trip_load_err:
                     logger.warning(f"Could not load trip_plan from trips collection, using embedded: {trip_load_err}")
 
+            # Baseline สำหรับ delta save: สิ่งที่อยู่ในเอกสารตอนนี้
+            try:
+                session._persisted_state = snapshot_session(session, trip_synced_id=trip_synced_id)
+            except Exception as snap_err:
+                logger.debug(f"Session delta baseline unavailable for {session_id}, next save is a full write: {snap_err}")
+
             logger.debug(f"Loaded session {session_id} from MongoDB")
             return session
         
@@ -244,6 +291,10 @@ class MongoStorage(StorageInterface):
         Save session to MongoDB (async, non-blocking)
         ✅ SECURITY: Ensures user_id in session matches session_id format
         
+        Sessions loaded via get_session (or saved once) carry a PersistedState baseline:
+        only modified paths are written ($set/$unset) and the trips mirror is skipped when
+        neither trip_plan nor title changed. First save / unsupported shapes write the full document.
+        
         Args:
             session: UserSession object to save
             
@@ -265,98 +316,18 @@ class MongoStorage(StorageInterface):
                 session.user_id = expected_user_id
             
             session.update_timestamp()
-            
-            # ✅ CRITICAL: Verify trip_plan exists and can be serialized before creating SessionDocument
-            trip_plan_dict = None
-            if hasattr(session, 'trip_plan') and session.trip_plan:
-                try:
-                    trip_plan_dict = session.trip_plan.model_dump()
-                    
-                    # Count confirmed segments with selected_option for logging
-                    confirmed_count = 0
-                    options_pool_count = 0
-                    all_segments = (
-                        trip_plan_dict.get("travel", {}).get("flights", {}).get("outbound", []) +
-                        trip_plan_dict.get("travel", {}).get("flights", {}).get("inbound", []) +
-                        trip_plan_dict.get("accommodation", {}).get("segments", []) +
-                        trip_plan_dict.get("travel", {}).get("ground_transport", [])
-                    )
-                    for seg in all_segments:
-                        if seg.get("status") == "confirmed" and seg.get("selected_option"):
-                            confirmed_count += 1
-                        if seg.get("options_pool") and len(seg.get("options_pool", [])) > 0:
-                            options_pool_count += len(seg.get("options_pool", []))
-                    
-                    if confirmed_count > 0 or options_pool_count > 0:
-                        logger.info(f"Session trip_plan data: {confirmed_count} confirmed segments with selected_option, {options_pool_count} options in pools: session_id={session.session_id}")
-                except Exception as e:
-                    logger.error(f"Error serializing trip_plan for session {session.session_id}: {e}", exc_info=True)
-                    # Continue anyway - SessionDocument.from_user_session will handle it
-            
-            session_doc = SessionDocument.from_user_session(session)
-            
-            # Convert to dict for MongoDB
-            doc_dict = session_doc.model_dump(by_alias=True, exclude={"id"})
-            
-            # ✅ SECURITY: Ensure user_id is set correctly in document
-            doc_dict["user_id"] = expected_user_id
-            
-            # ✅ CRITICAL: Double-check trip_plan is in dict and contains all raw data
-            # Verify that trip_plan includes options_pool and selected_option
-            if "trip_plan" in doc_dict and doc_dict["trip_plan"]:
-                # Verify that raw data (options_pool, selected_option) is present
-                trip_plan_in_dict = doc_dict["trip_plan"]
-                segments_to_check = (
-                    trip_plan_in_dict.get("travel", {}).get("flights", {}).get("outbound", []) +
-                    trip_plan_in_dict.get("travel", {}).get("flights", {}).get("inbound", []) +
-                    trip_plan_in_dict.get("accommodation", {}).get("segments", []) +
-                    trip_plan_in_dict.get("travel", {}).get("ground_transport", [])
-                )
-                
-                has_raw_data = False
-                for seg in segments_to_check:
-                    if seg.get("options_pool") or seg.get("selected_option"):
-                        has_raw_data = True
-                        break
-                
-                if has_raw_data:
-                    logger.debug(f"trip_plan contains raw data (options_pool/selected_option): session_id={session.session_id}")
-            else:
-                logger.warning(f"trip_plan missing in doc_dict for session {session.session_id}, attempting to add from session")
-                if trip_plan_dict:
-                    doc_dict["trip_plan"] = trip_plan_dict
-                elif hasattr(session, 'trip_plan') and session.trip_plan:
-                    try:
-                        doc_dict["trip_plan"] = session.trip_plan.model_dump()
-                        logger.info(f"Added trip_plan to doc_dict from session object: session_id={session.session_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to add trip_plan to doc_dict: {e}", exc_info=True)
-            
-            # Upsert session
-            result = await self.sessions_collection.update_one(
-                {"session_id": session.session_id},
-                {"$set": doc_dict},
-                upsert=True
-            )
 
-            # ✅ Sync trip_plan to trips collection (source of truth for shared trips)
-            if session.trip_id and trip_plan_dict:
+            state = getattr(session, "_persisted_state", None)
+            if settings.session_delta_save_enabled and state is not None:
                 try:
-                    await self.save_trip(
-                        trip_id=session.trip_id,
-                        user_id=expected_user_id,
-                        trip_plan=trip_plan_dict,
-                        title=session.title,
-                    )
-                except Exception as trip_sync_err:
-                    logger.warning(f"Could not sync trip_plan to trips collection: {trip_sync_err}")
-
-            if result.upserted_id or result.modified_count > 0:
-                logger.debug(f"Saved session {session.session_id} to MongoDB with user_id={expected_user_id}, trip_plan included")
-            else:
-                logger.warning(f"Session save may have failed: session_id={session.session_id}, matched={result.matched_count}, modified={result.modified_count}")
-            
-            return True
+                    delta = compute_session_delta(session, state)
+                except UnsupportedDelta as e:
+                    logger.debug(f"Delta save not possible for {session.session_id}, writing full document: {e}")
+                    delta = None
+                if delta is not None and await self._save_session_delta(session, delta, expected_user_id):
+                    return True
+
+            return await self._save_session_full(session, expected_user_id)
         
         except DuplicateKeyError as e:
             logger.error(f"Duplicate key error saving session {session.session_id}: {e}")
@@ -364,6 +335,184 @@ class MongoStorage(StorageInterface):
         except Exception as e:
             logger.error(f"Error saving session {session.session_id}: {e}", exc_info=True)
             raise StorageException(f"Failed to save session {session.session_id}: {e}") from e
+
+    async def _save_session_delta(self, session: UserSession, delta: SessionDelta, expected_user_id: str) -> bool:
+        """
+        Write only the dirty paths of a session. Returns False when the sessions document
+        no longer exists (caller falls back to a full upsert).
+        """
+        set_fields = dict(delta.set_fields)
+        set_fields["last_updated"] = datetime.fromisoformat(session.last_updated.replace('Z', '+00:00'))
+        update: Dict[str, Any] = {"$set": set_fields}
+        if delta.unset_fields:
+            update["$unset"] = {path: "" for path in delta.unset_fields}
+        raw, session_bytes = encoded_size(update, self.sessions_collection.codec_options)
+        result = await self.sessions_collection.update_one(
+            {"session_id": session.session_id},
+            RawBSONDocument(raw),
+        )
+        if result.matched_count == 0:
+            logger.info(f"Session {session.session_id} missing for delta save, re-creating with a full write")
+            return False
+
+        state = delta.state
+        trip_mode, trip_bytes = await self._mirror_trip(session, expected_user_id, delta)
+        if trip_mode in ("full", "delta"):
+            state.trip_synced_id = session.trip_id
+        elif trip_mode == "failed":
+            state.trip_synced_id = None
+        session._persisted_state = state
+        session._dirty_paths.clear()
+        self._record_save(
+            session.session_id, "delta", session_bytes, trip_mode, trip_bytes,
+            set_paths=len(delta.set_fields), unset_paths=len(delta.unset_fields),
+        )
+        return True
+
+    async def _save_session_full(self, session: UserSession, expected_user_id: str) -> bool:
+        """Upsert the whole session document (first save, or when a delta cannot be used)."""
+        session_doc = SessionDocument.from_user_session(session)
+        
+        # Convert to dict for MongoDB
+        doc_dict = session_doc.model_dump(by_alias=True, exclude={"id"})
+        
+        # ✅ SECURITY: Ensure user_id is set correctly in document
+        doc_dict["user_id"] = expected_user_id
+        
+        # ✅ CRITICAL: Double-check trip_plan is in dict and contains all raw data (options_pool, selected_option)
+        trip_plan_in_dict = doc_dict.get("trip_plan")
+        if trip_plan_in_dict:
+            segments_to_check = (
+                trip_plan_in_dict.get("travel", {}).get("flights", {}).get("outbound", []) +
+                trip_plan_in_dict.get("travel", {}).get("flights", {}).get("inbound", []) +
+                trip_plan_in_dict.get("accommodation", {}).get("segments", []) +
+                trip_plan_in_dict.get("travel", {}).get("ground_transport", [])
+            )
+            confirmed_count = 0
+            options_pool_count = 0
+            for seg in segments_to_check:
+                if seg.get("status") == "confirmed" and seg.get("selected_option"):
+                    confirmed_count += 1
+                options_pool_count += len(seg.get("options_pool") or [])
+            if confirmed_count > 0 or options_pool_count > 0:
+                logger.info(f"Session trip_plan data: {confirmed_count} confirmed segments with selected_option, {options_pool_count} options in pools: session_id={session.session_id}")
+        elif hasattr(session, 'trip_plan') and session.trip_plan:
+            logger.warning(f"trip_plan missing in doc_dict for session {session.session_id}, attempting to add from session")
+            try:
+                doc_dict["trip_plan"] = session.trip_plan.model_dump()
+                logger.info(f"Added trip_plan to doc_dict from session object: session_id={session.session_id}")
+            except Exception as e:
+                logger.error(f"Failed to add trip_plan to doc_dict: {e}", exc_info=True)
+        
+        # Upsert session
+        raw, session_bytes = encoded_size({"$set": doc_dict}, self.sessions_collection.codec_options)
+        result = await self.sessions_collection.update_one(
+            {"session_id": session.session_id},
+            RawBSONDocument(raw),
+            upsert=True
+        )
+
+        # ✅ Sync trip_plan to trips collection (source of truth for shared trips)
+        trip_mode, trip_bytes = await self._mirror_trip(
+            session, expected_user_id, None, trip_plan=doc_dict.get("trip_plan")
+        )
+
+        if result.upserted_id or result.modified_count > 0:
+            logger.debug(f"Saved session {session.session_id} to MongoDB with user_id={expected_user_id}, trip_plan included")
+        else:
+            logger.warning(f"Session save may have failed: session_id={session.session_id}, matched={result.matched_count}, modified={result.modified_count}")
+
+        try:
+            session._persisted_state = snapshot_session(
+                session, trip_synced_id=session.trip_id if trip_mode == "full" else None
+            )
+            session._dirty_paths.clear()
+        except Exception as snap_err:
+            session._persisted_state = None
+            logger.debug(f"Session delta baseline unavailable for {session.session_id}: {snap_err}")
+        self._record_save(session.session_id, "full", session_bytes, trip_mode, trip_bytes)
+        return True
+
+    async def _mirror_trip(
+        self,
+        session: UserSession,
+        user_id: str,
+        delta: Optional[SessionDelta],
+        trip_plan: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, int]:
+        """
+        Mirror trip_plan/title to the trips collection.
+        Returns (mode, bytes): mode = none | skipped | delta | full | failed
+        """
+        trip_id = session.trip_id
+        if not trip_id:
+            return "none", 0
+        try:
+            if delta is not None and delta.state.trip_synced_id == trip_id:
+                if not delta.trip_changed:
+                    return "skipped", 0
+                await self._ensure_trips_collection()
+                set_fields = delta.trip_set_fields
+                set_fields["last_updated"] = datetime.utcnow()
+                if "title" in delta.set_fields and session.title is not None:
+                    set_fields["title"] = session.title
+                update: Dict[str, Any] = {"$set": set_fields}
+                unset_fields = delta.trip_unset_fields
+                if unset_fields:
+                    update["$unset"] = {path: "" for path in unset_fields}
+                raw, trip_bytes = encoded_size(update, self.trips_collection.codec_options)
+                result = await self.trips_collection.update_one(
+                    {"trip_id": trip_id, "user_id": user_id},
+                    RawBSONDocument(raw),
+                )
+                if result.matched_count:
+                    return "delta", trip_bytes
+                # trip document หายไป → upsert ทั้งก้อนด้านล่าง
+            if trip_plan is None:
+                trip_plan = session.trip_plan.model_dump() if session.trip_plan else {}
+            if not trip_plan:
+                return "none", 0
+            trip_bytes = await self._write_trip(trip_id, user_id, trip_plan, title=session.title)
+            return "full", trip_bytes
+        except Exception as trip_sync_err:
+            logger.warning(f"Could not sync trip_plan to trips collection: {trip_sync_err}")
+            return "failed", 0
+
+    def _record_save(
+        self,
+        session_id: str,
+        mode: str,
+        session_bytes: int,
+        trip_mode: str,
+        trip_bytes: int,
+        set_paths: Optional[int] = None,
+        unset_paths: Optional[int] = None,
+    ) -> None:
+        stats = self._save_stats
+        stats["saves"] += 1
+        stats["full_writes" if mode == "full" else "delta_writes"] += 1
+        stats["session_bytes"] += session_bytes
+        stats["trip_bytes"] += trip_bytes
+        if trip_mode in ("full", "delta", "skipped"):
+            stats[f"trip_mirror_{trip_mode}"] += 1
+        self.last_save_report = {
+            "session_id": session_id,
+            "mode": mode,
+            "session_bytes": session_bytes,
+            "trip_mode": trip_mode,
+            "trip_bytes": trip_bytes,
+            "set_paths": set_paths,
+            "unset_paths": unset_paths,
+        }
+        logger.debug(
+            f"save_session {session_id}: {mode} write {session_bytes} bytes"
+            + (f" ({set_paths} $set, {unset_paths} $unset)" if set_paths is not None else "")
+            + f", trips mirror {trip_mode} {trip_bytes} bytes"
+        )
+
+    def get_save_stats(self) -> Dict[str, Any]:
+        """Cumulative save_session statistics (bytes written, delta vs full, trips mirror skips)."""
+        return {**self._save_stats, "last": self.last_save_report}
     
     async def update_title(self, session_id: str, title: str) -> bool:
         """
@@ -411,6 +560,7 @@ class MongoStorage(StorageInterface):
         Save a chat message to conversation history (idempotent).
         Uses content+role fingerprint to prevent duplicate messages from
         being pushed when the same request is retried or SSE reconnects.
+        Messages go to fixed-size buckets (ConversationStore) — append cost does not grow with chat length.
         """
         if self.sessions_collection is None:
             await self.connect()
@@ -419,48 +569,11 @@ class MongoStorage(StorageInterface):
             if "timestamp" not in message:
                 message["timestamp"] = datetime.utcnow()
                 
-            conversations = self.db["conversations"]
             user_id = session_id.split("::")[0] if "::" in session_id else session_id
-            
-            existing_conv = await conversations.find_one({"session_id": session_id})
-            if existing_conv:
-                existing_user_id = existing_conv.get("user_id")
-                if existing_user_id and existing_user_id != user_id:
-                    logger.warning(f"Attempted to save message to conversation with mismatched user_id: session_id={session_id}")
-                    return False
-
-                # Idempotent guard: skip if an identical message was pushed recently
-                existing_msgs = existing_conv.get("messages") or []
-                if existing_msgs:
-                    last = existing_msgs[-1]
-                    same_role = last.get("role") == message.get("role")
-                    same_text = (last.get("content") or "")[:200] == (message.get("content") or "")[:200]
-                    if same_role and same_text:
-                        logger.debug(f"Idempotent skip: duplicate message for session_id={session_id}")
-                        return True
-            
-            update_op = {
-                "$push": {"messages": message},
-                "$setOnInsert": {
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "created_at": datetime.utcnow()
-                },
-                "$set": {
-                    "updated_at": datetime.utcnow()
-                }
-            }
-            
-            result = await conversations.update_one(
-                {"session_id": session_id},
-                update_op,
-                upsert=True
-            )
-            
-            if result.upserted_id or result.modified_count > 0:
+            saved = await ConversationStore(self.db).append(session_id, user_id, message)
+            if saved:
                 logger.debug(f"Message saved to MongoDB: session_id={session_id}, user_id={user_id}")
-            
-            return True
+            return saved
         except Exception as e:
             logger.error(f"Error saving message for {session_id}: {e}", exc_info=True)
             return False
@@ -474,30 +587,12 @@ class MongoStorage(StorageInterface):
             await self.connect()
             
         try:
-            conversations = self.db["conversations"]
-            
             # ✅ SECURITY: Extract user_id from session_id (format: user_id::chat_id)
             user_id_from_session = session_id.split("::")[0] if "::" in session_id else None
             
             # ✅ SECURITY: Query by BOTH session_id AND user_id to prevent data leakage
-            query_filter = {"session_id": session_id}
-            if user_id_from_session:
-                query_filter["user_id"] = user_id_from_session
-            
-            doc = await conversations.find_one(query_filter)
-            
-            if not doc or "messages" not in doc:
-                return []
-            
-            # ✅ SECURITY: Double-check user_id matches (additional safety check)
-            doc_user_id = doc.get("user_id")
-            if user_id_from_session and doc_user_id and user_id_from_session != doc_user_id:
-                logger.error(f"🚨 SECURITY ALERT: Session {session_id} user_id mismatch! session has {user_id_from_session}, doc has {doc_user_id}")
-                return []  # Return empty to prevent data leakage
-            
-            messages = doc["messages"]
-            # Return last N messages
-            return messages[-limit:]
+            # Only the trailing buckets are read (last N messages)
+            return await ConversationStore(self.db).tail(session_id, limit, user_id=user_id_from_session)
         except Exception as e:
             logger.error(f"Error getting history for {session_id}: {e}", exc_info=True)
             return []
@@ -510,19 +605,20 @@ class MongoStorage(StorageInterface):
         if self.sessions_collection is None:
             await self.connect()
         try:
-            conversations = self.db["conversations"]
+            store = ConversationStore(self.db)
             # รูปแบบเก่า: session_id = chat_id อย่างเดียว และ user_id ตรง
-            doc = await conversations.find_one({"session_id": chat_id, "user_id": user_id})
-            if doc and doc.get("messages"):
-                return doc["messages"][-limit:]
+            messages = await store.tail(chat_id, limit, user_id=user_id)
+            if messages:
+                return messages
             # หรือ session_id จบด้วย ::chat_id (กรณีมี prefix อื่น)
             import re
             safe_chat_id = re.escape(chat_id)
-            doc = await conversations.find_one(
-                {"session_id": {"$regex": f"::{safe_chat_id}$"}, "user_id": user_id}
+            head = await store.heads.find_one(
+                {"session_id": {"$regex": f"::{safe_chat_id}$"}, "user_id": user_id},
+                {"session_id": 1, "_id": 0},
             )
-            if doc and doc.get("messages"):
-                return doc["messages"][-limit:]
+            if head and head.get("session_id"):
+                return await store.tail(head["session_id"], limit, user_id=user_id)
             return []
         except Exception as e:
             logger.error(f"Error get_chat_history_by_chat_id chat_id={chat_id}: {e}", exc_info=True)
@@ -628,32 +724,48 @@ class MongoStorage(StorageInterface):
         booking_ids: Optional[list] = None,
     ) -> bool:
         """Upsert a trip document.  Creates if not present."""
-        await self._ensure_trips_collection()
         try:
-            now = datetime.utcnow()
-            update: Dict[str, Any] = {
-                "trip_id": trip_id,
-                "user_id": user_id,
-                "trip_plan": trip_plan,
-                "last_updated": now,
-            }
-            if title is not None:
-                update["title"] = title
-            if status is not None:
-                update["status"] = status
-            if booking_ids is not None:
-                update["booking_ids"] = booking_ids
-
-            await self.trips_collection.update_one(
-                {"trip_id": trip_id, "user_id": user_id},
-                {"$set": update, "$setOnInsert": {"created_at": now}},
-                upsert=True,
-            )
+            await self._write_trip(trip_id, user_id, trip_plan, title=title, status=status, booking_ids=booking_ids)
             return True
         except Exception as e:
             logger.error(f"save_trip error trip_id={trip_id}: {e}", exc_info=True)
             return False
 
+    async def _write_trip(
+        self,
+        trip_id: str,
+        user_id: str,
+        trip_plan: Dict[str, Any],
+        title: Optional[str] = None,
+        status: Optional[str] = None,
+        booking_ids: Optional[list] = None,
+    ) -> int:
+        """Upsert a full trip document; returns the BSON size of the update (raises on error)."""
+        await self._ensure_trips_collection()
+        now = datetime.utcnow()
+        update: Dict[str, Any] = {
+            "trip_id": trip_id,
+            "user_id": user_id,
+            "trip_plan": trip_plan,
+            "last_updated": now,
+        }
+        if title is not None:
+            update["title"] = title
+        if status is not None:
+            update["status"] = status
+        if booking_ids is not None:
+            update["booking_ids"] = booking_ids
+
+        raw, size = encoded_size(
+            {"$set": update, "$setOnInsert": {"created_at": now}}, self.trips_collection.codec_options
+        )
+        await self.trips_collection.update_one(
+            {"trip_id": trip_id, "user_id": user_id},
+            RawBSONDocument(raw),
+            upsert=True,
+        )
+        return size
+
     async def create_trip(self, user_id: str, title: str = "ทริปใหม่") -> str:
         """Create a brand-new trip entity.  Returns the new trip_id."""
         import uuid
@@ -0,0 +1,258 @@
+"""
+Delta persistence ของ UserSession สำหรับ MongoStorage.save_session
+
+เดิม save_session ทำ trip_plan.model_dump() สองรอบแล้ว $set ทั้งเอกสาร (รวม options_pool ของทุก segment)
+ทุกครั้ง และ mirror trip_plan ทั้งก้อนไป trips collection — ขณะที่ TravelAgent.run_turn save หลายครั้งต่อ turn
+
+โมดูลนี้เก็บ "สถานะที่เขียนลง MongoDB แล้ว" (PersistedState) ไว้บน UserSession แล้วหา dirty path:
+- ระดับ session: user_id, trip_id, chat_id, title, popular_destinations, travel_preferences, booking_funnel_state
+- ระดับ trip plan: plan_context, travel.mode / trip_type และ extra fields ของแต่ละ container
+- ระดับ segment (ราย index): status / requirements / options_pool / selected_option / extra fields
+  จำนวน segment ใน list เปลี่ยน → เขียนทั้ง list นั้น
+ค่าที่เล็กเทียบด้วย == กับสำเนาล่าสุด (จับการแก้ requirements แบบ in-place ได้)
+options_pool ใหญ่ที่สุดและถูกแทนทั้ง list เมื่อค้นหาใหม่ จึงเทียบ identity ก่อน แล้วค่อยเทียบ digest ของ BSON
+เมื่อ identity เปลี่ยน (เช่น trip_plan ถูก copy มา) — แก้ dict ภายใน pool แบบ in-place ให้เรียก session.mark_dirty()
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+import copy
+import hashlib
+from enum import Enum
+
+import bson
+from pydantic import BaseModel
+
+SESSION_FIELDS = (
+    "user_id",
+    "trip_id",
+    "chat_id",
+    "title",
+    "popular_destinations",
+    "travel_preferences",
+    "booking_funnel_state",
+)
+# path ระดับ session ที่ต้อง mirror ไป trips collection ด้วย (นอกเหนือจาก trip_plan.*)
+TRIP_MIRROR_FIELDS = frozenset({"title"})
+
+_MISSING = object()
+
+
+class UnsupportedDelta(Exception):
+    """Session shape that cannot be expressed as dotted paths (caller falls back to a full write)."""
+
+
+@dataclass
+class PoolFingerprint:
+    """Identity (+ BSON digest when known) of an options_pool list as last persisted."""
+    obj: List[Any]
+    length: int
+    first: Any
+    last: Any
+    digest: Optional[bytes] = None
+
+    def same_object(self, pool: List[Any]) -> bool:
+        n = len(pool)
+        return (
+            self.obj is pool
+            and self.length == n
+            and (not n or (self.first is pool[0] and self.last is pool[-1]))
+        )
+
+
+@dataclass
+class PersistedState:
+    """
+    What the sessions document holds for a UserSession.
+    values: dotted path -> snapshot (deep copy) or PoolFingerprint
+    lengths: segment list path -> number of segments
+    trip_synced_id: trip_id whose trips.trip_plan matches `values` (delta mirror allowed)
+    """
+    values: Dict[str, Any] = field(default_factory=dict)
+    lengths: Dict[str, int] = field(default_factory=dict)
+    trip_synced_id: Optional[str] = None
+
+
+@dataclass
+class SessionDelta:
+    """Targeted update for one save; `state` becomes the session's PersistedState once written."""
+    set_fields: Dict[str, Any]
+    unset_fields: List[str]
+    state: PersistedState
+
+    @property
+    def trip_set_fields(self) -> Dict[str, Any]:
+        return {k: v for k, v in self.set_fields.items() if k.startswith("trip_plan.")}
+
+    @property
+    def trip_unset_fields(self) -> List[str]:
+        return [k for k in self.unset_fields if k.startswith("trip_plan.")]
+
+    @property
+    def trip_changed(self) -> bool:
+        """True when the trips mirror needs an update (trip_plan paths or title)."""
+        if any(k.startswith("trip_plan.") or k in TRIP_MIRROR_FIELDS for k in self.set_fields):
+            return True
+        return any(k.startswith("trip_plan.") for k in self.unset_fields)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.set_fields and not self.unset_fields
+
+
+def _enum_value(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def to_plain(value: Any) -> Any:
+    """Nested BaseModel → dict (like model_dump), leaving other values untouched."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, dict):
+        if any(isinstance(v, (BaseModel, dict, list, tuple)) for v in value.values()):
+            return {k: to_plain(v) for k, v in value.items()}
+        return value
+    if isinstance(value, (list, tuple)):
+        return [to_plain(v) for v in value]
+    return value
+
+
+def bson_digest(value: Any) -> Optional[bytes]:
+    try:
+        return hashlib.blake2b(bson.encode({"v": value}), digest_size=16).digest()
+    except Exception:
+        return None
+
+
+def _check_key(key: Any) -> str:
+    if not isinstance(key, str) or not key or "." in key or key.startswith("$"):
+        raise UnsupportedDelta(f"field name {key!r} cannot be addressed with a dotted path")
+    return key
+
+
+class _DeltaBuilder:
+    def __init__(self, prev: Optional[PersistedState], forced: Set[str], emit: bool):
+        self.prev_values = prev.values if prev else {}
+        self.prev_lengths = prev.lengths if prev else {}
+        self.forced = forced
+        self.emit = emit
+        self.values: Dict[str, Any] = {}
+        self.lengths: Dict[str, int] = {}
+        self.set_fields: Dict[str, Any] = {}
+
+    def _is_forced(self, path: str, descendants: bool = True) -> bool:
+        if not self.forced:
+            return False
+        return any(
+            f == path or path.startswith(f + ".") or (descendants and f.startswith(path + "."))
+            for f in self.forced
+        )
+
+    def value(self, path: str, current: Any, emit: bool) -> None:
+        prev = self.prev_values.get(path, _MISSING)
+        if emit and (prev is _MISSING or self._is_forced(path) or prev != current):
+            plain = to_plain(current)
+            self.set_fields[path] = plain
+            self.values[path] = copy.deepcopy(plain)
+        elif prev is not _MISSING and prev == current:
+            self.values[path] = prev
+        else:
+            self.values[path] = copy.deepcopy(to_plain(current))
+
+    def pool(self, path: str, pool: List[Any], emit: bool) -> None:
+        prev = self.prev_values.get(path)
+        forced = emit and self._is_forced(path)
+        if isinstance(prev, PoolFingerprint) and prev.same_object(pool) and not forced:
+            self.values[path] = prev
+            return
+        n = len(pool)
+        fp = PoolFingerprint(pool, n, pool[0] if n else None, pool[-1] if n else None)
+        if emit:
+            plain = to_plain(pool)
+            fp.digest = bson_digest(plain)
+            prev_digest = prev.digest if isinstance(prev, PoolFingerprint) else None
+            if forced or fp.digest is None or fp.digest != prev_digest:
+                self.set_fields[path] = plain
+        self.values[path] = fp
+
+    def extras(self, prefix: str, model: BaseModel, emit: bool) -> None:
+        for key, val in (model.__pydantic_extra__ or {}).items():
+            self.value(f"{prefix}.{_check_key(key)}", val, emit)
+
+    def segments(self, path: str, segments: List[Any], emit: bool) -> None:
+        n = len(segments)
+        self.lengths[path] = n
+        if emit and (self.prev_lengths.get(path) != n or self._is_forced(path, descendants=False)):
+            # โครงสร้าง list เปลี่ยน → เขียนทั้ง list แล้วจำ snapshot ของลูกโดยไม่ emit ซ้ำ
+            self.set_fields[path] = [seg.model_dump() for seg in segments]
+            emit = False
+        for i, seg in enumerate(segments):
+            base = f"{path}.{i}"
+            self.value(f"{base}.status", _enum_value(seg.status), emit)
+            self.value(f"{base}.requirements", seg.requirements, emit)
+            self.pool(f"{base}.options_pool", seg.options_pool, emit)
+            self.value(f"{base}.selected_option", seg.selected_option, emit)
+            self.extras(base, seg, emit)
+
+    def covered(self, path: str) -> bool:
+        """True when an ancestor of `path` is being replaced by this update."""
+        idx = path.rfind(".")
+        while idx > 0:
+            if path[:idx] in self.set_fields:
+                return True
+            idx = path.rfind(".", 0, idx)
+        return False
+
+
+def _walk(builder: _DeltaBuilder, session: Any) -> None:
+    emit = builder.emit
+    for name in SESSION_FIELDS:
+        builder.value(name, getattr(session, name, None), emit)
+    plan = getattr(session, "trip_plan", None)
+    if plan is None:
+        builder.value("trip_plan", {}, emit)
+        return
+    travel = plan.travel
+    builder.value("trip_plan.plan_context", plan.plan_context, emit)
+    builder.value("trip_plan.travel.mode", _enum_value(travel.mode), emit)
+    builder.value("trip_plan.travel.trip_type", travel.trip_type, emit)
+    builder.extras("trip_plan", plan, emit)
+    builder.extras("trip_plan.travel", travel, emit)
+    builder.extras("trip_plan.travel.flights", travel.flights, emit)
+    builder.extras("trip_plan.accommodation", plan.accommodation, emit)
+    for path, segments in plan.segment_lists():
+        builder.segments(f"trip_plan.{path}", segments, emit)
+
+
+def snapshot_session(session: Any, trip_synced_id: Optional[str] = None) -> PersistedState:
+    """PersistedState for a session exactly as stored (after a load or a full write)."""
+    builder = _DeltaBuilder(None, set(), emit=False)
+    _walk(builder, session)
+    return PersistedState(values=builder.values, lengths=builder.lengths, trip_synced_id=trip_synced_id)
+
+
+def compute_session_delta(session: Any, state: PersistedState) -> SessionDelta:
+    """
+    Dirty paths of `session` relative to `state` as $set / $unset maps (dotted, sessions document layout).
+    Raises UnsupportedDelta when a path cannot be addressed (caller writes the full document).
+    """
+    forced = set(getattr(session, "_dirty_paths", None) or ())
+    builder = _DeltaBuilder(state, forced, emit=True)
+    _walk(builder, session)
+    unset_fields = [
+        p for p in state.values
+        if p not in builder.values and not builder.covered(p)
+    ]
+    new_state = PersistedState(
+        values=builder.values,
+        lengths=builder.lengths,
+        trip_synced_id=state.trip_synced_id,
+    )
+    return SessionDelta(set_fields=builder.set_fields, unset_fields=unset_fields, state=new_state)
+
+
+def encoded_size(document: Dict[str, Any], codec_options: Any = None) -> Tuple[bytes, int]:
+    """BSON-encode an update document once (reused for the write) and return (raw, size in bytes)."""
+    raw = bson.encode(document, codec_options=codec_options) if codec_options else bson.encode(document)
+    return raw, len(raw)
@@ -177,10 +177,29 @@ async def lifespan(app: FastAPI):
             logger.info("[OK] Flight monitor (Crisis Manager) started — interval: 30 min")
         except Exception as e:
             logger.warning(f"Failed to start flight monitor: {e}")
+
+        # Learning metrics rollup: สรุปตัวชี้วัดการเรียนรู้รายช่วงเวลาสำหรับกราฟย้อนหลังใน admin
+        if settings.learning_metrics_rollup_enabled:
+            try:
+                from app.services.learning_metrics import get_learning_metrics_service
+                asyncio.create_task(get_learning_metrics_service().run_rollup_loop())
+                logger.info(
+                    f"[OK] Learning metrics rollup started — interval: {settings.learning_metrics_rollup_interval_minutes} min"
+                )
+            except Exception as e:
+                logger.warning(f"Failed to start learning metrics rollup: {e}")
     else:
         logger.critical("="*60)
         logger.critical("⚠️  Server started in DEGRADED MODE - MongoDB unavailable")
         logger.critical("="*60)
+
+    # Warm agent services once per process (LLM, memory, orchestrator, MCP executor)
+    try:
+        from app.engine.service_container import get_agent_container
+        await get_agent_container().startup()
+        logger.info("[OK] Agent service container warmed")
+    except Exception as e:
+        logger.warning(f"Agent service container not warmed at startup (will build on first request): {e}")
     
     yield
     
@@ -196,6 +215,56 @@ async def lifespan(app: FastAPI):
     logger.info("Initiating graceful shutdown...")
     logger.info("="*60)
     
+    try:
+        from app.engine.service_container import get_agent_container
+        await get_agent_container().shutdown()
+    except Exception as e:
+        logger.error(f"Error shutting down agent service container: {e}")
+
+    try:
+        from app.engine.rl_pipeline import peek_rl_pipeline
+        _rl_pipeline = peek_rl_pipeline()
+        if _rl_pipeline is not None:
+            await _rl_pipeline.close()
+    except Exception as e:
+        logger.error(f"Error flushing RL event pipeline: {e}")
+
+    try:
+        from app.services.memory_access import get_memory_access_tracker
+        await get_memory_access_tracker().close()
+    except Exception as e:
+        logger.error(f"Error flushing memory access times: {e}")
+
+    try:
+        from app.services.llm_scheduler import peek_llm_scheduler
+        _llm_scheduler = peek_llm_scheduler()
+        if _llm_scheduler is not None:
+            _llm_scheduler.shutdown()
+    except Exception as e:
+        logger.error(f"Error shutting down LLM scheduler: {e}")
+
+    try:
+        from app.services.amadeus_transport import peek_amadeus_transport
+        _amadeus_transport = peek_amadeus_transport()
+        if _amadeus_transport is not None:
+            await _amadeus_transport.aclose()
+    except Exception as e:
+        logger.error(f"Error closing Amadeus transport: {e}")
+
+    try:
+        from app.services.notification_broker import peek_notification_broker
+        _notification_broker = peek_notification_broker()
+        if _notification_broker is not None:
+            await _notification_broker.close()
+    except Exception as e:
+        logger.error(f"Error closing notification broker: {e}")
+
+    try:
+        from app.core.bounded_cache import stop_all_sweepers
+        stop_all_sweepers()
+    except Exception as e:
+        logger.error(f"Error stopping cache sweepers: {e}")
+
     try:
         # Close MongoDB connections
         if app.state.mongo_mgr:
@@ -0,0 +1,222 @@
+"""
+Benchmark: admin /stream — loop ต่อ viewer แบบเดิม vs AdminStreamBroadcaster (producer ตัวเดียว)
+ใช้ Mongo ปลอมที่นับ op และ bytes ที่ส่งกลับ (BSON) + ไฟล์ log จริงที่โตขึ้นเรื่อยๆ ระหว่างทดสอบ
+เวลาถูกย่อด้วย --scale (0.1 = 1 นาทีจำลองใช้ 6 วินาที) แล้วรายงานต่อ 1 นาทีจำลอง ที่จำนวน viewer ต่างๆ:
+  Mongo ops, bytes จาก Mongo, bytes ที่อ่านจากไฟล์ log, CPU time ของโปรเซส
+Run: cd backend && python scripts/bench_admin_stream.py [--viewers 1,3,10] [--scale 0.1] [--sessions 50] [--log-lines 20000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+import bson  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services import admin_stream  # noqa: E402
+from app.services.admin_stream import AdminStreamBroadcaster  # noqa: E402
+
+
+class FakeSessions:
+    def __init__(self, docs, meter):
+        self.docs = docs
+        self.meter = meter
+
+    def _ordered(self):
+        return sorted(self.docs, key=lambda d: d["last_updated"], reverse=True)
+
+    def find(self, query):
+        meter, ordered = self.meter, self._ordered()
+
+        class Cursor:
+            def __init__(self):
+                self._limit = len(ordered)
+
+            def sort(self, *args):
+                return self
+
+            def limit(self, n):
+                self._limit = n
+                return self
+
+            async def __aiter__(self):
+                meter["ops"] += 1
+                for doc in ordered[:self._limit]:
+                    meter["bytes"] += len(bson.encode(doc))
+                    yield dict(doc)
+
+        return Cursor()
+
+    async def aggregate(self, pipeline):
+        # ผลลัพธ์เท่ากับ pipeline จริง: sort/limit แล้วคำนวณ summary + ตัด trip_plan ก่อนส่งกลับ
+        self.meter["ops"] += 1
+        for doc in self._ordered()[:admin_stream.SESSIONS_LIMIT]:
+            out = {k: v for k, v in doc.items() if k != "trip_plan"}
+            plan = doc.get("trip_plan") or {}
+            travel = plan.get("travel", {})
+            out["trip_plan_summary"] = {
+                "has_flights": bool(travel.get("flights", {}).get("outbound") or travel.get("flights", {}).get("inbound")),
+                "has_hotels": bool(plan.get("accommodation", {}).get("segments")),
+                "has_transport": bool(travel.get("ground_transport")),
+            }
+            self.meter["bytes"] += len(bson.encode(out))
+            yield out
+
+
+class FakeDatabase:
+    def __init__(self, sessions, meter):
+        self.sessions = FakeSessions(sessions, meter)
+        self.meter = meter
+
+    async def list_collection_names(self):
+        self.meter["ops"] += 1
+        return ["sessions", "users", "bookings", "notifications"]
+
+
+class FakeMongoManager:
+    def __init__(self, db):
+        self.db = db
+
+    async def mongo_ping(self):
+        self.db.meter["ops"] += 1
+        return True
+
+    def get_mongo_database(self):
+        return self.db
+
+
+def make_sessions(rng, n):
+    now = datetime.utcnow()
+    pool = [{"id": f"o{i}", "raw_data": {"blob": "x" * rng.randint(1500, 4000)}} for i in range(20)]
+    return [
+        {
+            "_id": bson.ObjectId(),
+            "session_id": f"user{i}::chat{i}",
+            "user_id": f"user{i}",
+            "title": f"Trip {i}",
+            "last_updated": now - timedelta(minutes=i),
+            "trip_plan": {
+                "travel": {"flights": {"outbound": [{"options_pool": pool}], "inbound": [{"options_pool": pool}]},
+                           "ground_transport": []},
+                "accommodation": {"segments": [{"options_pool": pool}]},
+            },
+        }
+        for i in range(n)
+    ]
+
+
+class LegacyViewer:
+    """loop เดิมของ admin_stream ต่อ 1 connection (เฉพาะส่วน Mongo / log / psutil)"""
+
+    def __init__(self, manager, log_path, meter, scale):
+        self.manager, self.log_path, self.meter, self.scale = manager, log_path, meter, scale
+
+    async def run(self, until):
+        import psutil
+        last_sessions = last_logs = 0.0
+        while time.monotonic() < until:
+            await self.manager.mongo_ping()
+            db = self.manager.get_mongo_database()
+            await db.list_collection_names()
+            process = psutil.Process(os.getpid())
+            process.memory_info()
+            psutil.cpu_percent()
+            now = time.monotonic()
+            if now - last_sessions > 10 * self.scale:
+                last_sessions = now
+                async for doc in db.sessions.find({}).sort("last_updated", -1).limit(50):
+                    doc.pop("trip_plan", None)
+            if now - last_logs > 5 * self.scale:
+                last_logs = now
+                with open(self.log_path, "r", encoding="utf-8") as f:
+                    lines = f.readlines()
+                self.meter["log_bytes"] += sum(len(line.encode("utf-8")) for line in lines)
+            await asyncio.sleep(2 * self.scale)
+
+
+async def _append_log(path, until, rng):
+    while time.monotonic() < until:
+        with open(path, "a", encoding="utf-8") as f:
+            for _ in range(5):
+                f.write(f"{datetime.utcnow().isoformat()} - app - INFO - request {rng.getrandbits(32):x} handled\n")
+        await asyncio.sleep(0.1)
+
+
+async def run_case(kind, viewers, args, log_path, sessions):
+    meter = {"ops": 0, "bytes": 0, "log_bytes": 0}
+    manager = FakeMongoManager(FakeDatabase(sessions, meter))
+    rng = random.Random(viewers)
+    window = 60 * args.scale
+    cpu0 = time.process_time()
+    until = time.monotonic() + window
+    writer = asyncio.ensure_future(_append_log(log_path, until, rng))
+    if kind == "legacy":
+        await asyncio.gather(*[LegacyViewer(manager, log_path, meter, args.scale).run(until) for _ in range(viewers)])
+    else:
+        broadcaster = AdminStreamBroadcaster(tick_seconds=2 * args.scale, mongo_manager=manager)
+        broadcaster._omise_checked = True
+        broadcaster._last_service_check = time.time() + 3600  # ไม่เรียก API ภายนอกในการทดสอบ
+        subs = [broadcaster.subscribe() for _ in range(viewers)]
+
+        async def viewer(sub):
+            frames = 0
+            while time.monotonic() < until:
+                if await sub.next_frame(timeout=1.0):
+                    frames += 1
+            return frames
+
+        await asyncio.gather(*[viewer(s) for s in subs])
+        for s in subs:
+            broadcaster.unsubscribe(s)
+        await asyncio.sleep(3 * args.scale)
+        meter["log_bytes"] = broadcaster.get_stats()["log_bytes_read"]
+        if broadcaster.get_stats()["producer_running"]:
+            print("   !! producer still running with no subscribers")
+    await writer
+    return meter, time.process_time() - cpu0
+
+
+async def run(args) -> None:
+    admin_stream.SESSIONS_REFRESH_SECONDS = 10 * args.scale
+    admin_stream.LOGS_REFRESH_SECONDS = 5 * args.scale
+    rng = random.Random(3)
+    sessions = make_sessions(rng, args.sessions)
+    tmpdir = tempfile.mkdtemp(prefix="admin_stream_bench_")
+    log_path = Path(tmpdir) / "app.log"
+    with open(log_path, "w", encoding="utf-8") as f:
+        for i in range(args.log_lines):
+            f.write(f"2026-01-01T00:00:00 - app - INFO - historical line {i} {'x' * 60}\n")
+    settings.log_file = str(log_path)
+    print(f"{args.sessions} sessions (~{len(bson.encode(sessions[0])) / 1024:.0f} KB each), "
+          f"log {log_path.stat().st_size / 1024:.0f} KB, per simulated minute (scale {args.scale:g}):")
+    print(f"   {'':<10}{'viewers':>8}{'mongo ops':>11}{'mongo KB':>10}{'log KB read':>13}{'cpu s':>8}")
+    for viewers in [int(v) for v in args.viewers.split(",")]:
+        for kind in ("legacy", "broadcast"):
+            meter, cpu = await run_case(kind, viewers, args, log_path, sessions)
+            print(f"   {kind:<10}{viewers:>8}{meter['ops']:>11}{meter['bytes'] / 1024:>10.0f}"
+                  f"{meter['log_bytes'] / 1024:>13.0f}{cpu:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--viewers", default="1,3,10")
+    parser.add_argument("--scale", type=float, default=0.1, help="time compression (1 = real time)")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--log-lines", type=int, default=20000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: ดัชนีสนามบินออฟไลน์ (AirportIndex)
+- ความเร็วค้นชื่อเมือง/สนามบิน (ไทย/อังกฤษ/alias) และ nearest-airport ด้วย grid
+- ตรวจว่า grid ให้ผลตรงกับ brute-force haversine ทุกจุดสุ่ม
+Run: cd backend && python scripts/bench_airport_index.py [--points 20000]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.services.airport_index import AirportIndex, DEFAULT_RADIUS_KM, haversine_km  # noqa: E402
+
+NAMES = [
+    "กรุงเทพ", "Bangkok", "กทม", "เชียงใหม่", "จังหวัดภูเก็ต", "พัทยา", "เกาะสมุย", "ดอนเมือง",
+    "Tokyo", "โตเกียว", "โอซาก้า", "Kyoto", "Seoul", "โซล", "Hong Kong", "สิงคโปร์",
+    "Paris, France", "London Heathrow Airport", "นิวยอร์ก", "Siam Paragon", "Unknown Town",
+]
+
+
+def brute_force(index: AirportIndex, lat: float, lng: float):
+    best = None
+    for iata, ap in index.airports.items():
+        d = haversine_km(lat, lng, ap["lat"], ap["lng"])
+        if d <= DEFAULT_RADIUS_KM and (best is None or d < best[0]):
+            best = (d, iata)
+    return best[1] if best else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = AirportIndex()
+    load_ms = (time.perf_counter() - t0) * 1000
+    print(f"Loaded {index.get_stats()} in {load_ms:.1f} ms")
+
+    for name in NAMES:
+        m = index.lookup(name)
+        print(f"  {name:<28} -> {m and (m['city_code'], m['flight_code'])}")
+
+    n = 200
+    t0 = time.perf_counter()
+    for _ in range(n):
+        for name in NAMES:
+            index.lookup(name)
+    lookup_us = (time.perf_counter() - t0) * 1e6 / (n * len(NAMES))
+
+    # จุดสุ่ม: ครึ่งหนึ่งรอบสนามบินจริง (±1.5°) อีกครึ่งสุ่มทั้งโลก
+    rng = random.Random(args.seed)
+    airports = list(index.airports.values())
+    points = []
+    for i in range(args.points):
+        if i % 2:
+            ap = rng.choice(airports)
+            points.append((ap["lat"] + rng.uniform(-1.5, 1.5), ap["lng"] + rng.uniform(-1.5, 1.5)))
+        else:
+            points.append((rng.uniform(-60, 70), rng.uniform(-180, 180)))
+
+    t0 = time.perf_counter()
+    grid = [index.nearest_airport(lat, lng) for lat, lng in points]
+    grid_us = (time.perf_counter() - t0) * 1e6 / len(points)
+    t0 = time.perf_counter()
+    brute = [brute_force(index, lat, lng) for lat, lng in points]
+    brute_us = (time.perf_counter() - t0) * 1e6 / len(points)
+
+    mismatches = sum(1 for g, b in zip(grid, brute) if (g["iata"] if g else None) != b)
+    found = sum(1 for g in grid if g)
+    print(f"name lookup: {lookup_us:.1f} µs/lookup")
+    print(f"nearest: grid {grid_us:.1f} µs vs brute-force {brute_us:.1f} µs "
+          f"(x{brute_us / max(grid_us, 1e-9):.1f}), found {found}/{len(points)}, mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark: AmadeusTransport กลาง (client/token ร่วมกัน + token bucket) เทียบกับแบบเดิม (client/token ต่อ TravelOrchestrator
+และ retry หลังโดน 429 ใน _amadeus_get) — ใช้ Amadeus ปลอมผ่าน httpx.MockTransport (ไม่ต้องมี API key / network)
+Amadeus ปลอม: รับได้ --server-tps คำขอ/วินาที (sliding window 1 วินาที) เกินแล้วตอบ 429 + Retry-After, หน่วง --latency-ms ต่อคำขอ
+รายงาน:
+  1) จำนวนการขอ OAuth token เมื่อมี orchestrator หลายตัว (agent, aggregator, MCP, diagnostics ...)
+  2) burst ค้นหาพร้อมกัน: จำนวน 429 ที่ได้รับ, สำเร็จ/ล้มเหลว, latency p50/p95 และเวลารวม
+  3) คำขอ INTERACTIVE ที่มาหลังงาน MONITOR ค้างคิว: เวลารอเทียบกับคิว FIFO
+Run: cd backend && python scripts/bench_amadeus_transport.py [--searches 40] [--server-tps 5] [--latency-ms 300]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import deque
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+import httpx  # noqa: E402
+
+from app.services.amadeus_transport import (  # noqa: E402
+    TOKEN_PATH,
+    AmadeusPriority,
+    AmadeusTransport,
+    amadeus_priority_scope,
+)
+
+SEARCH_URL = "https://test.api.amadeus.com/v2/shopping/flight-offers"
+
+
+class FakeAmadeus:
+    """Amadeus ปลอม: นับคำขอ token / ค้นหา และบังคับ TPS ด้วย 429"""
+
+    def __init__(self, tps: float, latency_ms: float):
+        self.tps = tps
+        self.latency = latency_ms / 1000
+        self.window: deque = deque()
+        self.token_calls = 0
+        self.search_calls = 0
+        self.rejected = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == TOKEN_PATH:
+            self.token_calls += 1
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"access_token": f"tok-{self.token_calls}", "expires_in": 1799})
+        now = time.monotonic()
+        while self.window and now - self.window[0] > 1.0:
+            self.window.popleft()
+        if len(self.window) >= self.tps:
+            self.rejected += 1
+            return httpx.Response(429, headers={"Retry-After": "1"}, json={"errors": [{"code": 38194}]})
+        self.window.append(now)
+        self.search_calls += 1
+        await asyncio.sleep(self.latency)
+        return httpx.Response(200, json={"data": [{"id": "1"}]})
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+class LegacyOrchestrator:
+    """พฤติกรรมเดิมของ TravelOrchestrator: client + token ของตัวเอง, retry 429/5xx ด้วย backoff 0.8*2^n"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self._token = None
+        self._lock = asyncio.Lock()
+
+    async def token(self) -> str:
+        async with self._lock:
+            if self._token is None:
+                resp = await self.client.post(f"https://test.api.amadeus.com{TOKEN_PATH}", data={"grant_type": "client_credentials"})
+                self._token = resp.json()["access_token"]
+            return self._token
+
+    async def search(self, retries: int = 3) -> httpx.Response:
+        token = await self.token()
+        last = None
+        for attempt in range(retries):
+            last = await self.client.get(SEARCH_URL, params={"max": 10}, headers={"Authorization": f"Bearer {token}"})
+            if last.status_code in (429, 500, 502, 503, 504):
+                await asyncio.sleep(0.8 * (2 ** attempt))
+                continue
+            return last
+        return last
+
+
+def _pct(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def _timed(coro):
+    t0 = time.perf_counter()
+    try:
+        resp = await coro
+        ok = resp is not None and resp.status_code == 200
+    except Exception:
+        ok = False
+    return ok, (time.perf_counter() - t0) * 1000
+
+
+async def bench_tokens(args) -> None:
+    print(f"1) OAuth token requests with {args.orchestrators} orchestrators x 3 searches")
+    server = FakeAmadeus(tps=1000, latency_ms=10)
+    legacy = [LegacyOrchestrator(server.client()) for _ in range(args.orchestrators)]
+    await asyncio.gather(*[o.search() for o in legacy for _ in range(3)])
+    legacy_tokens = server.token_calls
+    for o in legacy:
+        await o.client.aclose()
+
+    server = FakeAmadeus(tps=1000, latency_ms=10)
+    shared = AmadeusTransport(client=server.client(), rate_limits={})
+    await asyncio.gather(*[shared.get(SEARCH_URL, params={"max": 10}) for _ in range(args.orchestrators * 3)])
+    print(f"   per-instance clients: {legacy_tokens} token calls, {args.orchestrators} connection pools")
+    print(f"   shared transport:     {server.token_calls} token call(s), 1 connection pool")
+    await shared.aclose()
+
+
+async def bench_burst(args) -> None:
+    print(f"\n2) {args.searches} concurrent searches, Amadeus allows {args.server_tps:g} req/s, latency {args.latency_ms:g} ms")
+    print(f"   {'':<22}{'429 recv':>9}{'ok':>6}{'failed':>8}{'p50 ms':>9}{'p95 ms':>9}{'wall s':>8}")
+
+    server = FakeAmadeus(args.server_tps, args.latency_ms)
+    legacy = LegacyOrchestrator(server.client())
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*[_timed(legacy.search()) for _ in range(args.searches)])
+    _report("legacy (retry on 429)", server, results, time.perf_counter() - t0)
+    await legacy.client.aclose()
+
+    server = FakeAmadeus(args.server_tps, args.latency_ms)
+    transport = AmadeusTransport(client=server.client(), rate_limits={"shopping": args.client_tps, "auth": 2})
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*[_timed(transport.get(SEARCH_URL, params={"max": 10})) for _ in range(args.searches)])
+    _report(f"token bucket {args.client_tps:g}/s", server, results, time.perf_counter() - t0)
+    await transport.aclose()
+
+
+def _report(label, server, results, wall) -> None:
+    ok = [ms for good, ms in results if good]
+    failed = len(results) - len(ok)
+    print(f"   {label:<22}{server.rejected:>9}{len(ok):>6}{failed:>8}{_pct(ok, 0.5):>9.0f}{_pct(ok, 0.95):>9.0f}{wall:>8.1f}")
+
+
+async def bench_priority(args) -> None:
+    print(f"\n3) {args.monitor} MONITOR calls queued, then 3 INTERACTIVE searches (limit {args.client_tps:g}/s)")
+    for label, interactive_priority in (("FIFO (no priority)", AmadeusPriority.MONITOR), ("priority queue", AmadeusPriority.INTERACTIVE)):
+        server = FakeAmadeus(1000, args.latency_ms)
+        transport = AmadeusTransport(client=server.client(), rate_limits={"schedule": args.client_tps, "auth": 2})
+        url = "https://test.api.amadeus.com/v2/schedule/flights"
+        await transport.get_token("search")
+
+        async def monitor_call():
+            with amadeus_priority_scope(AmadeusPriority.MONITOR):
+                return await transport.get(url)
+
+        monitors = [asyncio.ensure_future(monitor_call()) for _ in range(args.monitor)]
+        await asyncio.sleep(0.01)
+        interactive = await asyncio.gather(*[_timed(transport.get(url, priority=interactive_priority)) for _ in range(3)])
+        await asyncio.gather(*monitors)
+        waits = [ms for _, ms in interactive]
+        print(f"   {label:<22} interactive latency mean {statistics.mean(waits):>7.0f} ms, max {max(waits):>7.0f} ms")
+        await transport.aclose()
+
+
+async def run(args) -> None:
+    await bench_tokens(args)
+    await bench_burst(args)
+    await bench_priority(args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orchestrators", type=int, default=6)
+    parser.add_argument("--searches", type=int, default=40)
+    parser.add_argument("--server-tps", type=float, default=5)
+    parser.add_argument("--client-tps", type=float, default=5, help="token bucket rate for the shared transport")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--monitor", type=int, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
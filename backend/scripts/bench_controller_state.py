@@ -0,0 +1,125 @@
+"""
+Benchmark: controller state serialization (legacy model_dump + deepcopy + indent JSON vs controller_view)
+จำลองทริปหลายเมืองที่มี options_pool ขนาดใหญ่ แล้ววัด CPU และ memory allocation ต่อ iteration
+Run: cd backend && python scripts/bench_controller_state.py [--cities 4] [--options 40] [--iterations 3]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+from app.models.trip_plan import TripPlan, Segment  # noqa: E402
+from app.engine.controller_view import controller_state_json, get_controller_view_stats  # noqa: E402
+
+
+def _fake_flight_offer(i: int) -> dict:
+    """~4KB Amadeus-like flight offer (เลียนแบบ raw payload)"""
+    return {
+        "id": str(i),
+        "source": "GDS",
+        "itineraries": [
+            {
+                "duration": "PT2H10M",
+                "segments": [
+                    {
+                        "departure": {"iataCode": "BKK", "at": "2026-07-01T08:00:00"},
+                        "arrival": {"iataCode": "HKT", "at": "2026-07-01T10:10:00"},
+                        "carrierCode": "TG",
+                        "number": str(200 + i),
+                        "aircraft": {"code": "320"},
+                        "operating": {"carrierCode": "TG"},
+                    }
+                    for _ in range(2)
+                ],
+            }
+        ],
+        "price": {"currency": "THB", "total": f"{3000 + i}.00", "base": f"{2500 + i}.00", "fees": [{"amount": "0.00", "type": "SUPPLIER"}] * 3},
+        "travelerPricings": [
+            {"travelerId": str(t), "fareOption": "STANDARD", "fareDetailsBySegment": [{"cabin": "ECONOMY", "fareBasis": "Y" * 8, "class": "Y", "includedCheckedBags": {"quantity": 1}}] * 4}
+            for t in range(4)
+        ],
+        "raw_blob": "x" * 2000,
+    }
+
+
+def build_plan(cities: int, options: int) -> TripPlan:
+    plan = TripPlan()
+    for c in range(cities):
+        plan.travel.flights.outbound.append(Segment(
+            requirements={"origin": "BKK", "destination": f"C{c:02d}", "departure_date": "2026-07-01", "adults": 2},
+            options_pool=[_fake_flight_offer(i) for i in range(options)],
+            status="selecting",
+        ))
+        plan.accommodation.segments.append(Segment(
+            requirements={"location": f"City {c}", "check_in": "2026-07-01", "check_out": "2026-07-04"},
+            options_pool=[_fake_flight_offer(i) for i in range(options)],
+            status="selecting",
+        ))
+    plan.travel.flights.inbound.append(Segment(
+        requirements={"origin": "C00", "destination": "BKK", "departure_date": "2026-07-10"},
+        selected_option=_fake_flight_offer(999),
+        options_pool=[_fake_flight_offer(i) for i in range(options)],
+        status="confirmed",
+    ))
+    return plan
+
+
+def legacy_state_json(plan: TripPlan) -> str:
+    """เส้นทางเดิม: model_dump → deepcopy → strip options_pool → json.dumps(indent=2)"""
+    state = copy.deepcopy(plan.model_dump())
+    for seg in (state["travel"]["flights"]["outbound"] + state["travel"]["flights"]["inbound"]
+                + state["travel"]["ground_transport"] + state["accommodation"]["segments"]):
+        if seg.get("options_pool"):
+            seg["options_pool"] = f"[{len(seg['options_pool'])} options available]"
+    return json.dumps(state, ensure_ascii=False, indent=2)
+
+
+def _measure(fn, plan: TripPlan, iterations: int, mutate: bool):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = ""
+    for it in range(iterations):
+        if mutate and it:
+            # แต่ละ iteration เปลี่ยน 1 segment (เหมือน controller เลือก 1 ตัวเลือก)
+            seg = plan.travel.flights.outbound[it % len(plan.travel.flights.outbound)]
+            seg.selected_option = seg.options_pool[0]
+            seg.requirements["max_price"] = 5000 + it
+        out = fn(plan)
+    elapsed = (time.perf_counter() - t0) * 1000 / iterations
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(out)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cities", type=int, default=4)
+    parser.add_argument("--options", type=int, default=40)
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    plan_legacy = build_plan(args.cities, args.options)
+    plan_view = build_plan(args.cities, args.options)
+    pool_bytes = len(json.dumps(plan_legacy.model_dump(), default=str))
+    print(f"Plan: {args.cities} cities, {args.options} options/segment, raw plan ≈ {pool_bytes / 1024:.0f} KB")
+
+    legacy_ms, legacy_peak, legacy_len = _measure(legacy_state_json, plan_legacy, args.iterations, mutate=True)
+    view_ms, view_peak, view_len = _measure(controller_state_json, plan_view, args.iterations, mutate=True)
+
+    print(f"{'path':<18}{'ms/iter':>10}{'peak alloc KB':>16}{'prompt chars':>14}")
+    print(f"{'legacy':<18}{legacy_ms:>10.2f}{legacy_peak / 1024:>16.0f}{legacy_len:>14}")
+    print(f"{'controller_view':<18}{view_ms:>10.2f}{view_peak / 1024:>16.0f}{view_len:>14}")
+    print(f"speedup x{legacy_ms / max(view_ms, 1e-6):.1f}, alloc x{legacy_peak / max(view_peak, 1):.1f}, "
+          f"prompt chars -{100 * (1 - view_len / max(legacy_len, 1)):.0f}%")
+    print(f"segment cache: {get_controller_view_stats()}")
+
+
+if __name__ == "__main__":
+    main()
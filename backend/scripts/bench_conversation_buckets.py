@@ -0,0 +1,127 @@
+"""
+Benchmark: ประวัติแชทแบบ array เดียว (เดิม) vs bucket pattern (ConversationStore) บน MongoDB จริง
+เติมข้อความทีละข้อความจนถึง --messages แล้ววัดที่ checkpoint:
+- append ms/ข้อความ (เดิม: find_one ทั้งเอกสารเพื่อ dedupe + $push; ใหม่: จอง seq บน head + $push bucket + เลื่อน message_count)
+- อ่าน tail --window ข้อความ (เดิม: find_one ทั้งเอกสารแล้ว slice ใน Python; ใหม่: bucket ท้าย + $slice)
+ใช้ database ชั่วคราวแล้วลบทิ้งตอนจบ (ต้องมี MongoDB ที่ --uri หรือ MONGO_URI)
+Run: cd backend && python scripts/bench_conversation_buckets.py [--messages 6000] [--window 20] [--uri mongodb://localhost:27017]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models.database import CONVERSATION_BUCKET_INDEXES, CONVERSATION_INDEXES  # noqa: E402
+from app.storage.conversation_store import ConversationStore  # noqa: E402
+
+SESSION_ID = "bench_user::bench_chat"
+USER_ID = "bench_user"
+SAMPLES = 50
+
+
+def make_message(i: int) -> dict:
+    role = "user" if i % 2 == 0 else "assistant"
+    text = f"ข้อความที่ {i}: อยากไปเที่ยวโตเกียวช่วงธันวาคม งบประมาณ 40,000 บาท " * 4
+    return {"role": role, "content": text, "timestamp": datetime.utcnow()}
+
+
+class LegacyStore:
+    """Copy of the pre-bucket layout: one `messages` array per conversation."""
+
+    def __init__(self, db):
+        self.coll = db["conversations_legacy"]
+
+    async def append(self, message: dict) -> None:
+        existing = await self.coll.find_one({"session_id": SESSION_ID})
+        if existing:
+            msgs = existing.get("messages") or []
+            if msgs and msgs[-1].get("role") == message.get("role") and \
+                    (msgs[-1].get("content") or "")[:200] == (message.get("content") or "")[:200]:
+                return
+        await self.coll.update_one(
+            {"session_id": SESSION_ID},
+            {"$push": {"messages": message}, "$setOnInsert": {"user_id": USER_ID}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    async def tail(self, limit: int) -> list:
+        doc = await self.coll.find_one({"session_id": SESSION_ID, "user_id": USER_ID})
+        return (doc or {}).get("messages", [])[-limit:]
+
+
+async def _time(coro_factory, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        await coro_factory(i)
+    return (time.perf_counter() - t0) * 1000 / n
+
+
+async def run(args) -> None:
+    client = AsyncIOMotorClient(args.uri or settings.mongodb_uri, serverSelectionTimeoutMS=3000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"MongoDB not reachable ({e}); this benchmark needs a live server (--uri).")
+        return
+    db_name = f"bench_conv_{os.getpid()}"
+    db = client[db_name]
+    await db["conversations"].create_indexes(CONVERSATION_INDEXES)
+    await db["conversation_buckets"].create_indexes(CONVERSATION_BUCKET_INDEXES)
+    await db["conversations_legacy"].create_index("session_id")
+    store = ConversationStore(db, bucket_size=args.bucket_size or None)
+    legacy = LegacyStore(db)
+
+    checkpoints = sorted({c for c in (100, 1000, 2500, 5000, args.messages) if c <= args.messages})
+    print(f"bucket size {store.bucket_size}, window {args.window}, {SAMPLES} samples per checkpoint")
+    print(f"{'messages':>9} | {'legacy append':>14}{'legacy read':>13} | {'bucket append':>14}{'bucket read':>13}  (ms)")
+    count = 0
+    try:
+        for target in checkpoints:
+            # เติมทั้งสองแบบให้ถึง checkpoint (ไม่นับเวลา) แล้ววัด SAMPLES ครั้ง
+            while count < target - SAMPLES:
+                msg = make_message(count)
+                await legacy.append(dict(msg))
+                await store.append(SESSION_ID, USER_ID, dict(msg))
+                count += 1
+            base = count
+            legacy_append = await _time(lambda i: legacy.append(make_message(base + i)), SAMPLES)
+            bucket_append = await _time(lambda i: store.append(SESSION_ID, USER_ID, make_message(base + i)), SAMPLES)
+            count += SAMPLES
+            legacy_read = await _time(lambda i: legacy.tail(args.window), SAMPLES)
+            bucket_read = await _time(lambda i: store.tail(SESSION_ID, args.window, user_id=USER_ID), SAMPLES)
+            tail_ok = [m["content"] for m in await legacy.tail(args.window)] == \
+                [m["content"] for m in await store.tail(SESSION_ID, args.window, user_id=USER_ID)]
+            print(f"{count:>9} | {legacy_append:>14.2f}{legacy_read:>13.2f} | {bucket_append:>14.2f}{bucket_read:>13.2f}"
+                  f"{'' if tail_ok else '  MISMATCH'}")
+        legacy_doc = await db.command("collStats", "conversations_legacy")
+        print(f"legacy document size: {legacy_doc.get('avgObjSize', 0) / 1024:.0f} KiB "
+              f"(16 MiB cap); buckets: {await store.buckets.count_documents({'session_id': SESSION_ID})}, "
+              f"head message_count={await store.count(SESSION_ID)}")
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=6000)
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--bucket-size", type=int, default=0)
+    parser.add_argument("--uri", default="")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: HotelPlaceIndex (Amadeus hotelId → Google place) — ค้นโรงแรมเมืองเดิมซ้ำ
+จำลอง Google (find_place / text / nearby / details) ด้วย latency คงที่ แล้วนับจำนวน call และเวลาต่อการค้นหา
+ใช้ hot layer ใน memory อย่างเดียว (ไม่ต้องมี MongoDB)
+Run: cd backend && python scripts/bench_hotel_place_index.py [--hotels 15] [--searches 5] [--google-ms 250]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+os.environ.setdefault("GOOGLE_MAPS_API_KEY", "bench-key")
+
+from app.services.hotel_place_enrichment import HotelPlaceIndex  # noqa: E402
+
+
+class FakeGoogle:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    async def _call(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+
+    async def resolve(self, name: str):
+        # เส้นทางที่แย่ที่สุดของ _resolve_google_place: find_place ไม่เจอ → text search → details
+        await self._call()
+        await self._call()
+        await self._call()
+        return {"place_id": f"pid-{name}", "name": name, "rating": 4.2, "formatted_address": f"{name}, Bangkok"}
+
+
+def _hotels(n: int):
+    return [
+        {"hotel": {"hotelId": f"HLBKK{i:03d}", "name": f"Hotel {i}", "latitude": 13.74 + i / 1000, "longitude": 100.52}}
+        for i in range(n)
+    ]
+
+
+async def _search(index, google, hotels, use_index: bool):
+    async def one(h):
+        name = h["hotel"]["name"]
+        if use_index:
+            return await index.get_or_resolve(h, lambda: google.resolve(name))
+        return await google.resolve(name)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(h) for h in hotels))
+    return (time.perf_counter() - t0) * 1000
+
+
+async def _run(hotels_n: int, searches: int, latency_s: float):
+    hotels = _hotels(hotels_n)
+    print(f"{hotels_n} hotels per search, {searches} searches, Google latency {latency_s * 1000:.0f} ms/call")
+    print(f"{'mode':<12}{'search #':>9}{'google calls':>14}{'ms':>9}")
+    for use_index in (False, True):
+        google = FakeGoogle(latency_s)
+        index = HotelPlaceIndex(use_db=False)
+        for n in range(1, searches + 1):
+            before = google.calls
+            ms = await _search(index, google, hotels, use_index)
+            print(f"{'index' if use_index else 'no index':<12}{n:>9}{google.calls - before:>14}{ms:>9.0f}")
+        if use_index:
+            print(f"index stats: {index.get_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hotels", type=int, default=15)
+    parser.add_argument("--searches", type=int, default=3)
+    parser.add_argument("--google-ms", type=float, default=250)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(_run(args.hotels, args.searches, args.google_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Benchmark: admin learning monitor — query ต่อ user แบบเดิม (N+1) vs LearningMetricsService (batch $in + $group / $facet)
+seed ฐานข้อมูลทดสอบ (default 10k users) ลง MongoDB จริง แล้ววัดเวลา + จำนวนคำสั่งที่ส่งถึง server (CommandListener):
+  1) learning-monitor: เลือก user --limit คน แล้วโหลดข้อมูลการเรียนรู้ (เดิม ~7–8 query ต่อ user)
+  2) ai-learning-metrics: count_documents({}) + distinct vs estimated_document_count + $group/$count
+  3) rollup: เวลาที่ใช้เขียน 1 bucket
+ใช้ database แยก (--database) และลบทิ้งหลังจบ ถ้าไม่ระบุ --keep
+Run: cd backend && python scripts/bench_learning_metrics.py [--uri mongodb://localhost:27017] [--users 10000] [--limit 50] [--repeat 5]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from pymongo import monitoring  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.engine.feature_learning import COLLECTION_FWL  # noqa: E402
+from app.models.database import (  # noqa: E402
+    CHOICE_HISTORY_INDEXES,
+    LEARNING_METRICS_ROLLUP_INDEXES,
+    MEMORY_INDEXES,
+    RL_QTABLE_INDEXES,
+    RL_REWARDS_INDEXES,
+    SESSION_INDEXES,
+    TRIP_EVALUATION_INDEXES,
+    USER_INDEXES,
+)
+from app.services.learning_metrics import ROLLUP_COL, LearningMetricsService  # noqa: E402
+from app.services.selection_preferences import COLLECTION_CHOICE_HISTORY  # noqa: E402
+from app.services.trip_evaluations import COLLECTION_NAME as TRIP_EVAL_COL  # noqa: E402
+
+SLOTS = ["flights_outbound", "flights_inbound", "accommodation", "ground_transport"]
+ACTIONS = ["select_option", "reject_option", "positive_feedback", "negative_feedback", "user_star_rating", "book"]
+
+
+class CommandCounter(monitoring.CommandListener):
+    """นับคำสั่งที่ส่งถึง server (find / aggregate / count / getMore ...)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name not in ("endSessions", "hello", "isMaster", "ping"):
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def seed(db, args) -> None:
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    indexes = [
+        ("users", USER_INDEXES), ("sessions", SESSION_INDEXES), ("memories", MEMORY_INDEXES),
+        ("user_preference_scores", RL_QTABLE_INDEXES), ("user_feedback_history", RL_REWARDS_INDEXES),
+        (COLLECTION_CHOICE_HISTORY, CHOICE_HISTORY_INDEXES), (TRIP_EVAL_COL, TRIP_EVALUATION_INDEXES),
+        (ROLLUP_COL, LEARNING_METRICS_ROLLUP_INDEXES),
+    ]
+    for name, models in indexes:
+        await db[name].create_indexes(models)
+
+    users, sessions, rewards, qtable, choices, trips, fwl, memories = [], [], [], [], [], [], [], []
+    for i in range(args.users):
+        uid = f"user{i:05d}"
+        travel = {}
+        if rng.random() < 0.4:
+            travel = {"budget_level": rng.choice(["low", "mid", "high"]), "travel_style": rng.choice(["relax", "adventure"])}
+        users.append({"user_id": uid, "email": f"{uid}@example.com", "first_name": "User", "last_name": str(i),
+                      "preferences": {"travelPreferences": travel, "inferred_from_chat": bool(travel)}})
+        for s in range(rng.randint(1, 4)):
+            sessions.append({"session_id": f"{uid}::chat{s}", "user_id": uid,
+                             "last_updated": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))})
+        for _ in range(rng.randint(0, args.rewards_per_user * 2)):
+            ts = now - timedelta(minutes=rng.randint(0, 60 * 24 * 14))
+            rewards.append({"user_id": uid, "action_type": rng.choice(ACTIONS), "slot_name": rng.choice(SLOTS),
+                            "option_key": f"opt:{rng.randint(0, 50)}", "reward": round(rng.uniform(-0.5, 1.0), 3),
+                            "context": {}, "created_at": ts.isoformat(), "created_ts": ts})
+        for k in rng.sample(range(60), rng.randint(0, 12)):
+            qtable.append({"user_id": uid, "slot_name": rng.choice(SLOTS), "option_key": f"airline:XX{k}",
+                           "q_value": round(rng.uniform(-1, 1), 3)})
+        for _ in range(rng.randint(0, 6)):
+            choices.append({"user_id": uid, "slot": rng.choice(SLOTS),
+                            "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))})
+        if rng.random() < 0.5:
+            for _ in range(rng.randint(1, 3)):
+                trips.append({"user_id": uid, "user_stars": rng.randint(1, 5), "satisfaction_pct": rng.randint(20, 100),
+                              "agent_accuracy_score": rng.randint(40, 100),
+                              "updated_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))})
+        for slot in rng.sample(["flight", "hotel", "transport"], rng.randint(0, 3)):
+            fwl.append({"user_id": uid, "slot_type": slot, "update_count": rng.randint(1, 40),
+                        "weights": {"f_price": rng.uniform(-1, 1), "f_is_direct": rng.uniform(-1, 1)}})
+        for _ in range(rng.randint(0, 5)):
+            memories.append({"user_id": uid, "content": "likes window seats", "importance": rng.random(),
+                             "created_at": now})
+    for name, docs in [("users", users), ("sessions", sessions), ("user_feedback_history", rewards),
+                       ("user_preference_scores", qtable), (COLLECTION_CHOICE_HISTORY, choices),
+                       (TRIP_EVAL_COL, trips), (COLLECTION_FWL, fwl), ("memories", memories)]:
+        for start in range(0, len(docs), 5000):
+            await db[name].insert_many(docs[start:start + 5000], ordered=False)
+    print(f"seeded {args.users} users: {len(sessions)} sessions, {len(rewards)} rewards, {len(qtable)} Q entries, "
+          f"{len(choices)} choices, {len(trips)} trip evals, {len(fwl)} FWL docs, {len(memories)} memories")
+
+
+# ---------- implementation เดิม (ก่อน LearningMetricsService) — เฉพาะส่วน query ----------
+
+async def legacy_monitor(db, limit: int) -> int:
+    user_ids = set()
+    for col_name in ["sessions", TRIP_EVAL_COL, COLLECTION_CHOICE_HISTORY, "user_feedback_history"]:
+        async for doc in db[col_name].find({}, {"user_id": 1, "session_id": 1}).limit(limit * 2):
+            if doc.get("user_id"):
+                user_ids.add(doc["user_id"])
+    user_ids = list(user_ids)[:limit]
+    for uid in user_ids:
+        user_doc = await db["users"].find_one({"user_id": uid}, {"preferences": 1, "email": 1})
+        travel = ((user_doc or {}).get("preferences") or {}).get("travelPreferences") or {}
+        await db[COLLECTION_CHOICE_HISTORY].count_documents({"user_id": uid})
+        last_trip = await db[TRIP_EVAL_COL].find_one(
+            {"user_id": uid}, {"user_stars": 1, "satisfaction_pct": 1, "updated_at": 1}, sort=[("updated_at", -1)]
+        )
+        if not last_trip:
+            await db["sessions"].find_one({"user_id": uid}, {"last_updated": 1}, sort=[("last_updated", -1)])
+        await db["user_feedback_history"].count_documents({"user_id": uid})
+        q_count = await db["user_preference_scores"].count_documents({"user_id": uid})
+        if not travel and q_count > 0:
+            await db["user_preference_scores"].find(
+                {"user_id": uid, "q_value": {"$gt": 0}}, {"slot_name": 1, "option_key": 1, "q_value": 1}
+            ).sort("q_value", -1).limit(3).to_list(length=3)
+        await db[COLLECTION_FWL].find({"user_id": uid}, {"_id": 0}).to_list(length=20)
+    await db["user_feedback_history"].find({}).sort("created_at", -1).limit(50).to_list(length=50)
+    return len(user_ids)
+
+
+async def legacy_summary(db) -> None:
+    for name in ["user_feedback_history", "user_preference_scores", COLLECTION_CHOICE_HISTORY, "memories"]:
+        await db[name].count_documents({})
+        len(await db[name].distinct("user_id"))
+    await db["user_feedback_history"].find({}).sort("created_at", -1).limit(100).to_list(length=100)
+
+
+async def new_monitor(service: LearningMetricsService, limit: int) -> int:
+    user_ids = await service.candidate_user_ids(limit)
+    await service.load_users(user_ids)
+    await service.recent_events(50)
+    return len(user_ids)
+
+
+async def measure(label, counter, fn, repeat):
+    times, commands = [], []
+    for _ in range(repeat):
+        before = counter.count
+        t0 = time.perf_counter()
+        await fn()
+        times.append((time.perf_counter() - t0) * 1000)
+        commands.append(counter.count - before)
+    print(f"   {label:<28}{statistics.median(times):>10.1f}{min(times):>10.1f}{statistics.median(commands):>10.0f}")
+
+
+async def run(args) -> None:
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(args.uri, event_listeners=[counter], serverSelectionTimeoutMS=5000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"MongoDB not reachable at {args.uri}: {e}")
+        return
+    db = client[args.database]
+    try:
+        if not args.reuse or await db["users"].estimated_document_count() == 0:
+            await client.drop_database(args.database)
+            await seed(db, args)
+        service = LearningMetricsService(db=db)
+        header = f"   {'':<28}{'p50 ms':>10}{'min ms':>10}{'commands':>10}"
+
+        print(f"\n1) learning-monitor, limit={args.limit}")
+        print(header)
+        await measure("legacy (per-user queries)", counter, lambda: legacy_monitor(db, args.limit), args.repeat)
+        await measure("batched ($in + $group)", counter, lambda: new_monitor(service, args.limit), args.repeat)
+
+        print("\n2) ai-learning-metrics")
+        print(header)
+        await measure("count_documents + distinct", counter, lambda: legacy_summary(db), args.repeat)
+        await measure("estimated + $group/$count", counter, service.summary, args.repeat)
+
+        print("\n3) rollup (1 bucket)")
+        print(header)
+        await measure("write_rollup", counter, service.write_rollup, args.repeat)
+        history = await service.history(days=1)
+        print(f"   rollup buckets stored: {len(history)} (idempotent upsert per bucket), "
+              f"interval {settings.learning_metrics_rollup_interval_minutes} min")
+    finally:
+        if not args.keep:
+            await client.drop_database(args.database)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=os.getenv("BENCH_MONGO_URI", settings.mongodb_uri))
+    parser.add_argument("--database", default="bench_learning_metrics")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--rewards-per-user", type=int, default=15, help="average reward events per user")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="reuse an already seeded --database")
+    parser.add_argument("--keep", action="store_true", help="do not drop --database afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark/ตรวจสอบ: LLM response cache (LLMResponseCache) สำหรับ brain ที่ให้ผลคงที่
+ใช้โมเดลปลอม (FakeLLM) ที่หน่วง --llm-ms ต่อ call — ไม่ต้องมี API key หรือ network (ไม่มี REDIS_URL → memory อย่างเดียว)
+จำลอง: extraction --requests ครั้ง จาก query --distinct แบบ โดย query ยอดนิยมถูกถามซ้ำบ่อยกว่า (Zipf)
+ตรวจ: คำตอบที่ไม่ใช่ JSON / error ไม่ถูกแคช, bypass และ temperature สูง (responder) ไม่แตะแคช,
+prompt ที่ต่างกันแค่ whitespace ใช้ key เดียวกัน, คำตอบจากโมเดล fallback ไม่ถูกเก็บใต้ key ของโมเดลหลัก
+รายงาน: hit rate, latency p50, จำนวน call จริง, โทเค็นและต้นทุนที่ประหยัดได้ (จาก CostTracker)
+Run: cd backend && python scripts/bench_llm_cache.py [--requests 400] [--distinct 60] [--llm-ms 300]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.engine.cost_tracker import cost_tracker  # noqa: E402
+from app.services.llm import LLMService  # noqa: E402
+from app.services.llm_cache import LLMCachePolicy, get_llm_cache  # noqa: E402
+
+CITIES = ["Bangkok", "Tokyo", "Osaka", "Seoul", "Chiang Mai", "Phuket", "Singapore", "Taipei", "Hanoi", "Bali"]
+
+
+class FakeLLM(LLMService):
+    """LLMService ที่แทน Gemini ด้วยโมเดลปลอม: หน่วง llm_ms แล้วคืน JSON ของ extraction"""
+
+    def __init__(self, llm_ms: float):
+        self.enable_gemini = True
+        self.model_name = "gemini-2.5-flash"
+        self.gemini_api_key = "fake"
+        self._gemini_client = None
+        self.delay = llm_ms / 1000
+        self.calls = 0
+        self.reply_override = None
+        self.served_model = None  # จำลองว่าโมเดล fallback เป็นคนตอบ (None = โมเดลหลัก)
+
+    async def _generate_with_gemini(self, prompt, system_prompt=None, temperature=0.7, max_tokens=2000,
+                                    auto_select_model=True, context=None, priority=None, served=None) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if served is not None:
+            served["model"] = self.served_model or self.model_name
+        if self.reply_override is not None:
+            return self.reply_override
+        origin, destination = prompt.split("|")[1:3]
+        return json.dumps({"origin": origin, "destination": destination, "date": "2026-12-01"})
+
+
+def _query(i: int) -> str:
+    return f"Extract travel info |{CITIES[i % len(CITIES)]}|{CITIES[(i * 7 + 3) % len(CITIES)]}| trip #{i}"
+
+
+async def _workload(llm: FakeLLM, args, cached: bool) -> list:
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(args.distinct)]
+    latencies = []
+    policy = LLMCachePolicy(schema="bench_extract:v1") if cached else None
+    for _ in range(args.requests):
+        i = rng.choices(range(args.distinct), weights=weights)[0]
+        t0 = time.perf_counter()
+        await llm.generate_content(_query(i), system_prompt="Return JSON", temperature=0.3, max_tokens=200,
+                                   auto_select_model=False, context="travel_extraction", cache=policy)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+async def run(args) -> None:
+    base_llm = FakeLLM(args.llm_ms)
+    base = await _workload(base_llm, args, cached=False)
+    llm = FakeLLM(args.llm_ms)
+    lat = await _workload(llm, args, cached=True)
+
+    print(f"{args.requests} extraction requests over {args.distinct} distinct queries (Zipf), fake model {args.llm_ms:.0f} ms/call")
+    print(f"{'':<16}{'p50':>9}{'mean':>9}{'model calls':>13}")
+    print(f"{'no cache':<16}{statistics.median(base):>7.0f}ms{statistics.mean(base):>7.0f}ms{base_llm.calls:>13}")
+    print(f"{'LLM cache':<16}{statistics.median(lat):>7.0f}ms{statistics.mean(lat):>7.0f}ms{llm.calls:>13}")
+
+    summary = cost_tracker.get_cache_summary()
+    print(
+        f"CostTracker: hits={summary['hits']} misses={summary['misses']} hit_rate={summary['hit_rate']} "
+        f"saved tokens={summary['saved_input_tokens']}→{summary['saved_output_tokens']} saved=${summary['saved_cost_usd']}"
+    )
+
+    # correctness checks
+    checks = FakeLLM(1)
+    policy = LLMCachePolicy(schema="bench_checks:v1")
+    checks.reply_override = "ขอโทษค่ะ ไม่เข้าใจคำถาม"
+    for _ in range(2):
+        await checks.generate_content("not json", temperature=0.3, auto_select_model=False, cache=policy)
+    non_json_calls = checks.calls
+
+    checks.reply_override = None
+    prompt = _query(1)
+    await checks.generate_content(prompt, temperature=0.3, auto_select_model=False, cache=policy)
+    before = checks.calls
+    await checks.generate_content("  " + prompt.replace(" ", "   ") + "\n", temperature=0.3, auto_select_model=False, cache=policy)
+    whitespace_hit = checks.calls == before
+    await checks.generate_content(prompt, temperature=0.3, auto_select_model=False,
+                                  cache=LLMCachePolicy(schema="bench_checks:v1", bypass=True))
+    bypassed = checks.calls == before + 1
+    await checks.generate_content(prompt, temperature=0.7, auto_select_model=False, cache=policy)
+    await checks.generate_content(prompt, temperature=0.7, auto_select_model=False, cache=policy)
+    hot_uncached = checks.calls == before + 3
+
+    checks.reply_override = "{}"
+    await checks.generate_json("json error", auto_select_model=False, cache=policy)
+    await checks.generate_json("json error", auto_select_model=False, cache=policy)
+    error_uncached = checks.calls == before + 5
+
+    checks.reply_override = None
+    checks.served_model = "gemini-2.5-flash-lite"
+    fallback_prompt = _query(2)
+    await checks.generate_content(fallback_prompt, temperature=0.3, auto_select_model=False, cache=policy)
+    checks.served_model = None
+    await checks.generate_content(fallback_prompt, temperature=0.3, auto_select_model=False, cache=policy)
+    await checks.generate_content(fallback_prompt, temperature=0.3, auto_select_model=False, cache=policy)
+    # fallback ตอบ → ไม่เก็บ; โมเดลหลักตอบรอบถัดไป → เก็บ; รอบที่สาม hit
+    fallback_uncached = checks.calls == before + 7
+
+    print(f"non-JSON reply cached: {non_json_calls != 2}")
+    print(f"whitespace-only prompt change hits: {whitespace_hit}")
+    print(f"bypass calls the model: {bypassed}, temperature 0.7 never cached: {hot_uncached}, empty/error JSON never cached: {error_uncached}")
+    print(f"fallback-model reply not cached under the primary key: {fallback_uncached}")
+    print(f"cache stats: {get_llm_cache().get_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--distinct", type=int, default=60)
+    parser.add_argument("--llm-ms", type=float, default=300)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark: การเรียก LLM แบบเดิม (run_in_executor(None) ใช้ thread pool ร่วมกับ SDK อื่น) vs LLMScheduler
+จำลองโหลด: งานเบื้องหลัง --background งาน (consolidate/title, หน่วง --bg-ms) ถูกส่งพร้อมกันก่อน
+แล้วตามด้วยการเรียกของผู้ใช้ --interactive ครั้ง (controller/responder, หน่วง --llm-ms) ทุก --gap-ms
+และงาน SDK อื่น (googlemaps/Amadeus/bcrypt) ที่ใช้ default pool ตลอดเวลา — ทุกงานเป็น time.sleep แบบ blocking
+รายงาน: เวลารอคิว + latency ของการเรียกฝั่งผู้ใช้, จำนวนงานที่ถูกตัดเพราะ deadline, และสัญญาณ queue pressure
+Run: cd backend && python scripts/bench_llm_scheduler.py [--background 40] [--interactive 20] [--pool 8]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.services.llm_scheduler import (  # noqa: E402
+    LLMDeadlineExceeded,
+    LLMPriority,
+    LLMScheduler,
+    llm_deadline_scope,
+)
+
+
+def _blocking(ms: float):
+    def _call():
+        time.sleep(ms / 1000)
+        return ms
+    return _call
+
+
+def _pct(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def _other_sdk_load(stop: asyncio.Event, ms: float) -> None:
+    """googlemaps / Amadeus / bcrypt ที่ใช้ default pool ตลอดช่วงทดสอบ"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        await asyncio.gather(*[loop.run_in_executor(None, _blocking(ms)) for _ in range(2)])
+
+
+async def legacy(args) -> list:
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=args.pool))
+    stop = asyncio.Event()
+    other = asyncio.create_task(_other_sdk_load(stop, args.bg_ms))
+    background = [loop.run_in_executor(None, _blocking(args.bg_ms)) for _ in range(args.background)]
+    latencies = []
+
+    async def user_call():
+        t0 = time.perf_counter()
+        await loop.run_in_executor(None, _blocking(args.llm_ms))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    calls = []
+    for _ in range(args.interactive):
+        calls.append(asyncio.create_task(user_call()))
+        await asyncio.sleep(args.gap_ms / 1000)
+    await asyncio.gather(*calls)
+    stop.set()
+    await asyncio.gather(other, *background)
+    return latencies
+
+
+async def scheduled(args) -> tuple:
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=args.pool))
+    scheduler = LLMScheduler(
+        max_workers=args.pool,
+        caps={LLMPriority.INTERACTIVE: args.pool, LLMPriority.BACKGROUND: max(1, args.pool // 4)},
+        pressure_queue_ms=args.pressure_ms,
+    )
+    stop = asyncio.Event()
+    other = asyncio.create_task(_other_sdk_load(stop, args.bg_ms))
+    background = [
+        asyncio.create_task(scheduler.run(_blocking(args.bg_ms), priority=LLMPriority.BACKGROUND, label="bg"))
+        for _ in range(args.background)
+    ]
+    latencies = []
+
+    async def user_call():
+        t0 = time.perf_counter()
+        await scheduler.run(_blocking(args.llm_ms), priority=LLMPriority.INTERACTIVE, label="controller")
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    calls = []
+    for _ in range(args.interactive):
+        calls.append(asyncio.create_task(user_call()))
+        await asyncio.sleep(args.gap_ms / 1000)
+    await asyncio.gather(*calls)
+    stop.set()
+    await asyncio.gather(other, *background)
+
+    # queue pressure: ผู้ใช้เข้ามาพร้อมกันเกินจำนวน thread → คิวค้างเกิน pressure_ms → LLMService ใช้ flash-lite
+    pressure_before = scheduler.is_under_pressure(LLMPriority.INTERACTIVE)
+    burst = [asyncio.create_task(scheduler.run(_blocking(args.llm_ms * 2), label="burst")) for _ in range(args.pool * 3)]
+    await asyncio.sleep(args.pressure_ms * 1.5 / 1000)
+    pressure_during = scheduler.is_under_pressure(LLMPriority.INTERACTIVE)
+    await asyncio.gather(*burst)
+    pressure_seen = (pressure_before, pressure_during, scheduler.is_under_pressure(LLMPriority.INTERACTIVE))
+
+    # deadline: งาน interactive ที่ turn หมดเวลาระหว่างรอคิว ต้องไม่ถูกส่งไปเรียก API
+    blockers = [asyncio.create_task(scheduler.run(_blocking(300), label="busy")) for _ in range(args.pool)]
+    await asyncio.sleep(0.01)
+    dropped = 0
+    with llm_deadline_scope(0.05):
+        for _ in range(5):
+            try:
+                await scheduler.run(_blocking(10), label="late")
+            except LLMDeadlineExceeded:
+                dropped += 1
+    await asyncio.gather(*blockers)
+    scheduler.shutdown()
+    return latencies, scheduler.get_stats(), pressure_seen, dropped
+
+
+def _report(name: str, latencies: list) -> None:
+    print(
+        f"{name:<28}p50={statistics.median(latencies):>7.0f}ms  p95={_pct(latencies, 0.95):>7.0f}ms  "
+        f"max={max(latencies):>7.0f}ms"
+    )
+
+
+async def run(args) -> None:
+    print(
+        f"pool={args.pool} threads, {args.background} background calls x {args.bg_ms:.0f}ms queued first, "
+        f"{args.interactive} user calls x {args.llm_ms:.0f}ms every {args.gap_ms:.0f}ms"
+    )
+    base = await legacy(args)
+    _report("shared default executor", base)
+    lat, stats, pressure_seen, dropped = await scheduled(args)
+    _report("LLMScheduler", lat)
+    bg = stats["classes"]["background"]
+    it = stats["classes"]["interactive"]
+    print(f"interactive queue p50/p95: {it['queue_ms_p50']}/{it['queue_ms_p95']} ms, background queue p50/p95: {bg['queue_ms_p50']}/{bg['queue_ms_p95']} ms")
+    print(f"queue pressure (idle / burst of {args.pool * 3} user calls / drained): {pressure_seen} (True → flash-lite fallback)")
+    print(f"dropped in queue by turn deadline: {dropped}/5, expired_in_queue={it['expired_in_queue']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--background", type=int, default=40)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--pool", type=int, default=8)
+    parser.add_argument("--bg-ms", type=float, default=400)
+    parser.add_argument("--llm-ms", type=float, default=200)
+    parser.add_argument("--gap-ms", type=float, default=50)
+    parser.add_argument("--pressure-ms", type=float, default=100)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark/ตรวจสอบ: Responder แบบรอคำตอบเต็ม vs stream token (LLMService.stream_content)
+ใช้โมเดลปลอมในเครื่อง (FakeStreamingLLM) ที่ปล่อย chunk ทีละ --chunk-ms จาก executor thread แบบ blocking
+เหมือน SDK จริง — ไม่ต้องมี API key หรือ network
+ตรวจ: ข้อความที่ stream ต่อกันแล้วตรงกับคำตอบเต็ม, event loop ไม่ถูกบล็อกระหว่าง stream,
+stream ล้มกลางทาง → ส่ง reset ให้ผู้รับ, fallback model ก่อน chunk แรก
+รายงาน: time-to-first-token แยกจากเวลารวม
+Run: cd backend && python scripts/bench_llm_streaming.py [--chunks 60] [--chunk-ms 25] [--first-ms 400]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.core.exceptions import LLMException  # noqa: E402
+from app.engine.agent import TravelAgent  # noqa: E402
+from app.services.llm import LLMService  # noqa: E402
+
+WORDS = "ดิฉันแนะนำเที่ยวบินตรงไปโตเกียว ออกเดินทางเช้า ราคาดีมากค่ะ เลือกได้เลยนะคะ ".split()
+
+
+class FakeStreamingLLM(LLMService):
+    """LLMService ที่แทน SDK ด้วยโมเดลปลอม: หน่วง first_ms ก่อน chunk แรก แล้ว chunk_ms ต่อ chunk (time.sleep ใน thread)."""
+
+    def __init__(self, chunks: int, first_ms: float, chunk_ms: float, fail_models=(), break_after=None):
+        self.enable_gemini = True
+        self.model_name = "fake-model"
+        self.gemini_api_key = "fake"
+        self._gemini_client = None
+        self.chunks = chunks
+        self.first = first_ms / 1000
+        self.per_chunk = chunk_ms / 1000
+        self.fail_models = set(fail_models)
+        self.break_after = break_after
+        self.opened = []
+
+    def reply(self) -> str:
+        return "".join(WORDS[i % len(WORDS)] + " " for i in range(self.chunks))
+
+    def _open_gemini_stream(self, model_name, full_prompt, temperature, max_tokens, usage):
+        self.opened.append(model_name)
+        if model_name in self.fail_models:
+            raise RuntimeError(f"404 model {model_name} not found")
+        time.sleep(self.first)
+        for i in range(self.chunks):
+            if self.break_after is not None and i == self.break_after:
+                raise RuntimeError("connection reset")
+            if i:
+                time.sleep(self.per_chunk)
+            yield WORDS[i % len(WORDS)] + " "
+        usage["input"] = len(full_prompt) // 4
+        usage["output"] = self.chunks
+
+    async def generate_content(self, prompt: str, **kwargs) -> str:
+        """เส้นทางเดิม: รอจนได้คำตอบเต็มแล้วค่อยคืน"""
+        parts = [chunk async for chunk in self.stream_content(prompt, auto_select_model=False)]
+        return "".join(parts)
+
+
+async def _ticker(stop: asyncio.Event, ticks: list) -> None:
+    """นับรอบ event loop ทุก 5ms — ถ้า SDK บล็อก loop จำนวน tick จะต่ำผิดปกติ"""
+    while not stop.is_set():
+        ticks.append(time.perf_counter())
+        await asyncio.sleep(0.005)
+
+
+async def run(args) -> None:
+    llm = FakeStreamingLLM(args.chunks, args.first_ms, args.chunk_ms)
+
+    # 1) เดิม: รอคำตอบเต็ม — ผู้ใช้เห็นตัวอักษรแรกพร้อมกับตอนจบ
+    t0 = time.perf_counter()
+    full = await llm.generate_content("prompt")
+    blocking_ms = (time.perf_counter() - t0) * 1000
+
+    # 2) stream: ส่ง token ผ่าน callback (เหมือน chat_stream → SSE event status=token)
+    events = []
+
+    async def token_callback(delta: str, reset: bool = False) -> None:
+        events.append(("reset", "") if reset else ("token", delta))
+
+    stop, ticks = asyncio.Event(), []
+    ticker = asyncio.create_task(_ticker(stop, ticks))
+    stats = {}
+    t0 = time.perf_counter()
+    streamed = await TravelAgent._stream_responder_text(
+        llm.stream_content("prompt", auto_select_model=False, stats=stats), token_callback
+    )
+    stream_ms = (time.perf_counter() - t0) * 1000
+    stop.set()
+    await ticker
+    expected_ticks = stream_ms / 5
+
+    print(f"fake model: {args.chunks} chunks, first chunk after {args.first_ms:.0f} ms, then {args.chunk_ms:.0f} ms/chunk")
+    print(f"{'':<26}{'ttft':>10}{'total':>10}")
+    print(f"{'blocking generate':<26}{blocking_ms:>8.0f}ms{blocking_ms:>8.0f}ms")
+    print(f"{'stream_content':<26}{stats['ttft_ms']:>8.0f}ms{stats['total_ms']:>8.0f}ms")
+    print(f"token events: {sum(1 for kind, _ in events if kind == 'token')}, chunks recorded: {stats['chunks']}")
+    print(f"streamed text == full reply: {streamed == full.strip() == llm.reply().strip()}")
+    print(f"event loop ticks during stream: {len(ticks)} (~{expected_ticks:.0f} if never blocked)")
+
+    # 3) fallback ก่อน chunk แรก: โมเดลหลักล้ม → ใช้โมเดลถัดไปใน chain
+    fb = FakeStreamingLLM(5, 10, 1, fail_models={"fake-model"})
+    fb_stats = {}
+    text = "".join([c async for c in fb.stream_content("p", auto_select_model=False, stats=fb_stats)])
+    print(f"fallback before first chunk: opened={fb.opened} model={fb_stats.get('model')} ok={bool(text)}")
+
+    # 4) ล้มกลางทาง: ผู้รับต้องได้ reset และผู้เรียกได้ LLMException (ไปใช้ generate_content ต่อ)
+    broken = FakeStreamingLLM(10, 10, 1, break_after=4)
+    events.clear()
+    try:
+        await TravelAgent._stream_responder_text(broken.stream_content("p", auto_select_model=False), token_callback)
+        print("mid-stream failure: NOT raised")
+    except LLMException:
+        kinds = [kind for kind, _ in events]
+        print(f"mid-stream failure: raised LLMException, events={kinds.count('token')} tokens then {kinds[-1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=60)
+    parser.add_argument("--chunk-ms", type=float, default=25)
+    parser.add_argument("--first-ms", type=float, default=400)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
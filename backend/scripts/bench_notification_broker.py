@@ -0,0 +1,187 @@
+"""
+Benchmark: notification fanout ผ่าน NotificationBroker — จำลอง 2 worker (broker 2 ตัว) ที่ใช้ Redis ตัวเดียวกัน
+  1) in-process (local): latency publish → subscriber และ worker อีกตัวไม่ได้รับ (ข้อจำกัดเดิม)
+  2) Redis pub/sub: publish บน worker A, subscriber อยู่บน worker B — ได้รับครบ / latency p50 / p95
+  3) reconnect: ตัด connection ของ PubSub บน worker B แล้ว publish ต่อ — ได้รับหลัง reconnect + resync
+  4) subscriber ช้า: burst เกิน buffer → ทิ้งตัวเก่าสุด + resync, burst ที่ค้างส่งรวมใน batch เดียว
+ข้อ 2–3 ต้องมี Redis (--redis-url หรือ REDIS_URL) หรือ --fakeredis (2 client บน FakeServer เดียวกันใน process,
+ต้องติดตั้ง fakeredis) ถ้าไม่มีจะข้าม
+Run: cd backend && python scripts/bench_notification_broker.py [--users 200] [--subscribers 2] [--messages 2000]
+     [--redis-url redis://localhost:6379/0 | --fakeredis]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.services.notification_broker import NotificationBroker, RESYNC_PAYLOAD  # noqa: E402
+
+try:
+    from redis.asyncio import Redis
+except Exception:  # redis package ไม่มี → ข้ามส่วน Redis
+    Redis = None
+
+try:
+    import fakeredis
+except Exception:  # ไม่มี fakeredis → --fakeredis ใช้ไม่ได้
+    fakeredis = None
+
+
+def _pct(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def _collect(sub, latencies, expected, done):
+    received = 0
+    while received < expected:
+        batch = await sub.next_batch(timeout=5.0)
+        if not batch:
+            break
+        now = time.perf_counter()
+        for payload in batch:
+            if payload == RESYNC_PAYLOAD:
+                continue
+            latencies.append((now - json.loads(payload)["t"]) * 1000)
+            received += 1
+    done.append(received)
+
+
+async def fanout(publisher, receiver, args, label):
+    subs = [
+        await receiver.subscribe(f"user{u}", maxsize=args.messages)
+        for u in range(args.users)
+        for _ in range(args.subscribers)
+    ]
+    await asyncio.sleep(0.2)  # ให้ listener subscribe channel ครบ
+    per_user = max(1, args.messages // args.users)
+    latencies, done = [], []
+    collectors = [asyncio.ensure_future(_collect(s, latencies, per_user, done)) for s in subs]
+    t0 = time.perf_counter()
+    for i in range(per_user):
+        await asyncio.gather(*[
+            publisher.publish(f"user{u}", {"type": "new_notification", "t": time.perf_counter(), "i": i})
+            for u in range(args.users)
+        ])
+    await asyncio.gather(*collectors)
+    wall = time.perf_counter() - t0
+    expected = per_user * len(subs)
+    print(f"   {label:<34}{sum(done):>7}/{expected:<7}{_pct(latencies, 0.5):>8.2f}{_pct(latencies, 0.95):>8.2f}"
+          f"{(max(latencies) if latencies else 0):>8.2f}{per_user * args.users / wall:>10.0f}")
+    for s in subs:
+        await s.close()
+
+
+def _header():
+    print(f"   {'':<34}{'recv':>15}{'p50 ms':>8}{'p95 ms':>8}{'max ms':>8}{'pub/s':>10}")
+
+
+async def bench_local(args) -> None:
+    print(f"1) in-process broker, {args.users} users x {args.subscribers} SSE connections")
+    _header()
+    worker_a, worker_b = NotificationBroker(mode="local"), NotificationBroker(mode="local")
+    await fanout(worker_a, worker_a, args, "same worker")
+    await fanout(worker_a, worker_b, args, "other worker (old limitation)")
+
+
+def _redis_clients(args, url):
+    """Two clients (one per simulated worker) on the same Redis: a real server, or one shared FakeServer."""
+    if args.fakeredis:
+        server = fakeredis.FakeServer()
+        return [fakeredis.aioredis.FakeRedis(server=server, decode_responses=True) for _ in range(2)], "fakeredis", server
+    return [Redis.from_url(url, encoding="utf-8", decode_responses=True) for _ in range(2)], url, None
+
+
+async def _drop_connection(worker, server) -> None:
+    """Real Redis: close worker B's pub/sub socket. fakeredis: take the shared FakeServer down for a moment."""
+    if server is None:
+        await worker._pubsub.connection.disconnect()
+        return
+    server.connected = False  # คำสั่งทุกตัวบน FakeServer → ConnectionError (listener ต้อง reconnect)
+    await asyncio.sleep(1.5)
+    server.connected = True
+
+
+async def bench_redis(args, url) -> None:
+    clients, where, server = _redis_clients(args, url)
+    try:
+        await clients[0].ping()
+    except Exception as e:
+        print(f"\n2-3) Redis not reachable at {where}: {e} — skipped")
+        return
+    worker_a = NotificationBroker(mode="redis", redis=clients[0])
+    worker_b = NotificationBroker(mode="redis", redis=clients[1])
+    print(f"\n2) Redis pub/sub ({where}), publish on worker A, {args.users} users x {args.subscribers} SSE connections")
+    _header()
+    await fanout(worker_a, worker_a, args, "same worker (via Redis)")
+    await fanout(worker_a, worker_b, args, "worker A -> worker B")
+
+    print("\n3) reconnect: drop worker B's pub/sub connection, keep publishing")
+    sub = await worker_b.subscribe("reconnect-user")
+    await asyncio.sleep(0.2)
+    await _drop_connection(worker_b, server)
+    t0 = time.perf_counter()
+    got, resync = 0, False
+    while time.perf_counter() - t0 < 10 and not (got and resync):
+        await worker_a.publish("reconnect-user", {"type": "new_notification", "t": time.perf_counter()})
+        batch = await sub.next_batch(timeout=0.2)
+        resync = resync or RESYNC_PAYLOAD in batch
+        got += sum(1 for p in batch if p != RESYNC_PAYLOAD)
+    stats = worker_b.get_stats()
+    print(f"   delivery resumed after {time.perf_counter() - t0:.2f}s, resync sent: {resync}, "
+          f"reconnects {stats['reconnects']}, redis errors {stats['redis_errors']}")
+    await sub.close()
+    for broker in (worker_a, worker_b):
+        await broker.close()
+    for client in clients:
+        await client.aclose()
+
+
+async def bench_slow_consumer(args) -> None:
+    print(f"\n4) slow consumer: burst of {args.burst} to one SSE connection with buffer {args.buffer}")
+    broker = NotificationBroker(mode="local")
+    sub = await broker.subscribe("slow", maxsize=args.buffer)
+    for i in range(args.burst):
+        await broker.publish("slow", {"type": "new_notification", "i": i})
+    batch = await sub.next_batch(timeout=1.0)
+    kept = [json.loads(p)["i"] for p in batch if p != RESYNC_PAYLOAD]
+    print(f"   one batch of {len(batch)} frame(s): kept newest {len(kept)} (#{kept[0]}..#{kept[-1]}), "
+          f"dropped {sub.dropped}, resync appended: {batch[-1] == RESYNC_PAYLOAD}")
+    print(f"   stats: {broker.get_stats()}")
+
+
+async def run(args) -> None:
+    await bench_local(args)
+    url = args.redis_url or os.getenv("REDIS_URL", "")
+    if args.fakeredis and fakeredis is None:
+        print("\n2-3) --fakeredis needs the fakeredis package — Redis fanout and reconnect skipped")
+    elif not args.fakeredis and (Redis is None or not url):
+        print("\n2-3) no --redis-url / REDIS_URL / --fakeredis — Redis fanout and reconnect skipped")
+    else:
+        await bench_redis(args, url)
+    await bench_slow_consumer(args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--subscribers", type=int, default=2, help="SSE connections per user (tabs / devices)")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--burst", type=int, default=500)
+    parser.add_argument("--buffer", type=int, default=50)
+    parser.add_argument("--redis-url", default="")
+    parser.add_argument("--fakeredis", action="store_true", help="Run 2-3 against two clients sharing one in-process FakeServer")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
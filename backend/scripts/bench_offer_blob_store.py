@@ -0,0 +1,235 @@
+"""
+Benchmark: session document ที่เก็บ raw_data เต็มใน options_pool vs raw_data แบบย่อ + raw_ref (OfferBlobStore)
+สร้าง offer ปลอมรูปแบบ Amadeus (flight: travelerPricings หลายคน + dictionaries, hotel: รีวิว/รูป Google + หลาย offers)
+ใช้ collection ปลอมใน memory (ไม่ต่อ MongoDB) แล้ววัด:
+  1) ขนาด BSON ของ session document ก่อน/หลัง
+  2) เวลา encode (save) / decode + to_user_session (load) ต่อเอกสาร
+  3) เวลา offload ต่อการค้นหา และ dedupe เมื่อเซสชันที่สองได้ offer ชุดเดียวกัน
+  4) เวลา resolve_option ตอน booking (hot memory และ cold → Mongo)
+Run: cd backend && python scripts/bench_offer_blob_store.py [--options 10] [--travelers 4] [--rounds 50]
+"""
+import argparse
+import asyncio
+import copy
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+import bson  # noqa: E402
+
+from app.models.database import SessionDocument  # noqa: E402
+from app.models.session import UserSession  # noqa: E402
+from app.models.trip_plan import Segment, TripPlan  # noqa: E402
+from app.services.offer_blob_store import OfferBlobStore, RAW_REF_FIELD  # noqa: E402
+
+
+class FakeBlobCollection:
+    """offer_blobs ปลอม: รองรับ bulk_write (UpdateOne upsert) และ find_one ตาม _id"""
+
+    def __init__(self):
+        self.docs = {}
+        self.bulk_calls = 0
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_calls += 1
+        for op in ops:
+            doc_id = op._filter["_id"]
+            if doc_id not in self.docs:
+                self.docs[doc_id] = dict(op._doc.get("$setOnInsert", {}))
+            expires = op._doc.get("$max", {}).get("expires_at")
+            if expires and expires > self.docs[doc_id].get("expires_at", expires):
+                self.docs[doc_id]["expires_at"] = expires
+            self.docs[doc_id].setdefault("expires_at", expires)
+
+    async def find_one(self, flt, projection=None):
+        await asyncio.sleep(0.001)  # round-trip Mongo โดยประมาณ
+        return self.docs.get(flt["_id"])
+
+
+def _segment(rng, seg_id):
+    return {
+        "id": str(seg_id),
+        "departure": {"iataCode": "BKK", "terminal": "1", "at": "2026-12-01T08:00:00"},
+        "arrival": {"iataCode": "NRT", "terminal": "2", "at": "2026-12-01T16:30:00"},
+        "carrierCode": "TG", "number": str(rng.randint(100, 999)),
+        "aircraft": {"code": "789"}, "operating": {"carrierCode": "TG"},
+        "duration": "PT6H30M", "numberOfStops": 0, "blacklistedInEU": False,
+    }
+
+
+def make_flight_raw(rng, i, travelers):
+    itineraries = []
+    seg_id = 1
+    for _ in range(2):
+        segs = []
+        for _ in range(rng.randint(1, 2)):
+            segs.append(_segment(rng, seg_id))
+            seg_id += 1
+        itineraries.append({"duration": f"PT{rng.randint(6, 14)}H", "segments": segs})
+    traveler_pricings = [
+        {
+            "travelerId": str(t + 1), "fareOption": "STANDARD", "travelerType": "ADULT",
+            "price": {"currency": "THB", "total": "15000.00", "base": "11000.00",
+                      "taxes": [{"amount": str(rng.randint(50, 900)), "code": f"T{k}"} for k in range(6)]},
+            "fareDetailsBySegment": [
+                {"segmentId": str(s), "cabin": "ECONOMY", "fareBasis": "KLOWTH", "brandedFare": "ECOLIGHT",
+                 "brandedFareLabel": "ECONOMY LIGHT", "class": "K", "includedCheckedBags": {"quantity": 1},
+                 "includedCabinBags": {"quantity": 1},
+                 "amenities": [{"description": f"AMENITY {a}", "isChargeable": bool(a % 2), "amenityType": "BAGGAGE",
+                                "amenityProvider": {"name": "BrandedFare"}} for a in range(8)]}
+                for s in range(1, seg_id)
+            ],
+        }
+        for t in range(travelers)
+    ]
+    return {
+        "type": "flight-offer", "id": str(i), "source": "GDS", "instantTicketingRequired": False,
+        "lastTicketingDate": "2026-11-20", "numberOfBookableSeats": 9,
+        "itineraries": itineraries,
+        "price": {"currency": "THB", "total": f"{rng.uniform(9000, 45000):.2f}", "grandTotal": "15000.00",
+                  "fees": [{"amount": "0.00", "type": "SUPPLIER"}, {"amount": "0.00", "type": "TICKETING"}]},
+        "pricingOptions": {"fareType": ["PUBLISHED"], "includedCheckedBagsOnly": True},
+        "validatingAirlineCodes": ["TG"],
+        "travelerPricings": traveler_pricings,
+        "dictionaries": {"locations": {c: {"cityCode": c, "countryCode": "XX"} for c in ("BKK", "NRT", "HND", "KIX")},
+                         "aircraft": {"789": "BOEING 787-9"}, "carriers": {"TG": "THAI AIRWAYS INTERNATIONAL"}},
+        "enhanced_info": {"airline_name": "Thai Airways", "aircraft_name": "Boeing 787-9"},
+    }
+
+
+def make_hotel_raw(rng, i):
+    return {
+        "hotel": {"hotelId": f"HT{i:05d}", "name": f"Hotel {i}", "cityCode": "TYO",
+                  "latitude": 35.68, "longitude": 139.76},
+        "offers": [
+            {"id": f"OFF{i}-{k}", "checkInDate": "2026-12-01", "checkOutDate": "2026-12-05",
+             "room": {"type": "DBL", "description": {"text": "Deluxe double room " * 8}},
+             "price": {"currency": "THB", "total": f"{rng.uniform(3000, 20000):.2f}"},
+             "policies": {"cancellations": [{"description": {"text": "Free cancellation " * 10}}]}}
+            for k in range(4)
+        ],
+        "google_place": {
+            "rating": 4.4, "user_ratings_total": 1200,
+            "reviews": [{"author_name": f"Guest {r}", "rating": 4, "text": "Great stay, friendly staff. " * 20}
+                        for r in range(5)],
+            "photos": [{"photo_reference": "ref" * 60, "height": 1200, "width": 1600,
+                        "html_attributions": ["<a href='https://maps.google.com'>owner</a>"]} for _ in range(10)],
+        },
+        "visuals": {"image_urls": [f"https://img.example.com/{i}/{k}.jpg" for k in range(12)]},
+        "location": {"address": "1-1 Marunouchi, Chiyoda", "district": "Chiyoda"},
+    }
+
+
+def make_pool(rng, n, kind, travelers):
+    pool = []
+    for i in range(n):
+        raw = make_flight_raw(rng, i, travelers) if kind == "flight" else make_hotel_raw(rng, i)
+        pool.append({
+            "id": f"{kind}-{i}", "category": kind, "display_name": f"{kind.title()} option {i}",
+            "price_amount": float(raw.get("price", {}).get("total", 9000.0)), "currency": "THB",
+            "tags": ["recommended"], "raw_data": raw,
+        })
+    return pool
+
+
+def make_session(pools, session_id="bench_session"):
+    plan = TripPlan()
+    plan.travel.flights.outbound = [Segment(options_pool=copy.deepcopy(pools["outbound"]))]
+    plan.travel.flights.inbound = [Segment(options_pool=copy.deepcopy(pools["inbound"]))]
+    plan.accommodation.segments = [Segment(options_pool=copy.deepcopy(pools["hotel"]))]
+    return UserSession(session_id=session_id, user_id="bench_user", trip_plan=plan)
+
+
+def encode(session):
+    return bson.encode(SessionDocument.from_user_session(session).model_dump(by_alias=True, exclude={"id"}))
+
+
+def timed_ms(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+async def offload_session(store, session):
+    t0 = time.perf_counter()
+    for _, segments in session.trip_plan.segment_lists():
+        for seg in segments:
+            seg.options_pool = await store.offload_options(seg.options_pool)
+    return (time.perf_counter() - t0) * 1000
+
+
+async def run(args) -> None:
+    rng = random.Random(args.seed)
+    pools = {
+        "outbound": make_pool(rng, args.options, "flight", args.travelers),
+        "inbound": make_pool(rng, args.options, "flight", args.travelers),
+        "hotel": make_pool(rng, args.options, "hotel", args.travelers),
+    }
+    print(f"session: 3 segments x {args.options} options, {args.travelers} traveler(s) per flight offer")
+
+    inline = make_session(pools)
+    collection = FakeBlobCollection()
+    store = OfferBlobStore(collection=collection)
+    offloaded = make_session(pools)
+    offload_ms = await offload_session(store, offloaded)
+
+    inline_doc, ref_doc = encode(inline), encode(offloaded)
+    print("\n1) session document size")
+    print(f"   inline raw_data:      {len(inline_doc) / 1024:>8.1f} KB")
+    print(f"   compact + raw_ref:    {len(ref_doc) / 1024:>8.1f} KB  ({len(ref_doc) / len(inline_doc):.0%})")
+    stored = sum(d["stored_bytes"] for d in collection.docs.values())
+    print(f"   offer_blobs:          {len(collection.docs)} blob(s), {stored / 1024:.1f} KB zlib")
+
+    print(f"\n2) save / load per session (median of {args.rounds})")
+    print(f"   {'':<22}{'save ms':>9}{'load ms':>9}")
+    for label, session, doc in (("inline raw_data", inline, inline_doc), ("compact + raw_ref", offloaded, ref_doc)):
+        save_ms = timed_ms(lambda: encode(session), args.rounds)
+        load_ms = timed_ms(lambda: SessionDocument(**bson.decode(doc)).to_user_session(), args.rounds)
+        print(f"   {label:<22}{save_ms:>9.2f}{load_ms:>9.2f}")
+
+    print("\n3) offload per search")
+    blobs_before, bulk_before = len(collection.docs), collection.bulk_calls
+    second = make_session(pools, session_id="bench_session_2")
+    second_ms = await offload_session(store, second)
+    print(f"   first session:  {offload_ms:>7.1f} ms, {blobs_before} blob(s) in {bulk_before} bulk write(s)")
+    print(f"   second session: {second_ms:>7.1f} ms, {len(collection.docs) - blobs_before} new blob(s), "
+          f"{collection.bulk_calls - bulk_before} bulk write(s) (same offers → dedupe)")
+
+    print("\n4) booking resolve_option")
+    option = offloaded.trip_plan.travel.flights.outbound[0].options_pool[0]
+    t0 = time.perf_counter()
+    resolved = await store.resolve_option(option)
+    hot_ms = (time.perf_counter() - t0) * 1000
+    cold = OfferBlobStore(collection=collection)
+    t0 = time.perf_counter()
+    resolved_cold = await cold.resolve_option(option)
+    cold_ms = (time.perf_counter() - t0) * 1000
+    ok = resolved["raw_data"] == pools["outbound"][0]["raw_data"] == resolved_cold["raw_data"]
+    print(f"   hot memory: {hot_ms:.2f} ms, cold (Mongo + zlib): {cold_ms:.2f} ms, "
+          f"full payload restored: {ok}, raw_ref dropped: {RAW_REF_FIELD not in resolved}")
+    print(f"\nstats: {store.get_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--options", type=int, default=10, help="options per segment")
+    parser.add_argument("--travelers", type=int, default=4, help="travelerPricings per flight offer")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Benchmark: ranking แบบ loop เดิม (dict ต่อ option) vs vectorized ranking engine (NumPy)
+- DataAggregator weighted sum (TYPE_WEIGHTS + min-max)
+- DataNormalizer.normalize_criteria
+- FeatureWeightLearner.score_options (extract_features + sigmoid·dot) + RL/FWL blend
+ตรวจว่าคะแนนตรงกับเส้นทางเดิม (ภายใน tolerance) แล้ววัดเวลาต่อ pool
+Run: cd backend && python scripts/bench_ranking_engine.py [--sizes 200,500] [--iterations 50]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+import numpy as np  # noqa: E402
+
+from app.services.data_aggregator import StandardizedItem, ItemCategory  # noqa: E402
+from app.engine.data_normalization import DataNormalizer  # noqa: E402
+from app.engine.feature_learning import FeatureWeightLearner, extract_features, _dot, _sigmoid  # noqa: E402
+from app.engine.ranking_engine import (  # noqa: E402
+    INVERSE_CRITERIA, TYPE_WEIGHTS, blend_rl_fwl, dur_to_min, item_value, personalized_final_scores, rank_items,
+)
+
+TOLERANCE = 1e-9
+
+
+# ─── Legacy (loop) implementations — copied from the pre-vectorization code ────
+
+def legacy_weighted_scores(items, request_type):
+    weights = TYPE_WEIGHTS.get(request_type, TYPE_WEIGHTS["default"])
+    raw = {k: [] for k in weights}
+    for item in items:
+        for k in weights:
+            raw[k].append(item_value(item, k))
+
+    def _minmax(vals):
+        lo, hi = min(vals), max(vals)
+        if hi == lo:
+            return [0.5] * len(vals)
+        return [(v - lo) / (hi - lo) for v in vals]
+
+    norm = {}
+    for k, vals in raw.items():
+        n = _minmax(vals)
+        norm[k] = [1.0 - v if k in INVERSE_CRITERIA else v for v in n]
+    return [sum(weights[k] * norm[k][idx] for k in weights) for idx in range(len(items))]
+
+
+def legacy_normalize_criteria(data, criteria, inverse):
+    criterion_values = {}
+    for c in criteria:
+        vals = []
+        for item in data:
+            v = item.get(c)
+            if v is not None:
+                try:
+                    vals.append(float(v))
+                except (ValueError, TypeError):
+                    pass
+        if vals:
+            criterion_values[c] = vals
+    out = []
+    for item in data:
+        row = {}
+        for c in criteria:
+            v = item.get(c)
+            if c not in criterion_values or v is None:
+                row[c] = 0.5
+                continue
+            try:
+                fv = float(v)
+            except (ValueError, TypeError):
+                row[c] = 0.5
+                continue
+            lo, hi = min(criterion_values[c]), max(criterion_values[c])
+            n = 0.5 if hi == lo else max(0.0, min(1.0, (fv - lo) / (hi - lo)))
+            row[c] = 1.0 - n if inverse.get(c) else n
+        out.append(row)
+    return out
+
+
+def legacy_fwl_scores(weights, slot, options):
+    scores = []
+    for opt in options:
+        feats = extract_features(opt, slot)
+        scores.append(0.5 if not feats else round(_sigmoid(_dot(weights, feats)), 4))
+    return scores
+
+
+# ─── Fixtures ───────────────────────────────────────────────────────────────────
+
+def make_items(n, rng):
+    items = []
+    for i in range(n):
+        minutes = rng.randint(55, 1500)
+        items.append(StandardizedItem(
+            id=str(i), category=ItemCategory.FLIGHT, display_name=f"F{i}",
+            price_amount=round(rng.uniform(1500, 45000), 2), is_price_available=rng.random() > 0.05,
+            rating=rng.choice([None, 3.5, 4.0, 4.2, 4.8]), review_count=rng.choice([None, 120, 900, 2500]),
+            duration=f"PT{minutes // 60}H{minutes % 60}M",
+        ))
+    return items
+
+
+def make_options(n, rng):
+    airlines = ["TG", "FD", "Thai Lion", "Scoot", "JL", "NH", "SQ"]
+    cabins = ["ECONOMY", "PREMIUM_ECONOMY", "BUSINESS", "FIRST", ""]
+    opts = []
+    for i in range(n):
+        segs = [{"duration_minutes": rng.randint(40, 600), "airline": rng.choice(airlines), "cabin_class": rng.choice(cabins)}
+                for _ in range(rng.randint(1, 3))]
+        opt = {"price_total": rng.choice([rng.uniform(900, 60000), None, "n/a"]), "segments": segs}
+        if rng.random() < 0.5:
+            opt["stops"] = len(segs) - 1
+        if rng.random() < 0.3:
+            opt["total_duration_minutes"] = rng.randint(60, 900)
+        opts.append(opt)
+    opts[0] = "not-a-dict"
+    return opts
+
+
+class _FixedWeightLearner(FeatureWeightLearner):
+    """FWL ที่ใช้ weights คงที่ (ไม่ต่อ MongoDB) — วัดเฉพาะส่วนคำนวณ"""
+
+    def __init__(self, weights):
+        self._weights = weights
+
+    async def _load_weights(self, user_id, slot_type, mode=""):
+        return dict(self._weights)
+
+
+def _timeit(fn, iterations):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        out = fn()
+    return (time.perf_counter() - t0) * 1000 / iterations, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="200,500")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    weights = {"f_price": -1.2, "f_cabin": 0.4, "f_is_direct": 1.1, "f_duration": -0.7, "f_budget_airline": 0.3}
+    learner = _FixedWeightLearner(weights)
+    loop = asyncio.new_event_loop()
+
+    print(f"{'pool':>5}  {'stage':<22}{'loop ms':>10}{'numpy ms':>10}{'speedup':>9}{'max |Δ|':>11}")
+    for n in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        items = make_items(n, rng)
+        options = make_options(n, rng)
+        rows = [{"price": it.price_amount, "rating": it.rating, "duration": dur_to_min(it.duration),
+                 "review_count": rng.choice([None, "x", 10, 500])} for it in items]
+        criteria = ["price", "rating", "duration", "review_count"]
+        inverse = {"price": True, "duration": True}
+        rl = [rng.uniform(-1, 1) for _ in range(n)]
+
+        stages = [
+            ("weighted_sum", lambda: legacy_weighted_scores(items, "flight"),
+             lambda: rank_items(items, "flight").scores.tolist()),
+            ("normalize_criteria",
+             lambda: [r[c] for r in legacy_normalize_criteria(rows, criteria, inverse) for c in criteria],
+             lambda: [r[c] for r in DataNormalizer.normalize_criteria(rows, criteria, inverse) for c in criteria]),
+            ("fwl_score_options", lambda: legacy_fwl_scores(weights, "flights_outbound", options),
+             lambda: loop.run_until_complete(learner.score_options("u1", "flights_outbound", options))),
+            ("rl_blend+final", lambda: [ws + (((r * 0.6 + (f - 0.5) * 2.0 * 0.4) + 1.0) / 2.0 * 0.20)
+                                        for ws, r, f in zip(legacy_weighted_scores(items, "flight"), rl,
+                                                            legacy_fwl_scores(weights, "flights_outbound", options))],
+             lambda: personalized_final_scores(
+                 rank_items(items, "flight").scores,
+                 blend_rl_fwl(rl, loop.run_until_complete(learner.score_options("u1", "flights_outbound", options))),
+             ).tolist()),
+        ]
+        for name, legacy_fn, vec_fn in stages:
+            legacy_ms, legacy_out = _timeit(legacy_fn, args.iterations)
+            vec_ms, vec_out = _timeit(vec_fn, args.iterations)
+            delta = float(np.max(np.abs(np.asarray(legacy_out, dtype=float) - np.asarray(vec_out, dtype=float))))
+            status = "" if delta <= TOLERANCE else "  MISMATCH"
+            print(f"{n:>5}  {name:<22}{legacy_ms:>10.3f}{vec_ms:>10.3f}{legacy_ms / max(vec_ms, 1e-9):>8.1f}x"
+                  f"{delta:>11.2e}{status}")
+
+        result = rank_items(items, "flight")
+        best = int(result.order[0])
+        print(f"       top option #{best}: score={result.scores[best]:.4f} explain={result.explain(best)}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
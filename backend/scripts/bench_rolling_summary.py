@@ -0,0 +1,156 @@
+"""
+Benchmark: context compaction แบบเดิม (สรุปครึ่งเก่าด้วย LLM ทุก turn ก่อน Controller) vs rolling summary
+(สรุปต่อยอดใน background หลังจบ turn แล้วเก็บไว้บน head ของแชท)
+จำลองแชท --turns turn (user + AI ต่อ turn) ด้วย ConversationStore ในหน่วยความจำ และ LLM ปลอมที่หน่วง --llm-ms
+แล้วนับ token แบบประมาณ (ตัวอักษร / 4) — ไม่ต้องมี MongoDB หรือ API key
+รายงาน: latency ของ build_conversation_context ที่ turn สุดท้าย, token ที่ใช้ใน turn นั้น และ token รวมทั้งแชท
+Run: cd backend && python scripts/bench_rolling_summary.py [--turns 50] [--llm-ms 800] [--reply-chars 1500]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.core.config import settings  # noqa: E402
+from app.services.memory import MemoryService  # noqa: E402
+
+SESSION_ID = "bench_user::bench_chat"
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeLLM:
+    """generate_content stand-in: fixed latency, counts prompt/output tokens."""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    async def generate_content(self, prompt: str, **kwargs) -> str:
+        await asyncio.sleep(self.latency)
+        out = "- ผู้ใช้อยากไปโตเกียว 5 วัน ช่วงธันวาคม งบ 40,000 บาท\n- ชอบโรงแรมใกล้สถานีรถไฟ\n- เลือกเที่ยวบินตรง"
+        self.calls += 1
+        self.prompt_tokens += _tokens(prompt)
+        self.output_tokens += _tokens(out)
+        return out
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+
+class MemoryConversationStore:
+    """In-memory ConversationStore with the calls MemoryService uses (seq-numbered messages + head summary)."""
+
+    def __init__(self):
+        self.messages = []
+        self.head = {"summary": "", "summary_upto": 0}
+
+    def append(self, message: dict) -> None:
+        self.messages.append({**message, "seq": len(self.messages)})
+
+    async def tail(self, session_id, limit, user_id=None, keep_seq=False):
+        msgs = self.messages[-limit:]
+        return [dict(m) for m in msgs] if keep_seq else [{k: v for k, v in m.items() if k != "seq"} for m in msgs]
+
+    async def range(self, session_id, start_seq, end_seq, bucket_size=None):
+        return [dict(m) for m in self.messages[start_seq:end_seq]]
+
+    async def summary_state(self, session_id):
+        return {
+            "bucketed": True,
+            "message_count": len(self.messages),
+            "bucket_size": settings.conversation_bucket_size,
+            **self.head,
+        }
+
+    async def save_summary(self, session_id, summary, upto, expected_upto):
+        if self.head["summary_upto"] != expected_upto:
+            return False
+        self.head = {"summary": summary, "summary_upto": upto}
+        return True
+
+
+class BenchMemory(MemoryService):
+    def __init__(self, llm: FakeLLM, store: MemoryConversationStore):
+        # ไม่เรียก MemoryService.__init__ (ต้องต่อ MongoDB)
+        self.llm = llm
+        self.db = None
+        self._store = store
+
+    def _conversations(self):
+        return self._store
+
+
+def _message(turn: int, role: str, chars: int) -> dict:
+    if role == "user":
+        text = f"turn {turn}: ขอเปลี่ยนโรงแรมเป็นย่านชินจูกุ และดูเที่ยวบินขากลับวันที่ {turn % 28 + 1} ได้ไหม"
+    else:
+        text = (f"turn {turn}: นี่คือตัวเลือกที่พบ เที่ยวบิน TG{600 + turn} ราคา 18,{turn:03d} บาท โรงแรมใกล้สถานี " * 40)[:chars]
+    return {"role": role, "content": text}
+
+
+async def simulate(args, rolling: bool) -> dict:
+    settings.rolling_summary_enabled = rolling
+    llm = FakeLLM(args.llm_ms)
+    store = MemoryConversationStore()
+    memory = BenchMemory(llm, store)
+    last_ms = 0.0
+    last_tokens = 0
+    context = ""
+    for turn in range(1, args.turns + 1):
+        store.append(_message(turn, "user", 0))
+        before = llm.tokens
+        t0 = time.perf_counter()
+        context = await memory.build_conversation_context(SESSION_ID, current_input="")
+        last_ms = (time.perf_counter() - t0) * 1000
+        last_tokens = llm.tokens - before
+        store.append(_message(turn, "assistant", args.reply_chars))
+        if rolling:
+            # หลังบันทึกข้อความ AI: chat.py เรียก schedule_summary_update → รอให้จบเพื่อจำลอง turn ถัดไป
+            memory.schedule_summary_update(SESSION_ID)
+            await asyncio.gather(*[t for t in asyncio.all_tasks() if t is not asyncio.current_task()])
+    return {
+        "ms": last_ms,
+        "turn_tokens": last_tokens,
+        "total_tokens": llm.tokens,
+        "calls": llm.calls,
+        "context_tokens": _tokens(context),
+        "summary_upto": store.head["summary_upto"],
+    }
+
+
+async def run(args) -> None:
+    before = await simulate(args, rolling=False)
+    after = await simulate(args, rolling=True)
+    print(f"turns={args.turns}, fake LLM latency={args.llm_ms:.0f} ms, AI reply={args.reply_chars} chars, "
+          f"keep_recent={settings.rolling_summary_keep_recent}, batch={settings.rolling_summary_batch}")
+    print(f"{'':<22}{'context ms @N':>14}{'LLM tokens @N':>15}{'prompt ctx tok':>16}{'LLM calls':>11}{'total tokens':>14}")
+    for name, r in (("inline compaction", before), ("rolling summary", after)):
+        print(f"{name:<22}{r['ms']:>14.1f}{r['turn_tokens']:>15}{r['context_tokens']:>16}{r['calls']:>11}{r['total_tokens']:>14}")
+    print(f"rolling summary covers messages [0, {after['summary_upto']}) of {args.turns * 2}; "
+          f"summary LLM calls run after the reply is saved (off the turn's critical path)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--llm-ms", type=float, default=800.0)
+    parser.add_argument("--reply-chars", type=int, default=1500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
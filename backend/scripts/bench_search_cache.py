@@ -0,0 +1,80 @@
+"""
+Benchmark: shared search cache + single-flight (จำลองหลายเซสชันค้นเส้นทางเดียวกันพร้อมกันช่วง peak)
+นับจำนวน Amadeus call และ latency ต่อ request เทียบกับการยิงตรงทุกเซสชัน
+Run: cd backend && python scripts/bench_search_cache.py [--sessions 50] [--routes 5] [--latency-ms 800]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+from app.services.search_cache import SharedSearchCache  # noqa: E402
+
+
+class FakeAmadeus:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+        self.calls = 0
+
+    async def get_flights(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency_s * random.uniform(0.8, 1.2))
+        return [{"id": str(i), "price": {"total": f"{3000 + i}.00"}, "raw_blob": "x" * 2000} for i in range(10)]
+
+
+def _requests(sessions: int, routes: int):
+    dests = ["HKT", "CNX", "NRT", "ICN", "SIN", "HKG", "TPE", "KIX"][:routes]
+    return [
+        {"origin": "BKK", "destination": random.choice(dests), "departure_date": "2026-12-20", "adults": 2}
+        for _ in range(sessions)
+    ]
+
+
+async def _run(sessions: int, routes: int, latency_s: float, shared: bool):
+    api = FakeAmadeus(latency_s)
+    cache = SharedSearchCache(max_entries=100)
+    latencies = []
+
+    async def one(req):
+        await asyncio.sleep(random.uniform(0, latency_s))  # ผู้ใช้เข้ามาไม่พร้อมกันเป๊ะ
+        t0 = time.perf_counter()
+        if shared:
+            await cache.get_or_fetch("flight", req, lambda: api.get_flights(**req))
+        else:
+            await api.get_flights(**req)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(one(r) for r in _requests(sessions, routes)))
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return api.calls, statistics.median(latencies), p95, cache.get_stats() if shared else {}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--routes", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    random.seed(7)
+
+    print(f"{args.sessions} concurrent sessions, {args.routes} distinct routes, Amadeus latency ≈ {args.latency_ms:.0f} ms")
+    print(f"{'mode':<16}{'amadeus calls':>15}{'p50 ms':>10}{'p95 ms':>10}")
+    for shared in (False, True):
+        calls, p50, p95, stats = asyncio.run(_run(args.sessions, args.routes, args.latency_ms / 1000, shared))
+        print(f"{'shared cache' if shared else 'per-session':<16}{calls:>15}{p50:>10.0f}{p95:>10.0f}")
+        if stats:
+            print(f"cache stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
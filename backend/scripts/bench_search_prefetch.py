@@ -0,0 +1,179 @@
+"""
+Benchmark: speculative search prefetch (เริ่มค้นหาตั้งแต่ต้นเทิร์น) vs ค้นหาหลัง Controller LLM ตอบ CALL_SEARCH
+ใช้ MCP ปลอมที่หน่วง --search-ms ต่อการค้นหา และจำลอง Controller LLM --llm-ms ต่อเทิร์น (ไม่ต้องมี API key / network)
+ใช้ TravelAgent._start_search_prefetch / _search_with_prefetch ตัวจริง + ML intent จริงจาก MLKeywordService
+แต่ละเทิร์นมี requirements "จริง" ที่ CALL_SEARCH ใช้ (จำลองผล CREATE_ITINERARY / segment เดิม) — บางเทิร์นตั้งใจให้ไม่ตรง
+(เช่น route planner เลือก DMK แทน BKK, controller ถามกลับแทนการค้นหา) เพื่อดูว่า diverge/unused ถูกยกเลิกและนับถูกต้อง
+รายงาน: latency ต่อเทิร์น (p50/mean), จำนวนการค้นหาจริงที่ยิงไป MCP, hit rate และสถิติ prefetch
+Run: cd backend && python scripts/bench_search_prefetch.py [--llm-ms 1500] [--search-ms 2500] [--rounds 3]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.core.config import settings  # noqa: E402
+from app.engine.agent import TravelAgent  # noqa: E402
+from app.services.ml_keyword_service import get_ml_keyword_service  # noqa: E402
+from app.engine.search_prefetch import (  # noqa: E402
+    activate_prefetch,
+    deactivate_prefetch,
+    flight_search_params,
+    get_prefetch_stats,
+    hotel_search_params,
+)
+from app.models.session import UserSession  # noqa: E402
+from app.models.trip_plan import Segment, TripPlan  # noqa: E402
+
+
+class FakeMCP:
+    """MCP executor ปลอม: search_flights / search_hotels หน่วง search_ms แล้วคืนตัวเลือก 1 รายการ"""
+
+    def __init__(self, search_ms: float):
+        self.delay = search_ms / 1000
+        self.calls = 0
+        self.cancelled = 0
+
+    async def execute_tool(self, tool_name, params):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        field = "flights" if tool_name == "search_flights" else "hotels"
+        return {"success": True, field: [{"id": f"{tool_name}-{params.get('departure_date') or params.get('check_in')}"}]}
+
+
+def _d(days: int) -> str:
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+def _thai(days: int) -> str:
+    months = ["ม.ค.", "ก.พ.", "มี.ค.", "เม.ย.", "พ.ค.", "มิ.ย.", "ก.ค.", "ส.ค.", "ก.ย.", "ต.ค.", "พ.ย.", "ธ.ค."]
+    d = date.today() + timedelta(days=days)
+    return f"{d.day} {months[d.month - 1]}"
+
+
+def _round_trip(origin, dest, hotel, start, end, adults=1, children=0):
+    """CALL_SEARCH ที่ controller ยิงหลัง CREATE_ITINERARY แบบไป-กลับ: (slot, req, tool, params)"""
+    pax = {"adults": adults, "children": children, "guests": adults + children}
+    out = {"origin": origin, "destination": dest, "departure_date": start, **pax, "non_stop": True, "return_date": end}
+    inb = {"origin": dest, "destination": origin, "departure_date": end, **pax, "non_stop": True}
+    acc = {"location": hotel, "check_in": start, "check_out": end, **pax}
+    return [
+        ("flights_outbound", out, "search_flights", flight_search_params(out, end, True)),
+        ("flights_inbound", inb, "search_flights", flight_search_params(inb, None, True)),
+        ("accommodation", acc, "search_hotels", hotel_search_params(acc)),
+    ]
+
+
+def _planned_trip(start: str, end: str) -> TripPlan:
+    trip = TripPlan()
+    trip.travel.flights.outbound.append(Segment(requirements={
+        "origin": "BKK", "destination": "HKT", "departure_date": start, "adults": 2, "children": 0, "guests": 2}))
+    trip.travel.flights.inbound.append(Segment(requirements={
+        "origin": "HKT", "destination": "BKK", "departure_date": end, "adults": 2, "children": 0, "guests": 2}))
+    trip.accommodation.segments.append(Segment(requirements={
+        "location": "Phuket", "check_in": start, "check_out": end, "adults": 2, "children": 0, "guests": 2}))
+    return trip
+
+
+def _scenarios():
+    s1, e1 = _d(40), _d(43)
+    s2, e2 = _d(60), _d(65)
+    s3, e3 = _d(80), _d(84)
+    planned_searches = [
+        ("flights_outbound", {"origin": "BKK", "destination": "HKT", "departure_date": s3, "adults": 2, "children": 0,
+                              "guests": 2, "non_stop": True, "return_date": e3}, "search_flights", None),
+        ("flights_inbound", {"origin": "HKT", "destination": "BKK", "departure_date": e3, "adults": 2, "children": 0,
+                             "guests": 2, "non_stop": True}, "search_flights", None),
+        ("accommodation", {"location": "Phuket", "check_in": s3, "check_out": e3, "adults": 2, "children": 0,
+                           "guests": 2}, "search_hotels", None),
+    ]
+    planned_searches = [
+        (slot, req, tool, flight_search_params(req, req.get("return_date"), True) if tool == "search_flights" else hotel_search_params(req))
+        for slot, req, tool, _ in planned_searches
+    ]
+    return [
+        # (name, text, trip plan, CALL_SEARCH ที่ controller ยิงจริง)
+        ("new trip, TH", f"อยากไปเชียงใหม่จากกรุงเทพ {_thai(40)} - {_thai(43)}", TripPlan(),
+         _round_trip("BKK", "CNX", "Chiang Mai", s1, e1)),
+        ("new trip, EN 2 pax", f"Flight from Bangkok to Tokyo {s2} to {e2} for 2 adults", TripPlan(),
+         _round_trip("BKK", "TYO", "Tokyo", s2, e2, adults=2)),
+        ("route planner picks DMK", f"ไปเชียงใหม่ {_thai(40)} ถึง {_thai(43)}", TripPlan(),
+         _round_trip("DMK", "CNX", "Chiang Mai", s1, e1)),
+        ("search existing plan", "ค้นหาเลย", _planned_trip(s3, e3), planned_searches),
+        ("controller asks instead", f"ไปภูเก็ต {_thai(60)} - {_thai(65)}", TripPlan(), []),
+        ("open question (no prefetch)", "ไปญี่ปุ่นช่วงไหนดี", TripPlan(), []),
+    ]
+
+
+async def _turn(agent: TravelAgent, text: str, trip: TripPlan, searches, llm_ms: float, speculative: bool) -> float:
+    session = UserSession(session_id="bench_session", user_id="bench_user", trip_plan=trip.model_copy(deep=True))
+    t0 = time.perf_counter()
+    if speculative:
+        # run_turn ถอด intent ครั้งเดียวแล้วส่งให้ทั้ง prefetch และ controller — นับเวลานี้รวมในเทิร์นด้วย
+        hint = get_ml_keyword_service().decode_keywords(text)
+        token = activate_prefetch(agent._start_search_prefetch(session, text, hint))
+    else:
+        token = activate_prefetch(None)
+    try:
+        await asyncio.sleep(llm_ms / 1000)  # Controller LLM
+        await asyncio.gather(*[
+            agent._search_with_prefetch(slot, 0, req, tool, "flight" if tool == "search_flights" else "hotel", params, timeout=20.0)
+            for slot, req, tool, params in searches
+        ])
+    finally:
+        deactivate_prefetch(token)
+    return (time.perf_counter() - t0) * 1000
+
+
+async def run(args) -> None:
+    settings.search_cache_enabled = False  # วัดเฉพาะผลของ prefetch (ไม่ให้ shared cache ข้ามรอบช่วย)
+    results = {}
+    for speculative in (False, True):
+        agent = TravelAgent.__new__(TravelAgent)
+        agent.mcp_executor = FakeMCP(args.search_ms)
+        per_case = {}
+        for _ in range(args.rounds):
+            for name, text, trip, searches in _scenarios():
+                per_case.setdefault(name, []).append(
+                    await _turn(agent, text, trip, searches, args.llm_ms, speculative)
+                )
+        await asyncio.sleep(0.05)
+        results[speculative] = (per_case, agent.mcp_executor)
+
+    print(f"controller LLM {args.llm_ms:.0f} ms, search {args.search_ms:.0f} ms, {args.rounds} rounds")
+    print(f"{'turn':<30}{'serial p50':>12}{'prefetch p50':>14}")
+    base_cases, base_mcp = results[False]
+    pre_cases, pre_mcp = results[True]
+    for name in base_cases:
+        print(f"{name:<30}{statistics.median(base_cases[name]):>10.0f}ms{statistics.median(pre_cases[name]):>12.0f}ms")
+    all_base = [v for vs in base_cases.values() for v in vs]
+    all_pre = [v for vs in pre_cases.values() for v in vs]
+    print(f"{'all turns (mean)':<30}{statistics.mean(all_base):>10.0f}ms{statistics.mean(all_pre):>12.0f}ms")
+    print(f"MCP searches issued: serial={base_mcp.calls}, prefetch={pre_mcp.calls} (cancelled in flight: {pre_mcp.cancelled})")
+    print(f"prefetch stats: {get_prefetch_stats().get_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=1500)
+    parser.add_argument("--search-ms", type=float, default=2500)
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: สรุปความชอบจากการเลือก (selection_preferences) ต่อ turn
+- เดิม: ทุก turn อ่าน learnFromMyChoices + choice 150 รายการ + reward 200 รายการ + Q-table 500 รายการ แล้วสร้างข้อความใหม่
+- ใหม่: อ่านสรุปที่ materialize ไว้ (find_one ตาม _id) หรือ cache ใน process
+seed ผู้ใช้ที่มีประวัติการเลือกหลายพันรายการลง database ชั่วคราวแล้วลบทิ้งตอนจบ (ต้องมี MongoDB ที่ --uri หรือ MONGO_URI)
+Run: cd backend && python scripts/bench_selection_summary.py [--users 20] [--choices 3000] [--rounds 200]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models.database import CHOICE_HISTORY_INDEXES, RL_QTABLE_INDEXES, RL_REWARDS_INDEXES  # noqa: E402
+from app.services import selection_preferences as sp  # noqa: E402
+
+DESTINATIONS = ["Tokyo", "Osaka", "Seoul", "Singapore", "Taipei", "Paris", "London", "Bali"]
+AIRLINES = ["Thai Airways", "ANA", "AirAsia", "Singapore Airlines", "EVA Air", "Korean Air"]
+SLOTS = ["flights_outbound", "flights_inbound", "accommodation", "ground_transport"]
+
+
+async def seed(db, users: int, choices: int) -> list:
+    user_ids = [f"bench_user_{i}" for i in range(users)]
+    now = datetime.utcnow()
+    await db["users"].insert_many([{"user_id": u, "preferences": {"learnFromMyChoices": True}} for u in user_ids])
+    for u in user_ids:
+        await db[sp.COLLECTION_CHOICE_HISTORY].insert_many([{
+            "user_id": u,
+            "slot_name": random.choice(SLOTS),
+            "slot_type": "flight",
+            "price": random.randint(2000, 40000),
+            "destination": random.choice(DESTINATIONS),
+            "origin": "Bangkok",
+            "name": random.choice(AIRLINES),
+            "created_at": now - timedelta(minutes=i),
+        } for i in range(choices)])
+        await db["user_feedback_history"].insert_many([{
+            "user_id": u,
+            "action_type": random.choice(["select_option", "reject_option"]),
+            "slot_name": random.choice(SLOTS),
+            "option_key": f"k{i}",
+            "reward": 0.2,
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+        } for i in range(500)])
+        await db["user_preference_scores"].insert_many([{
+            "user_id": u, "slot_name": random.choice(SLOTS), "option_key": f"k{i}", "q_value": random.uniform(-0.3, 0.3),
+        } for i in range(500)])
+    return user_ids
+
+
+async def legacy_summary(db, user_id: str) -> str:
+    """Pre-materialization turn path: preference check + full recompute."""
+    if not await sp._user_learn_from_choices(db, user_id):
+        return ""
+    return await sp._compute_selection_summary(db, user_id)
+
+
+async def _time(fn, user_ids, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(rounds):
+        await fn(user_ids[i % len(user_ids)])
+    return (time.perf_counter() - t0) * 1000 / rounds
+
+
+async def run(args) -> None:
+    client = AsyncIOMotorClient(args.uri or settings.mongodb_uri, serverSelectionTimeoutMS=3000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"MongoDB not reachable ({e}); this benchmark needs a live server (--uri).")
+        return
+    db_name = f"bench_selsum_{os.getpid()}"
+    db = client[db_name]
+    sp._get_db = lambda: db  # ชี้ service ไปที่ database ชั่วคราว
+    try:
+        await db[sp.COLLECTION_CHOICE_HISTORY].create_indexes(CHOICE_HISTORY_INDEXES)
+        await db["user_feedback_history"].create_indexes(RL_REWARDS_INDEXES)
+        await db["user_preference_scores"].create_indexes(RL_QTABLE_INDEXES)
+        user_ids = await seed(db, args.users, args.choices)
+        print(f"{args.users} users x {args.choices} choices (+500 rewards, 500 Q entries each), {args.rounds} reads")
+
+        # materialize ครั้งแรก (ทำตอน record_choice / reward ใน production)
+        t0 = time.perf_counter()
+        for u in user_ids:
+            await sp.refresh_selection_preferences_summary(u)
+        refresh_ms = (time.perf_counter() - t0) * 1000 / len(user_ids)
+
+        legacy_ms = await _time(lambda u: legacy_summary(db, u), user_ids, args.rounds)
+
+        async def cold(u):
+            sp._summary_cache.pop(u, None)
+            return await sp.get_selection_preferences_summary(u)
+        cold_ms = await _time(cold, user_ids, args.rounds)
+        warm_ms = await _time(sp.get_selection_preferences_summary, user_ids, args.rounds)
+
+        same = all([await legacy_summary(db, u) == await sp.get_selection_preferences_summary(u) for u in user_ids])
+        print(f"{'legacy recompute per turn':<34}{legacy_ms:>9.2f} ms")
+        print(f"{'materialized find_one (cold)':<34}{cold_ms:>9.2f} ms")
+        print(f"{'materialized in-process cache':<34}{warm_ms:>9.3f} ms")
+        print(f"{'refresh on write (off turn path)':<34}{refresh_ms:>9.2f} ms")
+        print(f"summaries identical: {same}")
+    finally:
+        await client.drop_database(db_name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--choices", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--uri", default="")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark: save_session แบบเต็มเอกสาร vs delta ($set/$unset เฉพาะ path ที่เปลี่ยน)
+จำลอง turn ที่ save หลายครั้ง (แก้ requirements → ได้ options_pool → เลือก → ยืนยัน → ตั้ง title ...)
+วัด bytes ที่ต้องเขียนต่อ save และตรวจว่าเอกสารที่ได้จากการ apply delta ตรงกับเอกสารเต็มทุกขั้น (ไม่ต่อ MongoDB)
+Run: cd backend && python scripts/bench_session_delta.py [--pool-size 40] [--turns 5]
+"""
+import argparse
+import copy
+import logging
+import os
+import random
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+import bson  # noqa: E402
+
+from app.models.database import SessionDocument  # noqa: E402
+from app.models.session import UserSession  # noqa: E402
+from app.models.trip_plan import Segment, SegmentStatus, TripPlan  # noqa: E402
+from app.storage.session_delta import compute_session_delta, snapshot_session  # noqa: E402
+
+COMPARED_FIELDS = ("user_id", "trip_id", "chat_id", "title", "popular_destinations",
+                   "travel_preferences", "booking_funnel_state", "trip_plan")
+
+
+def make_pool(rng, n, kind):
+    pool = []
+    for i in range(n):
+        pool.append({
+            "id": f"{kind}-{rng.getrandbits(40):x}",
+            "category": kind,
+            "display_name": f"{kind.title()} option {i}",
+            "price_amount": round(rng.uniform(1500, 45000), 2),
+            "currency": "THB",
+            "duration": f"PT{rng.randint(1, 14)}H{rng.randint(0, 59)}M",
+            "tags": rng.sample(["cheapest", "fastest", "best_value", "recommended", "direct"], 2),
+            "raw_data": {"segments": [{"carrier": "TG", "number": str(rng.randint(100, 999)),
+                                       "departure": "2026-12-01T08:00:00", "arrival": "2026-12-01T16:30:00",
+                                       "aircraft": "789", "cabin": "ECONOMY"} for _ in range(rng.randint(1, 3))],
+                         "fare_rules": "x" * rng.randint(200, 600)},
+        })
+    return pool
+
+
+def set_path(doc, path, value):
+    parts = path.split(".")
+    cur = doc
+    for p in parts[:-1]:
+        cur = cur[int(p)] if isinstance(cur, list) else cur.setdefault(p, {})
+    if isinstance(cur, list):
+        cur[int(parts[-1])] = value
+    else:
+        cur[parts[-1]] = value
+
+
+def unset_path(doc, path):
+    parts = path.split(".")
+    cur = doc
+    for p in parts[:-1]:
+        cur = cur[int(p)] if isinstance(cur, list) else cur[p]
+    cur.pop(parts[-1], None)
+
+
+def full_doc(session):
+    doc = SessionDocument.from_user_session(session).model_dump(by_alias=True, exclude={"id"})
+    return doc
+
+
+def normalized(doc):
+    # enum → value เหมือนที่ BSON เก็บจริง
+    return bson.decode(bson.encode({k: doc.get(k) for k in COMPARED_FIELDS}))
+
+
+def steps(session, rng, pool_size):
+    """ลำดับการแก้ session แบบเดียวกับ run_turn (save หลังแต่ละขั้น)"""
+    plan = session.trip_plan
+    out, inb = plan.travel.flights.outbound[0], plan.travel.flights.inbound[0]
+    acc = plan.accommodation.segments[0]
+    yield "requirements (in-place)", lambda: out.requirements.update({"max_price": 20000, "direct_flight": True})
+    yield "searching status", lambda: setattr(out, "status", SegmentStatus.SEARCHING)
+    yield "outbound pool", lambda: setattr(out, "options_pool", make_pool(rng, pool_size, "flight"))
+    yield "outbound selecting", lambda: setattr(out, "status", SegmentStatus.SELECTING)
+    yield "inbound pool", lambda: setattr(inb, "options_pool", make_pool(rng, pool_size, "flight"))
+    yield "hotel pool", lambda: setattr(acc, "options_pool", make_pool(rng, pool_size, "hotel"))
+    yield "no-op save", lambda: None
+    yield "select outbound", lambda: (setattr(out, "selected_option", copy.deepcopy(out.options_pool[3])),
+                                      setattr(out, "status", SegmentStatus.CONFIRMED))
+    yield "funnel + prefs", lambda: (setattr(session, "booking_funnel_state", "selecting"),
+                                     session.travel_preferences.update({"budget_level": "mid"}))
+    yield "title", lambda: setattr(session, "title", "ทริปโตเกียว 5 วัน")
+    yield "add ground segment", lambda: plan.travel.ground_transport.append(
+        Segment(requirements={"origin": "NRT", "destination": "Shinjuku"}))
+    yield "segment extra field", lambda: setattr(acc, "note", "near station")
+    yield "drop extra field", lambda: acc.__pydantic_extra__.pop("note")
+    yield "plan_context", lambda: setattr(plan, "plan_context", {"season": "winter", "travel_style": "family"})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool-size", type=int, default=40)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    total_full = total_delta = 0
+    full_ms = delta_ms = 0.0
+    mismatches = 0
+    saves = 0
+    for turn in range(args.turns):
+        plan = TripPlan()
+        plan.travel.flights.outbound.append(Segment(requirements={"origin": "BKK", "destination": "TYO", "date": "2026-12-01"}))
+        plan.travel.flights.inbound.append(Segment(requirements={"origin": "TYO", "destination": "BKK", "date": "2026-12-06"}))
+        plan.accommodation.segments.append(Segment(requirements={"location": "Tokyo", "check_in": "2026-12-01", "check_out": "2026-12-06"}))
+        session = UserSession(session_id=f"u{turn}::chat{turn}", user_id=f"u{turn}", trip_id=f"trip_{turn}", trip_plan=plan)
+
+        stored = full_doc(session)
+        session._persisted_state = snapshot_session(session, trip_synced_id=session.trip_id)
+        for label, mutate in steps(session, rng, args.pool_size):
+            mutate()
+            t0 = time.perf_counter()
+            doc = full_doc(session)
+            full_bytes = len(bson.encode({"$set": doc}))
+            full_ms += (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            delta = compute_session_delta(session, session._persisted_state)
+            update = {"$set": delta.set_fields}
+            if delta.unset_fields:
+                update["$unset"] = {p: "" for p in delta.unset_fields}
+            delta_bytes = len(bson.encode(update))
+            delta_ms += (time.perf_counter() - t0) * 1000
+            session._persisted_state = delta.state
+            session._dirty_paths.clear()
+
+            for path, value in delta.set_fields.items():
+                set_path(stored, path, copy.deepcopy(value))
+            for path in delta.unset_fields:
+                unset_path(stored, path)
+            ok = normalized(stored) == normalized(doc)
+            mismatches += not ok
+            saves += 1
+            total_full += full_bytes
+            total_delta += delta_bytes
+            if turn == 0:
+                mirror = "mirror" if delta.trip_changed else "skip"
+                print(f"  {label:<26} full {full_bytes:>8} B   delta {delta_bytes:>7} B "
+                      f"({len(delta.set_fields)} set, {len(delta.unset_fields)} unset, trips {mirror})"
+                      f"{'' if ok else '  MISMATCH'}")
+
+    print(f"{saves} saves: full {total_full / 1024:.1f} KiB vs delta {total_delta / 1024:.1f} KiB "
+          f"(x{total_full / max(total_delta, 1):.1f} fewer bytes), "
+          f"build+encode full {full_ms / saves:.3f} ms vs delta {delta_ms / saves:.3f} ms per save, "
+          f"mismatches {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
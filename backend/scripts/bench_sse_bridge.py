@@ -0,0 +1,172 @@
+"""
+Load test: SSE bridge ของ chat_stream — loop เดิม (asyncio.wait_for(queue.get(), 0.1) + heartbeat 2s) vs SSEBridge (event-driven)
+ไม่ต่อ HTTP: จำลอง agent task + consumer ของ SSE generator ใน event loop เดียว
+  1) stream ที่ idle พร้อมกันหลายร้อยตัว: CPU time ของโปรเซส และจำนวนครั้งที่ consumer ตื่น
+  2) latency ตั้งแต่ agent publish จนถึง consumer ได้ event (p50 / p95 / max)
+  3) client อ่านช้า: token หลายพันตัว → จำนวน frame ที่ส่งจริง, token ที่รวม, status ที่ตัด, buffer สูงสุด
+Run: cd backend && python scripts/bench_sse_bridge.py [--streams 300] [--seconds 5] [--events 20]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.core.sse_bridge import SSEBridge, get_sse_bridge_stats  # noqa: E402
+
+HEARTBEAT = {"status": "processing", "message": "กำลังประมวลผล...", "step": "heartbeat"}
+
+
+async def _connected() -> bool:
+    return False
+
+
+class LegacyBridge:
+    """loop เดิมของ chat_stream: poll คิวทุก 0.1s, heartbeat ทุก 2s, ตรวจ disconnect ทุกครั้งที่ timeout"""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.wakeups = 0
+
+    async def publish(self, event):
+        await self.queue.put(event)
+
+    async def stream(self, task, deadline, is_disconnected=None):
+        loop = asyncio.get_running_loop()
+        last_heartbeat = loop.time()
+        while not task.done() or not self.queue.empty():
+            if loop.time() > deadline:
+                return
+            try:
+                event = await asyncio.wait_for(self.queue.get(), timeout=0.1)
+                self.wakeups += 1
+                yield event
+            except asyncio.TimeoutError:
+                self.wakeups += 1
+                now = loop.time()
+                if now - last_heartbeat >= 2.0:
+                    yield HEARTBEAT
+                    last_heartbeat = now
+                if is_disconnected is not None and await is_disconnected():
+                    return
+
+
+async def _agent(bridge, seconds, events, latencies, rng):
+    """agent ปลอม: ส่ง status ตามเวลาสุ่มภายใน `seconds` แล้วจบ"""
+    loop = asyncio.get_running_loop()
+    times = sorted(rng.uniform(0, seconds) for _ in range(events))
+    start = loop.time()
+    for at in times:
+        await asyncio.sleep(max(0.0, start + at - loop.time()))
+        await bridge.publish({"status": "searching", "message": "ค้นหา...", "step": "search", "_t": time.perf_counter()})
+    await asyncio.sleep(max(0.0, start + seconds - loop.time()))
+    return "done"
+
+
+async def _consume(bridge, task, seconds, latencies):
+    loop = asyncio.get_running_loop()
+    async for event in bridge.stream(task, deadline=loop.time() + seconds + 5, is_disconnected=_connected):
+        sent = event.get("_t")
+        if sent is not None:
+            latencies.append((time.perf_counter() - sent) * 1000)
+
+
+async def run_streams(kind, args, events):
+    rng = random.Random(args.seed)
+    latencies = []
+    bridges = []
+    jobs = []
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    for _ in range(args.streams):
+        bridge = LegacyBridge() if kind == "legacy" else SSEBridge(heartbeat_interval=2.0)
+        task = asyncio.ensure_future(_agent(bridge, args.seconds, events, latencies, rng))
+        bridges.append(bridge)
+        jobs.append(_consume(bridge, task, args.seconds, latencies))
+    before = get_sse_bridge_stats()["wakeups"]
+    await asyncio.gather(*jobs)
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+    wakeups = sum(b.wakeups for b in bridges) if kind == "legacy" else get_sse_bridge_stats()["wakeups"] - before
+    return cpu, wall, wakeups, latencies
+
+
+def _pct(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def bench_idle(args) -> None:
+    print(f"1) {args.streams} idle streams for {args.seconds:g}s (agent sends nothing until it finishes)")
+    print(f"   {'':<14}{'cpu s':>8}{'cpu %':>8}{'wakeups':>10}{'wakeups/s/stream':>19}")
+    for kind in ("legacy", "bridge"):
+        cpu, wall, wakeups, _ = await run_streams(kind, args, events=0)
+        print(f"   {kind:<14}{cpu:>8.2f}{cpu / wall:>8.0%}{wakeups:>10}{wakeups / wall / args.streams:>19.1f}")
+
+
+async def bench_latency(args) -> None:
+    print(f"\n2) {args.streams} streams x {args.events} status events over {args.seconds:g}s: publish → consumer latency")
+    print(f"   {'':<14}{'p50 ms':>8}{'p95 ms':>8}{'max ms':>8}{'cpu s':>8}")
+    for kind in ("legacy", "bridge"):
+        cpu, _, _, lat = await run_streams(kind, args, events=args.events)
+        print(f"   {kind:<14}{_pct(lat, 0.5):>8.2f}{_pct(lat, 0.95):>8.2f}{max(lat):>8.2f}{cpu:>8.2f}")
+
+
+async def bench_slow_client(args) -> None:
+    print(f"\n3) slow client ({args.read_ms:g} ms per frame), agent streams {args.tokens} tokens + 40 status updates")
+    before = get_sse_bridge_stats()
+    bridge = SSEBridge(max_buffer=64, heartbeat_interval=2.0, slow_client_timeout=5.0)
+    text = []
+
+    async def agent():
+        t0 = time.perf_counter()
+        for i in range(args.tokens):
+            if i % (args.tokens // 40) == 0:
+                await bridge.publish({"status": "thinking", "message": f"step {i}", "step": "progress"})
+            await bridge.publish({"status": "token", "delta": f"t{i} ", "seq": i + 1})
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+        return time.perf_counter() - t0
+
+    task = asyncio.ensure_future(agent())
+    frames = 0
+    loop = asyncio.get_running_loop()
+    async for event in bridge.stream(task, deadline=loop.time() + 60):
+        frames += 1
+        if event.get("status") == "token":
+            text.append(event["delta"])
+        await asyncio.sleep(args.read_ms / 1000)
+    after = get_sse_bridge_stats()
+    intact = "".join(text) == "".join(f"t{i} " for i in range(args.tokens))
+    print(f"   frames sent {frames} (vs {args.tokens + 40} unbuffered), tokens coalesced "
+          f"{after['tokens_coalesced'] - before['tokens_coalesced']}, progress dropped "
+          f"{after['progress_dropped'] - before['progress_dropped']}, max buffered {bridge.max_buffered}")
+    print(f"   agent publish time {task.result() * 1000:.0f} ms, producer waits "
+          f"{after['producer_waits'] - before['producer_waits']}, text intact: {intact}")
+
+
+async def run(args) -> None:
+    await bench_idle(args)
+    await bench_latency(args)
+    await bench_slow_client(args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=300)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--events", type=int, default=20, help="status events per stream in the latency test")
+    parser.add_argument("--tokens", type=int, default=4000)
+    parser.add_argument("--read-ms", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+ตรวจ ConversationStore (bucket pattern) แบบรันจริง: append / dedupe / migration / ความทนต่อ append ที่ล้มกลางทาง
+  1) append ข้าม bucket: seq ต่อเนื่อง, tail / range / count ตรงกัน
+  2) dedupe: ข้อความเดิมซ้ำติดกันไม่ถูกเพิ่ม, user อื่นเขียนแชทนี้ไม่ได้
+  3) migration: เอกสารแบบเดิม (array messages) → bucket เมื่อมีข้อความใหม่ + head แบบ bucket ที่ยังไม่มี next_seq
+  4) push ลง bucket ล้ม: message_count ไม่เลื่อน, ส่งข้อความเดิมซ้ำได้, tail ไม่มีข้อความผี
+  5) โปรเซสตายหลังจอง seq: repair() ปรับ message_count / last_hash ให้ตรงกับ bucket
+  6) append พร้อมกัน: ทุกข้อความอยู่ครบและเรียงตาม seq
+ต้องมี MongoDB ที่ --uri (ใช้ database ชั่วคราวแล้วลบทิ้ง) หรือ --memory (mongomock-motor ถ้าติดตั้งไว้ — ตรวจ logic เท่านั้น)
+Run: cd backend && python scripts/check_conversation_store.py [--uri mongodb://localhost:27017 | --memory] [--bucket-size 5]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.core.config import settings  # noqa: E402
+from app.storage.conversation_store import ConversationStore, message_fingerprint  # noqa: E402
+
+USER_ID = "check_user"
+FAILURES = []
+
+
+def check(label: str, ok: bool, detail: str = "") -> None:
+    print(f"   [{'ok' if ok else 'FAIL'}] {label}" + (f" — {detail}" if detail and not ok else ""))
+    if not ok:
+        FAILURES.append(label)
+
+
+def msg(i: int, role: str = "") -> dict:
+    return {"role": role or ("user" if i % 2 == 0 else "assistant"), "content": f"message {i}", "timestamp": datetime.utcnow()}
+
+
+class FailingBuckets:
+    """Wrap the buckets collection: the next `fail` update_one calls raise (simulated write failure)."""
+
+    def __init__(self, inner, fail: int = 1):
+        self._inner = inner
+        self.fail = fail
+
+    async def update_one(self, *args, **kwargs):
+        if self.fail > 0:
+            self.fail -= 1
+            raise RuntimeError("simulated bucket write failure")
+        return await self._inner.update_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+async def run_checks(db, bucket_size: int) -> None:
+    store = ConversationStore(db, bucket_size=bucket_size)
+
+    print("1) append across buckets")
+    sid = f"{USER_ID}::append"
+    n = bucket_size * 3 + 2
+    for i in range(n):
+        await store.append(sid, USER_ID, msg(i))
+    tail = await store.tail(sid, 7, keep_seq=True)
+    check("count == appended", await store.count(sid) == n, str(await store.count(sid)))
+    check("tail is the last 7 in order", [m["content"] for m in tail] == [f"message {i}" for i in range(n - 7, n)])
+    check("seq contiguous", [m["seq"] for m in tail] == list(range(n - 7, n)))
+    rng = await store.range(sid, bucket_size - 1, bucket_size + 2)
+    check("range crosses a bucket boundary", [m["seq"] for m in rng] == list(range(bucket_size - 1, bucket_size + 2)))
+
+    print("2) dedupe / ownership")
+    before = await store.count(sid)
+    await store.append(sid, USER_ID, msg(n - 1))
+    check("repeat of the last message is skipped", await store.count(sid) == before)
+    await store.append(sid, USER_ID, msg(n - 2))
+    check("non-consecutive repeat is stored", await store.count(sid) == before + 1)
+    check("other user is rejected", await store.append(sid, "intruder", msg(999)) is False)
+
+    print("3) migration")
+    legacy_sid = f"{USER_ID}::legacy"
+    legacy = [dict(msg(i), timestamp=datetime.utcnow()) for i in range(bucket_size + 3)]
+    await store.heads.insert_one({"session_id": legacy_sid, "user_id": USER_ID, "messages": legacy, "created_at": datetime.utcnow()})
+    check("legacy tail readable before migration", [m["content"] for m in await store.tail(legacy_sid, 3)]
+          == [m["content"] for m in legacy[-3:]])
+    await store.append(legacy_sid, USER_ID, msg(100))
+    head = await store.heads.find_one({"session_id": legacy_sid})
+    check("migrated on next append", head.get("layout") == "bucketed" and "messages" not in head)
+    check("count includes legacy + new", await store.count(legacy_sid) == len(legacy) + 1)
+    check("legacy tail dedupe carried over", await store.append(legacy_sid, USER_ID, msg(100)) and
+          await store.count(legacy_sid) == len(legacy) + 1)
+    old_sid = f"{USER_ID}::pre_next_seq"
+    for i in range(3):
+        await store.append(old_sid, USER_ID, msg(i))
+    await store.heads.update_one({"session_id": old_sid}, {"$unset": {"next_seq": ""}})
+    await store.append(old_sid, USER_ID, msg(3))
+    seqs = [m["seq"] for m in await store.tail(old_sid, 10, keep_seq=True)]
+    check("head without next_seq continues after message_count", seqs == [0, 1, 2, 3], str(seqs))
+
+    print("4) bucket write fails after the seq is reserved")
+    fail_sid = f"{USER_ID}::fail"
+    for i in range(3):
+        await store.append(fail_sid, USER_ID, msg(i))
+    real_buckets = store.buckets
+    store.buckets = FailingBuckets(real_buckets)
+    try:
+        await store.append(fail_sid, USER_ID, msg(3))
+        check("failure surfaced to caller", False)
+    except RuntimeError:
+        check("failure surfaced to caller", True)
+    store.buckets = real_buckets
+    check("message_count not advanced", await store.count(fail_sid) == 3, str(await store.count(fail_sid)))
+    check("tail has no phantom message", len(await store.tail(fail_sid, 10)) == 3)
+    await store.append(fail_sid, USER_ID, msg(3))
+    tail = await store.tail(fail_sid, 10, keep_seq=True)
+    check("retry of the same message is stored", [m["content"] for m in tail][-1] == "message 3")
+    check("count matches stored messages", await store.count(fail_sid) == tail[-1]["seq"] + 1 and len(tail) == 4)
+
+    print("5) process died between reserve and push → repair")
+    crash_sid = f"{USER_ID}::crash"
+    for i in range(4):
+        await store.append(crash_sid, USER_ID, msg(i))
+    lost = msg(4)
+    await store.heads.update_one(
+        {"session_id": crash_sid},
+        {"$inc": {"next_seq": 1}, "$set": {"last_hash": message_fingerprint(lost)}},
+    )
+    result = await store.repair(crash_sid)
+    check("repair keeps message_count at stored messages", result.get("after", {}).get("message_count") == 4, str(result))
+    await store.append(crash_sid, USER_ID, lost)
+    tail = await store.tail(crash_sid, 10)
+    check("lost message can be re-sent after repair", [m["content"] for m in tail][-1] == "message 4" and len(tail) == 5)
+    check("repair is a no-op on a healthy chat", (await store.repair(sid))["before"]["message_count"]
+          == (await store.repair(sid))["after"]["message_count"])
+
+    print("6) concurrent appends")
+    conc_sid = f"{USER_ID}::concurrent"
+    k = bucket_size * 4
+    await asyncio.gather(*[store.append(conc_sid, USER_ID, msg(i, role=f"r{i}")) for i in range(k)])
+    tail = await store.tail(conc_sid, k, keep_seq=True)
+    check("all concurrent messages stored", len(tail) == k and await store.count(conc_sid) == k,
+          f"{len(tail)} / count {await store.count(conc_sid)}")
+    check("ordered by seq", [m["seq"] for m in tail] == list(range(k)))
+
+
+async def run(args) -> None:
+    if args.memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            print("--memory needs mongomock-motor (pip install mongomock-motor)")
+            sys.exit(2)
+        client = AsyncMongoMockClient()
+        print("backend: mongomock-motor (in-memory, logic only)")
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.uri or settings.mongodb_uri, serverSelectionTimeoutMS=3000)
+        try:
+            await client.admin.command("ping")
+        except Exception as e:
+            print(f"MongoDB not reachable ({e}); pass --uri or --memory")
+            sys.exit(2)
+        print(f"backend: MongoDB {args.uri or settings.mongodb_uri}")
+    db = client[args.database]
+    try:
+        if not args.memory:
+            from app.models.database import CONVERSATION_BUCKET_INDEXES, CONVERSATION_INDEXES
+            await db["conversations"].create_indexes(CONVERSATION_INDEXES)
+            await db["conversation_buckets"].create_indexes(CONVERSATION_BUCKET_INDEXES)
+        await run_checks(db, args.bucket_size)
+    finally:
+        await client.drop_database(args.database)
+        client.close()
+    print(f"\n{'all checks passed' if not FAILURES else f'{len(FAILURES)} check(s) failed: {FAILURES}'}")
+    sys.exit(1 if FAILURES else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="")
+    parser.add_argument("--memory", action="store_true", help="run against mongomock-motor instead of a server")
+    parser.add_argument("--database", default="check_conversation_store")
+    parser.add_argument("--bucket-size", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
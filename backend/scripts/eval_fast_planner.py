@@ -0,0 +1,203 @@
+"""
+Offline evaluation: FastPathPlanner (ตัดสินใจ controller ด้วยกฎ) เทียบกับ action ที่ controller LLM ควรเลือก
+ใช้ข้อความตัวอย่างที่ติด label ไว้ในไฟล์นี้ (หรือ --cases ไฟล์ JSONL ของ {"text", "state", "expected", "intent"})
+ไม่ต้องมี API key, network หรือ MongoDB — สร้าง TripPlan จำลองและ ML intent hint จาก label
+state: "empty" = ยังไม่มีทริป, "planned" = มี segment เที่ยวบิน/ที่พัก (pending) แล้ว
+expected: ชนิด action ที่ถูกต้อง (CREATE_ITINERARY / BATCH:UPDATE_REQ) หรือ "llm" = ต้องส่งต่อให้ controller LLM
+สำหรับ CREATE ที่ถูกต้อง จำลองรอบถัดไปของ turn: segment ครบ → BATCH CALL_SEARCH → มีตัวเลือก → ASK_USER
+รายงาน: action agreement, precision ของ fast path, อัตรา fallback และจำนวน controller call ที่ประหยัดได้
+Run: cd backend && python scripts/eval_fast_planner.py [--min-confidence 0.75] [--cases cases.jsonl] [--verbose]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import date, timedelta
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+from app.engine.fast_planner import FastPathPlanner, FastPathTurn  # noqa: E402
+from app.models.actions import ActionType  # noqa: E402
+from app.models.trip_plan import Segment, TripPlan  # noqa: E402
+
+# (text, state, expected, ml intent)
+CASES = [
+    ("อยากไปเชียงใหม่จากกรุงเทพ 12 ธ.ค. - 15 ธ.ค. 2 คน", "empty", "CREATE_ITINERARY", "destination"),
+    ("ไปภูเก็ต 3 คืน เริ่ม 5 มกราคม", "empty", "CREATE_ITINERARY", "destination"),
+    ("Flight from Bangkok to Tokyo Dec 20 to Dec 27 for 2 adults", "empty", "CREATE_ITINERARY", "flight"),
+    ("จองทริปไปโตเกียว 20/12 ถึง 27/12 ผู้ใหญ่ 2 เด็ก 1", "empty", "CREATE_ITINERARY", "booking"),
+    ("ไปโอซาก้ากับแฟน 1-5 มีนาคม", "empty", "CREATE_ITINERARY", "destination"),
+    ("บินเที่ยวเดียวไปสิงคโปร์ 10 พ.ย.", "empty", "CREATE_ITINERARY", "flight"),
+    ("trip to Seoul from Bangkok 2026-11-20 to 2026-11-24", "empty", "CREATE_ITINERARY", "destination"),
+    ("อยากไปเที่ยวกระบี่ 4 วัน 18 ธันวาคม สามคน", "empty", "CREATE_ITINERARY", "destination"),
+    ("ไปเชียงราย 7 ม.ค. ถึง 9 ม.ค.", "empty", "CREATE_ITINERARY", "general"),
+    ("Bangkok to Singapore on Jan 15, 4 nights", "empty", "CREATE_ITINERARY", "flight"),
+    ("ไปญี่ปุ่นช่วงไหนดี", "empty", "llm", "destination"),
+    ("อยากไปเที่ยวทะเล งบ 20000 บาท", "empty", "llm", "general"),
+    ("ไปเชียงใหม่ แวะลำปาง ระหว่างทาง 3 วัน 10 ธ.ค.", "empty", "llm", "destination"),
+    ("แนะนำที่เที่ยวในโตเกียวหน่อย", "empty", "llm", "general"),
+    ("ไปกรุงเทพ โตเกียว โอซาก้า 1-10 ธ.ค.", "empty", "llm", "destination"),
+    ("อยากไปเที่ยวเดือนหน้า", "empty", "llm", "date"),
+    ("ไปภูเก็ตสุดสัปดาห์นี้", "empty", "llm", "destination"),
+    ("hello", "empty", "llm", "general"),
+    ("ไปเชียงใหม่", "empty", "llm", "destination"),
+    ("ไฟลท์เช้าไปภูเก็ต 12 ธ.ค. - 14 ธ.ค.", "empty", "llm", "flight"),
+    ("เปลี่ยนเป็น 3 คน", "planned", "BATCH:UPDATE_REQ", "edit"),
+    ("change to 4 adults and 2 kids", "planned", "BATCH:UPDATE_REQ", "edit"),
+    ("แก้จำนวนผู้ใหญ่ 2 เด็ก 2", "planned", "BATCH:UPDATE_REQ", "edit"),
+    ("เลือกอันแรก", "planned", "llm", "booking"),
+    ("เปลี่ยนวันเป็น 20 ธ.ค.", "planned", "llm", "edit"),
+    ("ขอโรงแรมถูกกว่านี้", "planned", "llm", "hotel"),
+    ("เปลี่ยนปลายทางเป็นกระบี่", "planned", "llm", "edit"),
+    ("3 คน", "planned", "llm", "general"),
+    ("ยืนยันการจอง", "planned", "llm", "booking"),
+    ("ไปเชียงใหม่ 12-15 ธ.ค. แต่ขอโรงแรมใกล้นิมมาน", "empty", "llm", "destination"),
+]
+
+
+def _planned_trip(today: date) -> TripPlan:
+    """ทริปที่มี segment ครบแล้ว (ยังไม่ค้นหา) — ใช้กับ case state=planned"""
+    start = today + timedelta(days=40)
+    end = start + timedelta(days=3)
+    return _trip_from_payload({
+        "origin": "Bangkok", "destination": "Chiang Mai",
+        "start_date": start.isoformat(), "end_date": end.isoformat(), "adults": 2, "children": 0,
+    })
+
+
+def _trip_from_payload(payload: dict) -> TripPlan:
+    """จำลองผลของ CREATE_ITINERARY: เที่ยวบินไป/กลับ + ที่พัก ตาม payload ของ planner"""
+    trip = TripPlan()
+    guests = int(payload.get("guests") or payload.get("adults") or 1)
+    outbound = {"origin": payload["origin"], "destination": payload["destination"], "date": payload["start_date"],
+                "adults": payload.get("adults", 1), "children": payload.get("children", 0)}
+    trip.travel.flights.outbound.append(Segment(requirements=outbound))
+    if payload.get("end_date"):
+        inbound = {**outbound, "origin": payload["destination"], "destination": payload["origin"], "date": payload["end_date"]}
+        trip.travel.flights.inbound.append(Segment(requirements=inbound))
+        trip.accommodation.segments.append(Segment(requirements={
+            "location": payload["destination"], "check_in": payload["start_date"],
+            "check_out": payload["end_date"], "guests": guests,
+        }))
+    return trip
+
+
+def _label(action) -> str:
+    if action.action == ActionType.BATCH:
+        kinds = sorted({item.get("action") for item in action.batch_actions or []})
+        return "BATCH:" + "+".join(kinds)
+    return action.action.value
+
+
+def _simulate_followups(planner: FastPathPlanner, payload: dict, turn: FastPathTurn, max_iterations: int) -> tuple:
+    """รอบ 2..N ของ turn หลัง CREATE: คืน (จำนวนรอบที่ fast path ตัดสินได้, ถูกต้องทั้งหมดหรือไม่)"""
+    trip = _trip_from_payload(payload)
+    saved, correct = 0, True
+    for iteration in range(1, max_iterations):
+        plan = planner.plan(trip, "", None, turn=turn, mode="normal", iteration=iteration, max_iterations=max_iterations)
+        if plan is None:
+            break
+        saved += 1
+        if plan.rule == "call_search":
+            pending = sum(1 for seg in trip.travel.flights.outbound + trip.travel.flights.inbound + trip.accommodation.segments
+                          if seg.needs_search())
+            correct = correct and _label(plan.action) == "BATCH:CALL_SEARCH" and len(plan.action.batch_actions) == pending
+            # จำลองผลค้นหา: ทุก segment ได้ตัวเลือก
+            for item in plan.action.batch_actions:
+                slot = item["payload"]["slot"]
+                idx = item["payload"]["segment_index"]
+                segs = {
+                    "flights_outbound": trip.travel.flights.outbound,
+                    "flights_inbound": trip.travel.flights.inbound,
+                    "accommodation": trip.accommodation.segments,
+                }.get(slot, [])
+                if idx < len(segs):
+                    segs[idx].options_pool = [{"id": "opt-1"}]
+        else:
+            correct = correct and plan.action.action == ActionType.ASK_USER
+            break
+    return saved, correct
+
+
+def _load_cases(path: str) -> list:
+    cases = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                cases.append((row["text"], row.get("state", "empty"), row["expected"], row.get("intent", "general")))
+    return cases
+
+
+def run(args) -> None:
+    cases = _load_cases(args.cases) if args.cases else CASES
+    planner = FastPathPlanner(min_confidence=args.min_confidence)
+    today = date.today()
+
+    agree = fast_decisions = fast_correct = fallbacks = wrong_fallbacks = 0
+    llm_calls_baseline = llm_calls_fast = 0
+    followup_ok = followup_total = 0
+    for text, state, expected, intent in cases:
+        trip = TripPlan() if state == "empty" else _planned_trip(today)
+        hint = {"intent": intent, "confidence": args.ml_confidence, "workflow_intent": None}
+        turn = FastPathTurn()
+        plan = planner.plan(trip, text, hint, turn=turn, mode="normal", iteration=0, max_iterations=args.max_iterations)
+
+        # baseline: controller LLM ทุกรอบ (CREATE แล้ว SEARCH = 2 รอบ, นอกนั้น 1 รอบ)
+        baseline_calls = min(2, args.max_iterations) if expected == "CREATE_ITINERARY" else 1
+        llm_calls_baseline += baseline_calls
+        if plan is None:
+            fallbacks += 1
+            llm_calls_fast += baseline_calls
+            ok = expected == "llm"
+            wrong_fallbacks += 0 if ok else 1
+            got = "llm"
+        else:
+            fast_decisions += 1
+            got = _label(plan.action)
+            ok = got == expected
+            fast_correct += 1 if ok else 0
+            remaining = baseline_calls - 1
+            if ok and plan.rule == "create_itinerary":
+                followup_total += 1
+                saved, follow_correct = _simulate_followups(planner, plan.action.payload, turn, args.max_iterations)
+                followup_ok += 1 if follow_correct else 0
+                remaining = max(0, remaining - saved)
+            llm_calls_fast += remaining
+        agree += 1 if ok else 0
+        if args.verbose or not ok:
+            mark = "ok " if ok else "BAD"
+            conf = f" conf={plan.confidence}" if plan else ""
+            print(f"[{mark}] {state:<8}{expected:<20}got={got:<20}{conf}  {text}")
+
+    n = len(cases)
+    print(f"\n{n} labelled utterances, min_confidence={planner.min_confidence}, ML confidence={args.ml_confidence}")
+    print(f"action agreement:            {agree}/{n} ({agree / n:.1%})")
+    if fast_decisions:
+        print(f"fast-path precision:         {fast_correct}/{fast_decisions} ({fast_correct / fast_decisions:.1%})")
+    print(f"fallback to controller LLM:  {fallbacks}/{n} (of which should have been fast: {wrong_fallbacks})")
+    if followup_total:
+        print(f"CREATE → CALL_SEARCH follow-ups correct: {followup_ok}/{followup_total}")
+    saved = llm_calls_baseline - llm_calls_fast
+    print(f"controller LLM calls:        {llm_calls_baseline} → {llm_calls_fast} (saved {saved}, {saved / max(1, llm_calls_baseline):.1%})")
+    print(f"planner stats: {json.dumps(planner.get_stats(), ensure_ascii=False)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", default="", help="JSONL file of labelled utterances (default: built-in set)")
+    parser.add_argument("--min-confidence", type=float, default=None)
+    parser.add_argument("--ml-confidence", type=float, default=0.85)
+    parser.add_argument("--max-iterations", type=int, default=2)
+    parser.add_argument("--verbose", action="store_true")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Migration: conversations แบบเดิม (array `messages` เดียวต่อแชท) → head + conversation_buckets
+ย้ายทีละแชท (idempotent: รันซ้ำได้, แชทที่ย้ายแล้วถูกข้าม) — แชทที่ยังไม่ย้ายยังอ่านได้ตามปกติ
+และจะถูกย้ายอัตโนมัติเมื่อมีข้อความใหม่ สคริปต์นี้ใช้ย้ายแชทเก่าที่ไม่มีความเคลื่อนไหวให้หมด
+--repair: ตรวจ head ที่ย้ายแล้วให้ message_count / last_hash ตรงกับ bucket (หลัง append ที่ค้างกลางทางเพราะโปรเซสตาย)
+Run: cd backend && python scripts/migrate_conversation_buckets.py [--dry-run] [--limit 0] [--bucket-size 50] [--repair]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models.database import CONVERSATION_BUCKET_INDEXES  # noqa: E402
+from app.storage.conversation_store import BUCKETED_LAYOUT, ConversationStore  # noqa: E402
+
+
+async def migrate(args) -> None:
+    client = AsyncIOMotorClient(args.uri or settings.mongodb_uri)
+    db = client[args.database or settings.mongodb_database]
+    store = ConversationStore(db, bucket_size=args.bucket_size or None)
+    if not args.dry_run:
+        await store.buckets.create_indexes(CONVERSATION_BUCKET_INDEXES)
+
+    if args.repair:
+        await repair(store, args)
+        client.close()
+        return
+
+    query = {"layout": {"$ne": BUCKETED_LAYOUT}}
+    pending = await store.heads.count_documents(query)
+    print(f"{pending} conversation(s) in the legacy layout (bucket size {store.bucket_size})")
+    if args.dry_run or not pending:
+        client.close()
+        return
+
+    cursor = store.heads.find(query, {"session_id": 1, "_id": 0})
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+    t0 = time.perf_counter()
+    chats = messages = failed = 0
+    async for doc in cursor:
+        session_id = doc.get("session_id")
+        if not session_id:
+            continue
+        try:
+            messages += await store.migrate(session_id)
+            chats += 1
+        except Exception as e:
+            failed += 1
+            print(f"  failed {session_id}: {e}")
+        if chats and chats % 500 == 0:
+            print(f"  {chats} chats, {messages} messages ...")
+    print(f"migrated {chats} chat(s), {messages} message(s), {failed} failed in {time.perf_counter() - t0:.1f}s")
+    client.close()
+
+
+async def repair(store: ConversationStore, args) -> None:
+    cursor = store.heads.find({"layout": BUCKETED_LAYOUT}, {"session_id": 1, "_id": 0})
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+    checked = fixed = 0
+    async for doc in cursor:
+        session_id = doc.get("session_id")
+        if not session_id:
+            continue
+        checked += 1
+        if args.dry_run:
+            continue
+        result = await store.repair(session_id)
+        if result and result["before"] != result["after"]:
+            fixed += 1
+            print(f"  {session_id}: {result['before']} -> {result['after']}")
+    print(f"checked {checked} bucketed chat(s), repaired {fixed}" + (" (dry run)" if args.dry_run else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="", help="MongoDB URI (default: settings.mongodb_uri)")
+    parser.add_argument("--database", default="", help="Database name (default: settings.mongodb_database)")
+    parser.add_argument("--bucket-size", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=0, help="Migrate at most N chats (0 = all)")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--repair", action="store_true", help="Reconcile bucketed heads with their buckets")
+    asyncio.run(migrate(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
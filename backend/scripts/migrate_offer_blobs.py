@@ -0,0 +1,155 @@
+"""
+Migration: ย้าย raw_data เต็มของ options_pool / selected_option ใน sessions และ trips ไปเก็บที่ offer_blobs
+(segment เหลือ raw_data แบบย่อ + raw_ref) — idempotent: option ที่มี raw_ref แล้วถูกข้าม, รันซ้ำได้
+เอกสารที่ยังไม่ย้ายยังใช้งานได้ตามปกติ (booking ใช้ raw_data inline เมื่อไม่มี raw_ref)
+bookings ไม่ถูกแตะ (เป็นหลักฐานการจอง เก็บ payload เต็มไว้)
+เขียนกลับแบบมีเงื่อนไข (trip_plan ต้องยังเหมือนตอนอ่าน) — ถ้าแชท/บันทึกทริปเขียนทับระหว่างนั้น จะอ่านใหม่แล้วลองอีกครั้ง
+raw ที่เล็กกว่า OFFER_BLOB_MIN_BYTES อยู่ inline ตามเดิม (เหมือน OfferBlobStore) ทั้งตอนรันจริงและ --dry-run
+Run: cd backend && python scripts/migrate_offer_blobs.py [--dry-run] [--limit 0] [--collections sessions,trips]
+"""
+import argparse
+import asyncio
+import copy
+import logging
+import os
+import sys
+import time
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+logging.disable(logging.CRITICAL)
+
+import bson  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models.database import OFFER_BLOB_INDEXES  # noqa: E402
+from app.services.offer_blob_store import (  # noqa: E402
+    BLOB_COLLECTION,
+    RAW_REF_FIELD,
+    OfferBlobStore,
+    canonical_bytes,
+    compact_raw,
+    iter_plan_segments,
+)
+
+
+MAX_ATTEMPTS = 3
+
+
+def _offloadable(opt) -> bool:
+    """Same rule as OfferBlobStore.offload_options: raw_data dict, no raw_ref yet, not below the inline threshold."""
+    if not isinstance(opt, dict) or opt.get(RAW_REF_FIELD):
+        return False
+    raw = opt.get("raw_data")
+    return isinstance(raw, dict) and bool(raw) and len(canonical_bytes(raw)) >= settings.offer_blob_min_bytes
+
+
+def _plan_options(plan: dict):
+    for seg in iter_plan_segments(plan):
+        yield from (seg.get("options_pool") or []) + [seg.get("selected_option")]
+
+
+def _needs_migration(plan: dict) -> bool:
+    return any(_offloadable(opt) for opt in _plan_options(plan))
+
+
+async def _offload_guarded(coll, doc_id, plan: dict, store: OfferBlobStore):
+    """
+    Offload and write back only if trip_plan is unchanged since it was read; on a concurrent save re-read and retry.
+    Returns (new plan, options moved), or (None, 0) when the document kept changing / disappeared.
+    """
+    for _ in range(MAX_ATTEMPTS):
+        original = copy.deepcopy(plan)  # offload_plan แก้ plan in place
+        plan, moved = await store.offload_plan(plan)
+        if not moved:
+            return plan, 0
+        result = await coll.update_one({"_id": doc_id, "trip_plan": original}, {"$set": {"trip_plan": plan}})
+        if result.matched_count:
+            return plan, moved
+        fresh = await coll.find_one({"_id": doc_id}, {"trip_plan": 1})
+        plan = (fresh or {}).get("trip_plan")
+        if not isinstance(plan, dict) or not _needs_migration(plan):
+            return None, 0
+    return None, 0
+
+
+async def _migrate_collection(coll, key: str, store: OfferBlobStore, args) -> None:
+    query = {"trip_plan": {"$type": "object"}}
+    cursor = coll.find(query, {key: 1, "trip_plan": 1})
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+    t0 = time.perf_counter()
+    docs = changed = options = failed = conflicts = 0
+    before = after = 0
+    async for doc in cursor:
+        docs += 1
+        plan = doc.get("trip_plan") or {}
+        if not _needs_migration(plan):
+            continue
+        size_before = len(bson.encode({"trip_plan": plan}))
+        try:
+            if args.dry_run:
+                # ประเมินขนาดหลังย้ายโดยไม่เขียน blob (เฉพาะ option ที่รันจริงจะย้าย)
+                for opt in _plan_options(plan):
+                    if _offloadable(opt):
+                        opt["raw_data"] = compact_raw(opt["raw_data"])
+                        options += 1
+            else:
+                migrated, moved = await _offload_guarded(coll, doc["_id"], plan, store)
+                if migrated is None:
+                    # ถูกบันทึกทับซ้ำๆ ระหว่าง migrate (แชทกำลังใช้งาน) → ข้าม รันใหม่ภายหลังได้
+                    conflicts += 1
+                    continue
+                if not moved:
+                    continue
+                plan = migrated
+                options += moved
+        except Exception as e:
+            failed += 1
+            print(f"  failed {doc.get(key)}: {e}")
+            continue
+        changed += 1
+        before += size_before
+        after += len(bson.encode({"trip_plan": plan}))
+        if changed % 500 == 0:
+            print(f"  {changed} {coll.name} ...")
+    label = "would migrate" if args.dry_run else "migrated"
+    print(
+        f"{coll.name}: scanned {docs}, {label} {changed} document(s) / {options} option(s), {failed} failed, "
+        f"{conflicts} skipped (changed during migration) "
+        f"in {time.perf_counter() - t0:.1f}s — trip_plan {before / 1024:.0f} KB → {after / 1024:.0f} KB"
+    )
+
+
+async def migrate(args) -> None:
+    client = AsyncIOMotorClient(args.uri or settings.mongodb_uri)
+    db = client[args.database or settings.mongodb_database]
+    store = OfferBlobStore(collection=db[BLOB_COLLECTION])
+    if not args.dry_run:
+        await db[BLOB_COLLECTION].create_indexes(OFFER_BLOB_INDEXES)
+    keys = {"sessions": "session_id", "trips": "trip_id"}
+    for name in [c.strip() for c in args.collections.split(",") if c.strip()]:
+        if name not in keys:
+            print(f"skip unknown collection '{name}'")
+            continue
+        await _migrate_collection(db[name], keys[name], store, args)
+    if not args.dry_run:
+        print(f"blob store: {store.get_stats()}")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="", help="MongoDB URI (default: settings.mongodb_uri)")
+    parser.add_argument("--database", default="", help="Database name (default: settings.mongodb_database)")
+    parser.add_argument("--collections", default="sessions,trips")
+    parser.add_argument("--limit", type=int, default=0, help="Scan at most N documents per collection (0 = all)")
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(migrate(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+จัด index ของ memories ให้ตรงกับ MEMORY_INDEXES
+เดิมมี index ซ้ำ (user_id_idx + user_id_1, category_idx + category_1) และ index ที่ไม่มี query ใช้
+(importance_idx, created_at_-1) — ทุก index ทำให้ insert/update ของ memories ช้าลง
+สคริปต์นี้ลบ index ใน LEGACY_MEMORY_INDEX_NAMES ที่ยังมีอยู่ แล้วสร้าง MEMORY_INDEXES ที่ขาด
+Run: cd backend && python scripts/reconcile_memory_indexes.py [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models.database import LEGACY_MEMORY_INDEX_NAMES, MEMORY_INDEXES  # noqa: E402
+
+
+async def reconcile(args) -> None:
+    client = AsyncIOMotorClient(args.uri or settings.mongodb_uri)
+    coll = client[args.database or settings.mongodb_database]["memories"]
+    existing = await coll.index_information()
+    print("current indexes: " + ", ".join(f"{name} {info['key']}" for name, info in existing.items()))
+
+    to_drop = [name for name in LEGACY_MEMORY_INDEX_NAMES if name in existing]
+    wanted_keys = {tuple(m.document["key"].items()) for m in MEMORY_INDEXES}
+    existing_keys = {tuple(info["key"]) for info in existing.values()}
+    to_create = [m for m in MEMORY_INDEXES if tuple(m.document["key"].items()) not in existing_keys]
+    print(f"drop: {to_drop or '-'}")
+    print(f"create: {[m.document['name'] for m in to_create] or '-'} ({len(wanted_keys)} wanted)")
+    if args.dry_run:
+        client.close()
+        return
+
+    # สร้างก่อนลบ เพื่อให้ recall มี index ใช้ตลอด
+    if to_create:
+        await coll.create_indexes(to_create)
+    for name in to_drop:
+        await coll.drop_index(name)
+    print("indexes now: " + ", ".join(sorted((await coll.index_information()).keys())))
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="", help="MongoDB URI (default: settings.mongodb_uri)")
+    parser.add_argument("--database", default="", help="Database name (default: settings.mongodb_database)")
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(reconcile(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Soak test: in-process caches (options cache, RedisCache fallback, rate limiter, CostTracker) ภายใต้เซสชันจำนวนมาก
+ไม่มี Redis → ทุกอย่างลง BoundedCache; หน่วยความจำต้องคงที่หลังถึงเพดาน entry/bytes
+Run: cd backend && python scripts/soak_bounded_cache.py [--sessions 300000] [--report-every 50000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
+
+os.environ.pop("REDIS_URL", None)
+
+from app.core.bounded_cache import get_all_cache_stats  # noqa: E402
+from app.core.redis_cache import cache  # noqa: E402
+from app.core.redis_rate_limiter import RedisRateLimiter  # noqa: E402
+from app.engine.cost_tracker import cost_tracker  # noqa: E402
+from app.services.options_cache import get_options_cache  # noqa: E402
+
+
+def _options(i: int):
+    return [
+        {"display_name": f"TG{i % 900 + 100}", "price_amount": 3000 + j, "category": "flight", "raw_data": {"id": f"{i}-{j}"}}
+        for j in range(5)
+    ]
+
+
+async def _soak(sessions: int, report_every: int):
+    options_cache = get_options_cache()
+    limiter = RedisRateLimiter(max_requests=60, window_seconds=60)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    print(f"{'sessions':>10}{'traced MB':>12}{'peak MB':>10}{'sec':>8}")
+    for i in range(1, sessions + 1):
+        sid = f"soak-{i}"
+        req = {"origin": "BKK", "destination": "HKT", "departure_date": "2026-12-20", "adults": 1 + i % 3}
+        await options_cache.save_options(sid, "flights_outbound", 0, req, _options(i))
+        await options_cache.save_raw_amadeus(sid, "flights_outbound", 0, {"data": [{"id": i}]})
+        await cache.set(f"search:{sid}", {"n": i, "payload": "x" * 200}, ttl=3600)
+        await limiter.is_allowed(f"user-{i}")
+        cost_tracker.track_llm_call(sid, f"user-{i}", "gemini-2.5-flash", "controller", 1200, 300)
+        if i % report_every == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            print(f"{i:>10}{current / 1e6:>12.1f}{peak / 1e6:>10.1f}{time.perf_counter() - t0:>8.1f}")
+    tracemalloc.stop()
+    print()
+    print(f"{'cache':<34}{'entries':>9}{'approx MB':>11}{'evictions':>11}{'hit rate':>10}")
+    for s in sorted(get_all_cache_stats(), key=lambda s: s["name"]):
+        print(f"{s['name']:<34}{s['entries']:>9}{s['approx_bytes'] / 1e6:>11.1f}{s['evictions']:>11}{s['hit_rate']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=300_000)
+    parser.add_argument("--report-every", type=int, default=50_000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(_soak(args.sessions, args.report_every))
+
+
+if __name__ == "__main__":
+    main()
@@ -263,6 +263,9 @@ function App() {
             };
             setNotifications(prev => [formatted, ...prev]);
             setNotificationCount(prev => prev + 1);
+          } else if (msg.type === 'resync') {
+            // server ทิ้ง event บางส่วน (client ช้า / Redis reconnect) → โหลดรายการใหม่
+            fetchNotificationCount();
           }
         } catch (e) {
           console.error('SSE parse error:', e);
@@ -786,6 +786,7 @@ export default function AITravelChat({ user, onLogout, onSignIn, initialPrompt =
   const completedProcessedRef = useRef(false);
   // ✅ สถานะการทำงานของ Agent แบบ realtime
   const [agentStatus, setAgentStatus] = useState(null); // { status, message, step }
+  const [streamingText, setStreamingText] = useState(''); // คำตอบที่ Responder กำลัง stream (event status=token)
   // ✅ ข้อความแก้ไขทริป (สำหรับปุ่ม "รัน Flow ใหม่" ในโหมดแก้ไข) — ใช้ state เพื่อให้ปุ่มแสดงหลังโหลดจากประวัติ
   const [editModeMessageForRerun, setEditModeMessageForRerun] = useState(null);
   // ✅ โหมดแก้ไข (มาจาก My Bookings กดแก้ไข) — บังคับใช้โหมดถามเท่านั้น
@@ -1794,6 +1795,7 @@ export default function AITravelChat({ user, onLogout, onSignIn, initialPrompt =
     appendMessageToTrip(targetId, userMessage);
     setProcessingTripId(targetId);
     setAgentStatus(null); // Reset status
+    setStreamingText('');
 
     // Create abort controller for this request
     abortControllerRef.current = new AbortController();
@@ -1858,7 +1860,17 @@ export default function AITravelChat({ user, onLogout, onSignIn, initialPrompt =
                 });
                 throw new Error(data.message || 'Unknown stream error');
               }
-              
+
+              // ✅ Streaming: ต่อ token ของคำตอบที่กำลังสร้าง (ข้อความจริงมาจาก completed)
+              if (data.status === 'token') {
+                setStreamingText(prev => prev + (data.delta || ''));
+                continue;
+              }
+              if (data.status === 'token_reset') {
+                setStreamingText('');
+                continue;
+              }
+
               // ✅ อัปเดตสถานะการทำงานแบบ realtime (ไม่ใช้ heartbeat — เอาออกเพื่อให้แสดงเฉพาะขั้นตอนจริง)
               if (data.status && data.message && data.status !== 'heartbeat' && data.step !== 'heartbeat') {
                 setAgentStatus({
@@ -2120,6 +2132,7 @@ export default function AITravelChat({ user, onLogout, onSignIn, initialPrompt =
     } finally {
       setProcessingTripId(null);
       setAgentStatus(null); // Clear status
+      setStreamingText('');
       abortControllerRef.current = null;
       sendInProgressRef.current = false; // Allow next send (fix duplicate messages from double-send)
     }
@@ -2160,6 +2173,7 @@ export default function AITravelChat({ user, onLogout, onSignIn, initialPrompt =
     // Create abort controller for this request
     abortControllerRef.current = new AbortController();
     setAgentStatus(null); // Reset status
+    setStreamingText('');
     
     try {
       // ✅ ใช้ SSE endpoint เพื่อให้แสดงการทำงานแบบ realtime
@@ -2210,6 +2224,16 @@ export default function AITravelChat({ user, onLogout, onSignIn, initialPrompt =
                 throw new Error(data.message || 'Unknown stream error');
               }
 
+              // ✅ Streaming: ต่อ token ของคำตอบที่กำลังสร้าง (ข้อความจริงมาจาก completed)
+              if (data.status === 'token') {
+                setStreamingText(prev => prev + (data.delta || ''));
+                continue;
+              }
+              if (data.status === 'token_reset') {
+                setStreamingText('');
+                continue;
+              }
+
               // ✅ อัปเดตสถานะการทำงานแบบ realtime (ไม่ใช้ heartbeat)
               if (data.status && data.message && data.status !== 'heartbeat' && data.step !== 'heartbeat') {
                 setAgentStatus({
@@ -2375,6 +2399,7 @@ export default function AITravelChat({ user, onLogout, onSignIn, initialPrompt =
       }
     } finally {
       setProcessingTripId(null);
+      setStreamingText('');
       abortControllerRef.current = null;
     }
   };
@@ -5242,6 +5267,11 @@ export default function AITravelChat({ user, onLogout, onSignIn, initialPrompt =
                         })()}
                       </div>
                     </div>
+                    {streamingText && (
+                      <div className="agent-activity-draft" style={{ whiteSpace: 'pre-wrap' }}>
+                        {streamingText}
+                      </div>
+                    )}
                     <div className="typing-dots">
                       <div className="typing-dot"></div>
                       <div className="typing-dot"></div>